@@ -1,16 +1,21 @@
 # === APP.PY ===
 # Módulo principal de la interfaz gráfica del sistema de restaurante usando Flet.
+import time
+INICIO_PROCESO = time.perf_counter()  # para medir cuánto tarda la primera pantalla
 import flet as ft
 from typing import Optional, Callable, List, Dict, Any
 from datetime import datetime
 import threading
-import time
+import os
+import sys
+import importlib
 import requests
 import winsound
 import time as time_module
 import logging  # <-- NUEVO
 from pathlib import Path
 import copy
+import json
 
 
 # ====================== SISTEMA DE LOGS PROFESIONAL ======================
@@ -32,7 +37,9 @@ log.info("app.py cargado correctamente - Iniciando módulo principal")
 from inventario_view import crear_vista_inventario
 from inventario_service import InventoryService
 from configuraciones_view import crear_vista_configuraciones
-from reportes_view import crear_vista_reportes
+# reportes_view NO se importa aquí: trae plotly, numpy y reportlab, que la terminal de la
+# mesera no necesita. Se precarga en segundo plano con la interfaz ya visible y, si aún no
+# terminó, se importa al abrir la pestaña Reportes (ver RestauranteGUI.abrir_reportes)
 from caja_view import crear_vista_caja # <-- IMPORTAR LA NUEVA VISTA DE CAJA
 from reservas_view import crear_vista_reservas
 from reservas_service import ReservasService # Asumiendo que creas este archivo
@@ -42,6 +49,29 @@ from recetas_service import RecetasService
 
 log.info("Módulos importados correctamente (vistas y servicios)")
 
+# === REFRESCO PARCIAL DE LA UI ===
+# Índices de las pestañas principales (orden en ft.Tabs de RestauranteGUI.main)
+PESTANA_MESERA, PESTANA_COCINA, PESTANA_CAJA, PESTANA_ADMIN = 0, 1, 2, 3
+PESTANA_INVENTARIO, PESTANA_RECETAS, PESTANA_RESERVAS, PESTANA_REPORTES = 4, 5, 8, 9
+
+# Importar el stack de reportes en segundo plano apenas se muestra la interfaz (0 = sólo al abrir la pestaña)
+PRECARGAR_REPORTES = os.environ.get("PRECARGAR_REPORTES", "1") != "0"
+
+# Dominios de datos que marca cada evento del backend como modificados
+DOMINIOS_POR_EVENTO = {
+    "pedido_creado": {"pedidos", "mesas", "inventario"},
+    "pedido_estado": {"pedidos", "mesas"},
+    "pedido_actualizado": {"pedidos", "mesas"},
+    "pedido_eliminado": {"pedidos", "mesas"},
+    "stock_bajo": {"inventario"},
+    "inventario_actualizado": {"inventario"},
+    "inventario_eliminado": {"inventario"},
+    "mesas_actualizadas": {"mesas", "reservas"},
+    "reserva_creada": {"mesas", "reservas"},
+    "reserva_eliminada": {"mesas", "reservas"},
+    "menu_actualizado": {"menu"},
+}
+
 # === FUNCIÓN: reproducir_sonido_pedido ===
 # Reproduce una melodía simple cuando se confirma un pedido.
 def reproducir_sonido_pedido():
@@ -859,6 +889,31 @@ def crear_vista_cocina(backend_service, on_update_ui, page):
     # ===== NUEVO: ESTADO DEL FILTRO =====
     filtro_actual = {"valor": "todos"}  # todos | pendiente | preparacion | retrasados
 
+    # ===== TARJETAS POR CLAVE =====
+    # {id de pedido: (versión del contenido, tarjeta)}. Una tarjeta sólo se vuelve a crear si
+    # su versión cambió; si no, se reutiliza el mismo control y sólo se refrescan sus textos
+    # de tiempo. Así page.update() envía al cliente las diferencias y no todas las tarjetas.
+    # Los pedidos activos que el filtro oculta conservan su tarjeta para cuando vuelvan
+    tarjetas = {}
+
+    def version_tarjeta(pedido, atrasado):
+        """Todo lo que cambia el contenido de la tarjeta, menos los tiempos (que se refrescan en sitio)."""
+        return hash(json.dumps(
+            [pedido.get("estado"), pedido.get("items"), pedido.get("notas"),
+             obtener_titulo_pedido(pedido), pedido.get("fecha_hora"), atrasado],
+            sort_keys=True, default=str
+        ))
+
+    def minutos_desde_pedido(pedido, ahora):
+        try:
+            fecha_pedido_str = pedido.get('fecha_hora', '')
+            if fecha_pedido_str:
+                fecha_pedido = datetime.strptime(fecha_pedido_str.split(".")[0], "%Y-%m-%d %H:%M:%S")
+                return (ahora - fecha_pedido).total_seconds() / 60
+        except:
+            pass
+        return 0
+
     def actualizar():
         nonlocal alertas_retraso_vista
         try:
@@ -938,11 +993,34 @@ def crear_vista_cocina(backend_service, on_update_ui, page):
             btn_preparacion.text = f"👨‍🍳 En Prep. ({total_preparacion})"
             btn_retrasados.text = f"⚠️ Retrasados ({total_retrasados})"
 
-            # ===== ACTUALIZAR LISTA DE PEDIDOS =====
-            lista_pedidos.controls.clear()
+            # ===== ACTUALIZAR LISTA DE PEDIDOS (POR CLAVE) =====
+            ids_activos = {p["id"] for p in pedidos}
+            ids_atrasados = {a['id_pedido'] for a in alertas_retraso_vista}
+            quitadas = 0
+            for pedido_id in list(tarjetas):
+                if pedido_id not in ids_activos:
+                    del tarjetas[pedido_id]
+                    quitadas += 1
+
+            controles = []
+            creadas = 0
             for pedido in pedidos_filtrados:
-                lista_pedidos.controls.append(crear_item_pedido_cocina(pedido, backend_service, on_update_ui))
-            
+                version = version_tarjeta(pedido, pedido["id"] in ids_atrasados)
+                guardada = tarjetas.get(pedido["id"])
+                if guardada is None or guardada[0] != version:
+                    tarjeta = crear_item_pedido_cocina(pedido, backend_service, on_update_ui)
+                    tarjetas[pedido["id"]] = (version, tarjeta)
+                    creadas += 1
+                else:
+                    tarjeta = guardada[1]
+                    tarjeta.actualizar_tiempo(ahora)
+                controles.append(tarjeta)
+
+            # Flet compara la lista nueva con la anterior por control: sólo agrega, quita o mueve
+            if [id(c) for c in lista_pedidos.controls] != [id(c) for c in controles]:
+                lista_pedidos.controls = controles
+            log.debug(f"Cocina → {len(controles)} tarjetas | {creadas} creadas | {len(controles) - creadas} reutilizadas | {quitadas} quitadas")
+
             page.update()
         except Exception as e:
             log.error(f"Error crítico al actualizar vista Cocina: {e}")
@@ -955,16 +1033,7 @@ def crear_vista_cocina(backend_service, on_update_ui, page):
         pedido_atrasado = any(a['id_pedido'] == pedido_id for a in alertas_retraso_vista)
         
         # ===== CALCULAR TIEMPO TRANSCURRIDO =====
-        try:
-            fecha_pedido_str = pedido.get('fecha_hora', '')
-            if fecha_pedido_str:
-                fecha_pedido = datetime.strptime(fecha_pedido_str.split(".")[0], "%Y-%m-%d %H:%M:%S")
-                ahora = datetime.now()
-                minutos_transcurridos = (ahora - fecha_pedido).total_seconds() / 60
-            else:
-                minutos_transcurridos = 0
-        except:
-            minutos_transcurridos = 0
+        minutos_transcurridos = minutos_desde_pedido(pedido, datetime.now())
         
         # ===== NUEVO SISTEMA DE COLORES POR ESTADO =====
         estado_pedido = pedido.get("estado", "Pendiente")
@@ -1031,15 +1100,16 @@ def crear_vista_cocina(backend_service, on_update_ui, page):
             tiempo_retraso = alerta['tiempo_retraso'] if alerta else 0
             origen = f"{titulo_base} - {pedido.get('fecha_hora', 'Sin fecha')[-8:]}"
             # Agregar información adicional sobre el retraso
+            texto_retraso = ft.Text(
+                f"RETRASADO: {tiempo_retraso:.1f} minutos",
+                size=13,
+                color=ft.Colors.RED_300,
+                weight=ft.FontWeight.BOLD
+            )
             info_retraso = ft.Container(
                 content=ft.Row([
                     ft.Icon(ft.Icons.ALARM, color=ft.Colors.RED_400, size=16),
-                    ft.Text(
-                        f"RETRASADO: {tiempo_retraso:.1f} minutos",
-                        size=13,
-                        color=ft.Colors.RED_300,
-                        weight=ft.FontWeight.BOLD
-                    )
+                    texto_retraso
                 ], spacing=5),
                 padding=ft.padding.only(top=5, bottom=5),
                 bgcolor=ft.Colors.with_opacity(0.2, ft.Colors.RED_900),
@@ -1047,6 +1117,7 @@ def crear_vista_cocina(backend_service, on_update_ui, page):
             )
         else:
             origen = f"{titulo_base} - {pedido.get('fecha_hora', 'Sin fecha')[-8:]}"
+            texto_retraso = None
             info_retraso = None
 
         def cambiar_estado(e, p, nuevo_estado):
@@ -1097,13 +1168,15 @@ def crear_vista_cocina(backend_service, on_update_ui, page):
             weight=ft.FontWeight.BOLD
         )
         
+        icono_temporizador = ft.Icon(
+            ft.Icons.ACCESS_TIME,
+            color=obtener_color_tiempo(minutos_transcurridos),
+            size=16
+        )
+
         temporizador_container = ft.Container(
             content=ft.Row([
-                ft.Icon(
-                    ft.Icons.ACCESS_TIME,
-                    color=obtener_color_tiempo(minutos_transcurridos),
-                    size=16
-                ),
+                icono_temporizador,
                 temporizador_text
             ], spacing=5),
             padding=5,
@@ -1248,6 +1321,20 @@ def crear_vista_cocina(backend_service, on_update_ui, page):
 
         card_container.on_hover = on_hover_card
 
+        # ===== TIEMPOS EN SITIO =====
+        def actualizar_tiempo(ahora):
+            """Refresca el temporizador y los minutos de retraso sin rehacer la tarjeta."""
+            minutos = minutos_desde_pedido(pedido, ahora)
+            temporizador_text.value = formatear_tiempo(minutos)
+            temporizador_text.color = obtener_color_tiempo(minutos)
+            icono_temporizador.color = obtener_color_tiempo(minutos)
+            if texto_retraso is not None:
+                alerta = next((a for a in alertas_retraso_vista if a['id_pedido'] == pedido_id), None)
+                if alerta:
+                    texto_retraso.value = f"RETRASADO: {alerta['tiempo_retraso']:.1f} minutos"
+
+        card_container.actualizar_tiempo = actualizar_tiempo
+
         return card_container
 
     # ===== FUNCIONES DE FILTRADO =====
@@ -1662,7 +1749,9 @@ class RestauranteGUI:
 
         from backend_service import BackendService
         from configuraciones_service import ConfiguracionesService
+        from eventos_service import EventosService
         self.backend_service = BackendService()
+        self.eventos_service = EventosService()
         self.inventory_service = InventoryService()
         self.config_service = ConfiguracionesService()
         self.recetas_service = RecetasService()
@@ -1676,9 +1765,24 @@ class RestauranteGUI:
         self.vista_recetas = None
         self.vista_configuraciones = None
         self.vista_reportes = None
+        self.reportes_creados = False
+        self.lock_reportes = threading.Lock()
         self.vista_personalizacion = None
         self.menu_cache = None
+        self.version_menu = None  # Versión del menú en menu_cache (X-Menu-Version del backend)
         self.hilo_sincronizacion = None
+        # Se activa con cada evento del backend para despertar al hilo de sincronización
+        self.evento_sincronizacion = threading.Event()
+        self.intervalo_sondeo = 3  # Segundos entre refrescos si el canal de eventos está caído
+        self.intervalo_reloj_eventos = 30  # Refresco de tiempos de cocina/retrasos con el canal activo
+        self.intervalo_lento = 60  # Carril lento: clientes (no emiten eventos) y el menú por si se perdió un evento
+        self.ultimo_carril_lento = 0
+
+        # Refresco parcial: vistas con datos pendientes y pestaña visible
+        self.vistas_sucias = set()
+        self.hashes_dominios = {}  # {dominio: hash de la última respuesta} para el carril lento
+        self.lock_refresco = threading.RLock()
+        self.pestana_activa = PESTANA_MESERA
         
         # Alertas de stock
         self.hilo_verificacion_stock = None  # Eliminado en la nueva versión
@@ -1797,6 +1901,7 @@ class RestauranteGUI:
             # Si hubo CUALQUIER cambio (estructura o valores), recalculamos las alertas
             if cambio_estructural or cambio_valor:
                 log.debug("Cambio en inventario detectado (valor o eliminación) -> Recalculando alertas")
+                self.marcar_sucio("inventario")
                 
                 # Verificar stock bajo usando el umbral personalizado de cada ítem
                 ingredientes_bajos = []
@@ -1853,6 +1958,7 @@ class RestauranteGUI:
 
             if not cambios_detectados and self.pedidos_activos_actual:
                 return  # Solo si realmente no cambió nada
+            self.marcar_sucio("pedidos", "mesas")
 
             # === AQUÍ SÍ ENTRA SIEMPRE QUE HAYA UN PEDIDO NUEVO O CAMBIO ===
 
@@ -1901,29 +2007,194 @@ class RestauranteGUI:
         # Verificar retrasos  
         self.verificar_retrasos_real_time()
 
+    # === REFRESCO PARCIAL: dominios modificados → vistas sucias ===
+    def _vistas_refrescables(self):
+        """(clave, pestaña, dominios de los que depende, función que la refresca)"""
+        return [
+            ("mesas_grid", PESTANA_MESERA, {"mesas", "pedidos", "tiempo"}, self._refrescar_grid_mesas),
+            ("menu_gestion", PESTANA_MESERA, {"menu"}, lambda: self.panel_gestion.actualizar_menu(self.menu_cache)),
+            ("cocina", PESTANA_COCINA, {"pedidos", "tiempo"}, lambda: self.vista_cocina.actualizar()),
+            ("caja", PESTANA_CAJA, {"pedidos"}, lambda: self.vista_caja.actualizar()),
+            ("admin_menu", PESTANA_ADMIN, {"menu"}, lambda: self.vista_admin.actualizar_menu(self.menu_cache)),
+            ("admin_clientes", PESTANA_ADMIN, {"clientes"}, lambda: self.vista_admin.actualizar_lista_clientes()),
+            ("inventario", PESTANA_INVENTARIO, {"inventario"}, lambda: self.vista_inventario.actualizar_lista()),
+            ("recetas", PESTANA_RECETAS, {"inventario"}, lambda: self.vista_recetas.actualizar_datos()),
+            ("reservas_clientes", PESTANA_RESERVAS, {"clientes"}, lambda: self.vista_reservas.cargar_clientes()),
+            ("reservas_dia", PESTANA_RESERVAS, {"reservas"}, lambda: self.vista_reservas.actualizar_dia()),
+        ]
+
+    def marcar_sucio(self, *dominios):
+        """Marca como pendientes de refresco las vistas que dependen de estos dominios."""
+        dominios = set(dominios)
+        with self.lock_refresco:
+            for clave, _, depende_de, _ in self._vistas_refrescables():
+                if depende_de & dominios:
+                    self.vistas_sucias.add(clave)
+
+    def _dominio_cambio(self, dominio: str, datos) -> bool:
+        """Compara el hash de la respuesta con el anterior (para datos que no emiten eventos)."""
+        nuevo_hash = hash(json.dumps(datos, sort_keys=True, default=str))
+        if self.hashes_dominios.get(dominio) == nuevo_hash:
+            return False
+        self.hashes_dominios[dominio] = nuevo_hash
+        return True
+
+    def recargar_menu(self) -> bool:
+        """Trae el menú sólo si cambió de versión (si no, el backend contesta 304). True si se recargó."""
+        version, menu = self.backend_service.obtener_menu_si_cambio(self.version_menu if self.menu_cache else None)
+        if menu is None:
+            return False
+        self.version_menu = version
+        self.menu_cache = menu
+        log.debug(f"Menú recargado → versión {version} | {len(menu)} ítems")
+        return True
+
+    def revisar_carril_lento(self):
+        """Menú y clientes: se consultan cada `intervalo_lento` segundos y sólo ensucian si cambiaron."""
+        self.ultimo_carril_lento = time.monotonic()
+        try:
+            if self.recargar_menu():
+                self.marcar_sucio("menu")
+                log.debug("Carril lento → menú cambió")
+        except Exception as e:
+            log.error(f"Error al revisar menú en carril lento: {e}")
+        try:
+            if self._dominio_cambio("clientes", self.backend_service.obtener_clientes()):
+                self.marcar_sucio("clientes")
+                log.debug("Carril lento → lista de clientes cambió")
+        except Exception as e:
+            log.error(f"Error al revisar clientes en carril lento: {e}")
+
+    def _refrescar_grid_mesas(self):
+        nuevo_grid = crear_mesas_grid(self.backend_service, self.seleccionar_mesa, self)
+        self.mesas_grid.controls = nuevo_grid.controls
+        self.mesas_grid.update()
+
+    def refrescar_vistas_sucias(self):
+        """Refresca sólo las vistas pendientes de la pestaña visible; el resto espera a que se abra."""
+        if self.page is None or self.mesas_grid is None:
+            return  # Interfaz aún no construida (asistente de primera configuración)
+        with self.lock_refresco:
+            refrescadas = []
+            for clave, pestana, _, refrescar in self._vistas_refrescables():
+                if clave not in self.vistas_sucias or pestana != self.pestana_activa:
+                    continue
+                self.vistas_sucias.discard(clave)
+                try:
+                    refrescar()
+                    refrescadas.append(clave)
+                except Exception as e:
+                    log.error(f"Error al refrescar vista '{clave}': {e}")
+            if refrescadas:
+                self.page.update()
+                log.debug(f"Refresco parcial → {', '.join(refrescadas)} | Pendientes en otras pestañas: {len(self.vistas_sucias)}")
+
+    def cambiar_pestana(self, indice: int):
+        log.debug(f"Pestaña activa → {indice}")
+        self.pestana_activa = indice
+        if indice == PESTANA_REPORTES:
+            self.abrir_reportes()
+        self.refrescar_vistas_sucias()
+
+    # === CARGA DIFERIDA DE REPORTES ===
+    def precargar_reportes(self):
+        """Importa reportes_view (plotly, numpy, reportlab) en un hilo, con la interfaz ya en pantalla."""
+        def precargar():
+            inicio = time.perf_counter()
+            try:
+                importlib.import_module("reportes_view")
+                log.info(f"Módulos de reportes precargados en segundo plano → {(time.perf_counter() - inicio) * 1000:.0f} ms")
+            except Exception as e:
+                log.error(f"No se pudieron precargar los módulos de reportes: {e}")
+        threading.Thread(target=precargar, daemon=True, name="precarga_reportes").start()
+
+    def abrir_reportes(self):
+        """
+        Crea la vista de Reportes la primera vez que se abre la pestaña. Si la precarga sigue
+        importando, el import espera a que termine (el lock de importación de Python lo ordena).
+        """
+        with self.lock_reportes:
+            if self.reportes_creados:
+                return
+            inicio = time.perf_counter()
+            from reportes_view import crear_vista_reportes
+            self.vista_reportes.content = crear_vista_reportes(self.backend_service, self.actualizar_ui_completo, self.page)
+            self.vista_reportes.alignment = None
+            self.reportes_creados = True
+        self.page.update()
+        log.info(f"Vista de Reportes creada al abrir la pestaña → {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
     def iniciar_sincronizacion(self):
-        """Inicia la sincronización automática en segundo plano."""
+        """
+        Inicia la sincronización automática en segundo plano.
+        Con el canal de eventos conectado la UI se refresca al llegar cada evento del backend;
+        si el canal se cae, vuelve al sondeo cada `intervalo_sondeo` segundos hasta reconectar.
+        """
         log.info("Iniciando hilos de sincronización automática")
-        
+
+        dominios_pendientes = set()
+        lock_pendientes = threading.Lock()
+
+        def on_evento(evento):
+            tipo = evento.get('tipo')
+            if tipo == "stock_bajo":
+                log.warning(f"EVENTO STOCK BAJO → {evento['data'].get('mensaje')}")
+            with lock_pendientes:
+                if tipo == "conectado":
+                    # Al (re)conectar se resincroniza todo lo que pudo perderse
+                    dominios_pendientes.update({"pedidos", "mesas", "inventario", "menu", "reservas"})
+                else:
+                    dominios_pendientes.update(DOMINIOS_POR_EVENTO.get(tipo, set()))
+            # Varios eventos seguidos se agrupan en un solo refresco
+            self.evento_sincronizacion.set()
+
+        def on_conexion(conectado):
+            if conectado:
+                log.info("Sincronización por eventos activa → sondeo desactivado")
+            else:
+                log.warning(f"Canal de eventos caído → sondeo cada {self.intervalo_sondeo}s hasta reconectar")
+            self.evento_sincronizacion.set()
+
         def actualizar_periodicamente():
             while True:
+                espera = self.intervalo_reloj_eventos if self.eventos_service.conectado else self.intervalo_sondeo
+                por_evento = self.evento_sincronizacion.wait(espera)
+                self.evento_sincronizacion.clear()
                 try:
-                    # Verificar alertas en tiempo real ANTES de actualizar la UI
-                    self.verificar_todo_real_time()
-                    # Ahora actualizar la UI con los estados de alerta actualizados
-                    self.actualizar_ui_completo()
-                    time.sleep(3)
+                    with lock_pendientes:
+                        dominios = set(dominios_pendientes)
+                        dominios_pendientes.clear()
+
+                    if not self.eventos_service.conectado:
+                        # Sin canal de eventos: los verificadores detectan cambios y ensucian las vistas
+                        self.verificar_todo_real_time()
+                        self.marcar_sucio("mesas", "reservas")
+                    else:
+                        # Con eventos: sólo se consulta lo que el backend avisó que cambió
+                        if "inventario" in dominios:
+                            self.verificar_stock_real_time()
+                        if "pedidos" in dominios or not por_evento:
+                            self.verificar_retrasos_real_time()
+                        if "menu" in dominios and not self.recargar_menu():
+                            dominios.discard("menu")  # Misma versión: nada que redibujar
+                        self.marcar_sucio(*dominios)
+                    if not por_evento:
+                        # Tic del reloj: tiempos de cocina y reservas que empiezan/terminan
+                        self.marcar_sucio("tiempo")
+
+                    if time.monotonic() - self.ultimo_carril_lento >= self.intervalo_lento:
+                        self.revisar_carril_lento()
+
+                    self.refrescar_vistas_sucias()
                 except Exception as e:
                     log.error(f"Error crítico en hilo de sincronización UI: {e}")
-                    time.sleep(3)
+                    time.sleep(self.intervalo_sondeo)
         
         # Hilo principal de UI
         self.hilo_sincronizacion = threading.Thread(target=actualizar_periodicamente, daemon=True)
         self.hilo_sincronizacion.start()
-        log.info("Hilo de sincronización UI iniciado (cada 3s) con verificación de alertas en tiempo real")
-        
-        # NOTA: Ya no iniciamos los hilos separados de verificación periódica
-        # porque ahora se hace en el mismo hilo de actualización de UI
+        self.eventos_service.iniciar(on_evento, on_conexion)
+        log.info("Hilo de sincronización UI iniciado (por eventos, sondeo de respaldo cada 3s)")
 
     def main(self, page: ft.Page):
         log.info("main() ejecutado - Iniciando interfaz gráfica RestIA")
@@ -1958,8 +2229,8 @@ class RestauranteGUI:
         
         # === CARGA INICIAL DEL MENÚ ===
         try:
-            self.menu_cache = self.backend_service.obtener_menu()
-            log.info(f"Menú cargado desde backend → {len(self.menu_cache)} ítems")
+            self.recargar_menu()
+            log.info(f"Menú cargado desde backend → {len(self.menu_cache)} ítems (versión {self.version_menu})")
         except Exception as e:
             log.error(f"Error al cargar menú al iniciar: {e}")
             self.menu_cache = []
@@ -2030,8 +2301,8 @@ class RestauranteGUI:
         
         # === CARGA INICIAL DEL MENÚ ===
         try:
-            self.menu_cache = self.backend_service.obtener_menu()
-            log.info(f"Menú cargado desde backend → {len(self.menu_cache)} ítems")
+            self.recargar_menu()
+            log.info(f"Menú cargado desde backend → {len(self.menu_cache)} ítems (versión {self.version_menu})")
         except Exception as e:
             log.error(f"Error al cargar menú al iniciar: {e}")
             self.menu_cache = []
@@ -2055,7 +2326,15 @@ class RestauranteGUI:
             self.config_service, self.inventory_service, self.backend_service,
             self.actualizar_ui_completo, page
         )
-        self.vista_reportes = crear_vista_reportes(self.backend_service, self.actualizar_ui_completo, page)
+        # Contenedor vacío hasta que se abra la pestaña: ahí se crea la vista real
+        self.vista_reportes = ft.Container(
+            content=ft.Column([
+                ft.ProgressRing(),
+                ft.Text("Cargando reportes...", size=16)
+            ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, alignment=ft.MainAxisAlignment.CENTER),
+            alignment=ft.alignment.center,
+            expand=True
+        )
         self.vista_reservas = crear_vista_reservas(
             self.reservas_service, self.backend_service, self.backend_service,
             self.actualizar_ui_completo, page
@@ -2079,7 +2358,8 @@ class RestauranteGUI:
                 ft.Tab(text="Reservas", icon=ft.Icons.CALENDAR_TODAY, content=self.vista_reservas),
                 ft.Tab(text="Reportes", icon=ft.Icons.ANALYTICS, content=self.vista_reportes),
             ],
-            expand=1
+            expand=1,
+            on_change=lambda e: self.cambiar_pestana(e.control.selected_index)
         )
         
         log.info("Pestañas principales creadas - 10 módulos activos")
@@ -2147,6 +2427,9 @@ class RestauranteGUI:
         self.actualizar_ui_completo()
         actualizar_visibilidad_alerta()
         self.actualizar_visibilidad_alerta = actualizar_visibilidad_alerta
+        log.info(f"Primera pantalla interactiva en {(time.perf_counter() - INICIO_PROCESO) * 1000:.0f} ms desde el arranque")
+        if PRECARGAR_REPORTES:
+            self.precargar_reportes()
         log.info("¡APLICACIÓN RESTIA INICIADA CORRECTAMENTE! - Todo listo y funcionando")
         log.info("=" * 60)
 
@@ -2180,55 +2463,25 @@ class RestauranteGUI:
             self.panel_gestion.seleccionar_mesa(numero_mesa)
 
     def actualizar_ui_completo(self):
-        log.debug("↻ actualizar_ui_completo() llamado - Iniciando refresco completo de UI")
+        """
+        Refresco forzado (tras una acción del usuario): marca todo como modificado.
+        Las vistas de la pestaña visible se refrescan ya; las demás al abrir su pestaña.
+        """
+        log.debug("↻ actualizar_ui_completo() llamado - Marcando todas las vistas como pendientes")
         
         try:
-            self.menu_cache = self.backend_service.obtener_menu()
-            if self.panel_gestion and hasattr(self.panel_gestion, 'actualizar_menu'):
-                self.panel_gestion.actualizar_menu(self.menu_cache)
-            if self.vista_admin and hasattr(self.vista_admin, 'actualizar_menu'):
-                self.vista_admin.actualizar_menu(self.menu_cache)
-            log.debug(f"Menú recargado y propagado: {len(self.menu_cache)} ítems")
+            self.recargar_menu()
         except Exception as e:
             log.error(f"Error al recargar menú: {e}")
 
-        nuevo_grid = crear_mesas_grid(self.backend_service, self.seleccionar_mesa, self)
-        self.mesas_grid.controls = nuevo_grid.controls
-        self.mesas_grid.update()
-        log.debug("Grid de mesas recreado y actualizado")
-        
-        if hasattr(self.vista_cocina, 'actualizar'):
-            self.vista_cocina.actualizar()
-        log.debug("Vista Cocina actualizada")
-        
-        if hasattr(self.vista_caja, 'actualizar'):
-            self.vista_caja.actualizar()
-        log.debug("Vista Caja actualizada")
-        
-        if hasattr(self.vista_admin, 'actualizar_lista_clientes'):
-            self.vista_admin.actualizar_lista_clientes()
-        log.debug("Lista de clientes en Administración actualizada")
-        
-        if hasattr(self.vista_recetas, 'actualizar_datos'):
-            self.vista_recetas.actualizar_datos()
-        log.debug("Vista Recetas actualizada")
-        
-        if hasattr(self.vista_inventario, 'actualizar_lista'):
-            self.vista_inventario.actualizar_lista()
-        log.debug("Lista de inventario actualizada")
+        self.marcar_sucio("menu", "mesas", "pedidos", "clientes", "inventario")
+        self.refrescar_vistas_sucias()
         
         if hasattr(self, 'actualizar_visibilidad_alerta'):
             self.actualizar_visibilidad_alerta()
         log.debug("Visibilidad de alertas de stock y retrasos actualizada")
         
-        self.page.update()
-        log.debug("page.update() ejecutado - UI refrescada completamente")
-        
-        if hasattr(self.vista_reservas, 'cargar_clientes'):
-            self.vista_reservas.cargar_clientes()
-        log.debug("Vista Reservas lista para actualizar (método disponible)")
-        
-        log.info("✓ Actualización completa de UI finalizada con éxito")
+        log.info("✓ Actualización de UI finalizada (pestaña visible refrescada, resto diferido)")
 
     # --- FUNCIÓN: actualizar_lista_inventario ---
     def actualizar_lista_inventario(self):
@@ -2354,6 +2607,11 @@ class RestauranteGUI:
 
 
 def main():
+    if "--tiempos-arranque" in sys.argv:
+        # Informe de importaciones (como -X importtime) sin abrir la interfaz
+        import tiempos_arranque
+        tiempos_arranque.main("app")
+        return
     log.info("Iniciando aplicación RestIA - Llamando a ft.app()")
     app = RestauranteGUI()
     ft.app(target=app.main)
@@ -1,21 +1,22 @@
 # === BACKEND.PY ===
 # Backend API para el sistema de restaurante con integración de FastAPI y PostgreSQL.
 
-from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from pydantic import BaseModel
 from typing import List, Optional
 import psycopg2
-from psycopg2.extras import RealDictCursor
+import psycopg2.errors
+import asyncpg
 import json
 from datetime import datetime, date, timedelta
-import subprocess
 import os
-import shutil
-import glob
+import time
 import logging  # ← AÑADIDO
 from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
 from pathlib import Path
 from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from typing import List
 import asyncio
 
@@ -96,6 +97,18 @@ from inventario_backend import inventario_app
 from configuraciones_backend import configuraciones_app
 from recetas_backend import recetas_app
 from backend_service import BackendService
+from db_pool import PoolAgotadoError, get_db, pool
+from db_async import get_db_async, pool_async
+from recetas_cache import cache_recetas
+from menu_cache import cache_menu
+from mesas_estado import estado_mesas, TIPOS_EVENTO_MESAS
+from eventos_hub import hub_eventos, publicar_evento, publicar_evento_async
+from etag_respuestas import respuesta_con_etag
+import resumen_ventas
+import disponibilidad
+import reportes_dashboard
+import migraciones
+from respaldos import servicio_respaldos
 
 app = FastAPI(title="RestaurantIA Backend")
 
@@ -107,9 +120,70 @@ app.mount("/recetas", recetas_app)
 log.info("Backend FastAPI iniciando - RestaurantIA API v2")
 log.info("Sub-apps montadas: /inventario | /configuraciones | /recetas")
 
-# Configuración directa de PostgreSQL
-DATABASE_URL = "dbname=restaurant_db user=postgres password=postgres host=localhost port=5432"
-log.info(f"Conexión configurada → BD: restaurant_db | Host: localhost:5432")
+log.info(f"Conexión configurada → BD: restaurant_db | Pool compartido min={pool.minimo} max={pool.maximo}")
+
+# Aplicar migraciones pendientes al arrancar (con varios workers sólo migra el primero)
+MIGRAR_AL_INICIAR = os.environ.get("DB_MIGRAR_AL_INICIAR", "1") != "0"
+
+@app.on_event("startup")
+def abrir_pool_db():
+    try:
+        pool.abrir()
+    except Exception as e:
+        # El pool se llenará bajo demanda cuando la BD esté disponible
+        log.error(f"No se pudo precalentar el pool de conexiones → {e}")
+        return
+    if MIGRAR_AL_INICIAR:
+        try:
+            conn = pool.obtener()
+            try:
+                aplicadas = migraciones.aplicar(conn)
+            finally:
+                pool.devolver(conn)
+            if aplicadas:
+                log.info(f"Esquema actualizado → {len(aplicadas)} migraciones en {sum(m['duracion_ms'] for m in aplicadas)} ms")
+        except Exception as e:
+            # Se sigue sirviendo con el esquema actual; la falla queda en el log
+            log.error(f"No se pudieron aplicar las migraciones pendientes → {e}")
+    try:
+        conn = pool.obtener()
+        try:
+            cache_recetas.cargar_todo(conn)
+        finally:
+            pool.devolver(conn)
+    except Exception as e:
+        # Sin precarga la caché se llena plato por plato con los pedidos
+        log.error(f"No se pudo precargar la caché de recetas → {e}")
+
+@app.on_event("startup")
+async def iniciar_hub_eventos():
+    # Un cambio de menú hecho en otro worker (o fuera de la API) también vacía la caché de este
+    hub_eventos.al_recibir("menu_actualizado", lambda data: cache_menu.invalidar(data.get("version")))
+    # Ocupación de mesas: se mantiene con los eventos y se reconstruye al (re)conectar el LISTEN
+    for tipo in TIPOS_EVENTO_MESAS:
+        hub_eventos.al_recibir(tipo, lambda data, tipo=tipo: estado_mesas.aplicar_evento(tipo, data))
+    hub_eventos.al_recibir("conectado", lambda data: estado_mesas.conexion_eventos(True))
+    hub_eventos.al_recibir("desconectado", lambda data: estado_mesas.conexion_eventos(False))
+    hub_eventos.al_recibir("conectado", lambda data: cache_menu.conexion_eventos(True))
+    hub_eventos.al_recibir("desconectado", lambda data: cache_menu.conexion_eventos(False))
+    hub_eventos.iniciar(asyncio.get_running_loop())
+
+@app.on_event("startup")
+async def abrir_pool_async():
+    try:
+        await pool_async.abrir()
+    except Exception as e:
+        # Se reintenta al pedir la primera conexión
+        log.error(f"No se pudo abrir el pool async → {e}")
+
+@app.on_event("shutdown")
+def cerrar_pool_db():
+    hub_eventos.detener()
+    pool.cerrar()
+
+@app.on_event("shutdown")
+async def cerrar_pool_async():
+    await pool_async.cerrar()
 
 @app.get("/")
 def read_root():
@@ -117,23 +191,13 @@ def read_root():
     return {"message": "Bienvenido a la API del Sistema de Restaurante"}
 
 
-async def broadcast_alerta(tipo: str, data: dict):
+@app.websocket("/ws/eventos")
+async def websocket_eventos(websocket: WebSocket):
     """
-    Función para enviar alertas en tiempo real.
-    Por ahora solo registra en logs, en el futuro usará WebSockets.
+    Canal de eventos en tiempo real: pedidos creados/actualizados/eliminados,
+    stock bajo, inventario, mesas y reservas. Ver eventos_hub.py.
     """
-    log.warning(f"🚨 ALERTA [{tipo.upper()}] → {data}")
-    # Aquí irá tu lógica de WebSocket cuando la implementes
-    # Ejemplo: await manager.broadcast(json.dumps({"tipo": tipo, "data": data}))
-
-def get_db():
-    conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
-    log.debug("Nueva conexión a BD abierta (dependency get_db)")
-    try:
-        yield conn
-    finally:
-        conn.close()
-        log.debug("Conexión a BD cerrada correctamente")
+    await hub_eventos.atender(websocket)
 
 # ====================== MODELOS PYDANTIC ======================
 class ItemMenu(BaseModel):
@@ -174,10 +238,18 @@ class ReservaCreate(BaseModel):
     fecha_hora_inicio: str
     fecha_hora_fin: Optional[str] = None
 
-class BackupResponse(BaseModel):
-    status: str
-    message: str
-    file_path: str
+class RespaldoResponse(BaseModel):
+    id: int
+    modo: str  # pg_dump | completo | diferencial
+    base_id: Optional[int] = None  # Respaldo sobre el que se aplica un diferencial
+    estado: str  # pendiente | en_curso | completado | fallido
+    progreso: float
+    mensaje: str
+    ruta: Optional[str] = None
+    tamano_mb: Optional[float] = None
+    creado_en: str
+    terminado_en: Optional[str] = None
+    duracion_segundos: Optional[float] = None
 
 log.info("Modelos Pydantic cargados correctamente")
 log.info("Backend 100% listo - Esperando peticiones en http://localhost:8000")
@@ -189,179 +261,376 @@ log.info("=" * 70)
 def health():
     log.debug("GET /health - Health check solicitado")
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        conn.close()
+        conn = pool.obtener()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        finally:
+            pool.devolver(conn)
         log.info("Health check OK - Base de datos conectada correctamente")
         return {"status": "ok", "database": "connected"}
     except Exception as e:
         log.error(f"Health check FALLÓ - No se pudo conectar a la BD: {e}")
         return {"status": "error", "database": str(e)}
 
+@app.get("/metrics/db_pool")
+def metricas_pool_db():
+    """
+    Estado del pool de conexiones: tiempos de espera al pedir conexión y saturación.
+    """
+    metricas = pool.metricas()
+    log.debug(f"GET /metrics/db_pool → {metricas['en_uso']}/{metricas['max']} en uso | p95 espera {metricas['espera_p95_ms']}ms")
+    return metricas
+
+@app.get("/metrics/db_pool_async")
+def metricas_pool_async():
+    """Mismas métricas que /metrics/db_pool para el pool asyncpg de los endpoints calientes."""
+    return pool_async.metricas()
+
+@app.get("/metrics/eventos")
+def metricas_eventos():
+    return hub_eventos.metricas()
+
+@app.get("/metrics/recetas_cache")
+def metricas_cache_recetas():
+    """
+    Aciertos/fallos de la caché de recetas usada al crear pedidos.
+    """
+    return cache_recetas.metricas()
+
+@app.get("/metrics/menu_cache")
+def metricas_cache_menu():
+    """Versión servida, aciertos, 304 y recargas de la caché de GET /menu/items."""
+    return cache_menu.metricas()
+
+@app.get("/metrics/mesas_estado")
+def metricas_estado_mesas():
+    """Ocupación en memoria de GET /mesas: reconstrucciones desde BD y eventos aplicados."""
+    return estado_mesas.metricas()
+
 @app.get("/menu/items", response_model=List[ItemMenu])
-def obtener_menu(conn: psycopg2.extensions.connection = Depends(get_db)):
+def obtener_menu(request: Request):
     log.debug("GET /menu/items - Solicitando menú completo")
-    with conn.cursor() as cursor:
-        cursor.execute("SELECT nombre, precio, tipo FROM menu ORDER BY tipo, nombre")
-        items = cursor.fetchall()
-        log.info(f"Menú enviado al cliente - {len(items)} ítems disponibles")
-        return items
+    # Desde la caché: sólo va a la BD la primera vez tras un cambio de menú
+    return cache_menu.respuesta(request, List[ItemMenu])
+
+
+# --- STOCK POR LOTES: demanda desde la caché de recetas y un UPDATE para el consumo ---
+# (Conexión asyncpg: crear_pedido corre en el event loop, ver db_async.py)
+async def calcular_demanda_ingredientes(conn, items_agrupados: dict) -> List[dict]:
+    """
+    Suma lo que el pedido completo necesita de cada ingrediente usando la caché de
+    recetas (sólo va a la BD por platos que no estén en caché).
+    Devuelve una entrada por ingrediente con la cantidad total y los platos que lo usan.
+    """
+    recetas = await cache_recetas.obtener_async(conn, items_agrupados.keys())
+    demanda = {}
+    for nombre_plato, cantidad_pedido in items_agrupados.items():
+        for ingrediente_id, cantidad_necesaria in recetas.get(nombre_plato, []):
+            entrada = demanda.setdefault(ingrediente_id, {"ingrediente_id": ingrediente_id, "cantidad": 0, "platos": []})
+            entrada["cantidad"] += cantidad_necesaria * cantidad_pedido
+            entrada["platos"].append(nombre_plato)
+    return [demanda[i] for i in sorted(demanda)]
+
+
+async def consumir_ingredientes(conn, demanda: List[dict]) -> List[dict]:
+    """
+    Descuenta todo el consumo en un solo UPDATE condicional. Las filas se bloquean en
+    orden de id (sin interbloqueos entre pedidos simultáneos) y sólo se descuenta un
+    ingrediente si alcanza; si faltan filas en el RETURNING el llamador debe hacer rollback.
+    """
+    if not demanda:
+        return []
+    return await conn.fetch("""
+        WITH consumo AS (
+            SELECT * FROM unnest($1::int[], $2::numeric[]) AS c(ingrediente_id, cantidad)
+        ),
+        bloqueados AS (
+            SELECT i.id FROM inventario i
+            WHERE i.id IN (SELECT ingrediente_id FROM consumo)
+            ORDER BY i.id
+            FOR UPDATE
+        )
+        UPDATE inventario i
+        SET cantidad_disponible = i.cantidad_disponible - c.cantidad,
+            fecha_actualizacion = CURRENT_TIMESTAMP
+        FROM consumo c
+        WHERE i.id = c.ingrediente_id
+          AND i.id IN (SELECT id FROM bloqueados)
+          AND i.cantidad_disponible >= c.cantidad
+        RETURNING i.id, i.nombre, i.cantidad_disponible, i.cantidad_minima_alerta, i.unidad_medida
+    """, [d['ingrediente_id'] for d in demanda], [d['cantidad'] for d in demanda])
+
+
+def _error_stock_insuficiente(faltante: dict, nombre_ingrediente: str, disponible) -> HTTPException:
+    cantidad_actual = float(disponible)
+    cantidad_total_necesaria = float(faltante['cantidad'])
+    platos = ", ".join(faltante['platos'])
+    log.warning(f"STOCK INSUFICIENTE → '{nombre_ingrediente}' | Disp: {cantidad_actual} | Necesario: {cantidad_total_necesaria} → Pedido RECHAZADO")
+    return HTTPException(
+        status_code=400,
+        detail=f"No hay suficiente stock de '{nombre_ingrediente}' para preparar '{platos}'. Disponible: {cantidad_actual}, Necesario: {cantidad_total_necesaria}"
+    )
+
+
+async def asignar_numero_app(conn) -> int:
+    """
+    Siguiente número de pedido digital (mesa 99) del día, en O(1).
+    El UPSERT bloquea la fila del contador hasta el commit, así que dos pedidos
+    simultáneos nunca reciben el mismo número; si el pedido se revierte, el número
+    se reutiliza. El contador vuelve a 1 cada día.
+    """
+    hoy = date.today()
+    numero = await conn.fetchval("""
+        UPDATE contador_pedidos_app SET ultimo_numero = ultimo_numero + 1
+        WHERE fecha = $1
+        RETURNING ultimo_numero
+    """, hoy)
+    if numero is not None:
+        return numero
+    # Primer pedido digital del día para el contador: parte del mayor número ya usado hoy
+    # (si el contador se crea a mitad del día, los pedidos anteriores ya tienen números)
+    return await conn.fetchval("""
+        INSERT INTO contador_pedidos_app (fecha, ultimo_numero)
+        SELECT $1::date, COALESCE(MAX(numero_app), 0) + 1
+        FROM pedidos
+        WHERE mesa_numero = 99 AND fecha_hora >= $1::date AND fecha_hora < $1::date + 1
+        ON CONFLICT (fecha) DO UPDATE
+            SET ultimo_numero = contador_pedidos_app.ultimo_numero + 1
+        RETURNING ultimo_numero
+    """, hoy)
+
+
+def _columnas_lineas_pedido(items: List[dict]) -> tuple:
+    """Posición, nombre, precio y cantidad de cada elemento de `items`, como arreglos para unnest."""
+    return (
+        list(range(len(items))),
+        [item.get('nombre') or '' for item in items],
+        [item.get('precio') or 0 for item in items],
+        [max(int(item.get('cantidad') or 1), 1) for item in items]
+    )
+
+
+def guardar_lineas_pedido(cursor, pedido_id: int, items: List[dict]) -> None:
+    """
+    Reescribe las filas de `pedido_items` del pedido a partir de su lista `items`
+    (una fila por elemento, en el mismo orden). El plato se enlaza con `menu` por nombre.
+    """
+    cursor.execute("DELETE FROM pedido_items WHERE pedido_id = %s", (pedido_id,))
+    if not items:
+        return
+    cursor.execute("""
+        INSERT INTO pedido_items (pedido_id, posicion, menu_id, nombre, precio_unitario, cantidad)
+        SELECT %s, l.posicion, m.id, l.nombre, l.precio, l.cantidad
+        FROM unnest(%s::int[], %s::text[], %s::numeric[], %s::int[]) AS l(posicion, nombre, precio, cantidad)
+        LEFT JOIN menu m ON m.nombre = l.nombre
+    """, (pedido_id, *_columnas_lineas_pedido(items)))
+
+
+async def guardar_lineas_pedido_async(conn, pedido_id: int, items: List[dict]) -> None:
+    """guardar_lineas_pedido para una conexión asyncpg."""
+    await conn.execute("DELETE FROM pedido_items WHERE pedido_id = $1", pedido_id)
+    if not items:
+        return
+    await conn.execute("""
+        INSERT INTO pedido_items (pedido_id, posicion, menu_id, nombre, precio_unitario, cantidad)
+        SELECT $1, l.posicion, m.id, l.nombre, l.precio, l.cantidad
+        FROM unnest($2::int[], $3::text[], $4::numeric[], $5::int[]) AS l(posicion, nombre, precio, cantidad)
+        LEFT JOIN menu m ON m.nombre = l.nombre
+    """, pedido_id, *_columnas_lineas_pedido(items))
 
 
 @app.post("/pedidos", response_model=PedidoResponse)
-async def crear_pedido(pedido: PedidoCreate, conn: psycopg2.extensions.connection = Depends(get_db)):
+async def crear_pedido(pedido: PedidoCreate, conn: asyncpg.Connection = Depends(get_db_async)):
     total_items = len(pedido.items)
     mesa = pedido.mesa_numero
     es_digital = mesa == 99
     log.info(f"POST /pedidos → {'Digital' if es_digital else f'Mesa {mesa}'} | {total_items} ítems | Notas: '{pedido.notas.strip()[:40]}...'")
 
-    with conn.cursor() as cursor:
-        # --- VERIFICACIÓN Y CONSUMO DE STOCK ---
-        items_agrupados = {}
-        for item in pedido.items:
-            nombre_item = item['nombre']
-            items_agrupados[nombre_item] = items_agrupados.get(nombre_item, 0) + 1
+    # --- VERIFICACIÓN Y CONSUMO DE STOCK ---
+    items_agrupados = {}
+    for item in pedido.items:
+        nombre_item = item['nombre']
+        items_agrupados[nombre_item] = items_agrupados.get(nombre_item, 0) + 1
 
-        ingredientes_a_consumir = []
-        
-        for nombre_item, cantidad_pedido in items_agrupados.items():
-            cursor.execute("SELECT r.id FROM recetas r WHERE r.nombre_plato = %s", (nombre_item,))
-            receta = cursor.fetchone()
-            
-            if receta:
-                cursor.execute("""
-                    SELECT ir.ingrediente_id, ir.cantidad_necesaria, i.cantidad_disponible, i.nombre as nombre_ingrediente
-                    FROM ingredientes_recetas ir
-                    JOIN inventario i ON ir.ingrediente_id = i.id
-                    WHERE ir.receta_id = %s
-                """, (receta['id'],))
-                
-                for ing in cursor.fetchall():
-                    cantidad_total_necesaria = float(ing['cantidad_necesaria']) * cantidad_pedido
-                    cantidad_actual = float(ing['cantidad_disponible'])
-                    
-                    # ← AQUÍ ESTABA EL PROBLEMA: Ahora usa <= para permitir llegar a 0
-                    if cantidad_actual < cantidad_total_necesaria:
-                        log.warning(f"STOCK INSUFICIENTE → '{ing['nombre_ingrediente']}' | Disp: {cantidad_actual} | Necesario: {cantidad_total_necesaria} → Pedido RECHAZADO")
-                        raise HTTPException(
-                            status_code=400, 
-                            detail=f"No hay suficiente stock de '{ing['nombre_ingrediente']}' para preparar '{nombre_item}'. Disponible: {cantidad_actual}, Necesario: {cantidad_total_necesaria}"
-                        )
-                    
-                    ingredientes_a_consumir.append({
-                        "id": ing['ingrediente_id'],
-                        "cantidad": cantidad_total_necesaria
-                    })
-                    log.debug(f"Stock verificado → {ing['nombre_ingrediente']} | -{cantidad_total_necesaria} unidades para {cantidad_pedido} × '{nombre_item}'")
+    # Cualquier excepción dentro del bloque (incluido el 400 por falta de stock) revierte todo
+    async with conn.transaction():
+        # Demanda total por ingrediente de TODOS los platos del pedido (desde la caché de recetas)
+        ingredientes_a_consumir = await calcular_demanda_ingredientes(conn, items_agrupados)
 
         # --- GENERAR NÚMERO DE PEDIDO DIGITAL ---
         numero_app = None
         if pedido.mesa_numero == 99:
-            cursor.execute("SELECT MAX(numero_app) FROM pedidos WHERE mesa_numero = 99")
-            max_app = cursor.fetchone()
-            numero_app = (max_app['max'] + 1) if max_app and max_app['max'] else 1
+            numero_app = await asignar_numero_app(conn)
             log.debug(f"Pedido digital → Número asignado: {numero_app}")
 
-        fecha_hora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        cursor.execute("""
+        fecha_hora = datetime.now().replace(microsecond=0)
+
+        result = await conn.fetchrow("""
             INSERT INTO pedidos (mesa_numero, numero_app, estado, fecha_hora, items, notas)
-            VALUES (%s, %s, %s, %s, %s, %s)
+            VALUES ($1, $2, $3, $4, $5, $6)
             RETURNING id, mesa_numero, numero_app, estado, fecha_hora, items, notas
-        """, (
-            pedido.mesa_numero,
-            numero_app,
-            pedido.estado,
-            fecha_hora,
-            json.dumps(pedido.items),
-            pedido.notas
-        ))
-        
-        result = cursor.fetchone()
-        pedido_id_nuevo = result['id']
+        """, pedido.mesa_numero, numero_app, pedido.estado, fecha_hora, pedido.items, pedido.notas)
 
-        # === CONSUMIR STOCK + ALERTA DE STOCK BAJO EN TIEMPO REAL ===
-        for consumo in ingredientes_a_consumir:
-            cursor.execute("""
-                UPDATE inventario 
-                SET cantidad_disponible = cantidad_disponible - %s,
-                    fecha_actualizacion = CURRENT_TIMESTAMP
-                WHERE id = %s
-                RETURNING nombre, cantidad_disponible, cantidad_minima_alerta, unidad_medida
-            """, (consumo['cantidad'], consumo['id']))
-            
-            ing = cursor.fetchone()
-            if ing:
-                nombre_ing = ing['nombre']
-                disponible = float(ing['cantidad_disponible'])
-                minimo_alerta = float(ing['cantidad_minima_alerta'])
-                unidad = ing['unidad_medida'] or "unidades"
-
-                log.debug(f"Stock actualizado → {nombre_ing} | Quedan: {disponible} {unidad}")
-
-                # ENVIAR ALERTA SI ESTÁ BAJO O CRÍTICO (AHORA ASYNC)
-                if disponible <= minimo_alerta:
-                    alerta = {
-                        "ingrediente": nombre_ing,
-                        "disponible": round(disponible, 2),
-                        "minimo": minimo_alerta,
-                        "unidad": unidad,
-                        "mensaje": f"¡Stock crítico de {nombre_ing}! Solo quedan {disponible} {unidad}"
-                    }
-                    # ← LÍNEA CORREGIDA: Ahora usa await en vez de create_task
-                    await broadcast_alerta("stock_bajo", alerta)
-                    log.warning(f"ALERTA STOCK BAJO ENVIADA → {nombre_ing} ({disponible} ≤ {minimo_alerta})")
-
-        conn.commit()
-        
-        fecha_hora_str = result['fecha_hora'].strftime("%Y-%m-%d %H:%M:%S") if isinstance(result['fecha_hora'], datetime) else result['fecha_hora']
-        
-        log.info(f"PEDIDO CREADO CON ÉXITO → ID: {pedido_id_nuevo} | {'Digital' if es_digital else f'Mesa {mesa}'} | {total_items} ítems | {len(ingredientes_a_consumir)} ingredientes consumidos")
-
-        return {
+        pedido_id_nuevo = result['id']
+        await guardar_lineas_pedido_async(conn, pedido_id_nuevo, pedido.items)
+
+        # === CONSUMIR STOCK (UPDATE ÚNICO Y ATÓMICO) + ALERTA DE STOCK BAJO EN TIEMPO REAL ===
+        consumidos = await consumir_ingredientes(conn, ingredientes_a_consumir)
+        if len(consumidos) < len(ingredientes_a_consumir):
+            # Algún ingrediente no alcanza: se revierte el pedido completo
+            ids_consumidos = {ing['id'] for ing in consumidos}
+            faltante = next(d for d in ingredientes_a_consumir if d['ingrediente_id'] not in ids_consumidos)
+            actual = await conn.fetchrow(
+                "SELECT nombre, cantidad_disponible FROM inventario WHERE id = $1", faltante['ingrediente_id']
+            )
+            raise _error_stock_insuficiente(
+                faltante,
+                actual['nombre'] if actual else f"ID {faltante['ingrediente_id']}",
+                actual['cantidad_disponible'] if actual else 0
+            )
+
+        for ing in consumidos:
+            nombre_ing = ing['nombre']
+            disponible = float(ing['cantidad_disponible'])
+            minimo_alerta = float(ing['cantidad_minima_alerta'])
+            unidad = ing['unidad_medida'] or "unidades"
+
+            log.debug(f"Stock actualizado → {nombre_ing} | Quedan: {disponible} {unidad}")
+
+            # ENVIAR ALERTA SI ESTÁ BAJO O CRÍTICO (AHORA ASYNC)
+            if disponible <= minimo_alerta:
+                alerta = {
+                    "ingrediente": nombre_ing,
+                    "disponible": round(disponible, 2),
+                    "minimo": minimo_alerta,
+                    "unidad": unidad,
+                    "mensaje": f"¡Stock crítico de {nombre_ing}! Solo quedan {disponible} {unidad}"
+                }
+                # Se entrega a los clientes sólo si el pedido hace commit
+                await publicar_evento_async(conn, "stock_bajo", alerta)
+                log.warning(f"ALERTA STOCK BAJO ENVIADA → {nombre_ing} ({disponible} ≤ {minimo_alerta})")
+
+        await publicar_evento_async(conn, "pedido_creado", {
             "id": pedido_id_nuevo,
             "mesa_numero": result['mesa_numero'],
-            "items": result['items'],
-            "estado": result['estado'],
-            "fecha_hora": fecha_hora_str,
             "numero_app": result['numero_app'],
-            "notas": result['notas']
-        }
+            "estado": result['estado']
+        })
+
+    log.info(f"PEDIDO CREADO CON ÉXITO → ID: {pedido_id_nuevo} | {'Digital' if es_digital else f'Mesa {mesa}'} | {total_items} ítems | {len(ingredientes_a_consumir)} ingredientes consumidos")
+
+    return {
+        "id": pedido_id_nuevo,
+        "mesa_numero": result['mesa_numero'],
+        "items": result['items'],
+        "estado": result['estado'],
+        "fecha_hora": result['fecha_hora'].strftime("%Y-%m-%d %H:%M:%S"),
+        "numero_app": result['numero_app'],
+        "notas": result['notas']
+    }
+
+# Los tombstones de pedidos eliminados se conservan este tiempo; un cursor más viejo recibe la foto completa
+RETENCION_PEDIDOS_ELIMINADOS = "1 day"
+
+def _formatear_pedido_activo(row) -> dict:
+    fecha_hora_str = row['fecha_hora'].strftime("%Y-%m-%d %H:%M:%S") if isinstance(row['fecha_hora'], datetime) else row['fecha_hora']
+    return {
+        "id": row['id'],
+        "mesa_numero": row['mesa_numero'],
+        "numero_app": row['numero_app'],
+        "estado": row['estado'],
+        "fecha_hora": fecha_hora_str,
+        "items": row['items'],
+        "notas": row['notas']
+    }
 
 @app.get("/pedidos/activos", response_model=List[PedidoResponse])
-def obtener_pedidos_activos(conn: psycopg2.extensions.connection = Depends(get_db)):
+async def obtener_pedidos_activos(conn: asyncpg.Connection = Depends(get_db_async)):
     log.debug("GET /pedidos/activos - Solicitando pedidos en cocina")
+    rows = await conn.fetch("""
+        SELECT id, mesa_numero, numero_app, estado, fecha_hora, items, notas 
+        FROM pedidos 
+        WHERE estado IN ('Pendiente', 'En preparacion', 'Listo')
+        ORDER BY fecha_hora DESC
+    """)
+    pedidos = [_formatear_pedido_activo(row) for row in rows]
+    log.info(f"{len(pedidos)} pedidos activos enviados a cocina → {', '.join([str(p['id']) for p in pedidos[:5]])}{'...' if len(pedidos)>5 else ''}")
+    # Ya tiene la forma de PedidoResponse: validar/codificar cientos de pedidos con
+    # pydantic bloquearía el event loop (~150 ms) y frenaría al resto de peticiones
+    return JSONResponse(pedidos)
+
+
+@app.get("/pedidos/activos/cambios")
+def obtener_cambios_pedidos_activos(
+    since: Optional[str] = Query(None, description="Cursor devuelto por la llamada anterior (vacío = foto completa)"),
+    conn: psycopg2.extensions.connection = Depends(get_db)
+):
+    """
+    Feed de cambios de pedidos activos basado en `updated_at`.
+    Devuelve sólo los pedidos activos insertados/modificados desde `since`, más los IDs
+    de los que se cerraron o eliminaron (tombstones), y un cursor nuevo para la siguiente llamada.
+    """
+    since_obj = None
+    if since:
+        try:
+            since_obj = datetime.fromisoformat(since)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor 'since' inválido.")
+
     with conn.cursor() as cursor:
+        # El cursor nuevo nunca pasa del inicio de una transacción de escritura aún abierta:
+        # su updated_at (CURRENT_TIMESTAMP = inicio de la transacción) todavía no es visible.
         cursor.execute("""
-            SELECT id, mesa_numero, numero_app, estado, fecha_hora, items, notas 
-            FROM pedidos 
-            WHERE estado IN ('Pendiente', 'En preparacion', 'Listo')
-            ORDER BY fecha_hora DESC
-        """)
-        rows = cursor.fetchall()
-        pedidos = []
-        for row in rows:
-            fecha_hora_str = row['fecha_hora'].strftime("%Y-%m-%d %H:%M:%S") if isinstance(row['fecha_hora'], datetime) else row['fecha_hora']
-            pedidos.append({
-                "id": row['id'],
-                "mesa_numero": row['mesa_numero'],
-                "numero_app": row['numero_app'],
-                "estado": row['estado'],
-                "fecha_hora": fecha_hora_str,
-                "items": row['items'],
-                "notas": row['notas']
-            })
-        log.info(f"{len(pedidos)} pedidos activos enviados a cocina → {', '.join([str(p['id']) for p in pedidos[:5]])}{'...' if len(pedidos)>5 else ''}")
-        return pedidos
+            SELECT LEAST(
+                LOCALTIMESTAMP,
+                (SELECT MIN(xact_start)::timestamp FROM pg_stat_activity WHERE backend_xid IS NOT NULL)
+            ) AS cursor,
+            LOCALTIMESTAMP - %s::interval AS horizonte
+        """, (RETENCION_PEDIDOS_ELIMINADOS,))
+        marcas = cursor.fetchone()
+        completo = since_obj is None or since_obj < marcas['horizonte']
+
+        if completo:
+            cursor.execute("""
+                SELECT id, mesa_numero, numero_app, estado, fecha_hora, items, notas
+                FROM pedidos
+                WHERE estado IN ('Pendiente', 'En preparacion', 'Listo')
+                ORDER BY fecha_hora DESC
+            """)
+            pedidos = [_formatear_pedido_activo(row) for row in cursor.fetchall()]
+            eliminados = []
+        else:
+            cursor.execute("""
+                SELECT id, mesa_numero, numero_app, estado, fecha_hora, items, notas,
+                       estado IN ('Pendiente', 'En preparacion', 'Listo') AS activo
+                FROM pedidos
+                WHERE updated_at >= %s
+                ORDER BY fecha_hora DESC
+            """, (since_obj,))
+            cambiados = cursor.fetchall()
+            pedidos = [_formatear_pedido_activo(row) for row in cambiados if row['activo']]
+            eliminados = [row['id'] for row in cambiados if not row['activo']]
+
+            cursor.execute("SELECT DISTINCT pedido_id FROM pedidos_eliminados WHERE eliminado_en >= %s", (since_obj,))
+            eliminados += [row['pedido_id'] for row in cursor.fetchall()]
+
+    log.debug(f"GET /pedidos/activos/cambios → {'Foto completa' if completo else f'Delta desde {since}'} | {len(pedidos)} cambiados | {len(eliminados)} cerrados/eliminados")
+    return {
+        "cursor": marcas['cursor'].isoformat(),
+        "completo": completo,
+        "pedidos": pedidos,
+        "eliminados": eliminados
+    }
 
 # --- MODIFICACIÓN EN EL ENDPOINT DE ACTUALIZACIÓN DE ESTADO ---
 @app.patch("/pedidos/{pedido_id}/estado")
-def actualizar_estado_pedido(pedido_id: int, estado: str, conn = Depends(get_db)):
+async def actualizar_estado_pedido(pedido_id: int, estado: str, conn: asyncpg.Connection = Depends(get_db_async)):
     log.info(f"PATCH /pedidos/{pedido_id}/estado → Cambiando a '{estado}'")
 
-    with conn.cursor() as cursor:
+    async with conn.transaction():
         # Verificar si el pedido existe
-        cursor.execute("SELECT estado, hora_inicio_cocina, hora_fin_cocina FROM pedidos WHERE id = %s", (pedido_id,))
-        pedido = cursor.fetchone()
+        pedido = await conn.fetchrow("SELECT estado, hora_inicio_cocina, hora_fin_cocina FROM pedidos WHERE id = $1", pedido_id)
         if not pedido:
             log.warning(f"Intento de actualizar estado → Pedido {pedido_id} NO ENCONTRADO")
             raise HTTPException(status_code=404, detail="Pedido no encontrado")
@@ -375,39 +644,43 @@ def actualizar_estado_pedido(pedido_id: int, estado: str, conn = Depends(get_db)
         extra_values = []
 
         if estado == "En preparacion" and pedido['hora_inicio_cocina'] is None:
-            extra_update = ", hora_inicio_cocina = %s"
+            extra_update = ", hora_inicio_cocina = $3"
             extra_values.append(now)
             log.info(f"Inicio de cocina registrado → Pedido {pedido_id} | {now.strftime('%H:%M:%S')}")
         elif estado == "Listo" and pedido['hora_inicio_cocina'] is not None and pedido['hora_fin_cocina'] is None:
-            extra_update = ", hora_fin_cocina = %s"
+            extra_update = ", hora_fin_cocina = $3"
             extra_values.append(now)
             log.info(f"Pedido {pedido_id} MARCADO COMO LISTO → Fin de cocina: {now.strftime('%H:%M:%S')}")
 
         # Actualizar el estado (y potencialmente las marcas de tiempo)
-        update_query = f"UPDATE pedidos SET estado = %s {extra_update} WHERE id = %s RETURNING id, mesa_numero, cliente_id, estado, fecha_hora, items, numero_app, notas, updated_at, hora_inicio_cocina, hora_fin_cocina"
-        cursor.execute(update_query, (estado, *extra_values, pedido_id))
-        result = cursor.fetchone()
+        update_query = f"UPDATE pedidos SET estado = $1 {extra_update} WHERE id = $2 RETURNING id, mesa_numero, cliente_id, estado, fecha_hora, items, numero_app, notas, updated_at, hora_inicio_cocina, hora_fin_cocina"
+        result = await conn.fetchrow(update_query, estado, pedido_id, *extra_values)
 
         if not result:
             raise HTTPException(status_code=404, detail="Pedido no encontrado")
 
-        conn.commit()
+        await publicar_evento_async(conn, "pedido_estado", {
+            "id": pedido_id,
+            "mesa_numero": result['mesa_numero'],
+            "estado": estado,
+            "estado_anterior": estado_anterior
+        })
 
-        # Devolver el pedido actualizado
-        pedido_dict = dict(result)
-        
-        # Calcular tiempo de cocina si aplica
-        if pedido_dict['hora_inicio_cocina'] and pedido_dict['hora_fin_cocina']:
-            tiempo_cocina = (pedido_dict['hora_fin_cocina'] - pedido_dict['hora_inicio_cocina']).total_seconds() / 60
-            pedido_dict['tiempo_cocina_minutos'] = round(tiempo_cocina, 1)
-            log.info(f"Pedido {pedido_id} listo en cocina → Tiempo total: {tiempo_cocina:.1f} minutos")
-        elif pedido_dict['hora_inicio_cocina'] and estado == "Listo":
-            tiempo_cocina = (now - pedido_dict['hora_inicio_cocina']).total_seconds() / 60
-            pedido_dict['tiempo_cocina_minutos'] = round(tiempo_cocina, 1)
-            log.info(f"Pedido {pedido_id} listo → Tiempo en cocina: {tiempo_cocina:.1f} minutos")
-
-        log.info(f"ESTADO ACTUALIZADO CON ÉXITO → Pedido {pedido_id} | '{estado_anterior}' → '{estado}'")
-        return pedido_dict
+    # Devolver el pedido actualizado
+    pedido_dict = dict(result)
+    
+    # Calcular tiempo de cocina si aplica
+    if pedido_dict['hora_inicio_cocina'] and pedido_dict['hora_fin_cocina']:
+        tiempo_cocina = (pedido_dict['hora_fin_cocina'] - pedido_dict['hora_inicio_cocina']).total_seconds() / 60
+        pedido_dict['tiempo_cocina_minutos'] = round(tiempo_cocina, 1)
+        log.info(f"Pedido {pedido_id} listo en cocina → Tiempo total: {tiempo_cocina:.1f} minutos")
+    elif pedido_dict['hora_inicio_cocina'] and estado == "Listo":
+        tiempo_cocina = (now - pedido_dict['hora_inicio_cocina']).total_seconds() / 60
+        pedido_dict['tiempo_cocina_minutos'] = round(tiempo_cocina, 1)
+        log.info(f"Pedido {pedido_id} listo → Tiempo en cocina: {tiempo_cocina:.1f} minutos")
+
+    log.info(f"ESTADO ACTUALIZADO CON ÉXITO → Pedido {pedido_id} | '{estado_anterior}' → '{estado}'")
+    return pedido_dict
 # --- FIN MODIFICACIÓN ---
 
 
@@ -429,6 +702,8 @@ def inicializar_menu(conn: psycopg2.extensions.connection = Depends(get_db)):
                 """, (nombre, precio, tipo))
             
             conn.commit()
+            cache_recetas.invalidar_todo()
+            cache_menu.invalidar()
             log.info(f"MENÚ INICIALIZADO CON ÉXITO → {len(menu_inicial)} ítems insertados correctamente")
             return {"status": "ok", "items_insertados": len(menu_inicial)}
             
@@ -443,19 +718,24 @@ def eliminar_ultimo_item(pedido_id: int, conn: psycopg2.extensions.connection =
     log.info(f"DELETE /pedidos/{pedido_id}/ultimo_item → Eliminando último ítem del pedido")
     
     with conn.cursor() as cursor:
-        cursor.execute("SELECT items FROM pedidos WHERE id = %s", (pedido_id,))
+        cursor.execute("SELECT items, mesa_numero, estado FROM pedidos WHERE id = %s", (pedido_id,))
         row = cursor.fetchone()
         if not row:
             log.warning(f"Intento de eliminar ítem → Pedido {pedido_id} NO ENCONTRADO")
             raise HTTPException(status_code=404, detail="Pedido no encontrado")
         
-        items = json.loads(row['items'])
+        items = row['items']
+        if isinstance(items, str):
+            items = json.loads(items)
         if not items:
             log.warning(f"Pedido {pedido_id} está vacío → No hay ítems para eliminar")
             raise HTTPException(status_code=400, detail="No hay ítems para eliminar")
         
         item_eliminado = items.pop()
         cursor.execute("UPDATE pedidos SET items = %s WHERE id = %s", (json.dumps(items), pedido_id))
+        # La línea eliminada es la de la última posición
+        cursor.execute("DELETE FROM pedido_items WHERE pedido_id = %s AND posicion = %s", (pedido_id, len(items)))
+        publicar_evento(cursor, "pedido_actualizado", {"id": pedido_id, "mesa_numero": row['mesa_numero'], "estado": row['estado']})
         conn.commit()
         
         log.info(f"ÚLTIMO ÍTEM ELIMINADO → Pedido {pedido_id} | Eliminado: '{item_eliminado['nombre']}' | Quedan: {len(items)} ítems")
@@ -486,6 +766,12 @@ def actualizar_pedido(pedido_id: int, pedido_actualizado: PedidoCreate, conn: ps
             pedido_actualizado.notas,
             pedido_id
         ))
+        guardar_lineas_pedido(cursor, pedido_id, pedido_actualizado.items)
+        publicar_evento(cursor, "pedido_actualizado", {
+            "id": pedido_id,
+            "mesa_numero": pedido_actualizado.mesa_numero,
+            "estado": pedido_actualizado.estado
+        })
         
         conn.commit()
         log.info(f"PEDIDO {pedido_id} ACTUALIZADO CORRECTAMENTE → Estado: '{pedido_actualizado.estado}' | {len(pedido_actualizado.items)} ítems")
@@ -496,11 +782,13 @@ def eliminar_pedido(pedido_id: int, conn: psycopg2.extensions.connection = Depen
     log.warning(f"DELETE /pedidos/{pedido_id} → ¡¡¡ELIMINANDO PEDIDO COMPLETO!!!")
     
     with conn.cursor() as cursor:
-        cursor.execute("DELETE FROM pedidos WHERE id = %s", (pedido_id,))
-        if cursor.rowcount == 0:
+        cursor.execute("DELETE FROM pedidos WHERE id = %s RETURNING mesa_numero", (pedido_id,))
+        eliminado = cursor.fetchone()
+        if not eliminado:
             log.warning(f"Intento de eliminar → Pedido {pedido_id} NO ENCONTRADO")
             raise HTTPException(status_code=404, detail="Pedido no encontrado")
         
+        publicar_evento(cursor, "pedido_eliminado", {"id": pedido_id, "mesa_numero": eliminado['mesa_numero']})
         conn.commit()
         log.warning(f"PEDIDO {pedido_id} ELIMINADO POR COMPLETO DE LA BASE DE DATOS")
         return {"status": "ok", "message": "Pedido eliminado"}
@@ -517,6 +805,7 @@ def agregar_item_menu(item: ItemMenu, conn: psycopg2.extensions.connection = Dep
         """, (item.nombre, item.precio, item.tipo))
         item_id = cursor.fetchone()['id']
         conn.commit()
+        cache_menu.invalidar()
         
         log.info(f"ÍTEM AGREGADO AL MENÚ → ID: {item_id} | '{item.nombre}' | ${item.precio}")
         return {"status": "ok", "id": item_id, "message": "Ítem agregado al menú"}
@@ -532,13 +821,16 @@ def eliminar_item_menu(nombre: str, tipo: str, conn: psycopg2.extensions.connect
             raise HTTPException(status_code=404, detail="Ítem no encontrado en el menú")
         
         conn.commit()
+        # La receta del plato se borra en cascada
+        cache_recetas.invalidar(nombre)
+        cache_menu.invalidar()
         log.info(f"ÍTEM ELIMINADO DEL MENÚ → '{nombre}' ({tipo})")
         return {"status": "ok", "message": "Ítem eliminado del menú"}
 
 # NUEVOS ENDPOINTS PARA GESTIÓN DE CLIENTES
 
 @app.get("/clientes", response_model=List[ClienteResponse])
-def obtener_clientes(conn: psycopg2.extensions.connection = Depends(get_db)):
+def obtener_clientes(request: Request, conn: psycopg2.extensions.connection = Depends(get_db)):
     log.debug("GET /clientes → Consultando lista de clientes registrados")
     
     with conn.cursor() as cursor:
@@ -555,7 +847,7 @@ def obtener_clientes(conn: psycopg2.extensions.connection = Depends(get_db)):
             })
         
         log.info(f"{len(clientes)} clientes enviados al frontend")
-        return clientes
+        return respuesta_con_etag(request, clientes, List[ClienteResponse])
 
 @app.post("/clientes", response_model=ClienteResponse)
 def crear_cliente(cliente: ClienteCreate, conn: psycopg2.extensions.connection = Depends(get_db)):
@@ -587,6 +879,10 @@ def eliminar_cliente(cliente_id: int, conn: psycopg2.extensions.connection = Dep
     log.warning(f"DELETE /clientes/{cliente_id} → Eliminando cliente permanentemente")
     
     with conn.cursor() as cursor:
+        # Sus reservas se borrarían en cascada sin avisar: se borran antes para publicar el evento
+        cursor.execute("DELETE FROM reservas WHERE cliente_id = %s RETURNING id, mesa_numero", (cliente_id,))
+        for eliminada in cursor.fetchall():
+            publicar_evento(cursor, "reserva_eliminada", {"id": eliminada['id'], "mesa_numero": eliminada['mesa_numero']})
         cursor.execute("DELETE FROM clientes WHERE id = %s", (cliente_id,))
         if cursor.rowcount == 0:
             log.warning(f"Cliente {cliente_id} no encontrado para eliminar")
@@ -596,44 +892,52 @@ def eliminar_cliente(cliente_id: int, conn: psycopg2.extensions.connection = Dep
         log.warning(f"CLIENTE {cliente_id} ELIMINADO DE LA BASE DE DATOS")
         return {"status": "ok", "message": "Cliente eliminado"}
     
+def _parsear_rango_reporte(start_date: Optional[str], end_date: Optional[str]):
+    try:
+        return resumen_ventas.parsear_limite(start_date), resumen_ventas.parsear_limite(end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD o YYYY-MM-DD HH:MM:SS.")
+
+def _ventas_en_rango(cursor, estados: tuple, desde, hasta):
+    """
+    Totales y unidades por producto de los pedidos en `estados` dentro de [desde, hasta).
+    Lo cerrado ('Entregado'/'Pagado') sale del resumen pre-agregado; otros estados
+    (p. ej. 'Listo') y límites que no caen en hora completa se agregan en SQL sobre `pedidos`.
+    """
+    estados_resumen = tuple(e for e in estados if e in resumen_ventas.ESTADOS_VENTA)
+    estados_crudos = tuple(e for e in estados if e not in resumen_ventas.ESTADOS_VENTA)
+    if estados_resumen and not (resumen_ventas.alineado_a_hora(desde) and resumen_ventas.alineado_a_hora(hasta)):
+        log.debug(f"Rango {desde} → {hasta} no alineado a la hora → se agrega directo sobre pedidos")
+        estados_crudos += estados_resumen
+        estados_resumen = ()
+
+    totales = {"pedidos": 0, "unidades": 0, "ingresos": 0.0}
+    conteo_productos = {}
+    if estados_resumen:
+        totales = resumen_ventas.totales(cursor, desde, hasta)
+        conteo_productos = {p['nombre']: p['cantidad'] for p in resumen_ventas.productos(cursor, desde, hasta)}
+    if estados_crudos:
+        crudos = resumen_ventas.totales_desde_pedidos(cursor, estados_crudos, desde, hasta)
+        for clave in totales:
+            totales[clave] += crudos[clave]
+        for p in resumen_ventas.productos_desde_pedidos(cursor, estados_crudos, desde, hasta):
+            conteo_productos[p['nombre']] = conteo_productos.get(p['nombre'], 0) + p['cantidad']
+
+    productos_ordenados = sorted(conteo_productos.items(), key=lambda x: (-x[1], x[0]))
+    return totales, productos_ordenados
+
 @app.get("/reportes")
 def obtener_reporte(tipo: str, start_date: str, end_date: str, conn: psycopg2.extensions.connection = Depends(get_db)):
     log.info(f"GET /reportes → Generando reporte | Tipo: {tipo} | {start_date} → {end_date}")
+    desde, hasta = _parsear_rango_reporte(start_date, end_date)
     
     with conn.cursor() as cursor:
-        cursor.execute("""
-            SELECT items, estado, fecha_hora
-            FROM pedidos
-            WHERE fecha_hora >= %s AND fecha_hora < %s
-            AND estado IN ('Listo', 'Entregado', 'Pagado')
-        """, (start_date, end_date))
-        
-        pedidos = cursor.fetchall()
-        
-        ventas_totales = 0
-        pedidos_totales = len(pedidos)
-        productos_vendidos = 0
-        productos_mas_vendidos = {}
-
-        for pedido in pedidos:
-            items = pedido['items']
-            if isinstance(items, str):
-                items = json.loads(items)
-            
-            for item in items:
-                nombre = item['nombre']
-                precio = item['precio']
-                
-                ventas_totales += precio
-                productos_vendidos += 1
-                
-                productos_mas_vendidos[nombre] = productos_mas_vendidos.get(nombre, 0) + 1
-
-        productos_mas_vendidos_lista = sorted(
-            [{'nombre': k, 'cantidad': v} for k, v in productos_mas_vendidos.items()],
-            key=lambda x: x['cantidad'],
-            reverse=True
-        )[:10]
+        totales, productos_ordenados = _ventas_en_rango(cursor, ('Listo', 'Entregado', 'Pagado'), desde, hasta)
+
+        ventas_totales = totales['ingresos']
+        pedidos_totales = totales['pedidos']
+        productos_vendidos = totales['unidades']
+        productos_mas_vendidos_lista = [{'nombre': k, 'cantidad': v} for k, v in productos_ordenados[:10]]
 
         log.info(f"REPORTE GENERADO → Ventas: ${ventas_totales:,.2f} | Pedidos: {pedidos_totales} | Productos vendidos: {productos_vendidos}")
         return {
@@ -655,43 +959,12 @@ def obtener_analisis_productos(
     """
     rango = f"{start_date or 'Inicio'} → {end_date or 'Hoy'}"
     log.info(f"GET /analisis/productos → Análisis de ventas | Rango: {rango}")
-
-    # Construir la condición de fecha si se proporcionan parámetros
-    fecha_condicion = ""
-    params = []
-    if start_date and end_date:
-        fecha_condicion = "AND fecha_hora >= %s AND fecha_hora < %s"
-        params = [start_date, end_date]
-    elif start_date:
-        fecha_condicion = "AND fecha_hora >= %s"
-        params = [start_date]
-    elif end_date:
-        fecha_condicion = "AND fecha_hora < %s"
-        params = [end_date]
+    desde, hasta = _parsear_rango_reporte(start_date, end_date)
 
     with conn.cursor() as cursor:
-        cursor.execute(f"""
-            SELECT items
-            FROM pedidos
-            WHERE estado IN ('Entregado', 'Pagado')
-            {fecha_condicion}
-        """, params)
-        
-        pedidos = cursor.fetchall()
-
-    conteo_productos = {}
-    for pedido in pedidos:
-        items = pedido['items']
-        if isinstance(items, str):
-            items = json.loads(items)
+        _, productos_ordenados = _ventas_en_rango(cursor, ('Entregado', 'Pagado'), desde, hasta)
 
-        if isinstance(items, list):
-            for item in items:
-                nombre = item.get('nombre')
-                if nombre:
-                    conteo_productos[nombre] = conteo_productos.get(nombre, 0) + 1
-
-    productos_ordenados = sorted(conteo_productos.items(), key=lambda x: x[1], reverse=True)
+    conteo_productos = dict(productos_ordenados)
     top_10 = [{"nombre": k, "cantidad": v} for k, v in productos_ordenados[:10]]
     bottom_10 = [{"nombre": k, "cantidad": v} for k, v in productos_ordenados[-10:]]
 
@@ -704,82 +977,26 @@ def obtener_analisis_productos(
 
 
 @app.get("/mesas")
-def obtener_mesas(conn = Depends(get_db)):
+async def obtener_mesas():
     """
-    Devuelve mesas con estado calculado dinámicamente desde pedidos activos.
-    OPTIMIZADO: Usa una sola query JOIN para máximo rendimiento.
+    Devuelve mesas con estado calculado dinámicamente desde pedidos activos y reservas.
+    Sale del estado en memoria (mesas_estado.py), que se mantiene con los eventos de
+    pedidos y reservas: sólo consulta la BD cuando hay que reconstruirlo.
     """
     log.debug("GET /mesas → Consultando estado de mesas (con cálculo dinámico de ocupación)")
 
     try:
-        with conn.cursor() as cursor:
-            # === QUERY ULTRA-OPTIMIZADA CON LEFT JOIN ===
-            cursor.execute("""
-                SELECT 
-                    m.numero,
-                    m.capacidad,
-                    -- Calcular si está ocupada (pedido activo)
-                    CASE 
-                        WHEN p.id IS NOT NULL THEN TRUE 
-                        ELSE FALSE 
-                    END AS ocupada,
-                    -- Detectar si tiene reserva activa
-                    CASE 
-                        WHEN r.id IS NOT NULL THEN TRUE 
-                        ELSE FALSE 
-                    END AS reservada,
-                    c.nombre AS cliente_reservado_nombre,
-                    r.fecha_hora_inicio AS fecha_hora_reserva
-                FROM mesas m
-                -- Pedidos activos (determina ocupada)
-                LEFT JOIN pedidos p ON m.numero = p.mesa_numero 
-                    AND p.estado IN ('Tomando pedido', 'Pendiente', 'En preparacion', 'Listo', 'Entregado')
-                -- Reservas activas
-                LEFT JOIN reservas r ON m.numero = r.mesa_numero 
-                    AND DATE(r.fecha_hora_inicio) >= CURRENT_DATE
-                LEFT JOIN clientes c ON r.cliente_id = c.id
-                WHERE m.numero != 99
-                ORDER BY m.numero;
-            """)
-            mesas_db = cursor.fetchall()
+        await estado_mesas.asegurar(pool_async.conexion)
+        mesas_result = estado_mesas.mesas()
+        ocupadas = sum(1 for m in mesas_result if m['ocupada'])
+        reservadas = sum(1 for m in mesas_result if m['reservada'])
 
-        # Procesar resultados
-        mesas_result = []
-        ocupadas = 0
-        reservadas = 0
-
-        for mesa_row in mesas_db:
-            es_ocupada = bool(mesa_row['ocupada'])
-            es_reservada = bool(mesa_row['reservada'])
-            
-            if es_ocupada:
-                ocupadas += 1
-            if es_reservada:
-                reservadas += 1
-
-            mesas_result.append({
-                "numero": mesa_row['numero'],
-                "capacidad": mesa_row['capacidad'],
-                "ocupada": es_ocupada,  # ← AHORA SÍ SE CALCULA CORRECTAMENTE
-                "reservada": es_reservada,
-                "cliente_reservado_nombre": mesa_row['cliente_reservado_nombre'],
-                "fecha_hora_reserva": str(mesa_row['fecha_hora_reserva']) if mesa_row['fecha_hora_reserva'] else None
-            })
-
-        # Mesa virtual (siempre disponible)
-        mesas_result.append({
-            "numero": 99,
-            "capacidad": 100,
-            "ocupada": False,
-            "reservada": False,
-            "cliente_reservado_nombre": None,
-            "fecha_hora_reserva": None,
-            "es_virtual": True
-        })
-
-        log.info(f"Mesas enviadas → {len(mesas_db)} físicas | {ocupadas} ocupadas | {reservadas} reservadas | Actualización dinámica ✅")
-        return mesas_result
+        log.info(f"Mesas enviadas → {len(mesas_result) - 1} físicas | {ocupadas} ocupadas | {reservadas} reservadas | Actualización dinámica ✅")
+        # Sin jsonable_encoder: los valores ya son tipos JSON y así no se ocupa el event loop
+        return JSONResponse(mesas_result)
 
+    except PoolAgotadoError as e:
+        raise HTTPException(status_code=503, detail=f"Base de datos saturada: {e}")
     except Exception as e:
         log.error(f"ERROR CRÍTICO en obtener_mesas → {e}", exc_info=True)
         # Fallback seguro
@@ -791,167 +1008,43 @@ def obtener_mesas(conn = Depends(get_db)):
         return fallback
 
 
-@app.get("/mesas/disponibles/")
-def obtener_mesas_disponibles_para_fecha_hora(
-    fecha_hora_str: str = Query(..., description="Fecha y hora en formato YYYY-MM-DD HH:MM:SS"),
-    conn = Depends(get_db)
-):
-    log.info(f"GET /mesas/disponibles → Buscando mesas libres para {fecha_hora_str}")
-
-    try:
-        fecha_hora_obj = datetime.strptime(fecha_hora_str, "%Y-%m-%d %H:%M:%S")
-    except ValueError:
-        log.warning(f"Formato de fecha inválido recibido: {fecha_hora_str}")
-        raise HTTPException(status_code=400, detail="Formato de fecha/hora inválido. Use YYYY-MM-DD HH:MM:SS")
-
+# --- ENDPOINTS DE RESPALDO (BACKUP) ---
+# El respaldo corre en segundo plano (respaldos.py): POST /backup encola el trabajo y
+# responde 202 con su id; el cliente consulta el avance con GET /backup/{id}.
+# modo: pg_dump (por defecto) | completo | diferencial (respaldo_streaming.py)
+@app.post("/backup", response_model=RespaldoResponse, status_code=202)
+def crear_respaldo(modo: str = Query("pg_dump"), conn=Depends(get_db)):
+    log.warning(f"POST /backup → ENCOLANDO RESPALDO ({modo}) DE LA BASE DE DATOS")
     try:
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT numero, capacidad FROM mesas WHERE numero != 99;")
-            mesas_db = cursor.fetchall()
-
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT DISTINCT mesa_numero
-                FROM pedidos
-                WHERE estado IN ('Tomando pedido', 'Pendiente', 'En preparacion', 'Listo', 'Entregado')
-                AND mesa_numero != 99;
-            """)
-            ocupadas_db = {row['mesa_numero'] for row in cursor.fetchall()}
-
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT DISTINCT mesa_numero
-                FROM reservas
-                WHERE %s BETWEEN fecha_hora_inicio AND COALESCE(fecha_hora_fin, fecha_hora_inicio + INTERVAL '1 hour');
-            """, (fecha_hora_obj,))
-            reservadas_db = {row['mesa_numero'] for row in cursor.fetchall()}
-        
-        disponibles = [
-            {"numero": m['numero'], "capacidad": m['capacidad']}
-            for m in mesas_db
-            if m['numero'] not in ocupadas_db and m['numero'] not in reservadas_db
-        ]
-
-        log.info(f"{len(disponibles)} mesas disponibles para {fecha_hora_str}")
-        return disponibles
-
-    except Exception as e:
-        log.error(f"ERROR en obtener_mesas_disponibles → {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-# --- ENDPOINT DE RESPALDO (BACKUP) ---
-def find_pg_dump():
-    path_in_path = shutil.which("pg_dump")
-    if path_in_path:
-        log.debug(f"pg_dump encontrado en PATH: {path_in_path}")
-        return path_in_path
-    
-    possible_paths = glob.glob("C:/Program Files/PostgreSQL/*/bin/pg_dump.exe")
-    if possible_paths:
-        possible_paths.sort()
-        elegido = possible_paths[-1]
-        log.debug(f"pg_dump encontrado en instalación: {elegido}")
-        return elegido
-    
-    log.error("pg_dump NO ENCONTRADO en el sistema")
-    return None
-
-
-@app.post("/backup", response_model=BackupResponse)
-def crear_respaldo():
-    log.warning("POST /backup → INICIANDO RESPALDO COMPLETO DE LA BASE DE DATOS")
-
-    try:
-        pg_dump_exe = find_pg_dump()
-        if not pg_dump_exe:
-            log.error("No se encontró pg_dump → Respaldo cancelado")
-            raise HTTPException(status_code=500, detail="pg_dump no encontrado en el sistema")
-
-        desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
-        backup_dir = os.path.join(desktop_path, "Backups_RestaurantPRO")
-        os.makedirs(backup_dir, exist_ok=True)
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"backup_restaurant_db_{timestamp}.sql"
-        filepath = os.path.join(backup_dir, filename)
-        
-        env = os.environ.copy()
-        env["PGPASSWORD"] = "postgres"
-        
-        command = [
-            pg_dump_exe, "-U", "postgres", "-h", "localhost", "-p", "5432",
-            "-d", "restaurant_db", "-f", filepath
-        ]
-        
-        log.info(f"Ejecutando pg_dump → {filepath}")
-        result = subprocess.run(command, env=env, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            log.info(f"RESPALDO COMPLETADO CON ÉXITO → {filepath} ({os.path.getsize(filepath) / 1024 / 1024:.1f} MB)")
-            return {"status": "ok", "message": "Respaldo creado exitosamente.", "file_path": filepath}
-        else:
-            log.error(f"pg_dump FALLÓ → {result.stderr}")
-            raise HTTPException(status_code=500, detail=result.stderr)
-            
+        return servicio_respaldos.encolar(conn, modo)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        log.error(f"ERROR GENERAL EN BACKUP → {e}", exc_info=True)
+        log.error(f"ERROR AL ENCOLAR RESPALDO → {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error creando respaldo: {str(e)}")
 
-@app.post("/backup", response_model=BackupResponse)
-def crear_respaldo():
-    """
-    Crea un respaldo de la base de datos PostgreSQL usando pg_dump.
-    """
-    log.warning("POST /backup → ¡¡¡INICIANDO RESPALDO COMPLETO DE LA BASE DE DATOS!!!")
+@app.get("/backup", response_model=List[RespaldoResponse])
+def listar_respaldos(limite: int = Query(20, ge=1, le=200), conn=Depends(get_db)):
+    return servicio_respaldos.listar(conn, limite)
 
-    try:
-        pg_dump_exe = find_pg_dump()
-        if not pg_dump_exe:
-            log.error("pg_dump NO ENCONTRADO → Respaldo abortado")
-            raise HTTPException(status_code=500, detail="No se encontró pg_dump. Instala PostgreSQL o agrégalo al PATH.")
-
-        desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
-        backup_dir = os.path.join(desktop_path, "Backups_RestaurantPRO")
-        os.makedirs(backup_dir, exist_ok=True)
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"backup_restaurant_db_{timestamp}.sql"
-        filepath = os.path.join(backup_dir, filename)
-        
-        env = os.environ.copy()
-        env["PGPASSWORD"] = "postgres"
-        
-        command = [
-            pg_dump_exe, "-U", "postgres", "-h", "localhost", "-p", "5432",
-            "-d", "restaurant_db", "-f", filepath
-        ]
-        
-        log.info(f"Ejecutando pg_dump → Guardando en: {filepath}")
-        result = subprocess.run(command, env=env, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            tamaño_mb = os.path.getsize(filepath) / (1024 * 1024)
-            log.info(f"RESPALDO COMPLETADO CON ÉXITO → {filepath} | {tamaño_mb:.2f} MB")
-            return {"status": "ok", "message": "Respaldo creado exitosamente.", "file_path": filepath}
-        else:
-            log.error(f"pg_dump FALLÓ → Código: {result.returncode} | Error: {result.stderr.strip()}")
-            raise HTTPException(status_code=500, detail=f"Error al ejecutar pg_dump: {result.stderr}")
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        log.error(f"ERROR GENERAL EN RESPALDO → {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Error creando respaldo: {str(e)}")
+@app.get("/backup/{respaldo_id}", response_model=RespaldoResponse)
+def obtener_respaldo(respaldo_id: int, conn=Depends(get_db)):
+    respaldo = servicio_respaldos.obtener(conn, respaldo_id)
+    if respaldo is None:
+        raise HTTPException(status_code=404, detail="Respaldo no encontrado")
+    return respaldo
 
 
-# (Este código estaba mal indentado en tu mensaje, lo corrijo y agrego logs)
+# Una sola franja: las mesas libres para una reserva que empieza en fecha_hora_str.
+# Con `personas` sólo las que alcanzan, de mejor a peor ajuste (ver disponibilidad.py).
 @app.get("/mesas/disponibles/")
 def obtener_mesas_disponibles_para_fecha_hora(
     fecha_hora_str: str = Query(..., description="Fecha y hora en formato YYYY-MM-DD HH:MM:SS"),
+    personas: int = Query(1, ge=1),
+    duracion_minutos: int = Query(60, ge=1, le=24 * 60),
     conn = Depends(get_db)
 ):
-    log.info(f"GET /mesas/disponibles → Buscando mesas libres para: {fecha_hora_str}")
+    log.info(f"GET /mesas/disponibles → Buscando mesas libres para: {fecha_hora_str} | {personas} personas")
 
     try:
         fecha_hora_obj = datetime.strptime(fecha_hora_str, "%Y-%m-%d %H:%M:%S")
@@ -959,31 +1052,12 @@ def obtener_mesas_disponibles_para_fecha_hora(
         log.warning(f"Formato inválido de fecha recibido → {fecha_hora_str}")
         raise HTTPException(status_code=400, detail="Formato de fecha/hora inválido. Use YYYY-MM-DD HH:MM:SS")
 
+    duracion = timedelta(minutes=duracion_minutos)
     try:
         with conn.cursor() as cursor:
-            cursor.execute("SELECT numero, capacidad FROM mesas WHERE numero != 99;")
-            mesas_db = cursor.fetchall()
-
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT DISTINCT mesa_numero FROM pedidos
-                WHERE estado IN ('Tomando pedido', 'Pendiente', 'En preparacion', 'Listo', 'Entregado')
-                AND mesa_numero != 99;
-            """)
-            ocupadas_db = {row['mesa_numero'] for row in cursor.fetchall()}
-
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT DISTINCT mesa_numero FROM reservas
-                WHERE %s BETWEEN fecha_hora_inicio AND COALESCE(fecha_hora_fin, fecha_hora_inicio + INTERVAL '1 hour');
-            """, (fecha_hora_obj,))
-            reservadas_db = {row['mesa_numero'] for row in cursor.fetchall()}
-        
-        mesas_disponibles = [
-            {"numero": m['numero'], "capacidad": m['capacidad']}
-            for m in mesas_db
-            if m['numero'] not in ocupadas_db and m['numero'] not in reservadas_db
-        ]
+            franjas = disponibilidad.mesas_libres(cursor, fecha_hora_obj, fecha_hora_obj + duracion, personas, duracion)
+        conn.rollback()
+        mesas_disponibles = franjas[0]["mesas"]
 
         log.info(f"{len(mesas_disponibles)} mesas disponibles para {fecha_hora_str} → {', '.join([str(m['numero']) for m in mesas_disponibles]) or 'Ninguna'}")
         return mesas_disponibles
@@ -1006,6 +1080,85 @@ class ReservaUpdate(BaseModel):
     fecha_hora_fin: Optional[str] = None
 
 
+# Disponibilidad de toda una ventana (una noche, un día) en una sola consulta: por cada
+# franja de inicio posible, la mesa que mejor se ajusta a `personas` y las demás libres.
+@app.get("/reservas/disponibilidad")
+def obtener_disponibilidad_reservas(
+    personas: int = Query(..., ge=1),
+    desde: str = Query(..., description="Inicio de la ventana, YYYY-MM-DD HH:MM:SS"),
+    hasta: str = Query(..., description="Fin de la ventana, YYYY-MM-DD HH:MM:SS"),
+    duracion_minutos: int = Query(60, ge=5, le=24 * 60),
+    paso_minutos: int = Query(30, ge=5, le=24 * 60),
+    conn = Depends(get_db)
+):
+    log.info(f"GET /reservas/disponibilidad → {personas} personas | {desde} a {hasta} | {duracion_minutos} min cada {paso_minutos} min")
+
+    try:
+        desde_obj = datetime.strptime(desde, "%Y-%m-%d %H:%M:%S")
+        hasta_obj = datetime.strptime(hasta, "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Formato de fecha/hora inválido. Use YYYY-MM-DD HH:MM:SS")
+
+    try:
+        with conn.cursor() as cursor:
+            franjas = disponibilidad.mesas_libres(
+                cursor, desde_obj, hasta_obj, personas,
+                timedelta(minutes=duracion_minutos), timedelta(minutes=paso_minutos)
+            )
+        conn.rollback()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        log.error(f"ERROR al calcular disponibilidad de reservas → {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor al consultar disponibilidad.")
+
+    for franja in franjas:
+        franja["mejor"] = franja["mesas"][0] if franja["mesas"] else None
+    log.info(f"Disponibilidad enviada → {len(franjas)} franjas | {sum(1 for f in franjas if f['mejor'])} con mesa libre")
+    return {
+        "personas": personas,
+        "duracion_minutos": duracion_minutos,
+        "paso_minutos": paso_minutos,
+        "franjas": franjas
+    }
+
+
+# Matriz mesa × franja de un día para la vista de reservas: una sola consulta por día en
+# lugar de una llamada a /mesas/disponibles/ por horario.
+@app.get("/reservas/grilla")
+def obtener_grilla_reservas(
+    fecha: str = Query(..., description="Día en formato YYYY-MM-DD"),
+    paso_minutos: int = Query(30, ge=5, le=240),
+    hora_inicio: int = Query(0, ge=0, le=23),
+    hora_fin: int = Query(24, ge=1, le=24),
+    conn = Depends(get_db)
+):
+    log.info(f"GET /reservas/grilla → {fecha} | {hora_inicio}:00 a {hora_fin}:00 cada {paso_minutos} min")
+
+    try:
+        dia = datetime.strptime(fecha, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD.")
+    if hora_fin <= hora_inicio:
+        raise HTTPException(status_code=400, detail="hora_fin debe ser posterior a hora_inicio.")
+
+    try:
+        with conn.cursor() as cursor:
+            resultado = disponibilidad.grilla(
+                cursor, dia + timedelta(hours=hora_inicio), dia + timedelta(hours=hora_fin),
+                timedelta(minutes=paso_minutos)
+            )
+        conn.rollback()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        log.error(f"ERROR al calcular la grilla de reservas → {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor al consultar disponibilidad.")
+
+    log.info(f"Grilla enviada → {len(resultado['mesas'])} mesas × {len(resultado['franjas'])} franjas")
+    return {"fecha": fecha, "paso_minutos": paso_minutos, **resultado}
+
+
 @app.get("/reservas/")
 def obtener_reservas(
     fecha: Optional[str] = Query(None, description="Fecha en formato YYYY-MM-DD para filtrar"),
@@ -1014,6 +1167,13 @@ def obtener_reservas(
     filtro = f" para {fecha}" if fecha else " (todas)"
     log.info(f"GET /reservas → Obteniendo reservas{filtro}")
 
+    dia = None
+    if fecha:
+        try:
+            dia = datetime.strptime(fecha, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD.")
+
     try:
         query = """
             SELECT r.id, r.mesa_numero, r.cliente_id, c.nombre as cliente_nombre, r.fecha_hora_inicio, r.fecha_hora_fin
@@ -1021,9 +1181,10 @@ def obtener_reservas(
             JOIN clientes c ON r.cliente_id = c.id
         """
         params = []
-        if fecha:
-            query += " WHERE DATE(r.fecha_hora_inicio) = %s"
-            params.append(fecha)
+        if dia:
+            # Rango semiabierto [día, día + 1) para que use idx_reservas_fecha_inicio
+            query += " WHERE r.fecha_hora_inicio >= %s AND r.fecha_hora_inicio < %s"
+            params += [dia, dia + timedelta(days=1)]
         query += " ORDER BY r.fecha_hora_inicio;"
 
         with conn.cursor() as cursor:
@@ -1059,8 +1220,10 @@ def crear_reserva_simplificada(reserva: ReservaCreate, conn = Depends(get_db)):
         if reserva.fecha_hora_fin:
             fecha_fin_obj = datetime.fromisoformat(reserva.fecha_hora_fin.replace(" ", "T"))
         else:
-            fecha_fin_obj = fecha_inicio_obj + timedelta(hours=1)
+            fecha_fin_obj = fecha_inicio_obj + disponibilidad.DURACION_DEFECTO
             log.debug(f"Duración no especificada → Asignando 1 hora por defecto")
+        if fecha_fin_obj <= fecha_inicio_obj:
+            raise ValueError("la hora de fin debe ser posterior a la de inicio")
 
         with conn.cursor() as cursor:
             cursor.execute("""
@@ -1068,10 +1231,6 @@ def crear_reserva_simplificada(reserva: ReservaCreate, conn = Depends(get_db)):
                 VALUES (%s, %s, %s, %s) RETURNING id;
             """, (reserva.mesa_numero, reserva.cliente_id, fecha_inicio_obj, fecha_fin_obj))
             reserva_id = cursor.fetchone()['id']
-        
-        conn.commit()
-
-        with conn.cursor() as cursor:
             cursor.execute("""
                 SELECT r.id, r.mesa_numero, r.cliente_id, c.nombre as cliente_nombre, r.fecha_hora_inicio, r.fecha_hora_fin
                 FROM reservas r
@@ -1079,6 +1238,16 @@ def crear_reserva_simplificada(reserva: ReservaCreate, conn = Depends(get_db)):
                 WHERE r.id = %s;
             """, (reserva_id,))
             nueva = cursor.fetchone()
+            # El nombre del cliente viaja en el evento para el estado de mesas (mesas_estado.py)
+            publicar_evento(cursor, "reserva_creada", {
+                "id": reserva_id,
+                "mesa_numero": reserva.mesa_numero,
+                "fecha_hora_inicio": fecha_inicio_obj,
+                "fecha_hora_fin": fecha_fin_obj,
+                "cliente_nombre": nueva['cliente_nombre']
+            })
+        
+        conn.commit()
 
         log.info(f"RESERVA CREADA CON ÉXITO → ID: {reserva_id} | Mesa {reserva.mesa_numero} | {nueva['cliente_nombre']} | {fecha_inicio_obj.strftime('%Y-%m-%d %H:%M')}")
 
@@ -1094,6 +1263,11 @@ def crear_reserva_simplificada(reserva: ReservaCreate, conn = Depends(get_db)):
     except ValueError as ve:
         log.warning(f"Error de formato de fecha en reserva → {ve}")
         raise HTTPException(status_code=400, detail=f"Formato de fecha/hora inválido: {ve}")
+    except psycopg2.errors.ExclusionViolation:
+        # reservas_sin_solape (migración 005): la mesa ya tiene una reserva que se cruza
+        conn.rollback()
+        log.warning(f"Reserva rechazada → Mesa {reserva.mesa_numero} ya reservada en ese horario")
+        raise HTTPException(status_code=409, detail=f"La mesa {reserva.mesa_numero} ya está reservada en ese horario.")
     except Exception as e:
         log.error(f"ERROR al crear reserva → {e}", exc_info=True)
         conn.rollback()
@@ -1109,11 +1283,12 @@ def eliminar_reserva(reserva_id: int, conn = Depends(get_db)):
 
     try:
         with conn.cursor() as cursor:
-            cursor.execute("DELETE FROM reservas WHERE id = %s RETURNING id;", (reserva_id,))
+            cursor.execute("DELETE FROM reservas WHERE id = %s RETURNING id, mesa_numero;", (reserva_id,))
             eliminado = cursor.fetchone()
             if not eliminado:
                 log.warning(f"Reserva {reserva_id} no encontrada → 404")
                 raise HTTPException(status_code=404, detail="Reserva no encontrada")
+            publicar_evento(cursor, "reserva_eliminada", {"id": reserva_id, "mesa_numero": eliminado['mesa_numero']})
 
         conn.commit()
         log.warning(f"RESERVA {reserva_id} ELIMINADA CON ÉXITO DE LA BASE DE DATOS")
@@ -1136,37 +1311,26 @@ def obtener_ventas_por_hora(
     log.info(f"GET /reportes/ventas_por_hora → Generando ventas por hora del día {fecha}")
 
     try:
-        datetime.strptime(fecha, "%Y-%m-%d")
+        fecha_obj = datetime.strptime(fecha, "%Y-%m-%d").date()
     except ValueError:
         log.warning(f"Fecha inválida recibida en ventas_por_hora → {fecha}")
         raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD.")
 
     try:
+        # Leído del resumen pre-agregado (mantenido por trigger_resumen_ventas)
         with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT EXTRACT(HOUR FROM fecha_hora) AS hora, SUM(item_data.precio) AS total_venta
-                FROM pedidos,
-                     jsonb_to_recordset(pedidos.items) AS item_data(nombre TEXT, precio REAL, tipo TEXT, cantidad INTEGER)
-                WHERE DATE(fecha_hora) = %s
-                  AND estado IN ('Entregado', 'Pagado')
-                GROUP BY EXTRACT(HOUR FROM fecha_hora)
-                ORDER BY hora;
-            """, (fecha,))
-            
-            resultados_db = cursor.fetchall()
+            resultados = resumen_ventas.ventas_por_hora(cursor, fecha_obj)
 
         ventas_por_hora = {f"{h:02d}": 0.0 for h in range(24)}
         total_del_dia = 0.0
 
-        for row in resultados_db:
-            hora_int = int(row['hora'])
-            total = float(row['total_venta'] or 0)
+        for hora_int, total in resultados.items():
             hora_str = f"{hora_int:02d}"
             ventas_por_hora[hora_str] = total
             total_del_dia += total
 
         hora_pico = max(ventas_por_hora.items(), key=lambda x: x[1])[0] if total_del_dia > 0 else "N/A"
-        monto_pico = ventas_por_hora[hora_pico]
+        monto_pico = ventas_por_hora.get(hora_pico, 0.0)
 
         log.info(f"VENTAS POR HORA {fecha} → Total día: ${total_del_dia:,.2f} | Hora pico: {hora_pico}h → ${monto_pico:,.2f}")
         return ventas_por_hora
@@ -1176,67 +1340,203 @@ def obtener_ventas_por_hora(
         raise HTTPException(status_code=500, detail=f"Error interno del servidor al calcular ventas por hora: {str(e)}")
 
 
+# Histograma de tiempos de cocina en minutos: límites inferiores de cada tramo (el último es "60+")
+TRAMOS_COCINA = (0, 5, 10, 15, 20, 30, 45, 60)
+
+# Una sola pasada: por tramo, cuántos pedidos y su suma, mínimo y máximo. El tramo de cada
+# pedido es cuántos límites (sin el 0) alcanza, igual que width_bucket con un arreglo
+SQL_EFICIENCIA_COCINA = """
+    WITH tiempos AS (
+        SELECT EXTRACT(EPOCH FROM (hora_fin_cocina - hora_inicio_cocina)) / 60 AS minutos
+        FROM pedidos
+        WHERE hora_inicio_cocina IS NOT NULL
+          AND hora_fin_cocina IS NOT NULL
+          AND fecha_hora >= %s
+          AND fecha_hora < %s
+          AND estado IN ('Listo', 'Entregado', 'Pagado')
+    )
+    SELECT width_bucket(minutos, %s::float8[]) AS tramo,
+           COUNT(*) AS pedidos, SUM(minutos) AS suma, MIN(minutos) AS minimo, MAX(minutos) AS maximo
+    FROM tiempos
+    GROUP BY 1
+"""
+
+
 @app.get("/reportes/eficiencia_cocina")
 def get_eficiencia_cocina(
     tipo: str,
     start_date: str,
     end_date: str,
-    conn = Depends(get_db)
+    conn = Depends(get_db),
+    detalle: bool = Query(True, description="Incluir la lista de pedidos (el tablero sólo usa los totales y los tramos)")
 ):
     log.info(f"REPORTE EFICIENCIA COCINA → {tipo} | {start_date} → {end_date}")
 
+    # Promedio, extremos e histograma se calculan en la base: el tamaño de la respuesta no
+    # depende de la cantidad de pedidos (el detalle completo está en /eficiencia_cocina/detalle)
     with conn.cursor() as cursor:
-        query = """
-            SELECT id, hora_inicio_cocina, hora_fin_cocina
-            FROM pedidos
-            WHERE hora_inicio_cocina IS NOT NULL
-              AND hora_fin_cocina IS NOT NULL
-              AND fecha_hora >= %s
-              AND fecha_hora < %s
-              AND estado IN ('Listo', 'Entregado', 'Pagado')
-            ORDER BY fecha_hora
-        """
-        cursor.execute(query, (start_date, end_date))
-        rows = cursor.fetchall()
+        cursor.execute(SQL_EFICIENCIA_COCINA, (start_date, end_date, list(TRAMOS_COCINA[1:])))
+        por_tramo = {f['tramo']: f for f in cursor.fetchall()}
+
+        total = sum(f['pedidos'] for f in por_tramo.values())
+        etiquetas = [f"{a}-{b}" for a, b in zip(TRAMOS_COCINA, TRAMOS_COCINA[1:])] + [f"{TRAMOS_COCINA[-1]}+"]
+        tramos = [
+            {"tramo": etiqueta, "pedidos": por_tramo[i]['pedidos'] if i in por_tramo else 0}
+            for i, etiqueta in enumerate(etiquetas)
+        ]
 
-        if not rows:
+        if not total:
             return {
                 "promedio_minutos": 0,
                 "total_pedidos": 0,
                 "mas_rapido_min": 0,
                 "mas_lento_min": 0,
+                "tramos": tramos,
                 "detalle_pedidos": []
             }
 
-        tiempos = []
-        detalle = []
-
-        for row in rows:
-            inicio = row['hora_inicio_cocina']
-            fin = row['hora_fin_cocina']
-            if isinstance(inicio, str):
-                inicio = datetime.fromisoformat(inicio.replace("Z", "+00:00"))
-            if isinstance(fin, str):
-                fin = datetime.fromisoformat(fin.replace("Z", "+00:00"))
-            
-            minutos = (fin - inicio).total_seconds() / 60
-            tiempos.append(minutos)
-            detalle.append({"id": row['id'], "tiempo": round(minutos, 1)})
+        promedio = float(sum(f['suma'] for f in por_tramo.values())) / total
+        mas_rapido = float(min(f['minimo'] for f in por_tramo.values()))
+        mas_lento = float(max(f['maximo'] for f in por_tramo.values()))
 
-        promedio = sum(tiempos) / len(tiempos)
-        mas_rapido = min(tiempos)
-        mas_lento = max(tiempos)
+        detalle_pedidos = []
+        if detalle:
+            cursor.execute("""
+                SELECT id, EXTRACT(EPOCH FROM (hora_fin_cocina - hora_inicio_cocina)) / 60 AS minutos
+                FROM pedidos
+                WHERE hora_inicio_cocina IS NOT NULL
+                  AND hora_fin_cocina IS NOT NULL
+                  AND fecha_hora >= %s
+                  AND fecha_hora < %s
+                  AND estado IN ('Listo', 'Entregado', 'Pagado')
+                ORDER BY fecha_hora
+            """, (start_date, end_date))
+            detalle_pedidos = [{"id": f['id'], "tiempo": round(float(f['minutos']), 1)} for f in cursor.fetchall()]
 
-        log.info(f"EFICIENCIA → {len(tiempos)} pedidos | Promedio: {promedio:.1f} min")
+        log.info(f"EFICIENCIA → {total} pedidos | Promedio: {promedio:.1f} min")
 
         return {
             "promedio_minutos": round(promedio, 1),
-            "total_pedidos": len(tiempos),
+            "total_pedidos": total,
             "mas_rapido_min": round(mas_rapido, 1),
             "mas_lento_min": round(mas_lento, 1),
-            "detalle_pedidos": detalle
+            "tramos": tramos,
+            "detalle_pedidos": detalle_pedidos
         }
 
+
+# Todos los pedidos de cocina del período, uno por línea (NDJSON), para el detalle del PDF.
+# Se leen con un cursor del lado del servidor: ni el backend ni el cliente tienen el año
+# completo en memoria.
+SQL_DETALLE_COCINA = """
+    SELECT id, fecha_hora, mesa_numero, hora_inicio_cocina, hora_fin_cocina,
+           ROUND((EXTRACT(EPOCH FROM (hora_fin_cocina - hora_inicio_cocina)) / 60)::numeric, 1)::float8 AS minutos
+    FROM pedidos
+    WHERE hora_inicio_cocina IS NOT NULL
+      AND hora_fin_cocina IS NOT NULL
+      AND fecha_hora >= %s
+      AND fecha_hora < %s
+      AND estado IN ('Listo', 'Entregado', 'Pagado')
+    ORDER BY fecha_hora
+"""
+
+
+@app.get("/reportes/eficiencia_cocina/detalle")
+def detalle_eficiencia_cocina(
+    tipo: str = Query("Diario", description="Diario | Semanal | Mensual | Anual"),
+    fecha: Optional[str] = Query(None, description="Día de referencia YYYY-MM-DD (por defecto hoy)")
+):
+    try:
+        dia = datetime.strptime(fecha, "%Y-%m-%d").date() if fecha else date.today()
+        desde, hasta = reportes_dashboard.rango_periodo(tipo, dia)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    log.info(f"GET /reportes/eficiencia_cocina/detalle → {tipo} | {desde} → {hasta}")
+
+    def lineas():
+        # La conexión se toma recién al empezar a enviar: si el cliente se va (o fallan los
+        # encabezados) antes del primer trozo, el generador nunca arranca y no hay nada que
+        # devolver. Con el pool agotado la respuesta ya salió con 200: se corta el envío y el
+        # cliente lo ve como un error de lectura
+        try:
+            conn = pool.obtener()
+        except PoolAgotadoError as e:
+            log.error(f"DETALLE COCINA → base de datos saturada: {e}")
+            raise
+        enviados = 0
+        try:
+            with conn.cursor(name="detalle_cocina") as cursor:
+                cursor.itersize = 2000
+                cursor.execute(SQL_DETALLE_COCINA, (desde, hasta))
+                for fila in cursor:
+                    enviados += 1
+                    yield json.dumps(fila, default=str) + "\n"
+            log.info(f"DETALLE COCINA ENVIADO → {tipo} | {enviados} pedidos")
+        finally:
+            pool.devolver(conn)
+
+    # Si el cliente se desconecta a mitad, Starlette deja el generador suspendido en un yield
+    # (con la conexión tomada) hasta que lo recoja el GC: la tarea de fondo, que corre igual
+    # tras la desconexión, lo cierra para que su finally devuelva la conexión enseguida
+    generador = lineas()
+    return StreamingResponse(generador, media_type="application/x-ndjson", background=BackgroundTask(generador.close))
+
+
+# Tablero completo de la vista de reportes en una sola petición; las secciones se calculan
+# en paralelo (reportes_dashboard.py). Con progresivo=true responde NDJSON: una línea por
+# sección apenas termina y una última con "fin", para ir dibujando mientras llega el resto.
+@app.get("/reportes/dashboard")
+async def obtener_dashboard_reportes(
+    tipo: str = Query("Diario", description="Diario | Semanal | Mensual | Anual"),
+    fecha: Optional[str] = Query(None, description="Día de referencia YYYY-MM-DD (por defecto hoy)"),
+    progresivo: bool = Query(False)
+):
+    try:
+        dia = datetime.strptime(fecha, "%Y-%m-%d").date() if fecha else date.today()
+        desde, hasta = reportes_dashboard.rango_periodo(tipo, dia)
+        anterior_desde, anterior_hasta = reportes_dashboard.rango_anterior(tipo, dia)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    log.info(f"GET /reportes/dashboard → {tipo} | {desde} → {hasta} | {'progresivo' if progresivo else 'completo'}")
+
+    # Las mismas funciones de los endpoints individuales, cada una con su conexión
+    secciones = {
+        "reporte": lambda c: obtener_reporte(tipo.lower(), desde.isoformat(), hasta.isoformat(), c),
+        "anterior": lambda c: obtener_reporte(tipo.lower(), anterior_desde.isoformat(), anterior_hasta.isoformat(), c),
+        "ventas_por_hora": lambda c: obtener_ventas_por_hora(dia.isoformat(), c),
+        "eficiencia": lambda c: get_eficiencia_cocina(tipo, desde.isoformat(), hasta.isoformat(), c, detalle=False),
+        "analisis": lambda c: obtener_analisis_productos(desde.isoformat(), hasta.isoformat(), c),
+    }
+    cabecera = {
+        "tipo": tipo,
+        "fecha": dia.isoformat(),
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "anterior_desde": anterior_desde.isoformat(),
+        "anterior_hasta": anterior_hasta.isoformat(),
+    }
+    inicio = time.perf_counter()
+
+    if progresivo:
+        async def lineas():
+            yield json.dumps(cabecera) + "\n"
+            async for nombre, resultado in reportes_dashboard.secciones_en_paralelo(secciones):
+                yield json.dumps({"seccion": nombre, **resultado}, default=str) + "\n"
+            duracion_ms = round((time.perf_counter() - inicio) * 1000, 1)
+            log.info(f"TABLERO DE REPORTES ENVIADO → {tipo} | {duracion_ms} ms")
+            yield json.dumps({"fin": True, "duracion_ms": duracion_ms}) + "\n"
+        return StreamingResponse(lineas(), media_type="application/x-ndjson")
+
+    resultado = {**cabecera, "secciones": {}, "errores": {}}
+    async for nombre, seccion in reportes_dashboard.secciones_en_paralelo(secciones):
+        if "error" in seccion:
+            resultado["errores"][nombre] = seccion["error"]
+        else:
+            resultado["secciones"][nombre] = seccion["datos"]
+    resultado["duracion_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    log.info(f"TABLERO DE REPORTES ENVIADO → {tipo} | {resultado['duracion_ms']} ms | {len(resultado['errores'])} secciones con error")
+    return JSONResponse(resultado)
+
 @app.delete("/mesas/limpiar_fisicas")
 def limpiar_mesas_fisicas(conn=Depends(get_db)):
     try:
@@ -1244,6 +1544,7 @@ def limpiar_mesas_fisicas(conn=Depends(get_db)):
             # CASCADE se encarga de borrar los pedidos asociados
             cursor.execute("DELETE FROM mesas WHERE numero != 99")
             eliminadas = cursor.rowcount
+            publicar_evento(cursor, "mesas_actualizadas", {"eliminadas": eliminadas})
             conn.commit()
         log.info(f"CONFIGURACIÓN INICIAL → {eliminadas} mesas físicas eliminadas (pedidos asociados también)")
         return {"status": "ok", "eliminadas": eliminadas}
@@ -1258,6 +1559,8 @@ def limpiar_menu_completo(conn=Depends(get_db)):
             cursor.execute("DELETE FROM menu")
             eliminados = cursor.rowcount
             conn.commit()
+        cache_recetas.invalidar_todo()
+        cache_menu.invalidar()
         log.info(f"Menú completo limpiado → {eliminados} ítems eliminados")
         return {"status": "ok", "message": "Menú limpiado correctamente"}
     except Exception as e:
@@ -1276,6 +1579,7 @@ def crear_mesa(mesa: dict, conn=Depends(get_db)):
                 VALUES (%s, %s)
                 ON CONFLICT (numero) DO UPDATE SET capacidad = %s
             """, (numero, capacidad, capacidad))
+            publicar_evento(cursor, "mesas_actualizadas", {"numero": numero, "capacidad": capacidad})
             conn.commit()
         log.info(f"Mesa creada/actualizada → Mesa {numero} - Capacidad: {capacidad}")
         return {"status": "ok"}
@@ -1291,53 +1595,51 @@ def obtener_reporte_rango(
     conn = Depends(get_db)
 ):
     """
-    Endpoint para obtener reporte en un rango de fechas
+    Endpoint para obtener reporte en un rango de fechas (ambos días incluidos)
     """
+    try:
+        desde = datetime.strptime(fecha_inicio, "%Y-%m-%d").date()
+        # Rango semiabierto [inicio, fin + 1 día) sobre fecha_hora, usable por los índices
+        hasta = datetime.strptime(fecha_fin, "%Y-%m-%d").date() + timedelta(days=1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD.")
+
     try:
         with conn.cursor() as cursor:
-            # Obtener ventas totales en el rango
+            # Ventas totales, pedidos y unidades en el rango (líneas normalizadas de pedido_items)
             cursor.execute("""
                 SELECT 
-                    COALESCE(SUM(total), 0) as ventas_totales,
-                    COUNT(*) as pedidos_totales
-                FROM pedidos 
-                WHERE DATE(fecha_hora) BETWEEN %s AND %s 
-                AND estado = 'Pagado'
-            """, (fecha_inicio, fecha_fin))
-            
-            resultado = cursor.fetchone()
-            ventas_totales = float(resultado[0]) if resultado[0] else 0
-            pedidos_totales = int(resultado[1]) if resultado[1] else 0
-            
-            # Obtener productos vendidos en el rango
-            cursor.execute("""
-                SELECT SUM(pp.cantidad) as productos_vendidos
+                    COALESCE(SUM(pi.precio_unitario * pi.cantidad), 0) as ventas_totales,
+                    COUNT(DISTINCT p.id) as pedidos_totales,
+                    COALESCE(SUM(pi.cantidad), 0) as productos_vendidos
                 FROM pedidos p
-                JOIN pedido_producto pp ON p.id = pp.pedido_id
-                WHERE DATE(p.fecha_hora) BETWEEN %s AND %s
+                LEFT JOIN pedido_items pi ON pi.pedido_id = p.id
+                WHERE p.fecha_hora >= %s AND p.fecha_hora < %s
                 AND p.estado = 'Pagado'
-            """, (fecha_inicio, fecha_fin))
+            """, (desde, hasta))
             
-            resultado_productos = cursor.fetchone()
-            productos_vendidos = int(resultado_productos[0]) if resultado_productos[0] else 0
+            resultado = cursor.fetchone()
+            ventas_totales = float(resultado['ventas_totales'])
+            pedidos_totales = int(resultado['pedidos_totales'])
+            productos_vendidos = int(resultado['productos_vendidos'])
             
-            # Obtener productos más vendidos
+            # Obtener productos más vendidos (por el nombre guardado en la venta)
             cursor.execute("""
                 SELECT 
-                    pr.nombre,
-                    SUM(pp.cantidad) as cantidad
+                    pi.nombre,
+                    SUM(pi.cantidad) as cantidad
                 FROM pedidos p
-                JOIN pedido_producto pp ON p.id = pp.pedido_id
-                JOIN productos pr ON pp.producto_id = pr.id
-                WHERE DATE(p.fecha_hora) BETWEEN %s AND %s
+                JOIN pedido_items pi ON pi.pedido_id = p.id
+                WHERE p.fecha_hora >= %s AND p.fecha_hora < %s
                 AND p.estado = 'Pagado'
-                GROUP BY pr.id, pr.nombre
-                ORDER BY cantidad DESC
+                AND pi.nombre <> ''
+                GROUP BY pi.nombre
+                ORDER BY cantidad DESC, pi.nombre
                 LIMIT 10
-            """, (fecha_inicio, fecha_fin))
+            """, (desde, hasta))
             
             productos_mas_vendidos = [
-                {"nombre": row[0], "cantidad": int(row[1])}
+                {"nombre": row['nombre'], "cantidad": int(row['cantidad'])}
                 for row in cursor.fetchall()
             ]
             
@@ -1,17 +1,26 @@
 # === BACKEND_SERVICE.PY ===
 # Cliente HTTP para interactuar con la API del backend del sistema de restaurante.
 
+import json
 import requests
 import logging
-from typing import List, Dict, Any
+import copy
+import threading
+from typing import Callable, Iterator, List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 
+from http_sesion import sesion, cache_etag, TIMEOUT_SEGUNDOS
+
 # ←←← LOGS PROFESIONALES (la línea mágica) ←←←
 log = logging.getLogger("RestaurantIA")
 
 class BackendService:
     def __init__(self, base_url: str = "http://127.0.0.1:8000"):
         self.base_url = base_url.rstrip("/")
+        # Vista local de pedidos activos, mantenida con el feed de cambios del backend
+        self._pedidos_activos: Dict[int, Dict[str, Any]] = {}
+        self._cursor_pedidos = None
+        self._lock_pedidos = threading.Lock()
         log.info(f"BackendService inicializado → Conectando a: {self.base_url}")
 
     def _request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
@@ -25,10 +34,11 @@ class BackendService:
         log.debug(f"HTTP {method.upper()} → {url} | Params: {kwargs.get('params')} | Payload: {kwargs.get('json')}")
 
         try:
-            response = requests.request(method, url, timeout=15, **kwargs)
+            # Sesión compartida: reutiliza la conexión keep-alive y reintenta con backoff
+            response = sesion.request(method, url, timeout=TIMEOUT_SEGUNDOS, **kwargs)
             duration = (datetime.now() - start_time).total_seconds() * 1000
             
-            if response.status_code >= 200 and response.status_code < 300:
+            if response.status_code >= 200 and response.status_code < 300 or response.status_code == 304:
                 log.info(f"HTTP {method.upper()} ← {response.status_code} | {duration:.1f}ms | {endpoint}")
             else:
                 log.warning(f"HTTP {method.upper()} ← {response.status_code} | {duration:.1f}ms | {endpoint} | Respuesta: {response.text[:200]}")
@@ -37,7 +47,7 @@ class BackendService:
             return response
 
         except requests.exceptions.Timeout:
-            log.error(f"TIMEOUT → {method.upper()} {endpoint} | Más de 15 segundos sin respuesta")
+            log.error(f"TIMEOUT → {method.upper()} {endpoint} | Más de {TIMEOUT_SEGUNDOS} segundos sin respuesta")
             raise Exception("El servidor tardó demasiado en responder. Revisa si el backend está corriendo.")
         except requests.exceptions.ConnectionError:
             log.error(f"CONEXIÓN FALLIDA → No se pudo conectar a {self.base_url}")
@@ -53,11 +63,29 @@ class BackendService:
             log.error(f"ERROR DESCONOCIDO en petición → {endpoint}", exc_info=True)
             raise
 
+    def _get_condicional(self, endpoint: str) -> Any:
+        """GET con If-None-Match: si no cambió, el backend responde 304 y se usa la copia local."""
+        url = f"{self.base_url}{endpoint}"
+        response = self._request("get", endpoint, headers=cache_etag.cabeceras(url))
+        return cache_etag.resolver(url, response)
+
     # === TODOS LOS MÉTODOS AHORA SON LIMPIOS Y CON LOGS AUTOMÁTICOS ===
 
     def obtener_menu(self) -> List[Dict[str, Any]]:
-        response = self._request("get", "/menu/items")
-        return response.json()
+        return self._get_condicional("/menu/items")
+
+    def obtener_menu_si_cambio(self, version: Optional[int]) -> Tuple[Optional[int], Optional[List[Dict[str, Any]]]]:
+        """
+        (versión, menú) si el menú cambió desde `version`; (version, None) si el backend
+        contestó 304 porque el cliente ya tiene esa versión.
+        """
+        # Mismo formato que menu_cache.etag_version en el backend
+        cabeceras = {"If-None-Match": f'"menu-{version}"'} if version is not None else {}
+        response = self._request("get", "/menu/items", headers=cabeceras)
+        if response.status_code == 304:
+            return version, None
+        version_nueva = response.headers.get("X-Menu-Version")
+        return (int(version_nueva) if version_nueva else None), response.json()
 
     def crear_pedido(self, mesa_numero: int, items: List[Dict[str, Any]], estado: str = "Pendiente", notas: str = "") -> Dict[str, Any]:
         payload = {"mesa_numero": mesa_numero, "items": items, "estado": estado, "notas": notas}
@@ -68,10 +96,27 @@ class BackendService:
         return resultado
 
     def obtener_pedidos_activos(self) -> List[Dict[str, Any]]:
-        response = self._request("get", "/pedidos/activos")
-        datos = response.json()
-        log.debug(f"Pedidos activos recibidos → {len(datos)} en cocina")
-        return datos
+        """
+        Pide sólo los cambios desde la última llamada y los fusiona en la vista local.
+        Devuelve la lista completa (copia) ordenada como /pedidos/activos.
+        """
+        with self._lock_pedidos:
+            params = {"since": self._cursor_pedidos} if self._cursor_pedidos else None
+            datos = self._request("get", "/pedidos/activos/cambios", params=params).json()
+
+            if datos["completo"]:
+                self._pedidos_activos = {}
+            for pedido_id in datos["eliminados"]:
+                self._pedidos_activos.pop(pedido_id, None)
+            for pedido in datos["pedidos"]:
+                self._pedidos_activos[pedido["id"]] = pedido
+            self._cursor_pedidos = datos["cursor"]
+
+            pedidos = sorted(self._pedidos_activos.values(), key=lambda p: str(p.get("fecha_hora", "")), reverse=True)
+            pedidos = copy.deepcopy(pedidos)
+
+        log.debug(f"Pedidos activos → {len(pedidos)} en cocina | Delta: {len(datos['pedidos'])} cambiados, {len(datos['eliminados'])} cerrados{' (foto completa)' if datos['completo'] else ''}")
+        return pedidos
 
     def actualizar_estado_pedido(self, pedido_id: int, nuevo_estado: str) -> Dict[str, Any]:
         response = self._request("patch", f"/pedidos/{pedido_id}/estado", params={"estado": nuevo_estado})
@@ -110,8 +155,7 @@ class BackendService:
         return response.json()
 
     def obtener_clientes(self) -> List[Dict[str, Any]]:
-        response = self._request("get", "/clientes")
-        return response.json()
+        return self._get_condicional("/clientes")
 
     def agregar_cliente(self, nombre: str, domicilio: str, celular: str) -> Dict[str, Any]:
         payload = {"nombre": nombre, "domicilio": domicilio, "celular": celular}
@@ -124,12 +168,17 @@ class BackendService:
         log.warning(f"CLIENTE ELIMINADO → ID #{cliente_id}")
         return response.json()
 
-    def crear_respaldo(self) -> Dict[str, Any]:
-        log.warning("RESPALDO SOLICITADO DESDE LA APP → Iniciando backup de BD...")
-        response = self._request("post", "/backup")
-        resultado = response.json()
-        log.info(f"RESPALDO CREADO CON ÉXITO → {resultado['file_path']}")
-        return resultado
+    def crear_respaldo(self, modo: str = "pg_dump") -> Dict[str, Any]:
+        """Encola el respaldo en el backend; devuelve el trabajo para consultar su avance con obtener_respaldo."""
+        log.warning(f"RESPALDO SOLICITADO DESDE LA APP → Encolando backup de BD ({modo})...")
+        response = self._request("post", "/backup", params={"modo": modo})
+        trabajo = response.json()
+        log.info(f"RESPALDO ENCOLADO → Trabajo #{trabajo['id']} ({trabajo['estado']})")
+        return trabajo
+
+    def obtener_respaldo(self, respaldo_id: int) -> Dict[str, Any]:
+        response = self._request("get", f"/backup/{respaldo_id}")
+        return response.json()
 
     def obtener_reporte(self, tipo: str, fecha: datetime) -> Dict[str, Any]:
         # ... (tu lógica de fechas queda igual)
@@ -143,6 +192,59 @@ class BackendService:
         log.info(f"REPORTE GENERADO → {tipo} | {start_date} → {end_date}")
         return response.json()
 
+    def obtener_dashboard(
+        self, tipo: str, fecha: datetime,
+        al_recibir: Optional[Callable[[str, Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Tablero completo de reportes en una sola petición (GET /reportes/dashboard).
+        Con `al_recibir(seccion, resultado)` la respuesta llega en streaming y se avisa cada
+        sección apenas el backend la termina; resultado es {"datos": ...} o {"error": ...}.
+        Antes de las secciones llega ("periodo", {"datos": cabecera}) con el rango calculado.
+        Devuelve la cabecera del período con "secciones" y "errores" ya completos.
+        """
+        params = {"tipo": tipo, "fecha": fecha.strftime("%Y-%m-%d")}
+        if al_recibir is None:
+            return self._request("get", "/reportes/dashboard", params=params).json()
+
+        response = self._request("get", "/reportes/dashboard", params={**params, "progresivo": "true"}, stream=True)
+        tablero = {"secciones": {}, "errores": {}}
+        with response:
+            for linea in response.iter_lines():
+                if not linea:
+                    continue
+                mensaje = json.loads(linea)
+                if "seccion" in mensaje:
+                    nombre = mensaje.pop("seccion")
+                    if "error" in mensaje:
+                        tablero["errores"][nombre] = mensaje["error"]
+                    else:
+                        tablero["secciones"][nombre] = mensaje["datos"]
+                    al_recibir(nombre, mensaje)
+                elif mensaje.get("fin"):
+                    tablero["duracion_ms"] = mensaje["duracion_ms"]
+                else:
+                    tablero.update(mensaje)
+                    al_recibir("periodo", {"datos": mensaje})
+        log.info(f"TABLERO DE REPORTES RECIBIDO → {tipo} | {len(tablero['secciones'])} secciones | {len(tablero['errores'])} con error")
+        return tablero
+
+    def iterar_detalle_cocina(self, tipo: str, fecha: datetime) -> Iterator[Dict[str, Any]]:
+        """
+        Todos los pedidos de cocina del período (GET /reportes/eficiencia_cocina/detalle), de
+        a uno mientras llegan: id, fecha_hora, mesa_numero, hora_inicio_cocina,
+        hora_fin_cocina y minutos. Para exportar períodos largos sin cargarlos enteros.
+        """
+        params = {"tipo": tipo, "fecha": fecha.strftime("%Y-%m-%d")}
+        response = self._request("get", "/reportes/eficiencia_cocina/detalle", params=params, stream=True)
+        recibidos = 0
+        with response:
+            for linea in response.iter_lines():
+                if linea:
+                    recibidos += 1
+                    yield json.loads(linea)
+        log.info(f"DETALLE DE COCINA RECIBIDO → {tipo} | {recibidos} pedidos")
+
     def obtener_analisis_productos(self, start_date: str = None, end_date: str = None) -> Dict[str, Any]:
         params = {}
         if start_date: params["start_date"] = start_date
@@ -309,7 +411,7 @@ class BackendService:
                 "fecha_inicio": fecha_inicio,
                 "fecha_fin": fecha_fin
             }
-            response = requests.get(f"{self.base_url}/reportes/rango", params=params)
+            response = sesion.get(f"{self.base_url}/reportes/rango", params=params, timeout=TIMEOUT_SEGUNDOS)
             response.raise_for_status()
             return response.json()
         except Exception as e:
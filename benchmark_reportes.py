@@ -0,0 +1,162 @@
+# === BENCHMARK_REPORTES.PY ===
+# Compara las tres formas de calcular /reportes y /analisis/productos sobre un año
+# sintético de pedidos:
+#   1. la implementación anterior (traer cada documento items a Python y contar en dicts),
+#   2. la agregación JSONB en PostgreSQL (jsonb_array_elements + GROUP BY),
+#   3. el resumen pre-agregado por hora.
+# Los datos van en tablas TEMP con los mismos nombres (pedidos, resumen_ventas_*), que
+# tapan a las reales sólo en esta sesión: la base de datos no se modifica.
+#
+#   python benchmark_reportes.py [--pedidos-por-dia 300] [--repeticiones 3]
+
+import sys
+import json
+import time
+import argparse
+import logging
+from datetime import datetime
+
+import resumen_ventas
+
+log = logging.getLogger("RestaurantIA")
+
+ESTADOS_REPORTE = ('Listo', 'Entregado', 'Pagado')
+
+
+def crear_datos(conn, pedidos_por_dia: int) -> int:
+    """Año 2025 completo: pedidos de 1 a 6 items de un menú de 40 productos."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TEMP TABLE pedidos (
+                id SERIAL PRIMARY KEY,
+                items JSONB NOT NULL,
+                estado VARCHAR(50) NOT NULL,
+                fecha_hora TIMESTAMP NOT NULL
+            )
+        """)
+        cursor.execute("CREATE TEMP TABLE resumen_ventas_hora (LIKE public.resumen_ventas_hora INCLUDING ALL)")
+        cursor.execute("CREATE TEMP TABLE resumen_ventas_producto (LIKE public.resumen_ventas_producto INCLUDING ALL)")
+        cursor.execute("""
+            INSERT INTO pedidos (items, estado, fecha_hora)
+            SELECT (
+                       SELECT jsonb_agg(jsonb_build_object(
+                           'nombre', 'Producto ' || lpad(((n * 7 + k * 13 + d) %% 40)::text, 2, '0'),
+                           'precio', 20 + ((n * 7 + k * 13 + d) %% 40) * 2.5,
+                           'tipo', 'Plato',
+                           'cantidad', 1))
+                       FROM generate_series(0, n %% 6) AS k
+                   ),
+                   CASE WHEN n %% 20 = 0 THEN 'Listo' WHEN n %% 3 = 0 THEN 'Entregado' ELSE 'Pagado' END,
+                   DATE '2025-01-01' + d + make_interval(hours => 9 + n %% 13, mins => (n * 17) %% 60)
+            FROM generate_series(0, 364) AS d, generate_series(1, %s) AS n
+        """, (pedidos_por_dia,))
+        total = cursor.rowcount
+        cursor.execute("CREATE INDEX ON pedidos (fecha_hora)")
+        cursor.execute("ANALYZE pedidos")
+    conn.commit()
+    resumen_ventas.reconstruir(conn)
+    with conn.cursor() as cursor:
+        # autovacuum no analiza tablas TEMP
+        cursor.execute("ANALYZE resumen_ventas_hora")
+        cursor.execute("ANALYZE resumen_ventas_producto")
+    conn.commit()
+    return total
+
+
+# === IMPLEMENTACIONES A COMPARAR ===
+def reporte_python(cursor, desde, hasta):
+    """La versión anterior de /reportes, tal cual: todo el JSONB viaja y se cuenta en Python."""
+    cursor.execute("""
+        SELECT items, estado, fecha_hora
+        FROM pedidos
+        WHERE fecha_hora >= %s AND fecha_hora < %s
+        AND estado IN ('Listo', 'Entregado', 'Pagado')
+    """, (desde, hasta))
+    pedidos = cursor.fetchall()
+    ventas_totales = 0
+    productos_vendidos = 0
+    conteo = {}
+    for pedido in pedidos:
+        items = pedido['items']
+        if isinstance(items, str):
+            items = json.loads(items)
+        for item in items:
+            ventas_totales += item['precio']
+            productos_vendidos += 1
+            conteo[item['nombre']] = conteo.get(item['nombre'], 0) + 1
+    top = sorted(conteo.items(), key=lambda x: x[1], reverse=True)[:10]
+    return round(ventas_totales, 2), len(pedidos), productos_vendidos, top
+
+
+def reporte_sql(cursor, desde, hasta):
+    t = resumen_ventas.totales_desde_pedidos(cursor, ESTADOS_REPORTE, desde, hasta)
+    top = [(p['nombre'], p['cantidad']) for p in resumen_ventas.productos_desde_pedidos(cursor, ESTADOS_REPORTE, desde, hasta)[:10]]
+    return round(t['ingresos'], 2), t['pedidos'], t['unidades'], top
+
+
+def reporte_resumen(cursor, desde, hasta):
+    """Como /reportes hoy: lo cerrado del resumen, 'Listo' agregado en SQL."""
+    t = resumen_ventas.totales(cursor, desde, hasta)
+    conteo = {p['nombre']: p['cantidad'] for p in resumen_ventas.productos(cursor, desde, hasta)}
+    listo = resumen_ventas.totales_desde_pedidos(cursor, ('Listo',), desde, hasta)
+    for p in resumen_ventas.productos_desde_pedidos(cursor, ('Listo',), desde, hasta):
+        conteo[p['nombre']] = conteo.get(p['nombre'], 0) + p['cantidad']
+    top = sorted(conteo.items(), key=lambda x: (-x[1], x[0]))[:10]
+    return (round(t['ingresos'] + listo['ingresos'], 2), t['pedidos'] + listo['pedidos'],
+            t['unidades'] + listo['unidades'], top)
+
+
+def medir(funcion, cursor, desde, hasta, repeticiones: int):
+    mejor, resultado = None, None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(cursor, desde, hasta)
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor, resultado
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de agregación de reportes sobre un año sintético.")
+    parser.add_argument("--pedidos-por-dia", type=int, default=300)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    from db_pool import pool
+    conn = pool.obtener()
+    try:
+        inicio = time.perf_counter()
+        total = crear_datos(conn, args.pedidos_por_dia)
+        print(f"Datos sintéticos: {total:,} pedidos en 365 días ({time.perf_counter() - inicio:.1f}s)\n")
+
+        rangos = [
+            ("Un día", datetime(2025, 6, 15), datetime(2025, 6, 16)),
+            ("Un mes", datetime(2025, 6, 1), datetime(2025, 7, 1)),
+            ("Un año", datetime(2025, 1, 1), datetime(2026, 1, 1)),
+        ]
+        implementaciones = [("Python (anterior)", reporte_python), ("SQL JSONB", reporte_sql), ("Resumen por hora", reporte_resumen)]
+        codigo = 0
+        with conn.cursor() as cursor:
+            print(f"{'Rango':<8} {'Implementación':<20} {'Tiempo':>10} {'Aceleración':>12}")
+            for nombre_rango, desde, hasta in rangos:
+                base, esperado = None, None
+                for nombre, funcion in implementaciones:
+                    duracion, resultado = medir(funcion, cursor, desde, hasta, args.repeticiones)
+                    if base is None:
+                        base, esperado = duracion, resultado
+                    # Qué producto entra al top 10 entre empatados no está definido: se comparan las cantidades
+                    iguales = esperado[:3] == resultado[:3] and [c for _, c in esperado[3]] == [c for _, c in resultado[3]]
+                    if not iguales:
+                        codigo = 1
+                    print(f"{nombre_rango:<8} {nombre:<20} {duracion * 1000:>8.1f}ms {base / duracion:>11.1f}x"
+                          f"{'' if iguales else '  ¡RESULTADO DISTINTO!'}")
+        conn.rollback()
+        return codigo
+    finally:
+        pool.devolver(conn)
+        pool.cerrar()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s | %(levelname)s | %(message)s")
+    sys.exit(main())
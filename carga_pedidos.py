@@ -0,0 +1,114 @@
+# === CARGA_PEDIDOS.PY ===
+# Prueba de carga de los endpoints calientes: tablets de meseros que consultan mesas y
+# crean pedidos, y pantallas de cocina que leen los pedidos activos y los avanzan de
+# estado, todo en paralelo contra un backend ya levantado. Reporta latencias p50/p95/p99
+# por endpoint.
+#
+# Crea pedidos de verdad: usar una base de pruebas, no la del restaurante.
+#
+#   python carga_pedidos.py --url http://127.0.0.1:8000 --tablets 24 --cocinas 6 --segundos 30
+
+import sys
+import time
+import random
+import asyncio
+import argparse
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+
+SIGUIENTE_ESTADO = {"Pendiente": "En preparacion", "En preparacion": "Listo", "Listo": "Entregado"}
+
+
+class Registro:
+    def __init__(self):
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.errores: Dict[str, int] = defaultdict(int)
+        self.rechazos: Dict[str, int] = defaultdict(int)
+
+    async def medir(self, nombre: str, peticion):
+        inicio = time.perf_counter()
+        try:
+            respuesta = await peticion
+        except httpx.HTTPError:
+            self.errores[nombre] += 1
+            return None
+        self.latencias[nombre].append((time.perf_counter() - inicio) * 1000)
+        if respuesta.status_code >= 500:
+            self.errores[nombre] += 1
+            return None
+        if respuesta.status_code >= 400:
+            # Por ejemplo, stock insuficiente: respuesta válida del backend
+            self.rechazos[nombre] += 1
+            return None
+        return respuesta.json()
+
+
+async def tablet(cliente: httpx.AsyncClient, registro: Registro, menu: List[dict], mesas: List[int], fin: float, rnd: random.Random):
+    while time.monotonic() < fin:
+        await registro.medir("GET /mesas", cliente.get("/mesas"))
+        items = [{"nombre": m["nombre"], "precio": float(m["precio"])} for m in rnd.choices(menu, k=rnd.randint(1, 4))]
+        await registro.medir("POST /pedidos", cliente.post("/pedidos", json={
+            "mesa_numero": rnd.choice(mesas), "items": items, "estado": "Pendiente", "notas": "carga"
+        }))
+        await asyncio.sleep(rnd.uniform(0.05, 0.25))
+
+
+async def cocina(cliente: httpx.AsyncClient, registro: Registro, fin: float, rnd: random.Random):
+    while time.monotonic() < fin:
+        activos = await registro.medir("GET /pedidos/activos", cliente.get("/pedidos/activos"))
+        for pedido in rnd.sample(activos or [], min(3, len(activos or []))):
+            siguiente = SIGUIENTE_ESTADO.get(pedido["estado"])
+            if siguiente:
+                await registro.medir("PATCH /pedidos/{id}/estado", cliente.patch(
+                    f"/pedidos/{pedido['id']}/estado", params={"estado": siguiente}
+                ))
+        await asyncio.sleep(rnd.uniform(0.1, 0.3))
+
+
+def percentil(valores: List[float], p: float) -> float:
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else 0.0
+
+
+async def ejecutar(args) -> int:
+    limites = httpx.Limits(max_connections=args.tablets + args.cocinas, max_keepalive_connections=args.tablets + args.cocinas)
+    async with httpx.AsyncClient(base_url=args.url, timeout=30, limits=limites) as cliente:
+        menu = (await cliente.get("/menu/items")).json()
+        mesas = [m["numero"] for m in (await cliente.get("/mesas")).json() if not m.get("es_virtual")]
+        if not menu or not mesas:
+            print("La base de pruebas necesita menú y mesas cargados")
+            return 1
+
+        registro = Registro()
+        rnd = random.Random(args.semilla)
+        fin = time.monotonic() + args.segundos
+        inicio = time.perf_counter()
+        await asyncio.gather(
+            *(tablet(cliente, registro, menu, mesas, fin, random.Random(rnd.random())) for _ in range(args.tablets)),
+            *(cocina(cliente, registro, fin, random.Random(rnd.random())) for _ in range(args.cocinas)),
+        )
+        duracion = time.perf_counter() - inicio
+
+    print(f"\n{args.tablets} tablets + {args.cocinas} pantallas de cocina durante {duracion:.1f}s")
+    print(f"{'endpoint':<28}{'peticiones':>11}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'4xx':>6}{'error':>7}")
+    for nombre in ("POST /pedidos", "GET /mesas", "GET /pedidos/activos", "PATCH /pedidos/{id}/estado"):
+        valores = sorted(registro.latencias[nombre])
+        print(f"{nombre:<28}{len(valores):>11}{len(valores) / duracion:>8.1f}"
+              f"{percentil(valores, 0.50):>9.1f}{percentil(valores, 0.95):>9.1f}{percentil(valores, 0.99):>9.1f}"
+              f"{(valores[-1] if valores else 0):>9.1f}{registro.rechazos[nombre]:>6}{registro.errores[nombre]:>7}")
+    return 1 if sum(registro.errores.values()) else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Carga concurrente sobre los endpoints de pedidos y mesas")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--tablets", type=int, default=24)
+    parser.add_argument("--cocinas", type=int, default=6)
+    parser.add_argument("--segundos", type=float, default=30)
+    parser.add_argument("--semilla", type=int, default=16)
+    return asyncio.run(ejecutar(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
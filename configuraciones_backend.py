@@ -1,18 +1,10 @@
 from fastapi import FastAPI, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List
-import psycopg2
-from psycopg2.extras import RealDictCursor
 import json
 
-DATABASE_URL = "dbname=restaurant_db user=postgres password=postgres host=localhost port=5432"
-
-def get_db():
-    conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
-    try:
-        yield conn
-    finally:
-        conn.close()
+# Conexiones prestadas por el pool compartido (ver db_pool.py)
+from db_pool import get_db
 
 class IngredienteConfig(BaseModel):
     nombre: str
@@ -1,4 +1,6 @@
 # configuraciones_view.py
+import threading
+import time
 import flet as ft
 from typing import List, Dict, Any
 
@@ -238,21 +240,32 @@ def crear_vista_configuraciones(config_service, inventory_service, backend_servi
             print(f"Error al cargar configuraciones: {e}")
 
     # --- NUEVA FUNCIÓN: crear_respaldo_click ---
+    def mostrar_aviso(texto, color):
+        page.snack_bar = ft.SnackBar(ft.Text(texto), bgcolor=color)
+        page.snack_bar.open = True
+        page.update()
+
+    def esperar_respaldo(respaldo_id):
+        # El backend hace el respaldo en segundo plano: se consulta su estado hasta que termine
+        try:
+            while True:
+                time.sleep(2)
+                trabajo = backend_service.obtener_respaldo(respaldo_id)
+                if trabajo["estado"] == "completado":
+                    mostrar_aviso(f"Respaldo creado con éxito en: {trabajo.get('ruta', '')}", ft.Colors.GREEN_700)
+                    return
+                if trabajo["estado"] == "fallido":
+                    mostrar_aviso(f"Error al crear respaldo: {trabajo.get('mensaje', 'Error desconocido')}", ft.Colors.RED_700)
+                    return
+        except Exception as ex:
+            print(f"Error al consultar respaldo: {ex}")
+            mostrar_aviso(f"Error crítico al conectar: {ex}", ft.Colors.RED_700)
+
     def crear_respaldo_click(e):
         try:
-            # Mostrar indicador de carga (opcional, o deshabilitar botón)
-            
-            respuesta = backend_service.crear_respaldo()
-            
-            if respuesta.get("status") == "ok":
-                ruta = respuesta.get("file_path", "")
-                page.snack_bar = ft.SnackBar(ft.Text(f"Respaldo creado con éxito en: {ruta}"), bgcolor=ft.Colors.GREEN_700)
-            else:
-                detalle = respuesta.get("message", "Error desconocido")
-                page.snack_bar = ft.SnackBar(ft.Text(f"Error al crear respaldo: {detalle}"), bgcolor=ft.Colors.RED_700)
-            
-            page.snack_bar.open = True
-            page.update()
+            trabajo = backend_service.crear_respaldo()
+            mostrar_aviso(f"Respaldo #{trabajo['id']} en curso... ({trabajo['progreso']:.0f}%)", ft.Colors.BLUE_700)
+            threading.Thread(target=esperar_respaldo, args=(trabajo["id"],), daemon=True).start()
         except Exception as ex:
             print(f"Error al crear respaldo: {ex}")
             page.snack_bar = ft.SnackBar(ft.Text(f"Error crítico al conectar: {ex}"), bgcolor=ft.Colors.RED_700)
@@ -0,0 +1,159 @@
+# === DB_ASYNC.PY ===
+# Pool asyncpg para los endpoints calientes (crear pedido, pedidos activos, cambio de
+# estado y mesas). Corren como `async def` en el event loop sin ocupar hilos del
+# threadpool de Starlette; el resto del backend sigue con el pool psycopg2 de db_pool.py.
+#
+# Diferencias con psycopg2 a tener en cuenta al escribir SQL para este pool:
+#   - Los parámetros son $1, $2... (no %s) y los timestamps se pasan como datetime.
+#   - Sin transacción explícita (`async with conn.transaction()`) cada sentencia hace commit sola.
+#   - Las filas son asyncpg.Record: se leen con fila['columna'] igual que con RealDictCursor.
+
+import os
+import json
+import asyncio
+import time
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import asyncpg
+import psycopg2.extensions
+from fastapi import HTTPException
+
+from db_pool import DATABASE_URL, PoolAgotadoError
+
+log = logging.getLogger("RestaurantIA")
+
+POOL_ASYNC_MIN = int(os.environ.get("DB_POOL_ASYNC_MIN", "2"))
+POOL_ASYNC_MAX = int(os.environ.get("DB_POOL_ASYNC_MAX", "10"))
+POOL_ASYNC_TIMEOUT_SEGUNDOS = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+
+# DSN libpq (el de DATABASE_URL) → argumentos de asyncpg.connect
+_CLAVES_ASYNCPG = {"dbname": "database", "user": "user", "password": "password", "host": "host", "port": "port"}
+
+
+def parametros_conexion(dsn: str) -> Dict[str, Any]:
+    parametros = {}
+    for clave, valor in psycopg2.extensions.parse_dsn(dsn).items():
+        if clave in _CLAVES_ASYNCPG:
+            parametros[_CLAVES_ASYNCPG[clave]] = int(valor) if clave == "port" else valor
+        else:
+            log.warning(f"Pool BD async → parámetro '{clave}' del DSN no soportado por asyncpg, se ignora")
+    return parametros
+
+
+async def _inicializar_conexion(conn: asyncpg.Connection) -> None:
+    # JSON/JSONB como objetos Python, igual que los devuelve psycopg2
+    for tipo in ("json", "jsonb"):
+        await conn.set_type_codec(tipo, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+
+class PoolAsync:
+    def __init__(self, dsn: str, minimo: int, maximo: int, timeout: float):
+        if minimo < 0 or maximo < 1 or minimo > maximo:
+            raise ValueError(f"Tamaño de pool async inválido: min={minimo} max={maximo}")
+        self.dsn = dsn
+        self.minimo = minimo
+        self.maximo = maximo
+        self.timeout = timeout
+        self._pool: Optional[asyncpg.Pool] = None
+        self._abriendo: Optional[asyncio.Lock] = None
+
+        # --- Métricas (mismos nombres que PoolConexiones.metricas) ---
+        self._esperas_ms = deque(maxlen=1000)
+        self._prestamos = 0
+        self._espera_total_ms = 0.0
+        self._espera_max_ms = 0.0
+        self._prestamos_con_espera = 0
+        self._timeouts = 0
+        self._en_uso = 0
+        self._max_en_uso = 0
+
+    async def abrir(self) -> None:
+        self._pool = await asyncpg.create_pool(
+            min_size=self.minimo, max_size=self.maximo, init=_inicializar_conexion,
+            **parametros_conexion(self.dsn)
+        )
+        log.info(f"Pool BD async abierto → min={self.minimo} max={self.maximo}")
+
+    async def cerrar(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+            log.info("Pool BD async cerrado")
+
+    @asynccontextmanager
+    async def conexion(self) -> AsyncIterator[asyncpg.Connection]:
+        """Presta una conexión; al devolverla asyncpg deshace cualquier transacción abierta."""
+        if self._pool is None:
+            # El arranque no pudo abrirlo (BD caída): se reintenta aquí, una sola corrutina a la vez
+            if self._abriendo is None:
+                self._abriendo = asyncio.Lock()
+            async with self._abriendo:
+                if self._pool is None:
+                    try:
+                        await self.abrir()
+                    except (OSError, asyncpg.PostgresError) as e:
+                        raise PoolAgotadoError(f"No se pudo abrir el pool async: {e}")
+        inicio = time.monotonic()
+        try:
+            conn = await self._pool.acquire(timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            log.error(f"Pool BD async AGOTADO → {self.maximo} conexiones en uso tras {self.timeout:.1f}s de espera")
+            raise PoolAgotadoError(f"Sin conexiones libres tras {self.timeout:.1f}s")
+
+        espera_ms = (time.monotonic() - inicio) * 1000
+        self._prestamos += 1
+        self._espera_total_ms += espera_ms
+        self._espera_max_ms = max(self._espera_max_ms, espera_ms)
+        self._esperas_ms.append(espera_ms)
+        if espera_ms >= 1:
+            self._prestamos_con_espera += 1
+        self._en_uso += 1
+        self._max_en_uso = max(self._max_en_uso, self._en_uso)
+        try:
+            yield conn
+        finally:
+            self._en_uso -= 1
+            await self._pool.release(conn)
+
+    # === MÉTRICAS ===
+    def metricas(self) -> Dict[str, Any]:
+        esperas = sorted(self._esperas_ms)
+
+        def percentil(p: float) -> float:
+            if not esperas:
+                return 0.0
+            return round(esperas[min(len(esperas) - 1, int(len(esperas) * p))], 2)
+
+        abiertas = self._pool.get_size() if self._pool is not None else 0
+        return {
+            "min": self.minimo,
+            "max": self.maximo,
+            "en_uso": self._en_uso,
+            "ociosas": self._pool.get_idle_size() if self._pool is not None else 0,
+            "abiertas": abiertas,
+            "saturacion": round(self._en_uso / self.maximo, 3),
+            "saturacion_maxima": round(self._max_en_uso / self.maximo, 3),
+            "prestamos": self._prestamos,
+            "prestamos_con_espera": self._prestamos_con_espera,
+            "timeouts": self._timeouts,
+            "espera_promedio_ms": round(self._espera_total_ms / self._prestamos, 2) if self._prestamos else 0.0,
+            "espera_p50_ms": percentil(0.50),
+            "espera_p95_ms": percentil(0.95),
+            "espera_max_ms": round(self._espera_max_ms, 2),
+        }
+
+
+pool_async = PoolAsync(DATABASE_URL, POOL_ASYNC_MIN, POOL_ASYNC_MAX, POOL_ASYNC_TIMEOUT_SEGUNDOS)
+
+
+async def get_db_async():
+    """Dependency de FastAPI: presta una conexión del pool async."""
+    try:
+        async with pool_async.conexion() as conn:
+            yield conn
+    except PoolAgotadoError as e:
+        raise HTTPException(status_code=503, detail=f"Base de datos saturada: {e}")
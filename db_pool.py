@@ -0,0 +1,276 @@
+# === DB_POOL.PY ===
+# Pool de conexiones PostgreSQL compartido por backend.py y las sub-apps montadas
+# (inventario, configuraciones, recetas).
+
+import os
+import threading
+import time
+import weakref
+import logging
+from collections import deque
+from typing import Dict, Any
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.extras import RealDictCursor
+from fastapi import HTTPException
+
+log = logging.getLogger("RestaurantIA")
+
+# Configuración directa de PostgreSQL (se puede sobreescribir por variables de entorno)
+DATABASE_URL = os.environ.get(
+    "DATABASE_URL",
+    "dbname=restaurant_db user=postgres password=postgres host=localhost port=5432"
+)
+POOL_MIN = int(os.environ.get("DB_POOL_MIN", "2"))
+POOL_MAX = int(os.environ.get("DB_POOL_MAX", "10"))
+POOL_TIMEOUT_SEGUNDOS = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+# Una conexión que lleva más de este tiempo ociosa se verifica con SELECT 1 al prestarse (0 = siempre)
+POOL_PING_OCIOSA_SEGUNDOS = float(os.environ.get("DB_POOL_PING_OCIOSA", "30"))
+
+
+class ConexionRastreada(psycopg2.extensions.connection):
+    """
+    Conexión que recuerda los cursores que abrió, para poder cerrarlos
+    cuando la conexión vuelve al pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cursores = weakref.WeakSet()
+        self._ultimo_uso = time.monotonic()
+
+    def cursor(self, *args, **kwargs):
+        cur = super().cursor(*args, **kwargs)
+        self._cursores.add(cur)
+        return cur
+
+    def cerrar_cursores(self) -> int:
+        cerrados = 0
+        for cur in list(self._cursores):
+            if not cur.closed:
+                cur.close()
+                cerrados += 1
+        self._cursores = weakref.WeakSet()
+        return cerrados
+
+
+class PoolAgotadoError(Exception):
+    """No se obtuvo una conexión libre dentro del tiempo de espera."""
+
+
+class PoolConexiones:
+    def __init__(self, dsn: str, minimo: int, maximo: int, timeout: float, ping_ociosa: float):
+        if minimo < 0 or maximo < 1 or minimo > maximo:
+            raise ValueError(f"Tamaño de pool inválido: min={minimo} max={maximo}")
+        self.dsn = dsn
+        self.minimo = minimo
+        self.maximo = maximo
+        self.timeout = timeout
+        self.ping_ociosa = ping_ociosa
+
+        self._lock = threading.Condition()
+        self._libres = deque()
+        self._en_uso = set()
+        self._abriendo = 0
+        self._cerrado = False
+
+        # --- Métricas ---
+        self._esperas_ms = deque(maxlen=1000)
+        self._prestamos = 0
+        self._espera_total_ms = 0.0
+        self._espera_max_ms = 0.0
+        self._prestamos_con_espera = 0
+        self._timeouts = 0
+        self._conexiones_creadas = 0
+        self._conexiones_descartadas = 0
+        self._fallos_salud = 0
+        self._max_en_uso = 0
+
+    # === CREACIÓN / DESCARTE ===
+    def _crear_conexion(self) -> ConexionRastreada:
+        conn = psycopg2.connect(self.dsn, connection_factory=ConexionRastreada, cursor_factory=RealDictCursor)
+        with self._lock:
+            self._conexiones_creadas += 1
+        log.debug("Pool BD → Nueva conexión física abierta")
+        return conn
+
+    def _descartar(self, conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._conexiones_descartadas += 1
+            self._lock.notify()
+
+    def abrir(self) -> None:
+        """Precalienta el pool con el mínimo de conexiones configurado."""
+        with self._lock:
+            self._cerrado = False
+            faltantes = max(0, self.minimo - len(self._libres) - len(self._en_uso) - self._abriendo)
+            self._abriendo += faltantes
+        for _ in range(faltantes):
+            try:
+                conn = self._crear_conexion()
+            except Exception:
+                with self._lock:
+                    self._abriendo -= 1
+                raise
+            with self._lock:
+                self._abriendo -= 1
+                self._libres.append(conn)
+                self._lock.notify()
+        log.info(f"Pool BD listo → min={self.minimo} max={self.maximo} | {len(self._libres)} conexiones ociosas")
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._cerrado = True
+            libres = list(self._libres)
+            self._libres.clear()
+            self._lock.notify_all()
+        for conn in libres:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        log.info(f"Pool BD cerrado → {len(libres)} conexiones ociosas liberadas")
+
+    # === VERIFICACIÓN DE SALUD ===
+    def _esta_sana(self, conn) -> bool:
+        if conn.closed:
+            return False
+        ociosa = time.monotonic() - conn._ultimo_uso
+        if ociosa < self.ping_ociosa:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception as e:
+            log.warning(f"Pool BD → Conexión ociosa {ociosa:.0f}s no respondió, se descarta: {e}")
+            return False
+
+    # === PRÉSTAMO / DEVOLUCIÓN ===
+    def obtener(self) -> ConexionRastreada:
+        inicio = time.monotonic()
+        limite = inicio + self.timeout
+        while True:
+            crear = False
+            conn = None
+            with self._lock:
+                while True:
+                    if self._cerrado:
+                        raise PoolAgotadoError("El pool de conexiones está cerrado")
+                    if self._libres:
+                        conn = self._libres.pop()
+                        self._en_uso.add(conn)
+                        break
+                    if len(self._en_uso) + self._abriendo < self.maximo:
+                        self._abriendo += 1
+                        crear = True
+                        break
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._timeouts += 1
+                        log.error(f"Pool BD AGOTADO → {self.maximo} conexiones en uso tras {self.timeout:.1f}s de espera")
+                        raise PoolAgotadoError(f"Sin conexiones libres tras {self.timeout:.1f}s")
+                    self._lock.wait(restante)
+
+            if crear:
+                try:
+                    conn = self._crear_conexion()
+                except Exception:
+                    with self._lock:
+                        self._abriendo -= 1
+                        self._lock.notify()
+                    raise
+            elif not self._esta_sana(conn):
+                with self._lock:
+                    self._en_uso.discard(conn)
+                    self._fallos_salud += 1
+                self._descartar(conn)
+                continue
+
+            espera_ms = (time.monotonic() - inicio) * 1000
+            with self._lock:
+                if crear:
+                    self._abriendo -= 1
+                self._en_uso.add(conn)
+                self._max_en_uso = max(self._max_en_uso, len(self._en_uso))
+                self._prestamos += 1
+                self._espera_total_ms += espera_ms
+                self._espera_max_ms = max(self._espera_max_ms, espera_ms)
+                self._esperas_ms.append(espera_ms)
+                if espera_ms >= 1:
+                    self._prestamos_con_espera += 1
+            return conn
+
+    def devolver(self, conn) -> None:
+        # Reset: cerrar cursores olvidados y deshacer cualquier transacción abierta
+        sana = not conn.closed
+        if sana:
+            try:
+                conn.cerrar_cursores()
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                conn._ultimo_uso = time.monotonic()
+            except Exception as e:
+                log.warning(f"Pool BD → Falló el reset de la conexión, se descarta: {e}")
+                sana = False
+
+        with self._lock:
+            self._en_uso.discard(conn)
+            if sana and not self._cerrado:
+                self._libres.append(conn)
+                self._lock.notify()
+                return
+        self._descartar(conn)
+
+    # === MÉTRICAS ===
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            esperas = sorted(self._esperas_ms)
+            en_uso = len(self._en_uso)
+            libres = len(self._libres)
+
+            def percentil(p: float) -> float:
+                if not esperas:
+                    return 0.0
+                return round(esperas[min(len(esperas) - 1, int(len(esperas) * p))], 2)
+
+            return {
+                "min": self.minimo,
+                "max": self.maximo,
+                "en_uso": en_uso,
+                "ociosas": libres,
+                "abiertas": en_uso + libres,
+                "saturacion": round(en_uso / self.maximo, 3),
+                "saturacion_maxima": round(self._max_en_uso / self.maximo, 3),
+                "prestamos": self._prestamos,
+                "prestamos_con_espera": self._prestamos_con_espera,
+                "timeouts": self._timeouts,
+                "espera_promedio_ms": round(self._espera_total_ms / self._prestamos, 2) if self._prestamos else 0.0,
+                "espera_p50_ms": percentil(0.50),
+                "espera_p95_ms": percentil(0.95),
+                "espera_max_ms": round(self._espera_max_ms, 2),
+                "conexiones_creadas": self._conexiones_creadas,
+                "conexiones_descartadas": self._conexiones_descartadas,
+                "fallos_salud": self._fallos_salud,
+            }
+
+
+pool = PoolConexiones(DATABASE_URL, POOL_MIN, POOL_MAX, POOL_TIMEOUT_SEGUNDOS, POOL_PING_OCIOSA_SEGUNDOS)
+
+
+def get_db():
+    """Dependency de FastAPI: presta una conexión del pool y la devuelve reseteada."""
+    try:
+        conn = pool.obtener()
+    except PoolAgotadoError as e:
+        raise HTTPException(status_code=503, detail=f"Base de datos saturada: {e}")
+    try:
+        yield conn
+    finally:
+        pool.devolver(conn)
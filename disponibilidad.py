@@ -0,0 +1,146 @@
+# === DISPONIBILIDAD.PY ===
+# Motor de disponibilidad de mesas para reservas. Cada reserva guarda su intervalo como
+# rango (`reservas.periodo`, migración 005) con índice GiST, y la restricción
+# reservas_sin_solape impide en la base que una mesa quede reservada dos veces a la vez.
+#
+# Una sola consulta responde toda una ventana (por ejemplo la noche de un sábado): genera
+# las franjas de inicio posibles y lee una vez las reservas que tocan la ventana.
+#   mesas_libres → por franja, las mesas libres con capacidad suficiente ordenadas de mejor
+#                  a peor ajuste (la más chica que alcanza primero).
+#   grilla       → matriz mesa × franja de un día para la vista de reservas.
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from mesas_estado import ESTADOS_OCUPADA, MESA_VIRTUAL
+
+log = logging.getLogger("RestaurantIA")
+
+# Duración de una reserva sin hora de fin (igual que POST /reservas/)
+DURACION_DEFECTO = timedelta(hours=1)
+# Tope de franjas por consulta: un día entero a 5 minutos
+MAX_FRANJAS = 288
+
+# Franjas de la ventana y lo que ya ocupa mesas en ella (común a las dos consultas)
+_CTE_VENTANA = f"""
+    WITH franjas AS (
+        SELECT inicio, inicio + %(duracion)s AS fin
+        FROM generate_series(%(desde)s::timestamp, %(ultimo_inicio)s::timestamp, %(paso)s) AS inicio
+    ),
+    reservadas AS MATERIALIZED (
+        -- Una sola pasada por el índice GiST: las reservas que tocan la ventana completa
+        SELECT mesa_numero, periodo FROM reservas
+        WHERE periodo && tsrange(%(desde)s, %(hasta)s, '[)')
+    ),
+    ocupadas AS MATERIALIZED (
+        -- Los pedidos en curso sólo cuentan para franjas cercanas a ahora
+        SELECT DISTINCT mesa_numero FROM pedidos
+        WHERE %(cerca_de_ahora)s
+          AND mesa_numero IS NOT NULL
+          AND estado IN ({', '.join(f"'{e}'" for e in ESTADOS_OCUPADA)})
+    )
+"""
+
+# La mesa m está libre durante la franja f
+_MESA_LIBRE = """
+    NOT EXISTS (
+        SELECT 1 FROM reservadas r
+        WHERE r.mesa_numero = m.numero AND r.periodo && tsrange(f.inicio, f.fin, '[)')
+    )
+    AND NOT (
+        tsrange(f.inicio, f.fin, '[)') && tsrange(%(ahora)s, %(ahora_fin)s, '[)')
+        AND m.numero IN (SELECT mesa_numero FROM ocupadas)
+    )
+"""
+
+SQL_MESAS_LIBRES = _CTE_VENTANA + f"""
+    SELECT f.inicio, f.fin, m.numero, m.capacidad
+    FROM franjas f
+    LEFT JOIN mesas m
+        ON m.numero != {MESA_VIRTUAL}
+       AND m.capacidad >= %(personas)s
+       AND {_MESA_LIBRE}
+    ORDER BY f.inicio, m.capacidad, m.numero
+"""
+
+# Una fila por mesa con un booleano por franja, en el orden de las franjas
+SQL_GRILLA = _CTE_VENTANA + f"""
+    SELECT m.numero, m.capacidad, array_agg(({_MESA_LIBRE}) ORDER BY f.inicio) AS libre
+    FROM mesas m
+    CROSS JOIN franjas f
+    WHERE m.numero != {MESA_VIRTUAL}
+    GROUP BY m.numero, m.capacidad
+    ORDER BY m.numero
+"""
+
+
+def _validar_ventana(desde: datetime, hasta: datetime, duracion: timedelta, paso: timedelta) -> int:
+    """Cantidad de franjas de la ventana; ValueError si la consulta no tiene sentido o es enorme."""
+    if duracion <= timedelta(0) or paso <= timedelta(0):
+        raise ValueError("La duración y el paso deben ser positivos.")
+    if hasta - desde < duracion:
+        raise ValueError("La ventana debe ser al menos tan larga como la duración de la reserva.")
+    cantidad = (hasta - desde - duracion) // paso + 1
+    if cantidad > MAX_FRANJAS:
+        raise ValueError(f"Demasiadas franjas ({cantidad}); el máximo por consulta es {MAX_FRANJAS}.")
+    return cantidad
+
+
+def _parametros(desde: datetime, hasta: datetime, duracion: timedelta, paso: timedelta) -> Dict[str, Any]:
+    ahora = datetime.now()
+    ahora_fin = ahora + DURACION_DEFECTO
+    return {
+        "desde": desde,
+        "hasta": hasta,
+        "ultimo_inicio": hasta - duracion,
+        "duracion": duracion,
+        "paso": paso,
+        "ahora": ahora,
+        "ahora_fin": ahora_fin,
+        "cerca_de_ahora": desde < ahora_fin and hasta > ahora,
+    }
+
+
+def mesas_libres(
+    cursor,
+    desde: datetime,
+    hasta: datetime,
+    personas: int = 1,
+    duracion: timedelta = DURACION_DEFECTO,
+    paso: Optional[timedelta] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Franjas [inicio, inicio + duracion) que caben en [desde, hasta), una cada `paso` (por
+    defecto una sola, en `desde`), cada una con sus mesas libres para `personas`, de mejor a
+    peor ajuste. Una mesa está libre si ninguna reserva se solapa con la franja y, si la
+    franja está a menos de DURACION_DEFECTO de ahora, si además no tiene un pedido en curso.
+    """
+    paso = paso or duracion
+    _validar_ventana(desde, hasta, duracion, paso)
+    cursor.execute(SQL_MESAS_LIBRES, {**_parametros(desde, hasta, duracion, paso), "personas": personas})
+
+    franjas: List[Dict[str, Any]] = []
+    for fila in cursor.fetchall():
+        if not franjas or franjas[-1]["inicio"] != str(fila['inicio']):
+            franjas.append({"inicio": str(fila['inicio']), "fin": str(fila['fin']), "mesas": []})
+        if fila['numero'] is not None:
+            franjas[-1]["mesas"].append({"numero": fila['numero'], "capacidad": fila['capacidad']})
+    return franjas
+
+
+def grilla(cursor, desde: datetime, hasta: datetime, paso: timedelta) -> Dict[str, Any]:
+    """
+    Matriz de disponibilidad de [desde, hasta) en franjas contiguas de `paso`: la lista de
+    inicios de franja y, por mesa, un booleano por franja (True = libre, con el mismo
+    criterio que mesas_libres).
+    """
+    cantidad = _validar_ventana(desde, hasta, paso, paso)
+    cursor.execute(SQL_GRILLA, _parametros(desde, hasta, paso, paso))
+    return {
+        "franjas": [str(desde + paso * i) for i in range(cantidad)],
+        "mesas": [
+            {"numero": fila['numero'], "capacidad": fila['capacidad'], "libre": fila['libre']}
+            for fila in cursor.fetchall()
+        ],
+    }
@@ -0,0 +1,44 @@
+# === ETAG_RESPUESTAS.PY ===
+# GET condicionales para los endpoints de lectura (menú, inventario, recetas, clientes).
+# El ETag es el hash del JSON de la respuesta; si el cliente manda el mismo en
+# If-None-Match se contesta 304 sin cuerpo y el cliente reutiliza lo que ya tiene.
+
+import json
+import hashlib
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import parse_obj_as
+
+
+def _etag_coincide(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidatos = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidatos or etag in candidatos or f"W/{etag}" in candidatos
+
+
+def serializar(datos: Any, modelo: Any = None) -> bytes:
+    """JSON compacto de `datos`, validados con el response_model `modelo` igual que haría FastAPI."""
+    if modelo is not None:
+        datos = parse_obj_as(modelo, datos)
+    return json.dumps(jsonable_encoder(datos), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def responder(request: Request, cuerpo: bytes, etag: str, cabeceras: Optional[Dict[str, str]] = None) -> Response:
+    """Responde `cuerpo` ya serializado, o 304 si `etag` coincide con el If-None-Match del cliente."""
+    # no-cache: el cliente puede guardar la respuesta pero debe revalidarla en cada uso
+    cabeceras = {**(cabeceras or {}), "ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_coincide(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=cabeceras)
+    return Response(content=cuerpo, media_type="application/json", headers=cabeceras)
+
+
+def respuesta_con_etag(request: Request, datos: Any, modelo: Any = None) -> Response:
+    """
+    Serializa `datos` y responde 304 si el ETag (hash del cuerpo) coincide con el
+    If-None-Match del cliente.
+    """
+    cuerpo = serializar(datos, modelo)
+    return responder(request, cuerpo, f'"{hashlib.blake2b(cuerpo, digest_size=16).hexdigest()}"')
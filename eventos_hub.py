@@ -0,0 +1,199 @@
+# === EVENTOS_HUB.PY ===
+# Canal de eventos en tiempo real (WebSocket /ws/eventos) para los clientes Flet.
+# Los endpoints publican con publicar_evento() dentro de su transacción: el evento viaja
+# por NOTIFY de PostgreSQL, así que sólo sale si la transacción hace commit y llega a
+# los clientes conectados a CUALQUIER worker de uvicorn (cada worker escucha con LISTEN).
+
+import asyncio
+import json
+import select
+import threading
+import logging
+from datetime import datetime, date
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+
+import psycopg2
+import psycopg2.extensions
+from fastapi import WebSocket, WebSocketDisconnect
+
+from db_pool import DATABASE_URL
+
+log = logging.getLogger("RestaurantIA")
+
+CANAL_EVENTOS = "restaurantia_eventos"
+# NOTIFY admite hasta 8000 bytes; los eventos llevan sólo ids y estados, no el pedido completo
+MAX_BYTES_EVENTO = 7900
+# Un cliente que acumula más eventos sin leer se desconecta (al reconectar se resincroniza)
+MAX_EVENTOS_PENDIENTES = 500
+ESPERA_RECONEXION_SEGUNDOS = 2
+
+
+def _serializar(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo no serializable en evento: {type(valor).__name__}")
+
+
+def _payload_evento(tipo: str, data: Dict[str, Any]) -> Optional[str]:
+    payload = json.dumps({"tipo": tipo, "data": data}, default=_serializar, ensure_ascii=False)
+    if len(payload.encode("utf-8")) > MAX_BYTES_EVENTO:
+        log.error(f"Evento '{tipo}' demasiado grande para NOTIFY ({len(payload)} bytes) → no se publica")
+        return None
+    return payload
+
+
+def publicar_evento(cursor, tipo: str, data: Dict[str, Any]) -> None:
+    """
+    Encola un evento en la transacción del cursor. Se entrega al hacer commit
+    y se descarta si hay rollback.
+    """
+    payload = _payload_evento(tipo, data)
+    if payload is None:
+        return
+    cursor.execute("SELECT pg_notify(%s, %s)", (CANAL_EVENTOS, payload))
+    log.debug(f"Evento encolado → {tipo} | {data}")
+
+
+async def publicar_evento_async(conn, tipo: str, data: Dict[str, Any]) -> None:
+    """publicar_evento para una conexión asyncpg (db_async.py), dentro de su transacción."""
+    payload = _payload_evento(tipo, data)
+    if payload is None:
+        return
+    await conn.execute("SELECT pg_notify($1, $2)", CANAL_EVENTOS, payload)
+    log.debug(f"Evento encolado → {tipo} | {data}")
+
+
+class HubEventos:
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._clientes: Dict[WebSocket, asyncio.Queue] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+        # Oyentes del propio servidor por tipo de evento (p. ej. invalidar cachés en cada worker)
+        self._oyentes: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+        # --- Métricas ---
+        self._eventos_recibidos = 0
+        self._eventos_enviados = 0
+        self._clientes_lentos = 0
+
+    # === ESCUCHA (LISTEN) EN HILO PROPIO ===
+    def iniciar(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._escuchar, name="hub-eventos", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=3)
+        log.info("Hub de eventos detenido")
+
+    def _escuchar(self) -> None:
+        while not self._detener.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CANAL_EVENTOS}")
+                log.info(f"Hub de eventos escuchando → canal '{CANAL_EVENTOS}'")
+                self._avisar_conexion(True)
+                while not self._detener.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notificacion = conn.notifies.pop(0)
+                        self._loop.call_soon_threadsafe(self._repartir, notificacion.payload)
+            except Exception as e:
+                log.error(f"Hub de eventos → se perdió la escucha de PostgreSQL: {e}")
+                self._avisar_conexion(False)
+                self._detener.wait(ESPERA_RECONEXION_SEGUNDOS)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def al_recibir(self, tipo: str, oyente: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Registra `oyente(data)` para los eventos `tipo` publicados por cualquier worker.
+        Corre en el event loop, así que debe ser rápido y no bloquear.
+        """
+        self._oyentes.setdefault(tipo, []).append(oyente)
+
+    def _avisar_conexion(self, conectado: bool) -> None:
+        """Los oyentes del servidor reciben `conectado`/`desconectado` como los clientes reciben `conectado`."""
+        tipo = "conectado" if conectado else "desconectado"
+        self._loop.call_soon_threadsafe(self._avisar_oyentes, json.dumps({"tipo": tipo, "data": {}}))
+
+    def _avisar_oyentes(self, payload: str) -> None:
+        try:
+            evento = json.loads(payload)
+        except ValueError:
+            return
+        for oyente in self._oyentes.get(evento.get("tipo"), []):
+            try:
+                oyente(evento.get("data") or {})
+            except Exception as e:
+                log.error(f"Hub de eventos → falló un oyente de '{evento.get('tipo')}': {e}")
+
+    def _repartir(self, payload: str) -> None:
+        """Corre en el event loop: avisa a los oyentes del servidor y copia el evento a la cola de cada cliente."""
+        self._eventos_recibidos += 1
+        if self._oyentes:
+            self._avisar_oyentes(payload)
+        for websocket, cola in list(self._clientes.items()):
+            try:
+                cola.put_nowait(payload)
+            except asyncio.QueueFull:
+                self._clientes_lentos += 1
+                log.warning("Hub de eventos → cliente lento, se desconecta para que se resincronice")
+                self._clientes.pop(websocket, None)
+                asyncio.ensure_future(websocket.close(code=1013))
+
+    # === CLIENTES ===
+    async def atender(self, websocket: WebSocket) -> None:
+        await websocket.accept()
+        cola: asyncio.Queue = asyncio.Queue(maxsize=MAX_EVENTOS_PENDIENTES)
+        self._clientes[websocket] = cola
+        log.info(f"Cliente de eventos conectado → {websocket.client} | Total: {len(self._clientes)}")
+
+        async def enviar():
+            # El primer mensaje avisa al cliente que debe resincronizar lo que se perdió
+            await websocket.send_text(json.dumps({"tipo": "conectado", "data": {}}))
+            while True:
+                payload = await cola.get()
+                await websocket.send_text(payload)
+                self._eventos_enviados += 1
+
+        envio = asyncio.ensure_future(enviar())
+        try:
+            # El cliente no manda nada; recibir sólo sirve para detectar la desconexión
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        except RuntimeError:
+            # El hub cerró el socket (cliente lento) mientras se esperaba un mensaje
+            pass
+        finally:
+            envio.cancel()
+            self._clientes.pop(websocket, None)
+            log.info(f"Cliente de eventos desconectado → {websocket.client} | Quedan: {len(self._clientes)}")
+
+    # === MÉTRICAS ===
+    def metricas(self) -> Dict[str, Any]:
+        return {
+            "clientes_conectados": len(self._clientes),
+            "escuchando": bool(self._hilo and self._hilo.is_alive()),
+            "eventos_recibidos": self._eventos_recibidos,
+            "eventos_enviados": self._eventos_enviados,
+            "clientes_lentos_desconectados": self._clientes_lentos,
+        }
+
+
+hub_eventos = HubEventos(DATABASE_URL)
@@ -0,0 +1,83 @@
+# === EVENTOS_SERVICE.PY ===
+# Cliente del canal de eventos en tiempo real del backend (WebSocket /ws/eventos).
+# Corre en un hilo propio, entrega cada evento a un callback y se reconecta solo.
+
+import json
+import threading
+import logging
+from typing import Callable, Dict, Any, Optional
+
+from websockets.sync.client import connect
+from websockets.exceptions import WebSocketException
+
+log = logging.getLogger("RestaurantIA")
+
+# Espera entre reintentos de conexión: crece hasta el máximo mientras el backend no responda
+ESPERA_RECONEXION_MIN = 1.0
+ESPERA_RECONEXION_MAX = 15.0
+
+
+class EventosService:
+    def __init__(self, base_url: str = "http://127.0.0.1:8000"):
+        self.url = base_url.rstrip("/").replace("http://", "ws://").replace("https://", "wss://") + "/ws/eventos"
+        self.conectado = False
+        self._on_evento: Optional[Callable[[Dict[str, Any]], None]] = None
+        self._on_conexion: Optional[Callable[[bool], None]] = None
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._ws = None
+
+    # === MÉTODO: iniciar ===
+    # Arranca el hilo de escucha. on_evento recibe {"tipo": ..., "data": {...}};
+    # on_conexion recibe True al conectar y False al perder la conexión.
+    def iniciar(self, on_evento: Callable[[Dict[str, Any]], None], on_conexion: Callable[[bool], None] = None):
+        self._on_evento = on_evento
+        self._on_conexion = on_conexion
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._escuchar, name="eventos-ws", daemon=True)
+        self._hilo.start()
+        log.info(f"EventosService iniciado → {self.url}")
+
+    def detener(self):
+        self._detener.set()
+        if self._ws is not None:
+            self._ws.close()
+
+    def _cambiar_conexion(self, conectado: bool):
+        if conectado == self.conectado:
+            return
+        self.conectado = conectado
+        if self._on_conexion:
+            try:
+                self._on_conexion(conectado)
+            except Exception as e:
+                log.error(f"Error en callback de conexión de eventos: {e}")
+
+    def _escuchar(self):
+        espera = ESPERA_RECONEXION_MIN
+        while not self._detener.is_set():
+            try:
+                with connect(self.url, open_timeout=5) as ws:
+                    self._ws = ws
+                    espera = ESPERA_RECONEXION_MIN
+                    for mensaje in ws:
+                        evento = json.loads(mensaje)
+                        if evento.get("tipo") == "conectado":
+                            log.info("Canal de eventos conectado → actualizaciones en tiempo real activas")
+                            self._cambiar_conexion(True)
+                        log.debug(f"Evento recibido → {evento.get('tipo')} | {evento.get('data')}")
+                        try:
+                            self._on_evento(evento)
+                        except Exception as e:
+                            log.error(f"Error procesando evento {evento.get('tipo')}: {e}")
+            except (WebSocketException, OSError, EOFError, TimeoutError) as e:
+                if self.conectado:
+                    log.warning(f"Canal de eventos desconectado → {e}")
+            except Exception as e:
+                log.error(f"Error inesperado en canal de eventos: {e}", exc_info=True)
+            finally:
+                self._ws = None
+            self._cambiar_conexion(False)
+            if self._detener.wait(espera):
+                break
+            espera = min(espera * 2, ESPERA_RECONEXION_MAX)
@@ -0,0 +1,262 @@
+# === GRAFICOS_RENDER.PY ===
+# Servicio de rasterizado de gráficos Plotly para la vista de reportes.
+#
+# Pasar una figura a PNG con kaleido es lo más caro de refrescar un reporte: la primera vez
+# levanta un navegador headless y cada imagen cuesta decenas de milisegundos. Aquí:
+#   - Un único hilo renderizador mantiene vivo el proceso de kaleido (start_sync_server en
+#     kaleido >= 1; la 0.2 ya deja su proceso abierto) y atiende los pedidos en cola, así
+#     que la interfaz y la lectura del tablero nunca esperan al rasterizado.
+#   - Caché direccionada por contenido: la clave es el hash del JSON de la figura más el
+#     tamaño, de modo que los mismos datos nunca se renderizan dos veces y datos distintos
+#     nunca reciben una imagen vieja. En memoria (LRU acotada por bytes) y, para períodos
+#     ya cerrados cuyos datos no pueden cambiar, también en disco entre ejecuciones (acotada
+#     por GRAFICOS_DISCO_MB: se borran primero las imágenes usadas hace más tiempo).
+#   - Pedidos iguales en vuelo comparten el mismo Future.
+
+import os
+import time
+import atexit
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+log = logging.getLogger("RestaurantIA")
+
+GRAFICOS_CACHE_MB = float(os.environ.get("GRAFICOS_CACHE_MB", "32"))
+GRAFICOS_DISCO_MB = float(os.environ.get("GRAFICOS_DISCO_MB", "256"))
+DIRECTORIO_GRAFICOS = Path(os.environ.get(
+    "GRAFICOS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".restaurantpro", "graficos")
+))
+
+
+def clave_figura(fig: Any, ancho: int, alto: int, escala: float = 1, formato: str = "png") -> str:
+    """Hash del contenido de la figura (datos, layout y plantilla) y del tamaño pedido."""
+    h = hashlib.sha256(fig.to_json().encode("utf-8"))
+    h.update(f"|{formato}|{ancho}x{alto}@{escala}".encode("ascii"))
+    return h.hexdigest()
+
+
+class RenderGraficos:
+    def __init__(self, max_bytes: int = int(GRAFICOS_CACHE_MB * 1024 * 1024),
+                 directorio: Path = DIRECTORIO_GRAFICOS,
+                 max_bytes_disco: int = int(GRAFICOS_DISCO_MB * 1024 * 1024)):
+        self._lock = threading.Lock()
+        self._max_bytes = max_bytes
+        self._directorio = directorio
+        self._max_bytes_disco = max_bytes_disco
+        self._bytes_disco: Optional[int] = None  # se mide al primer guardado
+        self._memoria: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._en_vuelo: Dict[str, Future] = {}
+        self._ejecutor: Optional[ThreadPoolExecutor] = None
+        self._servidor_kaleido = False
+        # --- Métricas ---
+        self._aciertos = 0
+        self._aciertos_disco = 0
+        self._podados_disco = 0
+        self._compartidos = 0
+        self._renders = 0
+        self._errores = 0
+        self._ms_render = 0.0
+
+    # === RENDERIZADOR ===
+    def _hilo(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._ejecutor is None:
+                self._ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="graficos")
+            return self._ejecutor
+
+    def _arrancar_kaleido(self) -> None:
+        """En el hilo renderizador: deja abierto el navegador de kaleido para todas las imágenes."""
+        if self._servidor_kaleido:
+            return
+        self._servidor_kaleido = True
+        try:
+            import kaleido
+        except ImportError:
+            return
+        if not hasattr(kaleido, "start_sync_server"):
+            return
+        inicio = time.perf_counter()
+        # Si el navegador no arranca, el servidor de kaleido muere en su hilo y deja colgada
+        # cada imagen posterior: se prueba primero con una imagen mínima, que sí falla enseguida
+        import plotly.graph_objects as go
+        try:
+            go.Figure().to_image(format="png", width=10, height=10)
+        except Exception as e:
+            log.error(f"Renderizador de gráficos no disponible (sin navegador para kaleido) → {e}")
+            return
+        kaleido.start_sync_server(silence_warnings=True)
+        log.info(f"Renderizador de gráficos listo → {(time.perf_counter() - inicio) * 1000:.0f}ms")
+
+    def _rasterizar(self, clave: str, fig: Any, ancho: int, alto: int, escala: float,
+                    formato: str, permanente: bool) -> bytes:
+        self._arrancar_kaleido()
+        inicio = time.perf_counter()
+        imagen = fig.to_image(format=formato, width=ancho, height=alto, scale=escala)
+        duracion = (time.perf_counter() - inicio) * 1000
+        with self._lock:
+            self._renders += 1
+            self._ms_render += duracion
+        self._guardar(clave, imagen)
+        if permanente:
+            self._guardar_disco(clave, formato, imagen)
+        log.debug(f"Gráfico renderizado → {clave[:12]} | {ancho}x{alto} | {len(imagen)} bytes | {duracion:.0f}ms")
+        return imagen
+
+    def calentar(self) -> None:
+        """Arranca el navegador de kaleido en segundo plano, antes del primer gráfico."""
+        self._hilo().submit(self._arrancar_kaleido)
+
+    # === CACHÉ ===
+    def _guardar(self, clave: str, imagen: bytes) -> None:
+        with self._lock:
+            if clave in self._memoria:
+                self._memoria.move_to_end(clave)
+                return
+            self._memoria[clave] = imagen
+            self._bytes += len(imagen)
+            while self._bytes > self._max_bytes and len(self._memoria) > 1:
+                _, vieja = self._memoria.popitem(last=False)
+                self._bytes -= len(vieja)
+
+    def _ruta(self, clave: str, formato: str) -> Path:
+        return self._directorio / f"{clave}.{formato}"
+
+    def _guardar_disco(self, clave: str, formato: str, imagen: bytes) -> None:
+        try:
+            self._directorio.mkdir(parents=True, exist_ok=True)
+            temporal = self._ruta(clave, formato).with_suffix(".tmp")
+            temporal.write_bytes(imagen)
+            os.replace(temporal, self._ruta(clave, formato))
+        except OSError as e:
+            log.warning(f"No se pudo guardar el gráfico en disco → {e}")
+            return
+        # Sólo lo llama el hilo renderizador: el tamaño del directorio no necesita lock
+        if self._bytes_disco is None:
+            self._bytes_disco = sum(f.stat().st_size for f in self._directorio.glob("*.*") if f.suffix != ".tmp")
+        else:
+            self._bytes_disco += len(imagen)
+        if self._bytes_disco > self._max_bytes_disco:
+            self._podar_disco()
+
+    def _podar_disco(self) -> None:
+        """Borra las imágenes de uso más viejo (mtime) hasta bajar al 90% del tope del disco."""
+        archivos = []
+        for archivo in self._directorio.glob("*.*"):
+            if archivo.suffix == ".tmp":
+                continue
+            try:
+                datos = archivo.stat()
+            except OSError:
+                continue
+            archivos.append((datos.st_mtime, datos.st_size, archivo))
+        archivos.sort()
+        total = sum(tamano for _, tamano, _ in archivos)
+        objetivo = self._max_bytes_disco * 0.9
+        borrados = 0
+        for _, tamano, archivo in archivos:
+            if total <= objetivo or len(archivos) - borrados <= 1:
+                break
+            try:
+                archivo.unlink()
+            except OSError:
+                continue
+            total -= tamano
+            borrados += 1
+        self._bytes_disco = total
+        with self._lock:
+            self._podados_disco += borrados
+        log.info(f"Caché de gráficos en disco podada → {borrados} imágenes | {total / 1024 / 1024:.1f} MB")
+
+    def _buscar(self, clave: str, formato: str, permanente: bool) -> Optional[bytes]:
+        with self._lock:
+            imagen = self._memoria.get(clave)
+            if imagen is not None:
+                self._memoria.move_to_end(clave)
+                self._aciertos += 1
+                return imagen
+        if permanente:
+            ruta = self._ruta(clave, formato)
+            try:
+                imagen = ruta.read_bytes()
+            except OSError:
+                return None
+            try:
+                os.utime(ruta)  # la poda borra primero lo usado hace más tiempo
+            except OSError:
+                pass
+            self._guardar(clave, imagen)
+            with self._lock:
+                self._aciertos_disco += 1
+            return imagen
+        return None
+
+    # === API ===
+    def renderizar(self, fig: Any, ancho: int = 600, alto: int = 300, escala: float = 1,
+                   formato: str = "png", permanente: bool = False) -> "Future[bytes]":
+        """
+        Imagen de `fig` como Future: ya resuelto si estaba en caché, si no se rasteriza en el
+        hilo renderizador. `permanente` (datos de un período cerrado) la guarda también en
+        disco para no volver a renderizarla en próximas ejecuciones.
+        """
+        clave = clave_figura(fig, ancho, alto, escala, formato)
+        imagen = self._buscar(clave, formato, permanente)
+        if imagen is not None:
+            listo: Future = Future()
+            listo.set_result(imagen)
+            return listo
+
+        ejecutor = self._hilo()
+        with self._lock:
+            futuro = self._en_vuelo.get(clave)
+            if futuro is not None:
+                self._compartidos += 1
+                return futuro
+            futuro = ejecutor.submit(self._rasterizar, clave, fig, ancho, alto, escala, formato, permanente)
+            self._en_vuelo[clave] = futuro
+
+        def terminado(f: Future) -> None:
+            with self._lock:
+                self._en_vuelo.pop(clave, None)
+                if f.exception() is not None:
+                    self._errores += 1
+        futuro.add_done_callback(terminado)
+        return futuro
+
+    def cerrar(self) -> None:
+        with self._lock:
+            ejecutor, self._ejecutor = self._ejecutor, None
+        if ejecutor is not None:
+            ejecutor.shutdown(wait=False, cancel_futures=True)
+        if self._servidor_kaleido:
+            try:
+                import kaleido
+                if hasattr(kaleido, "stop_sync_server"):
+                    kaleido.stop_sync_server(silence_warnings=True)
+            except Exception as e:
+                log.debug(f"Cierre del renderizador de gráficos → {e}")
+
+    # === MÉTRICAS ===
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "en_memoria": len(self._memoria),
+                "bytes": self._bytes,
+                "aciertos": self._aciertos,
+                "aciertos_disco": self._aciertos_disco,
+                "bytes_disco": self._bytes_disco,
+                "podados_disco": self._podados_disco,
+                "compartidos": self._compartidos,
+                "renders": self._renders,
+                "errores": self._errores,
+                "ms_render_promedio": round(self._ms_render / self._renders, 1) if self._renders else None,
+            }
+
+
+render_graficos = RenderGraficos()
+atexit.register(render_graficos.cerrar)
@@ -0,0 +1,81 @@
+# === HTTP_SESION.PY ===
+# Sesión HTTP compartida por los servicios cliente (BackendService, InventoryService,
+# RecetasService, ReservasService): conexiones keep-alive reutilizadas contra uvicorn,
+# reintentos con backoff y caché de ETags para los GET condicionales.
+
+import copy
+import threading
+import logging
+from typing import Any, Dict, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+log = logging.getLogger("RestaurantIA")
+
+TIMEOUT_SEGUNDOS = 15
+
+# Reintentos ante fallos de conexión y 502/503/504 (503 = pool de BD saturado).
+# Las respuestas con error sólo se reintentan en métodos idempotentes: un POST
+# (crear pedido, reserva...) nunca se repite si el servidor llegó a recibirlo.
+_reintentos = Retry(
+    total=3,
+    connect=3,
+    read=2,
+    status=3,
+    backoff_factor=0.3,
+    status_forcelist=(502, 503, 504),
+    allowed_methods=frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}),
+    raise_on_status=False,
+)
+
+sesion = requests.Session()
+_adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=_reintentos)
+sesion.mount("http://", _adaptador)
+sesion.mount("https://", _adaptador)
+
+
+class CacheETag:
+    """Última respuesta (ya parseada) y su ETag por URL."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entradas: Dict[str, Tuple[str, Any]] = {}
+        self.respuestas_304 = 0
+
+    def cabeceras(self, url: str) -> Dict[str, str]:
+        with self._lock:
+            entrada = self._entradas.get(url)
+        return {"If-None-Match": entrada[0]} if entrada else {}
+
+    def resolver(self, url: str, response: requests.Response) -> Any:
+        """Devuelve el JSON de la respuesta, o una copia del guardado si el backend contestó 304."""
+        if response.status_code == 304:
+            with self._lock:
+                entrada = self._entradas.get(url)
+                self.respuestas_304 += 1
+            if entrada is not None:
+                log.debug(f"HTTP 304 → {url} sin cambios, se reutiliza la copia local")
+                return copy.deepcopy(entrada[1])
+            # Sin copia local (no debería pasar): se pide de nuevo sin condición
+            response = sesion.get(url, timeout=TIMEOUT_SEGUNDOS)
+            response.raise_for_status()
+        datos = response.json()
+        etag = response.headers.get("ETag")
+        if etag:
+            with self._lock:
+                self._entradas[url] = (etag, datos)
+            return copy.deepcopy(datos)
+        return datos
+
+
+cache_etag = CacheETag()
+
+
+def get_condicional(url: str) -> Any:
+    """GET con If-None-Match; para los servicios que no pasan por BackendService._request."""
+    r = sesion.get(url, headers=cache_etag.cabeceras(url), timeout=TIMEOUT_SEGUNDOS)
+    if r.status_code != 304:
+        r.raise_for_status()
+    return cache_etag.resolver(url, r)
@@ -1,23 +1,19 @@
 # inventario_backend.py
 # Backend API para gestionar el inventario de ingredientes.
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from pydantic import BaseModel
 from typing import List
 import psycopg2
-from psycopg2.extras import RealDictCursor
 # --- IMPORTAR LA EXCEPCIÓN DE INTEGRIDAD ---
 import psycopg2.errors
 # --- FIN IMPORTAR ---
 
-DATABASE_URL = "dbname=restaurant_db user=postgres password=postgres host=localhost port=5432"
-
-def get_db():
-    conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
-    try:
-        yield conn
-    finally:
-        conn.close()
+# Conexiones prestadas por el pool compartido (ver db_pool.py)
+from db_pool import get_db
+# Avisos en tiempo real a los clientes (ver eventos_hub.py)
+from eventos_hub import publicar_evento
+from etag_respuestas import respuesta_con_etag
 
 # --- MODELO: InventarioItem ---
 # Para agregar un nuevo ítem al inventario.
@@ -55,7 +51,7 @@ class InventarioResponse(BaseModel):
 inventario_app = FastAPI(title="Inventory API")
 
 @inventario_app.get("/", response_model=List[InventarioResponse])
-def obtener_inventario(conn: psycopg2.extensions.connection = Depends(get_db)):
+def obtener_inventario(request: Request, conn: psycopg2.extensions.connection = Depends(get_db)):
     with conn.cursor() as cursor:
         # --- ACTUALIZAR CONSULTA: Incluir cantidad_minima_alerta ---
         cursor.execute("""
@@ -76,7 +72,8 @@ def obtener_inventario(conn: psycopg2.extensions.connection = Depends(get_db)):
                 "fecha_registro": str(row['fecha_registro']),
                 "fecha_actualizacion": str(row['fecha_actualizacion'])
             })
-        return items
+        # 304 sin cuerpo si el cliente ya tiene este inventario
+        return respuesta_con_etag(request, items, List[InventarioResponse])
 
 @inventario_app.post("/", response_model=InventarioResponse)
 def agregar_item_inventario(item: InventarioItem, conn: psycopg2.extensions.connection = Depends(get_db)):
@@ -99,6 +96,11 @@ def agregar_item_inventario(item: InventarioItem, conn: psycopg2.extensions.conn
             item.cantidad_disponible  # Valor para la suma en UPDATE de cantidad_disponible
         ))
         result = cursor.fetchone()
+        publicar_evento(cursor, "inventario_actualizado", {
+            "id": result['id'],
+            "cantidad_disponible": result['cantidad_disponible'],
+            "cantidad_minima_alerta": result['cantidad_minima_alerta']
+        })
         conn.commit()
         return {
             "id": result['id'],
@@ -125,6 +127,11 @@ def actualizar_item_inventario(item_id: int, update_data: InventarioUpdate, conn
         result = cursor.fetchone()
         if not result:
             raise HTTPException(status_code=404, detail="Ítem no encontrado")
+        publicar_evento(cursor, "inventario_actualizado", {
+            "id": result['id'],
+            "cantidad_disponible": result['cantidad_disponible'],
+            "cantidad_minima_alerta": result['cantidad_minima_alerta']
+        })
         conn.commit()
         return {
             "id": result['id'],
@@ -146,6 +153,7 @@ def eliminar_item_inventario(item_id: int, conn = Depends(get_db)):
             cursor.execute("DELETE FROM inventario WHERE id = %s", (item_id,))
             if cursor.rowcount == 0:
                 raise HTTPException(status_code=404, detail="Ítem no encontrado")
+            publicar_evento(cursor, "inventario_eliminado", {"id": item_id})
             conn.commit()
             return {"status": "ok"}
         # Capturar la excepción específica de PostgreSQL por la restricción ON DELETE RESTRICT
@@ -1,9 +1,10 @@
 # === INVENTARIO_SERVICE.PY ===
 # Cliente HTTP para interactuar con la API de inventario del sistema de restaurante.
 
-import requests
 from typing import List, Dict, Any
 
+from http_sesion import sesion, get_condicional, TIMEOUT_SEGUNDOS
+
 class InventoryService:
     def __init__(self, base_url: str = "http://127.0.0.1:8000"):
         self.base_url = base_url.rstrip("/")
@@ -12,9 +13,9 @@ class InventoryService:
     # Obtiene la lista completa de items en inventario desde el backend.
     # Ahora incluye 'cantidad_minima_alerta'.
     def obtener_inventario(self) -> List[Dict[str, Any]]:
-        r = requests.get(f"{self.base_url}/inventario")
-        r.raise_for_status()
-        return r.json() # El JSON devuelto por el backend ya incluye 'cantidad_minima_alerta'
+        # Con barra final: sin ella el backend redirige (307) en cada consulta.
+        # GET condicional: si el inventario no cambió, 304 y se reutiliza la copia local.
+        return get_condicional(f"{self.base_url}/inventario/") # El JSON devuelto por el backend ya incluye 'cantidad_minima_alerta'
 
     # === MÉTODO: agregar_item_inventario ===
     # Agrega un nuevo ítem al inventario en el backend o suma la cantidad si ya existe.
@@ -30,7 +31,7 @@ class InventoryService:
             "cantidad_minima_alerta": cantidad_minima_alerta
             # --- FIN AÑADIR EL NUEVO CAMPO ---
         }
-        r = requests.post(f"{self.base_url}/inventario", json=payload)
+        r = sesion.post(f"{self.base_url}/inventario/", json=payload, timeout=TIMEOUT_SEGUNDOS)
         r.raise_for_status()
         return r.json() # El JSON devuelto por el backend ya incluye 'cantidad_minima_alerta'
 
@@ -45,7 +46,7 @@ class InventoryService:
             "cantidad_minima_alerta": cantidad_minima_alerta
             # --- FIN AÑADIR EL NUEVO CAMPO ---
         }
-        r = requests.put(f"{self.base_url}/inventario/{item_id}", json=payload)
+        r = sesion.put(f"{self.base_url}/inventario/{item_id}", json=payload, timeout=TIMEOUT_SEGUNDOS)
         r.raise_for_status()
         return r.json() # El JSON devuelto por el backend ya incluye 'cantidad_minima_alerta'
 
@@ -53,6 +54,6 @@ class InventoryService:
     # Elimina un ítem del inventario en el backend.
     # (No cambia, no involucra el nuevo campo)
     def eliminar_item_inventario(self, item_id: int) -> Dict[str, Any]:
-        r = requests.delete(f"{self.base_url}/inventario/{item_id}")
+        r = sesion.delete(f"{self.base_url}/inventario/{item_id}", timeout=TIMEOUT_SEGUNDOS)
         r.raise_for_status()
         return r.json()
@@ -0,0 +1,145 @@
+# === MENU_CACHE.PY ===
+# Caché en memoria de GET /menu/items: guarda el JSON ya serializado junto con la versión
+# del menú (tabla menu_version, migración 004). Mientras la versión no cambie, servir el
+# menú no toca la base de datos ni vuelve a serializar; si el cliente manda el ETag de la
+# versión que ya tiene se contesta 304.
+#
+# Toda escritura en `menu` sube la versión y publica el evento `menu_actualizado` (triggers
+# de la migración 004): cada worker vacía su copia al recibirlo y los clientes recargan.
+# El endpoint que escribe además llama a invalidar() tras el commit, para que su propio
+# worker no sirva la copia vieja mientras llega el evento.
+#
+# Los cambios hechos mientras el hub no escucha (se cayó su LISTEN o todavía no conectó)
+# no llegan como evento: al perder y al recuperar la conexión se vacía la copia, y mientras
+# tanto la copia dura a lo sumo MENU_SIN_EVENTOS_SEGUNDOS antes de volver a leer la versión.
+
+import os
+import time
+import threading
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response
+
+from db_pool import pool, PoolAgotadoError
+from etag_respuestas import serializar, responder
+
+log = logging.getLogger("RestaurantIA")
+
+MENU_SIN_EVENTOS_SEGUNDOS = float(os.environ.get("MENU_SIN_EVENTOS_SEGUNDOS", "5"))
+
+
+def etag_version(version: int) -> str:
+    return f'"menu-{version}"'
+
+
+class CacheMenu:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Una sola carga a la vez: las peticiones que llegan mientras tanto esperan su resultado
+        self._lock_carga = threading.Lock()
+        self._cuerpo: Optional[bytes] = None
+        self._version: Optional[int] = None
+        self._items = 0
+        self._cargado_en = 0.0
+        # El hub de eventos está escuchando: la copia vale hasta el próximo `menu_actualizado`
+        self._en_vivo = False
+        # Cada invalidación sube la generación; una carga que empezó antes no se guarda
+        self._generacion = 0
+        self._aciertos = 0
+        self._respuestas_304 = 0
+        self._cargas_bd = 0
+        self._invalidaciones = 0
+
+    def _actual(self) -> Tuple[Optional[bytes], Optional[int]]:
+        with self._lock:
+            if (not self._en_vivo and self._cuerpo is not None
+                    and time.monotonic() - self._cargado_en > MENU_SIN_EVENTOS_SEGUNDOS):
+                return None, None
+            return self._cuerpo, self._version
+
+    # === CARGA ===
+    def _cargar(self, modelo: Any) -> Tuple[bytes, int]:
+        with self._lock:
+            generacion = self._generacion
+        try:
+            conn = pool.obtener()
+        except PoolAgotadoError as e:
+            raise HTTPException(status_code=503, detail=f"Base de datos saturada: {e}")
+        try:
+            with conn.cursor() as cursor:
+                # Versión y filas de la misma foto: nunca se guarda un menú nuevo con la versión vieja
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+                cursor.execute("SELECT version FROM menu_version")
+                version = cursor.fetchone()['version']
+                cursor.execute("SELECT nombre, precio, tipo FROM menu ORDER BY tipo, nombre")
+                items = cursor.fetchall()
+            conn.rollback()
+        finally:
+            pool.devolver(conn)
+
+        cuerpo = serializar(items, modelo)
+        with self._lock:
+            self._cargas_bd += 1
+            if generacion == self._generacion:
+                self._cuerpo, self._version, self._items = cuerpo, version, len(items)
+                self._cargado_en = time.monotonic()
+        log.info(f"Caché de menú cargada → versión {version} | {len(items)} ítems | {len(cuerpo)} bytes")
+        return cuerpo, version
+
+    def respuesta(self, request: Request, modelo: Any = None) -> Response:
+        """Menú serializado con ETag de su versión (304 si el cliente ya la tiene)."""
+        cuerpo, version = self._actual()
+        if cuerpo is None:
+            with self._lock_carga:
+                cuerpo, version = self._actual()
+                if cuerpo is None:
+                    cuerpo, version = self._cargar(modelo)
+        else:
+            with self._lock:
+                self._aciertos += 1
+
+        respuesta = responder(request, cuerpo, etag_version(version), {"X-Menu-Version": str(version)})
+        if respuesta.status_code == 304:
+            with self._lock:
+                self._respuestas_304 += 1
+        return respuesta
+
+    # === INVALIDACIÓN ===
+    def invalidar(self, version: Optional[int] = None) -> None:
+        """
+        Descarta la copia. Con `version` (la del evento `menu_actualizado`) sólo si la copia
+        es anterior: el worker que hizo el cambio puede haberla recargado ya.
+        """
+        with self._lock:
+            if version is not None and self._version is not None and self._version >= version:
+                return
+            self._generacion += 1
+            if self._cuerpo is not None:
+                self._invalidaciones += 1
+            self._cuerpo = None
+            self._version = None
+        log.debug(f"Caché de menú invalidada{f' → versión {version}' if version is not None else ''}")
+
+    def conexion_eventos(self, conectado: bool) -> None:
+        """El hub (re)conectó o perdió su LISTEN: lo cambiado mientras tanto no llegó como evento."""
+        with self._lock:
+            self._en_vivo = conectado
+        self.invalidar()
+
+    # === MÉTRICAS ===
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "version": self._version,
+                "en_vivo": self._en_vivo,
+                "items": self._items if self._cuerpo is not None else 0,
+                "bytes": len(self._cuerpo) if self._cuerpo is not None else 0,
+                "aciertos": self._aciertos,
+                "respuestas_304": self._respuestas_304,
+                "cargas_bd": self._cargas_bd,
+                "invalidaciones": self._invalidaciones,
+            }
+
+
+cache_menu = CacheMenu()
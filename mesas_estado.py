@@ -0,0 +1,208 @@
+# === MESAS_ESTADO.PY ===
+# Estado de ocupación y reservas de cada mesa, en memoria, para GET /mesas.
+# Se reconstruye desde la BD al conectar el hub de eventos y después se mantiene con los
+# eventos de pedidos, reservas y mesas que publica cualquier worker (eventos_hub.py), así
+# que /mesas responde en O(mesas) sin consultar la base y con una sola fila por mesa.
+#
+# Todo corre en el event loop (los eventos llegan por call_soon_threadsafe y /mesas es
+# async), así que no hace falta lock salvo durante la reconstrucción, que espera a la BD:
+# los eventos que llegan en ese intervalo se guardan y se aplican encima de la foto nueva.
+
+import os
+import time
+import asyncio
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+log = logging.getLogger("RestaurantIA")
+
+# Un pedido en alguno de estos estados ocupa su mesa
+ESTADOS_OCUPADA = ('Tomando pedido', 'Pendiente', 'En preparacion', 'Listo', 'Entregado')
+MESA_VIRTUAL = 99
+
+# Red de seguridad ante escrituras que no emiten eventos (psql, restauraciones...)
+RECONCILIAR_SEGUNDOS = float(os.environ.get("MESAS_RECONCILIAR_SEGUNDOS", "300"))
+
+# Las tres consultas de la reconstrucción (también las revisa verificar_indices.py)
+SQL_MESAS = "SELECT numero, capacidad FROM mesas WHERE numero != 99"
+SQL_PEDIDOS_OCUPAN = f"""
+    SELECT id, mesa_numero FROM pedidos
+    WHERE mesa_numero IS NOT NULL
+      AND estado IN ({', '.join(f"'{e}'" for e in ESTADOS_OCUPADA)})
+"""
+SQL_RESERVAS_VIGENTES = """
+    SELECT r.id, r.mesa_numero, r.fecha_hora_inicio, c.nombre AS cliente_nombre
+    FROM reservas r
+    LEFT JOIN clientes c ON r.cliente_id = c.id
+    WHERE r.fecha_hora_inicio >= CURRENT_DATE
+"""
+
+EVENTOS_PEDIDO = ("pedido_creado", "pedido_estado", "pedido_actualizado", "pedido_eliminado")
+EVENTOS_RESERVA = ("reserva_creada", "reserva_eliminada")
+TIPOS_EVENTO_MESAS = EVENTOS_PEDIDO + EVENTOS_RESERVA + ("mesas_actualizadas",)
+
+
+def _fecha(valor: Any) -> Optional[datetime]:
+    if valor is None or isinstance(valor, datetime):
+        return valor
+    return datetime.fromisoformat(str(valor))
+
+
+class EstadoMesas:
+    def __init__(self):
+        self._capacidades: Dict[int, int] = {}
+        self._pedidos: Dict[int, int] = {}  # pedido que ocupa → mesa
+        self._ocupacion: Dict[int, int] = {}  # mesa → cuántos pedidos la ocupan
+        # mesa → {reserva_id: (inicio, nombre del cliente)}
+        self._reservas: Dict[int, Dict[int, Tuple[datetime, Optional[str]]]] = {}
+
+        self._valido = False
+        # Sin el hub escuchando no llegan eventos: cada /mesas reconstruye desde la BD
+        self._en_vivo = False
+        self._reconstruido_en = 0.0
+        self._lock_reconstruir: Optional[asyncio.Lock] = None
+        self._pendientes: Optional[List[Tuple[str, Dict[str, Any]]]] = None
+        # --- Métricas ---
+        self._lecturas = 0
+        self._reconstrucciones = 0
+        self._eventos_aplicados = 0
+
+    # === EVENTOS (llamar desde el event loop) ===
+    def aplicar_evento(self, tipo: str, data: Dict[str, Any]) -> None:
+        if self._pendientes is not None:
+            # Reconstrucción en curso: se aplica después, sobre la foto nueva
+            self._pendientes.append((tipo, data))
+            return
+        self._aplicar(tipo, data)
+
+    def _aplicar(self, tipo: str, data: Dict[str, Any]) -> None:
+        self._eventos_aplicados += 1
+        if tipo in EVENTOS_PEDIDO:
+            self._quitar_pedido(data["id"])
+            if tipo != "pedido_eliminado" and data.get("estado") in ESTADOS_OCUPADA and data.get("mesa_numero") is not None:
+                self._pedidos[data["id"]] = data["mesa_numero"]
+                self._ocupacion[data["mesa_numero"]] = self._ocupacion.get(data["mesa_numero"], 0) + 1
+        elif tipo == "reserva_creada":
+            inicio = _fecha(data.get("fecha_hora_inicio"))
+            if inicio is not None and inicio.date() >= date.today():
+                self._reservas.setdefault(data["mesa_numero"], {})[data["id"]] = (inicio, data.get("cliente_nombre"))
+        elif tipo == "reserva_eliminada":
+            for reservas in self._reservas.values():
+                reservas.pop(data["id"], None)
+        elif tipo == "mesas_actualizadas":
+            # Alta o baja de mesas (con pedidos y reservas en cascada): se rehace todo
+            self.invalidar()
+
+    def _quitar_pedido(self, pedido_id: int) -> None:
+        mesa = self._pedidos.pop(pedido_id, None)
+        if mesa is None:
+            return
+        restantes = self._ocupacion.get(mesa, 0) - 1
+        if restantes > 0:
+            self._ocupacion[mesa] = restantes
+        else:
+            self._ocupacion.pop(mesa, None)
+
+    def conexion_eventos(self, conectado: bool) -> None:
+        """El hub (re)conectó o perdió su LISTEN: lo ocurrido mientras tanto no llegó como evento."""
+        self._en_vivo = conectado
+        self.invalidar()
+
+    def invalidar(self) -> None:
+        self._valido = False
+
+    # === RECONSTRUCCIÓN ===
+    async def reconstruir(self, conn) -> None:
+        """Foto completa desde la BD con una conexión asyncpg (una sola transacción de lectura)."""
+        self._pendientes = []
+        try:
+            async with conn.transaction(isolation="repeatable_read", readonly=True):
+                mesas = await conn.fetch(SQL_MESAS)
+                pedidos = await conn.fetch(SQL_PEDIDOS_OCUPAN)
+                reservas = await conn.fetch(SQL_RESERVAS_VIGENTES)
+        except BaseException:
+            self._pendientes = None
+            raise
+
+        self._capacidades = {m['numero']: m['capacidad'] for m in mesas}
+        self._pedidos = {p['id']: p['mesa_numero'] for p in pedidos}
+        self._ocupacion = {}
+        for mesa in self._pedidos.values():
+            self._ocupacion[mesa] = self._ocupacion.get(mesa, 0) + 1
+        self._reservas = {}
+        for r in reservas:
+            self._reservas.setdefault(r['mesa_numero'], {})[r['id']] = (r['fecha_hora_inicio'], r['cliente_nombre'])
+
+        pendientes, self._pendientes = self._pendientes, None
+        # Un evento de mesas entre medio vuelve a invalidar: se ve en la próxima lectura
+        self._valido = True
+        for tipo, data in pendientes:
+            self._aplicar(tipo, data)
+        self._reconstrucciones += 1
+        self._reconstruido_en = time.monotonic()
+        log.info(f"Estado de mesas reconstruido → {len(self._capacidades)} mesas | {len(self._ocupacion)} ocupadas | {len(reservas)} reservas vigentes | {len(pendientes)} eventos aplicados encima")
+
+    def necesita_reconstruir(self) -> bool:
+        return (not self._valido or not self._en_vivo
+                or time.monotonic() - self._reconstruido_en >= RECONCILIAR_SEGUNDOS)
+
+    async def asegurar(self, conexion) -> None:
+        """Reconstruye si hace falta; `conexion` es un context manager async que presta la conexión."""
+        if not self.necesita_reconstruir():
+            return
+        if self._lock_reconstruir is None:
+            self._lock_reconstruir = asyncio.Lock()
+        async with self._lock_reconstruir:
+            # Otra petición pudo reconstruir mientras se esperaba el lock
+            if self.necesita_reconstruir():
+                async with conexion() as conn:
+                    await self.reconstruir(conn)
+
+    # === LECTURA ===
+    def mesas(self) -> List[Dict[str, Any]]:
+        """Una fila por mesa física, ordenadas por número, más la mesa virtual 99."""
+        self._lecturas += 1
+        hoy = date.today()
+        resultado = []
+        for numero in sorted(self._capacidades):
+            # La reserva que se muestra es la más próxima de hoy en adelante
+            reserva = min(
+                (r for r in self._reservas.get(numero, {}).values() if r[0].date() >= hoy),
+                key=lambda r: r[0], default=None
+            )
+            resultado.append({
+                "numero": numero,
+                "capacidad": self._capacidades[numero],
+                "ocupada": numero in self._ocupacion,
+                "reservada": reserva is not None,
+                "cliente_reservado_nombre": reserva[1] if reserva else None,
+                "fecha_hora_reserva": str(reserva[0]) if reserva else None
+            })
+        resultado.append({
+            "numero": MESA_VIRTUAL,
+            "capacidad": 100,
+            "ocupada": False,
+            "reservada": False,
+            "cliente_reservado_nombre": None,
+            "fecha_hora_reserva": None,
+            "es_virtual": True
+        })
+        return resultado
+
+    # === MÉTRICAS ===
+    def metricas(self) -> Dict[str, Any]:
+        return {
+            "mesas": len(self._capacidades),
+            "ocupadas": len(self._ocupacion),
+            "reservas_vigentes": sum(len(r) for r in self._reservas.values()),
+            "valido": self._valido,
+            "en_vivo": self._en_vivo,
+            "segundos_desde_reconstruccion": round(time.monotonic() - self._reconstruido_en, 1) if self._reconstrucciones else None,
+            "lecturas": self._lecturas,
+            "reconstrucciones": self._reconstrucciones,
+            "eventos_aplicados": self._eventos_aplicados,
+        }
+
+
+estado_mesas = EstadoMesas()
@@ -0,0 +1,228 @@
+# === MIGRACIONES.PY ===
+# Migraciones versionadas del esquema (reemplazan a SqlPRO.sql / SQLelmasperro.txt).
+# Cada archivo migraciones/NNN_descripcion.sql se aplica una sola vez, en orden de versión;
+# las aplicadas quedan registradas en schema_migraciones junto con cuánto tardaron.
+#
+# Por defecto cada migración corre dentro de una transacción. Una migración que empieza con
+# la línea "-- migracion: sin-transaccion" corre sentencia por sentencia en autocommit, para
+# poder crear índices con CREATE INDEX CONCURRENTLY sin bloquear las escrituras del local, o
+# llenar tablas grandes por lotes con un procedimiento que hace COMMIT en cada lote (CALL en
+# autocommit). En esos archivos cada sentencia termina con ";" al final de la línea; dentro
+# de un bloque $$ ... $$ los ";" no cortan la sentencia.
+#
+# El backend aplica las pendientes al arrancar (DB_MIGRAR_AL_INICIAR=0 lo desactiva).
+#   python migraciones.py            → aplica las pendientes
+#   python migraciones.py --estado   → lista aplicadas y pendientes sin tocar nada
+
+import re
+import sys
+import time
+import hashlib
+import argparse
+import logging
+from pathlib import Path
+from typing import Dict, List
+
+log = logging.getLogger("RestaurantIA")
+
+DIRECTORIO_MIGRACIONES = Path(__file__).resolve().parent / "migraciones"
+PATRON_ARCHIVO = re.compile(r"^(\d+)_([\w-]+)\.sql$")
+DIRECTIVA_SIN_TRANSACCION = re.compile(r"^\s*--\s*migracion:\s*sin-transaccion\s*$", re.IGNORECASE | re.MULTILINE)
+PATRON_INDICE_CONCURRENTE = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.IGNORECASE
+)
+# Clave del advisory lock: dos procesos (p. ej. varios workers) nunca migran a la vez
+CLAVE_BLOQUEO = 72_110_013
+
+
+def listar_migraciones() -> List[Dict]:
+    """Archivos de migración ordenados por versión, con su SQL y checksum."""
+    migraciones = []
+    for archivo in sorted(DIRECTORIO_MIGRACIONES.glob("*.sql")):
+        coincidencia = PATRON_ARCHIVO.match(archivo.name)
+        if not coincidencia:
+            log.warning(f"Migraciones → se ignora '{archivo.name}' (formato esperado: NNN_descripcion.sql)")
+            continue
+        sql = archivo.read_text(encoding="utf-8")
+        migraciones.append({
+            "version": int(coincidencia.group(1)),
+            "nombre": coincidencia.group(2),
+            "archivo": archivo.name,
+            "sql": sql,
+            "checksum": hashlib.sha256(sql.encode("utf-8")).hexdigest(),
+            "transaccional": not DIRECTIVA_SIN_TRANSACCION.search(sql),
+        })
+    migraciones.sort(key=lambda m: m["version"])
+    versiones = [m["version"] for m in migraciones]
+    if len(versiones) != len(set(versiones)):
+        raise ValueError("Hay dos archivos de migración con la misma versión")
+    return migraciones
+
+
+def _asegurar_tabla(cursor) -> None:
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migraciones (
+            version INTEGER PRIMARY KEY,
+            nombre VARCHAR(255) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            aplicada_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("ALTER TABLE schema_migraciones ADD COLUMN IF NOT EXISTS duracion_ms INTEGER")
+
+
+def aplicadas(conn) -> Dict[int, Dict]:
+    with conn.cursor() as cursor:
+        _asegurar_tabla(cursor)
+        cursor.execute("SELECT version, nombre, checksum, aplicada_en, duracion_ms FROM schema_migraciones ORDER BY version")
+        filas = cursor.fetchall()
+    conn.commit()
+    return {f['version']: dict(f) for f in filas}
+
+
+def pendientes(conn) -> List[Dict]:
+    ya_aplicadas = aplicadas(conn)
+    migraciones = listar_migraciones()
+    for m in migraciones:
+        registrada = ya_aplicadas.get(m["version"])
+        if registrada and registrada['checksum'].strip() != m["checksum"]:
+            log.warning(f"Migración {m['archivo']} cambió después de aplicarse → no se vuelve a ejecutar")
+    return [m for m in migraciones if m["version"] not in ya_aplicadas]
+
+
+def _sentencias(sql: str) -> List[str]:
+    """
+    Divide una migración sin transacción en sentencias (terminan con ';' al final de la
+    línea, salvo dentro de un bloque $$ ... $$).
+    """
+    sentencias, actual, en_bloque = [], [], False
+    for linea in sql.splitlines():
+        if not en_bloque and linea.strip().startswith("--"):
+            continue
+        actual.append(linea)
+        if linea.count("$$") % 2:
+            en_bloque = not en_bloque
+        if not en_bloque and re.search(r";[ \t]*(?:--.*)?$", linea):
+            sentencias.append("\n".join(actual).strip())
+            actual = []
+    codigo = "\n".join(actual).strip()
+    if codigo:
+        sentencias.append(codigo)
+    return [s for s in sentencias if s.strip(" ;\n")]
+
+
+def _limpiar_indices_invalidos(conn, sql: str) -> None:
+    """
+    Un CREATE INDEX CONCURRENTLY que falla deja el índice marcado INVALID, y al reintentar
+    IF NOT EXISTS lo daría por creado: se borran para que el próximo intento lo construya.
+    """
+    nombres = PATRON_INDICE_CONCURRENTE.findall(sql)
+    if not nombres:
+        return
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE NOT i.indisvalid AND c.relname = ANY(%s)
+        """, (nombres,))
+        for fila in cursor.fetchall():
+            log.warning(f"Eliminando índice inválido '{fila['relname']}' de un intento fallido")
+            cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{fila["relname"]}"')
+
+
+def _ejecutar(conn, m: Dict) -> None:
+    if m["transaccional"]:
+        with conn.cursor() as cursor:
+            cursor.execute(m["sql"])
+        return
+    conn.commit()
+    conn.autocommit = True
+    try:
+        _limpiar_indices_invalidos(conn, m["sql"])
+        with conn.cursor() as cursor:
+            for sentencia in _sentencias(m["sql"]):
+                inicio = time.perf_counter()
+                cursor.execute(sentencia)
+                log.debug(f"  {' '.join(sentencia.split())[:80]} → {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    except Exception:
+        _limpiar_indices_invalidos(conn, m["sql"])
+        raise
+    finally:
+        conn.autocommit = False
+
+
+def aplicar(conn) -> List[Dict]:
+    """
+    Aplica las migraciones pendientes y devuelve las aplicadas con su duración.
+    Si una falla se revierte (las transaccionales) y no se aplican las siguientes.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", (CLAVE_BLOQUEO,))
+    conn.commit()
+    aplicadas_ahora = []
+    try:
+        # Se recalcula con el bloqueo tomado: otro proceso pudo haber migrado mientras tanto
+        for m in pendientes(conn):
+            modo = "" if m["transaccional"] else " (sin transacción)"
+            log.info(f"Aplicando migración {m['archivo']}{modo}...")
+            inicio = time.perf_counter()
+            del conn.notices[:]
+            try:
+                _ejecutar(conn, m)
+                # RAISE WARNING de la migración (p. ej. 005 sin poder crear su restricción)
+                for aviso in conn.notices:
+                    if aviso.startswith("WARNING"):
+                        log.warning(f"Migración {m['archivo']} → {aviso.strip()}")
+                duracion_ms = int((time.perf_counter() - inicio) * 1000)
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        "INSERT INTO schema_migraciones (version, nombre, checksum, duracion_ms) VALUES (%s, %s, %s, %s)",
+                        (m["version"], m["nombre"], m["checksum"], duracion_ms)
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                log.error(f"Migración {m['archivo']} FALLÓ → las siguientes no se aplicaron", exc_info=True)
+                raise
+            log.info(f"Migración {m['archivo']} aplicada en {duracion_ms} ms")
+            aplicadas_ahora.append({**m, "duracion_ms": duracion_ms})
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (CLAVE_BLOQUEO,))
+        conn.commit()
+    return aplicadas_ahora
+
+
+# === LÍNEA DE COMANDOS ===
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Aplica las migraciones pendientes del esquema.")
+    parser.add_argument("--estado", action="store_true", help="Sólo muestra aplicadas y pendientes")
+    args = parser.parse_args(argv)
+
+    from db_pool import pool
+    conn = pool.obtener()
+    try:
+        if args.estado:
+            for version, m in aplicadas(conn).items():
+                duracion = f"{m['duracion_ms']} ms" if m['duracion_ms'] is not None else "-"
+                print(f"  [aplicada]  {version:03d}_{m['nombre']}  ({m['aplicada_en']:%Y-%m-%d %H:%M}, {duracion})")
+            faltan = pendientes(conn)
+            for m in faltan:
+                print(f"  [pendiente] {m['archivo']}")
+            print(f"{len(faltan)} migraciones pendientes.")
+            return 0
+        aplicadas_ahora = aplicar(conn)
+        for m in aplicadas_ahora:
+            print(f"  {m['archivo']:<40} {m['duracion_ms']:>8} ms")
+        print(f"{len(aplicadas_ahora)} migraciones aplicadas." if aplicadas_ahora else "El esquema ya está al día.")
+        return 0
+    except Exception as e:
+        print(f"ERROR: {e}")
+        return 1
+    finally:
+        pool.devolver(conn)
+        pool.cerrar()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+    sys.exit(main())
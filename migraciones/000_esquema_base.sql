@@ -1,13 +1,10 @@
--- === SCRIPT SQL PARA CREAR BASE DE DATOS RESTIA COMPLETA ===
--- Este script crea la base de datos, tablas, índices, triggers y datos iniciales
--- para el sistema RestIA con funcionalidades avanzadas de reportes y alertas personalizadas.
-
--- 1. CREAR LA BASE DE DATOS (ejecutar como superusuario o en base 'postgres')
--- DESCOMENTA LA SIGUIENTE LÍNEA SI DESEAS CREAR LA BASE DE DATOS DESDE CERO
--- CREATE DATABASE restaurant_db;
-
--- 2. CONECTARSE A LA BASE DE DATOS 'restaurant_db' ANTES DE EJECUTAR EL RESTO DEL SCRIPT
--- \c restaurant_db; -- (Comando para psql)
+-- === 000: ESQUEMA BASE DE RESTIA ===
+-- Tablas, índices, triggers y datos iniciales del sistema RestIA (antes SqlPRO.sql).
+-- Es idempotente: en una base creada con los scripts anteriores sólo agrega lo que
+-- falte, y los datos de ejemplo sólo se cargan en tablas vacías.
+--
+-- Base nueva: CREATE DATABASE restaurant_db; y después python migraciones.py
+-- (el backend también aplica las migraciones pendientes al arrancar).
 
 -- 3. CREAR TABLAS (en orden correcto para respetar dependencias)
 
@@ -106,6 +103,24 @@ CREATE TABLE IF NOT EXISTS pedidos (
     FOREIGN KEY (cliente_id) REFERENCES clientes(id) ON DELETE SET NULL -- Si se borra el cliente, el pedido queda sin cliente
 );
 
+-- Tabla: pedido_items
+-- Líneas de cada pedido en forma normalizada (una fila por elemento de `pedidos.items`),
+-- para reportes y análisis por producto con joins indexados en vez de recorrer el JSONB.
+-- `nombre` y `precio_unitario` son una foto del momento de la venta; `posicion` es el
+-- índice del elemento dentro de `pedidos.items`. La mantiene el backend junto con `items`.
+CREATE TABLE IF NOT EXISTS pedido_items (
+    id SERIAL PRIMARY KEY,
+    pedido_id INTEGER NOT NULL,
+    posicion INTEGER NOT NULL CHECK (posicion >= 0),
+    menu_id INTEGER, -- NULL si el plato ya no existe en el menú
+    nombre VARCHAR(255) NOT NULL,
+    precio_unitario NUMERIC(10, 2) NOT NULL DEFAULT 0,
+    cantidad INTEGER NOT NULL DEFAULT 1 CHECK (cantidad > 0),
+    UNIQUE (pedido_id, posicion),
+    FOREIGN KEY (pedido_id) REFERENCES pedidos(id) ON DELETE CASCADE, -- Las líneas se van con el pedido
+    FOREIGN KEY (menu_id) REFERENCES menu(id) ON DELETE SET NULL -- Borrar un plato no borra su historial de ventas
+);
+
 -- Tabla: reservas
 -- Almacena las reservas de mesas.
 CREATE TABLE IF NOT EXISTS reservas (
@@ -119,6 +134,46 @@ CREATE TABLE IF NOT EXISTS reservas (
     FOREIGN KEY (cliente_id) REFERENCES clientes(id) ON DELETE CASCADE -- Si se elimina el cliente, se elimina la reserva
 );
 
+-- Tabla: contador_pedidos_app
+-- Último número de pedido digital (mesa 99) asignado cada día. Se usa con
+-- INSERT ... ON CONFLICT DO UPDATE para repartir números sin duplicados.
+CREATE TABLE IF NOT EXISTS contador_pedidos_app (
+    fecha DATE PRIMARY KEY,
+    ultimo_numero INTEGER NOT NULL DEFAULT 0
+);
+
+-- Tabla: pedidos_eliminados
+-- Tombstones de pedidos borrados para el feed de cambios (/pedidos/activos/cambios).
+-- Se llena con un trigger AFTER DELETE y se purga sola después de un día.
+CREATE TABLE IF NOT EXISTS pedidos_eliminados (
+    pedido_id INTEGER NOT NULL,
+    eliminado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Tabla: resumen_ventas_hora / resumen_ventas_producto
+-- Resumen de ventas pre-agregado por hora (y por producto) para los reportes.
+-- Solo cuentan pedidos 'Entregado'/'Pagado'; lo mantiene el trigger trigger_resumen_ventas,
+-- la migración 009 lo llena con el historial y se reconstruye con:
+-- python resumen_ventas.py --reconstruir
+CREATE TABLE IF NOT EXISTS resumen_ventas_hora (
+    fecha DATE NOT NULL,
+    hora SMALLINT NOT NULL CHECK (hora BETWEEN 0 AND 23),
+    pedidos INTEGER NOT NULL DEFAULT 0,
+    unidades INTEGER NOT NULL DEFAULT 0,
+    ingresos NUMERIC(12, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, hora)
+);
+
+CREATE TABLE IF NOT EXISTS resumen_ventas_producto (
+    fecha DATE NOT NULL,
+    hora SMALLINT NOT NULL CHECK (hora BETWEEN 0 AND 23),
+    producto VARCHAR(255) NOT NULL,
+    unidades INTEGER NOT NULL DEFAULT 0,
+    ingresos NUMERIC(12, 2) NOT NULL DEFAULT 0,
+    pedidos INTEGER NOT NULL DEFAULT 0, -- Pedidos que incluyen el producto
+    PRIMARY KEY (fecha, hora, producto)
+);
+
 -- Tabla: configuraciones (almacenada localmente en JSON, pero definida aquí por si acaso)
 -- Esta tabla se usa en configuraciones_backend.py.
 CREATE TABLE IF NOT EXISTS configuraciones (
@@ -140,9 +195,18 @@ CREATE INDEX IF NOT EXISTS idx_pedidos_mesa_estado_activos ON pedidos (mesa_nume
 -- Índice en pedidos por fecha_hora (para reportes generales)
 CREATE INDEX IF NOT EXISTS idx_pedidos_fecha ON pedidos (fecha_hora);
 
+-- El índice en pedidos por updated_at (feed de cambios) se crea sin bloquear escrituras en 008
+
+-- Índice en pedidos_eliminados por fecha (para el feed de cambios y la purga)
+CREATE INDEX IF NOT EXISTS idx_pedidos_eliminados_fecha ON pedidos_eliminados (eliminado_en);
+
 -- Índice en pedidos por mesa_numero (para vistas de mesas)
 CREATE INDEX IF NOT EXISTS idx_pedidos_mesa ON pedidos (mesa_numero);
 
+-- Índices en pedido_items (el UNIQUE (pedido_id, posicion) ya cubre el join con pedidos)
+CREATE INDEX IF NOT EXISTS idx_pedido_items_menu ON pedido_items (menu_id);
+CREATE INDEX IF NOT EXISTS idx_pedido_items_nombre ON pedido_items (nombre);
+
 -- Índice en inventario por cantidad_disponible y cantidad_minima_alerta (para alertas de stock)
 CREATE INDEX IF NOT EXISTS idx_inventario_stock ON inventario (cantidad_disponible, cantidad_minima_alerta);
 
@@ -169,11 +233,92 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+DROP TRIGGER IF EXISTS trigger_actualizar_fecha_pedido ON pedidos;
 CREATE TRIGGER trigger_actualizar_fecha_pedido
     BEFORE UPDATE ON pedidos
     FOR EACH ROW
     EXECUTE FUNCTION actualizar_fecha_pedido();
 
+-- Trigger para dejar un tombstone en `pedidos_eliminados` después de cada DELETE en `pedidos`
+CREATE OR REPLACE FUNCTION registrar_pedido_eliminado()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO pedidos_eliminados (pedido_id) VALUES (OLD.id);
+    DELETE FROM pedidos_eliminados WHERE eliminado_en < CURRENT_TIMESTAMP - INTERVAL '1 day';
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_registrar_pedido_eliminado ON pedidos;
+CREATE TRIGGER trigger_registrar_pedido_eliminado
+    AFTER DELETE ON pedidos
+    FOR EACH ROW
+    EXECUTE FUNCTION registrar_pedido_eliminado();
+
+-- Trigger para mantener `resumen_ventas_hora` / `resumen_ventas_producto` cuando un pedido
+-- entra, cambia o sale de los estados 'Entregado'/'Pagado' (resta lo viejo y suma lo nuevo)
+CREATE OR REPLACE FUNCTION aplicar_pedido_a_resumen(p_fecha_hora TIMESTAMP, p_items JSONB, p_signo INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    -- Un error aquí abortaría el pedido: cualquier cosa que no sea un arreglo cuenta como vacío
+    IF p_items IS NULL OR jsonb_typeof(p_items) <> 'array' THEN
+        p_items := '[]'::jsonb;
+    END IF;
+    -- Un pedido sin ítems igual cuenta como pedido (COUNT sobre cero filas devuelve una fila)
+    INSERT INTO resumen_ventas_hora AS r (fecha, hora, pedidos, unidades, ingresos)
+    SELECT p_fecha_hora::date, EXTRACT(HOUR FROM p_fecha_hora), p_signo,
+           p_signo * COUNT(*), p_signo * COALESCE(SUM((i ->> 'precio')::numeric), 0)
+    FROM jsonb_array_elements(p_items) AS i
+    ON CONFLICT (fecha, hora) DO UPDATE SET
+        pedidos = r.pedidos + EXCLUDED.pedidos,
+        unidades = r.unidades + EXCLUDED.unidades,
+        ingresos = r.ingresos + EXCLUDED.ingresos;
+
+    INSERT INTO resumen_ventas_producto AS r (fecha, hora, producto, unidades, ingresos, pedidos)
+    SELECT p_fecha_hora::date, EXTRACT(HOUR FROM p_fecha_hora), i ->> 'nombre',
+           p_signo * COUNT(*), p_signo * COALESCE(SUM((i ->> 'precio')::numeric), 0), p_signo
+    FROM jsonb_array_elements(p_items) AS i
+    WHERE i ->> 'nombre' IS NOT NULL AND i ->> 'nombre' <> ''
+    GROUP BY i ->> 'nombre'
+    ON CONFLICT (fecha, hora, producto) DO UPDATE SET
+        unidades = r.unidades + EXCLUDED.unidades,
+        ingresos = r.ingresos + EXCLUDED.ingresos,
+        pedidos = r.pedidos + EXCLUDED.pedidos;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION actualizar_resumen_ventas()
+RETURNS TRIGGER AS $$
+DECLARE
+    contaba BOOLEAN := FALSE;
+    cuenta BOOLEAN := FALSE;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        contaba := OLD.estado IN ('Entregado', 'Pagado') AND OLD.fecha_hora IS NOT NULL;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        cuenta := NEW.estado IN ('Entregado', 'Pagado') AND NEW.fecha_hora IS NOT NULL;
+    END IF;
+    -- Entregado → Pagado sin cambios en ítems ni fecha: el pedido ya está contado
+    IF contaba AND cuenta AND OLD.items = NEW.items AND OLD.fecha_hora = NEW.fecha_hora THEN
+        RETURN NULL;
+    END IF;
+    IF contaba THEN
+        PERFORM aplicar_pedido_a_resumen(OLD.fecha_hora, OLD.items, -1);
+    END IF;
+    IF cuenta THEN
+        PERFORM aplicar_pedido_a_resumen(NEW.fecha_hora, NEW.items, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_resumen_ventas ON pedidos;
+CREATE TRIGGER trigger_resumen_ventas
+    AFTER INSERT OR UPDATE OR DELETE ON pedidos
+    FOR EACH ROW
+    EXECUTE FUNCTION actualizar_resumen_ventas();
+
 -- Trigger para actualizar `fecha_actualizacion` en `inventario` antes de cada UPDATE
 CREATE OR REPLACE FUNCTION actualizar_fecha_inventario()
 RETURNS TRIGGER AS $$
@@ -183,6 +328,7 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+DROP TRIGGER IF EXISTS trigger_actualizar_fecha_inventario ON inventario;
 CREATE TRIGGER trigger_actualizar_fecha_inventario
     BEFORE UPDATE ON inventario
     FOR EACH ROW
@@ -197,21 +343,26 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+DROP TRIGGER IF EXISTS trigger_actualizar_fecha_receta ON recetas;
 CREATE TRIGGER trigger_actualizar_fecha_receta
     BEFORE UPDATE ON recetas
     FOR EACH ROW
     EXECUTE FUNCTION actualizar_fecha_receta();
 
--- 6. Insertar datos de ejemplo para probar
+-- 6. Insertar datos de ejemplo para probar (sólo si la tabla está vacía: una base
+--    en uso no recibe clientes de prueba ni recupera platos que se borraron)
 
 -- Clientes de ejemplo
-INSERT INTO clientes (nombre, domicilio, celular) VALUES
+INSERT INTO clientes (nombre, domicilio, celular)
+SELECT v.* FROM (VALUES
 ('Cliente de Prueba 1', 'Calle Falsa 123', '123456789'),
 ('Cliente de Prueba 2', 'Avenida Siempre Viva 742', '987654321')
-ON CONFLICT (id) DO NOTHING;
+) AS v(nombre, domicilio, celular)
+WHERE NOT EXISTS (SELECT 1 FROM clientes);
 
 -- Ítems de menú de ejemplo (tu menú original)
-INSERT INTO menu (nombre, precio, tipo) VALUES
+INSERT INTO menu (nombre, precio, tipo)
+SELECT v.* FROM (VALUES
 -- Entradas
 ('Empanada Kunai', 70.00, 'Entradas'),
 ('Dedos de queso (5pz)', 75.00, 'Entradas'),
@@ -291,22 +442,25 @@ INSERT INTO menu (nombre, precio, tipo) VALUES
 ('Tampico', 25.00, 'Extras'),
 ('Siracha', 10.00, 'Extras'),
 ('Soya', 10.00, 'Extras')
-ON CONFLICT (id) DO NOTHING;
+) AS v(nombre, precio, tipo)
+WHERE NOT EXISTS (SELECT 1 FROM menu);
 
 -- Ingredientes de inventario de ejemplo
-INSERT INTO inventario (nombre, descripcion, cantidad_disponible, unidad_medida, cantidad_minima, cantidad_minima_alerta) VALUES
+INSERT INTO inventario (nombre, descripcion, cantidad_disponible, unidad_medida, cantidad_minima, cantidad_minima_alerta)
+SELECT v.* FROM (VALUES
 ('Pollo', 'Pechuga de pollo fresco', 20.0, 'kg', 2.0, 5.0),
 ('Arroz', 'Arroz blanco grano largo', 10.0, 'kg', 1.0, 2.0),
 ('Salsa de Soja', 'Salsa de soja light', 5.0, 'lt', 0.5, 1.0),
 ('Camaron', 'Camaron crudo', 15.0, 'kg', 1.0, 3.0),
 ('Verduras Mixtas', 'Mezcla de verduras congeladas', 8.0, 'kg', 1.0, 2.0)
-ON CONFLICT (id) DO NOTHING;
+) AS v(nombre, descripcion, cantidad_disponible, unidad_medida, cantidad_minima, cantidad_minima_alerta)
+WHERE NOT EXISTS (SELECT 1 FROM inventario);
 
 -- Recetas de ejemplo (asociadas a ítems del menú)
--- Suponiendo que 'Yakimeshi Especial' tiene id 10 en la tabla menu
-INSERT INTO recetas (nombre_plato, descripcion, instrucciones) VALUES
-('Yakimeshi Especial', 'Yakimeshi con camarones y verduras', 'Saltear arroz con verduras, agregar camarones y salsa.')
-ON CONFLICT (id) DO NOTHING;
+INSERT INTO recetas (nombre_plato, descripcion, instrucciones)
+SELECT 'Yakimeshi Especial', 'Yakimeshi con camarones y verduras', 'Saltear arroz con verduras, agregar camarones y salsa.'
+WHERE NOT EXISTS (SELECT 1 FROM recetas)
+  AND EXISTS (SELECT 1 FROM menu WHERE nombre = 'Yakimeshi Especial');
 
 -- Asociar ingredientes a la receta 'Yakimeshi Especial' (suponiendo receta_id = 1, Arroz id = 2, Camaron id = 4, Verduras id = 5)
 -- Ajusta los IDs si no coinciden con tu inserción real
@@ -321,4 +475,6 @@ ON CONFLICT (id) DO NOTHING;
 -- ('Stock Basico', 'Ingredientes iniciales comunes', '[{"nombre": "Pollo", "cantidad": 10, "unidad": "kg"}, {"nombre": "Arroz", "cantidad": 5, "unidad": "kg"}]')
 -- ON CONFLICT (id) DO NOTHING;
 
+-- El historial de pedido_items y del resumen de ventas se llena en 009, por lotes
+
 -- Fin del script
\ No newline at end of file
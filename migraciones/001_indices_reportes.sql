@@ -0,0 +1,16 @@
+-- migracion: sin-transaccion
+-- 001: índices para las consultas de reportes y reservas por rango de fechas.
+-- Las consultas comparan la columna TIMESTAMP directamente (rangos semiabiertos
+-- [desde, hasta)), así que estos índices se pueden usar; DATE(columna) no los usaría.
+-- CONCURRENTLY: el backend puede aplicarla al arrancar con el local abierto y no frena
+-- los pedidos ni las reservas mientras se construyen.
+
+-- Pedidos cerrados por estado y fecha (/reportes/rango, reconstrucción del resumen de ventas).
+-- Parcial: sólo indexa 'Entregado'/'Pagado', que es lo que leen los reportes.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pedidos_cerrados_estado_fecha
+    ON pedidos (estado, fecha_hora)
+    WHERE estado IN ('Entregado', 'Pagado');
+
+-- Reservas de una mesa desde una fecha (/mesas: reservas de hoy en adelante por mesa)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reservas_mesa_inicio
+    ON reservas (mesa_numero, fecha_hora_inicio);
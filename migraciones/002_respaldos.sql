@@ -0,0 +1,22 @@
+-- 002: trabajos de respaldo (POST /backup). El estado vive en la base de datos para que
+-- cualquier worker de uvicorn pueda responder el GET /backup/{id} del trabajo.
+CREATE TABLE IF NOT EXISTS respaldos (
+    id SERIAL PRIMARY KEY,
+    estado VARCHAR(20) NOT NULL DEFAULT 'pendiente'
+        CHECK (estado IN ('pendiente', 'en_curso', 'completado', 'fallido')),
+    progreso NUMERIC(5, 2) NOT NULL DEFAULT 0, -- Porcentaje estimado por tamaño de las tablas ya volcadas
+    mensaje TEXT NOT NULL DEFAULT '',
+    ruta TEXT, -- Directorio del respaldo (formato directorio de pg_dump, comprimido)
+    tamano_bytes BIGINT,
+    creado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    iniciado_en TIMESTAMP,
+    terminado_en TIMESTAMP,
+    actualizado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP, -- Latido del proceso que lo ejecuta
+    eliminado_en TIMESTAMP -- Borrado por la política de retención
+);
+
+-- A lo sumo un respaldo pendiente o en curso a la vez
+CREATE UNIQUE INDEX IF NOT EXISTS idx_respaldos_uno_activo ON respaldos ((TRUE))
+    WHERE estado IN ('pendiente', 'en_curso');
+
+CREATE INDEX IF NOT EXISTS idx_respaldos_creado ON respaldos (creado_en DESC);
@@ -0,0 +1,26 @@
+-- 003: respaldos por streaming y diferenciales (respaldo_streaming.py).
+-- El respaldo diferencial exporta sólo los pedidos/reservas con `updated_at` posterior
+-- al respaldo anterior, así que `reservas` necesita la misma columna que `pedidos`.
+ALTER TABLE reservas ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+UPDATE reservas SET updated_at = created_at WHERE created_at IS NOT NULL AND updated_at > created_at;
+
+CREATE OR REPLACE FUNCTION actualizar_fecha_reserva()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_actualizar_fecha_reserva ON reservas;
+CREATE TRIGGER trigger_actualizar_fecha_reserva
+    BEFORE UPDATE ON reservas
+    FOR EACH ROW
+    EXECUTE FUNCTION actualizar_fecha_reserva();
+
+-- El índice sobre reservas.updated_at se crea sin bloquear escrituras en 006
+
+-- Modo de cada trabajo de respaldo; un diferencial apunta al respaldo sobre el que se aplica
+ALTER TABLE respaldos ADD COLUMN IF NOT EXISTS modo VARCHAR(20) NOT NULL DEFAULT 'pg_dump'
+    CHECK (modo IN ('pg_dump', 'completo', 'diferencial'));
+ALTER TABLE respaldos ADD COLUMN IF NOT EXISTS base_id INTEGER REFERENCES respaldos(id);
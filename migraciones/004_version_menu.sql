@@ -0,0 +1,48 @@
+-- 004: versión del menú para la caché de GET /menu/items (menu_cache.py).
+-- Cualquier sentencia que modifique `menu` sube la versión en la misma transacción, así que
+-- quien lea versión y filas en una misma foto (REPEATABLE READ) obtiene un par coherente.
+-- La versión es la misma para todos los workers de uvicorn y viaja en el ETag.
+-- Cada cambio de versión publica `menu_actualizado` en el canal del hub de eventos
+-- (eventos_hub.CANAL_EVENTOS) al hacer commit, venga de la API, de psql o de una restauración.
+CREATE TABLE IF NOT EXISTS menu_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id), -- Una sola fila
+    version BIGINT NOT NULL DEFAULT 1
+);
+INSERT INTO menu_version (id, version) VALUES (TRUE, 1) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION avanzar_version_menu()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE menu_version SET version = version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_version_menu ON menu;
+CREATE TRIGGER trigger_version_menu
+    AFTER INSERT OR UPDATE OR DELETE ON menu
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION avanzar_version_menu();
+
+DROP TRIGGER IF EXISTS trigger_version_menu_truncate ON menu;
+CREATE TRIGGER trigger_version_menu_truncate
+    AFTER TRUNCATE ON menu
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION avanzar_version_menu();
+
+CREATE OR REPLACE FUNCTION notificar_version_menu()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('restaurantia_eventos', json_build_object(
+        'tipo', 'menu_actualizado',
+        'data', json_build_object('version', NEW.version)
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_notificar_version_menu ON menu_version;
+CREATE TRIGGER trigger_notificar_version_menu
+    AFTER UPDATE ON menu_version
+    FOR EACH ROW
+    EXECUTE FUNCTION notificar_version_menu();
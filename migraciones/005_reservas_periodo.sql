@@ -0,0 +1,40 @@
+-- 005: intervalo de cada reserva como rango, para disponibilidad y contra la doble reserva.
+-- `periodo` es [inicio, fin) calculado por la propia base (sin fin = 1 hora, como crea las
+-- reservas la API). Es tsrange y no tstzrange porque las columnas son TIMESTAMP sin zona:
+-- así la expresión es inmutable y sirve para una columna generada.
+-- Semiabierto: una reserva que termina a las 21:00 no choca con otra que empieza a las 21:00.
+ALTER TABLE reservas ADD COLUMN IF NOT EXISTS periodo TSRANGE GENERATED ALWAYS AS (
+    tsrange(
+        fecha_hora_inicio,
+        -- Un fin anterior al inicio (dato viejo mal cargado) daría error: queda como rango vacío
+        GREATEST(COALESCE(fecha_hora_fin, fecha_hora_inicio + INTERVAL '1 hour'), fecha_hora_inicio),
+        '[)'
+    )
+) STORED;
+
+-- Dos reservas de la misma mesa no pueden solaparse. La mesa va como int4range de un solo
+-- valor para no depender de la extensión btree_gist. El índice GiST de la restricción
+-- (periodo primero) es también el que usan las consultas de disponibilidad.py.
+-- Si ya hay solapes guardados no se puede crear: se avisa cuáles y se deja un índice GiST
+-- sobre periodo para las consultas; la restricción se agrega a mano al corregirlos.
+DO $$
+DECLARE
+    solapes TEXT;
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'reservas_sin_solape') THEN
+        RETURN;
+    END IF;
+
+    SELECT string_agg(format('mesa %s: reservas %s y %s', a.mesa_numero, a.id, b.id), '; ')
+    INTO solapes
+    FROM reservas a
+    JOIN reservas b ON a.mesa_numero = b.mesa_numero AND a.id < b.id AND a.periodo && b.periodo;
+
+    IF solapes IS NULL THEN
+        ALTER TABLE reservas ADD CONSTRAINT reservas_sin_solape
+            EXCLUDE USING gist (periodo WITH &&, int4range(mesa_numero, mesa_numero, '[]') WITH &&);
+    ELSE
+        RAISE WARNING 'Reservas solapadas, no se crea reservas_sin_solape → %', solapes;
+        CREATE INDEX IF NOT EXISTS idx_reservas_periodo ON reservas USING gist (periodo);
+    END IF;
+END $$;
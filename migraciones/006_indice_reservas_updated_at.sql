@@ -0,0 +1,5 @@
+-- migracion: sin-transaccion
+-- 006: índice de reservas por updated_at para el respaldo diferencial (respaldo_streaming.py),
+-- que lee las reservas cambiadas desde el respaldo anterior. Estaba en 003, dentro de la
+-- transacción, bloqueando las escrituras en reservas mientras se construía.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reservas_updated_at ON reservas (updated_at);
@@ -0,0 +1,3 @@
+-- 007: proceso dueño de cada trabajo de respaldo ("servidor:pid", respaldos.PROPIETARIO).
+-- Un trabajo sin latido sólo se da por interrumpido si ese proceso ya no existe.
+ALTER TABLE respaldos ADD COLUMN IF NOT EXISTS propietario TEXT;
@@ -0,0 +1,5 @@
+-- migracion: sin-transaccion
+-- 008: índice de pedidos por updated_at para el feed de cambios (/pedidos/activos/cambios).
+-- Estaba en 000, dentro de su transacción: en un local con historial bloqueaba los pedidos
+-- nuevos y los cambios de estado mientras se construía.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pedidos_updated_at ON pedidos (updated_at);
@@ -0,0 +1,83 @@
+-- migracion: sin-transaccion
+-- 009: llena pedido_items y el resumen de ventas con los pedidos que ya existían.
+-- Corre por lotes, cada uno en su propia transacción (procedimientos con COMMIT llamados en
+-- autocommit), para no tener bloqueado `pedidos` ni el resumen mientras recorre todo el
+-- historial: entre lote y lote el local sigue tomando y cerrando pedidos.
+
+-- pedido_items: de a `lote` ids de pedido, sólo los pedidos que aún no tienen líneas.
+-- ON CONFLICT: el backend pudo escribir las líneas de un pedido mientras tanto
+CREATE OR REPLACE PROCEDURE migracion_009_pedido_items(lote INTEGER)
+LANGUAGE plpgsql AS $$
+DECLARE
+    desde INTEGER;
+    ultimo INTEGER;
+BEGIN
+    SELECT MIN(id), MAX(id) INTO desde, ultimo FROM pedidos;
+    WHILE desde <= ultimo LOOP
+        INSERT INTO pedido_items (pedido_id, posicion, menu_id, nombre, precio_unitario, cantidad)
+        SELECT p.id, i.posicion - 1, m.id, COALESCE(i.item ->> 'nombre', ''),
+               COALESCE((i.item ->> 'precio')::numeric, 0), GREATEST(COALESCE((i.item ->> 'cantidad')::int, 1), 1)
+        FROM pedidos p
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(p.items) = 'array' THEN p.items ELSE '[]'::jsonb END
+        ) WITH ORDINALITY AS i(item, posicion)
+        LEFT JOIN menu m ON m.nombre = i.item ->> 'nombre'
+        WHERE p.id >= desde AND p.id < desde + lote
+          AND NOT EXISTS (SELECT 1 FROM pedido_items pi WHERE pi.pedido_id = p.id)
+        ON CONFLICT (pedido_id, posicion) DO NOTHING;
+        COMMIT;
+        desde := desde + lote;
+    END LOOP;
+END $$;
+
+-- Resumen de ventas: mes por mes se borra y se recalcula desde `pedidos`, igual que
+-- resumen_ventas.reconstruir (mismo cálculo y mismo bloqueo EXCLUSIVE, sólo durante el mes:
+-- un pedido que se cierra mientras tanto espera y suma su parte sobre el mes ya recalculado).
+-- Recalcular en vez de insertar deja bien también lo que el trigger ya sumó
+CREATE OR REPLACE PROCEDURE migracion_009_resumen_ventas()
+LANGUAGE plpgsql AS $$
+DECLARE
+    mes DATE;
+    ultimo DATE;
+BEGIN
+    SELECT date_trunc('month', MIN(fecha_hora))::date, date_trunc('month', MAX(fecha_hora))::date
+    INTO mes, ultimo
+    FROM pedidos
+    WHERE estado IN ('Entregado', 'Pagado');
+    WHILE mes <= ultimo LOOP
+        LOCK TABLE resumen_ventas_hora, resumen_ventas_producto IN EXCLUSIVE MODE;
+        DELETE FROM resumen_ventas_hora WHERE fecha >= mes AND fecha < (mes + INTERVAL '1 month')::date;
+        DELETE FROM resumen_ventas_producto WHERE fecha >= mes AND fecha < (mes + INTERVAL '1 month')::date;
+
+        INSERT INTO resumen_ventas_hora (fecha, hora, pedidos, unidades, ingresos)
+        SELECT p.fecha_hora::date, EXTRACT(HOUR FROM p.fecha_hora),
+               COUNT(DISTINCT p.id), COUNT(i.item), COALESCE(SUM((i.item ->> 'precio')::numeric), 0)
+        FROM pedidos p
+        LEFT JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(p.items) = 'array' THEN p.items ELSE '[]'::jsonb END
+        ) AS i(item) ON TRUE
+        WHERE p.estado IN ('Entregado', 'Pagado')
+          AND p.fecha_hora >= mes AND p.fecha_hora < mes + INTERVAL '1 month'
+        GROUP BY 1, 2;
+
+        INSERT INTO resumen_ventas_producto (fecha, hora, producto, unidades, ingresos, pedidos)
+        SELECT p.fecha_hora::date, EXTRACT(HOUR FROM p.fecha_hora), i.item ->> 'nombre',
+               COUNT(*), COALESCE(SUM((i.item ->> 'precio')::numeric), 0), COUNT(DISTINCT p.id)
+        FROM pedidos p
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(p.items) = 'array' THEN p.items ELSE '[]'::jsonb END
+        ) AS i(item)
+        WHERE p.estado IN ('Entregado', 'Pagado')
+          AND p.fecha_hora >= mes AND p.fecha_hora < mes + INTERVAL '1 month'
+          AND i.item ->> 'nombre' IS NOT NULL AND i.item ->> 'nombre' <> ''
+        GROUP BY 1, 2, 3;
+        COMMIT;
+        mes := (mes + INTERVAL '1 month')::date;
+    END LOOP;
+END $$;
+
+CALL migracion_009_pedido_items(5000);
+CALL migracion_009_resumen_ventas();
+
+DROP PROCEDURE migracion_009_pedido_items(INTEGER);
+DROP PROCEDURE migracion_009_resumen_ventas();
@@ -1,22 +1,15 @@
 # recetas_backend.py
 # Backend API para gestionar recetas e ingredientes de recetas.
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from pydantic import BaseModel
 from typing import List
-import psycopg2
-from psycopg2.extras import RealDictCursor
 import json
 
-# Configuración directa de PostgreSQL
-DATABASE_URL = "dbname=restaurant_db user=postgres password=postgres host=localhost port=5432"
-
-def get_db():
-    conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
-    try:
-        yield conn
-    finally:
-        conn.close()
+# Conexiones prestadas por el pool compartido (ver db_pool.py)
+from db_pool import get_db
+from recetas_cache import cache_recetas
+from etag_respuestas import respuesta_con_etag
 
 # Modelos Pydantic para Recetas e Ingredientes de Recetas
 class IngredienteRecetaCreate(BaseModel):
@@ -56,7 +49,7 @@ recetas_app = FastAPI(title="Recetas API")
 # --- ENDPOINTS PARA RECETAS ---
 
 @recetas_app.get("/", response_model=List[RecetaResponse])
-def obtener_recetas(conn = Depends(get_db)):
+def obtener_recetas(request: Request, conn = Depends(get_db)):
     """
     Obtiene todas las recetas con sus ingredientes.
     """
@@ -99,7 +92,7 @@ def obtener_recetas(conn = Depends(get_db)):
                     ]
                 })
 
-            return resultado
+            return respuesta_con_etag(request, resultado, List[RecetaResponse])
     except Exception as e:
         print(f"Error en obtener_recetas: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor al obtener recetas.")
@@ -191,6 +184,7 @@ def crear_receta(receta: RecetaCreate, conn = Depends(get_db)):
                 """, (receta_id, ing.ingrediente_id, ing.cantidad_necesaria, ing.unidad_medida_necesaria))
 
             conn.commit()
+            cache_recetas.invalidar(receta.nombre_plato)
             
             # Retornar la receta creada (opcional: llamar a obtener_receta_por_plato)
             return obtener_receta_por_plato(receta.nombre_plato, conn)
@@ -251,6 +245,8 @@ def actualizar_receta(nombre_plato: str, receta_actualizada: RecetaUpdate, conn
                 """, (receta_id, ing.ingrediente_id, ing.cantidad_necesaria, ing.unidad_medida_necesaria))
 
             conn.commit()
+            # Si se renombró, el nombre anterior y el nuevo cambian de receta
+            cache_recetas.invalidar(nombre_plato, receta_actualizada.nombre_plato)
             
             # Retornar la receta actualizada (opcional: llamar a obtener_receta_por_plato)
             nombre_para_retorno = receta_actualizada.nombre_plato if receta_actualizada.nombre_plato is not None else nombre_plato
@@ -283,6 +279,7 @@ def eliminar_receta(nombre_plato: str, conn = Depends(get_db)):
             # La FK con ON DELETE CASCADE hará el resto
             cursor.execute("DELETE FROM recetas WHERE nombre_plato = %s", (nombre_plato,))
             conn.commit()
+            cache_recetas.invalidar(nombre_plato)
             return {"status": "ok", "message": "Receta eliminada"}
 
     except HTTPException:
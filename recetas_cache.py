@@ -0,0 +1,142 @@
+# === RECETAS_CACHE.PY ===
+# Caché en memoria de las recetas (lista de materiales) usada al crear pedidos.
+# Mapea nombre_plato → [(ingrediente_id, cantidad_necesaria), ...]. Un plato sin receta
+# se guarda como lista vacía para no volver a consultarlo.
+
+import threading
+import logging
+from decimal import Decimal
+from typing import Dict, List, Tuple, Iterable, Any
+
+log = logging.getLogger("RestaurantIA")
+
+ListaMateriales = List[Tuple[int, Decimal]]
+
+
+class CacheRecetas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recetas: Dict[str, ListaMateriales] = {}
+        # Cada invalidación sube la generación; una carga que empezó antes no se guarda
+        self._generacion = 0
+        self._aciertos = 0
+        self._fallos = 0
+        self._invalidaciones = 0
+        self._cargas_bd = 0
+
+    @staticmethod
+    def _agrupar(filas) -> Dict[str, ListaMateriales]:
+        recetas: Dict[str, ListaMateriales] = {}
+        for fila in filas:
+            ingredientes = recetas.setdefault(fila['nombre_plato'], [])
+            if fila['ingrediente_id'] is not None:
+                ingredientes.append((fila['ingrediente_id'], fila['cantidad_necesaria']))
+        return recetas
+
+    # === CARGA ===
+    def cargar_todo(self, conn) -> int:
+        """Carga todos los platos del menú con su receta (o lista vacía si no tienen)."""
+        with self._lock:
+            generacion = self._generacion
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT m.nombre AS nombre_plato, ir.ingrediente_id, ir.cantidad_necesaria
+                FROM menu m
+                LEFT JOIN recetas r ON r.nombre_plato = m.nombre
+                LEFT JOIN ingredientes_recetas ir ON ir.receta_id = r.id
+            """)
+            recetas = self._agrupar(cursor.fetchall())
+        conn.rollback()
+        with self._lock:
+            self._cargas_bd += 1
+            if generacion == self._generacion:
+                self._recetas = recetas
+        log.info(f"Caché de recetas cargada → {len(recetas)} platos | {sum(1 for r in recetas.values() if r)} con receta")
+        return len(recetas)
+
+    def _buscar(self, nombres: Iterable[str]) -> Tuple[Dict[str, ListaMateriales], List[str], int]:
+        resultado: Dict[str, ListaMateriales] = {}
+        faltantes = []
+        with self._lock:
+            generacion = self._generacion
+            for nombre in dict.fromkeys(nombres):
+                if nombre in self._recetas:
+                    resultado[nombre] = self._recetas[nombre]
+                    self._aciertos += 1
+                else:
+                    faltantes.append(nombre)
+                    self._fallos += 1
+        return resultado, faltantes, generacion
+
+    def _guardar(self, cargadas: Dict[str, ListaMateriales], faltantes: List[str], generacion: int) -> None:
+        with self._lock:
+            self._cargas_bd += 1
+            if generacion == self._generacion:
+                self._recetas.update(cargadas)
+        log.debug(f"Caché de recetas → {len(faltantes)} platos leídos de BD: {', '.join(faltantes)}")
+
+    def obtener(self, cursor, nombres: Iterable[str]) -> Dict[str, ListaMateriales]:
+        """
+        Devuelve la lista de materiales de cada plato pedido. Los platos que no están
+        en caché se leen de la BD en una sola consulta con el cursor del llamador.
+        """
+        resultado, faltantes, generacion = self._buscar(nombres)
+        if faltantes:
+            cursor.execute("""
+                SELECT p.nombre_plato, ir.ingrediente_id, ir.cantidad_necesaria
+                FROM unnest(%s::text[]) AS p(nombre_plato)
+                LEFT JOIN recetas r ON r.nombre_plato = p.nombre_plato
+                LEFT JOIN ingredientes_recetas ir ON ir.receta_id = r.id
+            """, (faltantes,))
+            cargadas = self._agrupar(cursor.fetchall())
+            resultado.update(cargadas)
+            self._guardar(cargadas, faltantes, generacion)
+        return resultado
+
+    async def obtener_async(self, conn, nombres: Iterable[str]) -> Dict[str, ListaMateriales]:
+        """obtener() con una conexión asyncpg (db_async.py)."""
+        resultado, faltantes, generacion = self._buscar(nombres)
+        if faltantes:
+            filas = await conn.fetch("""
+                SELECT p.nombre_plato, ir.ingrediente_id, ir.cantidad_necesaria
+                FROM unnest($1::text[]) AS p(nombre_plato)
+                LEFT JOIN recetas r ON r.nombre_plato = p.nombre_plato
+                LEFT JOIN ingredientes_recetas ir ON ir.receta_id = r.id
+            """, faltantes)
+            cargadas = self._agrupar(filas)
+            resultado.update(cargadas)
+            self._guardar(cargadas, faltantes, generacion)
+        return resultado
+
+    # === INVALIDACIÓN (llamar DESPUÉS del commit) ===
+    def invalidar(self, *nombres_plato: str) -> None:
+        with self._lock:
+            self._generacion += 1
+            for nombre in nombres_plato:
+                if nombre is not None:
+                    self._recetas.pop(nombre, None)
+                    self._invalidaciones += 1
+        log.debug(f"Caché de recetas invalidada → {', '.join(n for n in nombres_plato if n)}")
+
+    def invalidar_todo(self) -> None:
+        with self._lock:
+            self._generacion += 1
+            self._invalidaciones += len(self._recetas)
+            self._recetas = {}
+        log.info("Caché de recetas vaciada por completo")
+
+    # === MÉTRICAS ===
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self._aciertos + self._fallos
+            return {
+                "platos_en_cache": len(self._recetas),
+                "aciertos": self._aciertos,
+                "fallos": self._fallos,
+                "tasa_aciertos": round(self._aciertos / consultas, 3) if consultas else 0.0,
+                "invalidaciones": self._invalidaciones,
+                "cargas_bd": self._cargas_bd,
+            }
+
+
+cache_recetas = CacheRecetas()
@@ -4,6 +4,8 @@
 import requests
 from typing import List, Dict, Any
 
+from http_sesion import sesion, get_condicional, TIMEOUT_SEGUNDOS
+
 class RecetasService:
     def __init__(self, base_url: str = "http://127.0.0.1:8000"):
         self.base_url = base_url.rstrip("/")
@@ -11,14 +13,13 @@ class RecetasService:
     # === MÉTODO: obtener_recetas ===
     # Obtiene todas las recetas desde el backend.
     def obtener_recetas(self) -> List[Dict[str, Any]]:
-        r = requests.get(f"{self.base_url}/recetas/")
-        r.raise_for_status()
-        return r.json()
+        # GET condicional: 304 y copia local si las recetas no cambiaron
+        return get_condicional(f"{self.base_url}/recetas/")
 
     # === MÉTODO: obtener_receta_por_plato ===
     # Obtiene una receta específica por el nombre del plato.
     def obtener_receta_por_plato(self, nombre_plato: str) -> Dict[str, Any]:
-        r = requests.get(f"{self.base_url}/recetas/{nombre_plato}")
+        r = sesion.get(f"{self.base_url}/recetas/{nombre_plato}", timeout=TIMEOUT_SEGUNDOS)
         r.raise_for_status()
         return r.json()
 
@@ -41,7 +42,7 @@ class RecetasService:
             "instrucciones": instrucciones,
             "ingredientes": ingredientes
         }
-        r = requests.post(f"{self.base_url}/recetas/", json=payload)
+        r = sesion.post(f"{self.base_url}/recetas/", json=payload, timeout=TIMEOUT_SEGUNDOS)
         r.raise_for_status()
         return r.json()
 
@@ -66,7 +67,7 @@ class RecetasService:
             # Suponemos que se reemplazan todos los ingredientes
             payload["ingredientes"] = nuevos_ingredientes
 
-        r = requests.put(f"{self.base_url}/recetas/{nombre_plato}", json=payload)
+        r = sesion.put(f"{self.base_url}/recetas/{nombre_plato}", json=payload, timeout=TIMEOUT_SEGUNDOS)
         r.raise_for_status()
         return r.json()
 
@@ -79,7 +80,7 @@ class RecetasService:
         Returns:
             Dict[str, Any]: Mensaje de confirmación.
         """
-        r = requests.delete(f"{self.base_url}/recetas/{nombre_plato}")
+        r = sesion.delete(f"{self.base_url}/recetas/{nombre_plato}", timeout=TIMEOUT_SEGUNDOS)
         r.raise_for_status()
         return r.json()
 
@@ -0,0 +1,320 @@
+# === REPORTE_PDF.PY ===
+# Exportación del reporte a PDF.
+#
+# Los gráficos se dibujan como vectores nativos de ReportLab (reportlab.graphics) con los
+# mismos datos del tablero, así que no pasan por kaleido ni se incrustan como PNG: el PDF
+# pesa poco, se ve nítido a cualquier zoom y exportar no espera al rasterizado.
+#
+# El detalle de pedidos de cocina se escribe fila por fila desde un iterador (en la app,
+# el NDJSON de /reportes/eficiencia_cocina/detalle mientras llega): nunca está la lista
+# entera en memoria. ReportLab sí guarda el contenido de cada página terminada hasta
+# escribir el archivo (lo comprime al final), pero es sólo texto: unos 50 bytes por fila,
+# ~10 MB para 50.000 pedidos. Se escribe en un temporal y se renombra al terminar: un error
+# a mitad de camino no deja un PDF cortado en la ruta elegida.
+
+import os
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from reportlab.graphics import renderPDF
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.linecharts import HorizontalLineChart
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.graphics.widgets.markers import makeMarker
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+log = logging.getLogger("RestaurantIA")
+
+MARGEN = 50
+ALTO_LINEA = 14
+ALTO_FILA = 13
+ANCHO_GRAFICO = 500
+ALTO_GRAFICO = 200
+COLOR_SERIE = colors.HexColor("#636EFA")  # el azul de Plotly, como en pantalla
+
+# Detalle de cocina: (título, clave, ancho en caracteres, formato). Va en letra monoespaciada
+# y cada fila es una sola línea de un texto por página: con decenas de miles de pedidos,
+# dibujar celda por celda es lo que más cuesta
+COLUMNAS_DETALLE = (
+    ("Pedido", "id", 10, lambda v: f"#{v}"),
+    ("Fecha", "fecha_hora", 19, lambda v: str(v)[:16]),
+    ("Mesa", "mesa_numero", 7, str),
+    ("Inicio cocina", "hora_inicio_cocina", 16, lambda v: str(v)[11:19]),
+    ("Fin cocina", "hora_fin_cocina", 16, lambda v: str(v)[11:19]),
+    ("Minutos", "minutos", 8, lambda v: f"{v:.1f}"),
+)
+
+
+# === DOCUMENTO ===
+class _Documento:
+    """Canvas con un cursor vertical: cada bloque pide su alto y pasa de página si no entra."""
+
+    def __init__(self, ruta: str, titulo: str):
+        self.c = canvas.Canvas(ruta, pagesize=letter, pageCompression=1)
+        self.c.setTitle(titulo)
+        self.ancho, self.alto = letter
+        self.pagina = 1
+        self.y = self.alto - MARGEN
+        # Lo que se repite arriba de cada página nueva (el encabezado de una tabla larga)
+        self.al_nueva_pagina: Optional[Callable[[], None]] = None
+
+    def _pie(self) -> None:
+        self.c.setFont("Helvetica", 8)
+        self.c.setFillColor(colors.grey)
+        self.c.drawRightString(self.ancho - MARGEN, MARGEN / 2, f"Página {self.pagina}")
+        self.c.setFillColor(colors.black)
+
+    def nueva_pagina(self) -> None:
+        self._pie()
+        self.c.showPage()
+        self.pagina += 1
+        self.y = self.alto - MARGEN
+        if self.al_nueva_pagina:
+            self.al_nueva_pagina()
+
+    def espacio(self, alto: float) -> None:
+        if self.y - alto < MARGEN:
+            self.nueva_pagina()
+
+    def titulo(self, texto: str, tamano: int = 14) -> None:
+        self.espacio(tamano + 10 + ALTO_LINEA)  # no dejar un título solo al pie
+        self.y -= 6
+        self.c.setFont("Helvetica-Bold", tamano)
+        self.c.drawString(MARGEN, self.y - tamano, texto)
+        self.y -= tamano + 6
+
+    def linea(self, texto: str, tamano: int = 10) -> None:
+        self.espacio(ALTO_LINEA)
+        self.c.setFont("Helvetica", tamano)
+        self.c.drawString(MARGEN, self.y - tamano, texto)
+        self.y -= ALTO_LINEA
+
+    def dibujo(self, dibujo: Drawing) -> None:
+        self.espacio(dibujo.height + 10)
+        renderPDF.draw(dibujo, self.c, MARGEN, self.y - dibujo.height)
+        self.y -= dibujo.height + 10
+
+    def cerrar(self) -> None:
+        self._pie()
+        self.c.save()
+
+
+# === GRÁFICOS VECTORIALES ===
+def _corto(texto: Any, largo: int = 18) -> str:
+    texto = str(texto)
+    return texto if len(texto) <= largo else texto[:largo - 1] + "…"
+
+
+def _lienzo(titulo: str) -> Drawing:
+    dibujo = Drawing(ANCHO_GRAFICO, ALTO_GRAFICO)
+    dibujo.add(String(0, ALTO_GRAFICO - 12, titulo, fontName="Helvetica-Bold", fontSize=10))
+    return dibujo
+
+
+def _ubicar(grafico, etiquetas: Sequence[str], maximo: float) -> None:
+    grafico.x, grafico.y = 45, 50
+    grafico.width, grafico.height = ANCHO_GRAFICO - 60, ALTO_GRAFICO - 80
+    grafico.categoryAxis.categoryNames = [_corto(e) for e in etiquetas]
+    grafico.categoryAxis.labels.fontSize = 7
+    grafico.categoryAxis.labels.angle = 30
+    grafico.categoryAxis.labels.boxAnchor = "ne"
+    grafico.valueAxis.valueMin = 0
+    grafico.valueAxis.valueMax = maximo * 1.1 if maximo > 0 else 1
+    grafico.valueAxis.labels.fontSize = 7
+
+
+def grafico_barras(titulo: str, etiquetas: Sequence[str], valores: Sequence[float]) -> Drawing:
+    dibujo = _lienzo(titulo)
+    grafico = VerticalBarChart()
+    grafico.data = [list(valores)]
+    _ubicar(grafico, etiquetas, max(valores))
+    grafico.bars[0].fillColor = COLOR_SERIE
+    grafico.bars[0].strokeColor = None
+    grafico.barLabelFormat = "%g"
+    grafico.barLabels.fontSize = 6
+    grafico.barLabels.nudge = 6
+    dibujo.add(grafico)
+    return dibujo
+
+
+def grafico_lineas(titulo: str, etiquetas: Sequence[str], valores: Sequence[float]) -> Drawing:
+    dibujo = _lienzo(titulo)
+    grafico = HorizontalLineChart()
+    grafico.data = [list(valores)]
+    _ubicar(grafico, etiquetas, max(valores))
+    grafico.lines[0].strokeColor = COLOR_SERIE
+    grafico.lines[0].strokeWidth = 1.5
+    grafico.lines[0].symbol = makeMarker("FilledCircle", size=3)
+    dibujo.add(grafico)
+    return dibujo
+
+
+# === SECCIONES ===
+def _dinero(valor: float) -> str:
+    return f"${valor:,.2f}"
+
+
+def _variacion(actual: float, anterior: float) -> str:
+    return f"{(actual - anterior) / anterior * 100:+.1f}%" if anterior else "sin datos"
+
+
+def _resumen(doc: _Documento, reporte: Dict[str, Any], anterior: Optional[Dict[str, Any]]) -> None:
+    doc.titulo("Resumen")
+    ventas = reporte.get("ventas_totales", 0)
+    pedidos = reporte.get("pedidos_totales", 0)
+    productos = reporte.get("productos_vendidos", 0)
+    ticket = ventas / pedidos if pedidos else 0
+    filas = [("Ventas totales", _dinero(ventas), ventas, "ventas_totales"),
+             ("Pedidos totales", f"{pedidos:,}", pedidos, "pedidos_totales"),
+             ("Productos vendidos", f"{productos:,}", productos, "productos_vendidos"),
+             ("Ticket promedio", _dinero(ticket), ticket, None)]
+    for nombre, texto, valor, clave in filas:
+        comparacion = ""
+        if anterior is not None:
+            if clave is None:
+                previo = (anterior.get("ventas_totales", 0) / anterior["pedidos_totales"]
+                          if anterior.get("pedidos_totales") else 0)
+            else:
+                previo = anterior.get(clave, 0)
+            comparacion = f"   ({_variacion(valor, previo)} vs período anterior)"
+        doc.linea(f"{nombre}: {texto}{comparacion}")
+
+
+def _productos(doc: _Documento, titulo: str, productos: List[Dict[str, Any]], unidad: str) -> None:
+    doc.titulo(titulo, 12)
+    if not productos:
+        doc.linea("Sin datos en este período.")
+        return
+    top = productos[:10]
+    doc.dibujo(grafico_barras(titulo, [p["nombre"] for p in top], [p["cantidad"] for p in top]))
+    for p in top:
+        doc.linea(f"- {p['nombre']}: {p['cantidad']} {unidad}")
+
+
+def _ventas_hora(doc: _Documento, ventas_por_hora: Dict[str, float]) -> None:
+    doc.titulo("Ventas por hora")
+    horas = sorted((h for h, v in ventas_por_hora.items() if v > 0), key=int)
+    if not horas:
+        doc.linea("No hubo ventas en esta fecha.")
+        return
+    doc.dibujo(grafico_lineas("Ventas por hora ($)", [f"{int(h)}h" for h in horas],
+                              [ventas_por_hora[h] for h in horas]))
+    for h in horas:
+        doc.linea(f"Hora {h.zfill(2)}:00 - {_dinero(ventas_por_hora[h])}")
+
+
+def _eficiencia(doc: _Documento, eficiencia: Dict[str, Any]) -> None:
+    doc.titulo("Eficiencia de cocina")
+    total = eficiencia.get("total_pedidos", 0)
+    if not total:
+        doc.linea("No hay pedidos completados en cocina para este período.")
+        return
+    promedio = eficiencia.get("promedio_minutos", 0)
+    doc.linea(f"Pedidos: {total:,} | Promedio: {promedio:.1f} min | "
+              f"Más rápido: {eficiencia.get('mas_rapido_min', 0):.1f} min | "
+              f"Más lento: {eficiencia.get('mas_lento_min', 0):.1f} min")
+
+    # En períodos largos una barra por pedido no se lee: el backend ya los agrupa en tramos de minutos
+    tramos = eficiencia.get("tramos", [])
+    doc.dibujo(grafico_barras("Pedidos por tiempo en cocina (minutos)",
+                              [t["tramo"] for t in tramos], [t["pedidos"] for t in tramos]))
+
+
+def _fila_detalle(valores: Sequence[str]) -> str:
+    return "".join(v.ljust(ancho) for v, (_, _, ancho, _) in zip(valores, COLUMNAS_DETALLE))
+
+
+def _detalle_cocina(doc: _Documento, detalle: Iterable[Dict[str, Any]]) -> int:
+    doc.titulo("Detalle de pedidos de cocina")
+
+    def encabezado() -> None:
+        doc.c.setFont("Courier-Bold", 8)
+        doc.c.drawString(MARGEN, doc.y - 9, _fila_detalle([col[0] for col in COLUMNAS_DETALLE]))
+        ancho = doc.c.stringWidth(_fila_detalle([""] * len(COLUMNAS_DETALLE)), "Courier", 8)
+        doc.c.line(MARGEN, doc.y - 12, MARGEN + ancho, doc.y - 12)
+        doc.y -= ALTO_FILA + 3
+
+    doc.espacio(2 * ALTO_FILA + 3)
+    encabezado()
+    doc.al_nueva_pagina = encabezado
+    texto = None
+    filas = 0
+    for fila in detalle:
+        if doc.y - ALTO_FILA < MARGEN:
+            doc.c.drawText(texto)
+            texto = None
+            doc.nueva_pagina()
+        if texto is None:
+            texto = doc.c.beginText(MARGEN, doc.y - 9)
+            texto.setFont("Courier", 8, ALTO_FILA)
+        texto.textLine(_fila_detalle([
+            formato(fila[clave]) if fila.get(clave) is not None else "-"
+            for _, clave, _, formato in COLUMNAS_DETALLE
+        ]))
+        doc.y -= ALTO_FILA
+        filas += 1
+    if texto is not None:
+        doc.c.drawText(texto)
+    doc.al_nueva_pagina = None
+    if not filas:
+        doc.linea("Sin pedidos completados en cocina en este período.")
+    return filas
+
+
+# === EXPORTACIÓN ===
+def exportar_reporte(ruta: str, tablero: Dict[str, Any], detalle: Iterable[Dict[str, Any]] = ()) -> Dict[str, Any]:
+    """
+    Escribe en `ruta` el PDF del tablero de reportes (lo que devuelve
+    BackendService.obtener_dashboard) con el detalle de cocina de `detalle`, que se consume
+    una sola vez y fila por fila. Devuelve páginas, filas del detalle, bytes y duración.
+    """
+    inicio = time.perf_counter()
+    secciones = tablero.get("secciones", {})
+    tipo = tablero.get("tipo", "")
+    temporal = f"{ruta}.tmp"
+
+    try:
+        doc = _Documento(temporal, f"Reporte {tipo}")
+        doc.titulo(f"Reporte {tipo}", 18)
+        if tablero.get("desde") and tablero.get("hasta"):
+            ultimo_dia = datetime.strptime(tablero["hasta"], "%Y-%m-%d") - timedelta(days=1)
+            doc.linea(f"Período: {tablero['desde']} a {ultimo_dia.strftime('%Y-%m-%d')}", 12)
+        doc.linea(f"Generado: {datetime.now().strftime('%Y-%m-%d %H:%M')}", 9)
+        for nombre, error in tablero.get("errores", {}).items():
+            doc.linea(f"Sección '{nombre}' no disponible: {error}", 9)
+
+        reporte = secciones.get("reporte")
+        if reporte is not None:
+            _resumen(doc, reporte, secciones.get("anterior"))
+            _productos(doc, "Productos más vendidos", reporte.get("productos_mas_vendidos", []), "unidades")
+        if secciones.get("ventas_por_hora") is not None:
+            _ventas_hora(doc, secciones["ventas_por_hora"])
+        if secciones.get("eficiencia") is not None:
+            _eficiencia(doc, secciones["eficiencia"])
+        analisis = secciones.get("analisis")
+        if analisis is not None:
+            doc.titulo("Análisis de productos")
+            _productos(doc, "Más vendidos", analisis.get("productos_mas_vendidos", []), "veces")
+            _productos(doc, "Menos vendidos", analisis.get("productos_menos_vendidos", []), "veces")
+
+        doc.nueva_pagina()
+        filas = _detalle_cocina(doc, detalle)
+        doc.cerrar()
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+    resultado = {
+        "paginas": doc.pagina,
+        "filas_detalle": filas,
+        "bytes": os.path.getsize(ruta),
+        "duracion_ms": round((time.perf_counter() - inicio) * 1000, 1),
+    }
+    log.info(f"PDF DE REPORTE EXPORTADO → {ruta} | {resultado['paginas']} páginas | {filas} pedidos | {resultado['bytes']} bytes | {resultado['duracion_ms']} ms")
+    return resultado
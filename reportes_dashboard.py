@@ -0,0 +1,80 @@
+# === REPORTES_DASHBOARD.PY ===
+# Tablero de reportes en una sola petición (GET /reportes/dashboard). Cada sección (reporte
+# del período, período anterior, ventas por hora, eficiencia de cocina y análisis de
+# productos) corre a la vez en un hilo del threadpool con su propia conexión del pool, así
+# que el tablero tarda lo que la sección más lenta y no la suma de todas.
+#
+# Las secciones leen con conexiones distintas: cada una es coherente consigo misma, pero un
+# pedido que se cierra justo durante la consulta puede aparecer en una y no en otra.
+
+import time
+import asyncio
+import logging
+from datetime import date, timedelta
+from typing import Any, AsyncIterator, Callable, Dict, Tuple
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from db_pool import pool, PoolAgotadoError
+
+log = logging.getLogger("RestaurantIA")
+
+TIPOS = ("Diario", "Semanal", "Mensual", "Anual")
+
+
+# === PERÍODOS ===
+def rango_periodo(tipo: str, dia: date) -> Tuple[date, date]:
+    """Período [desde, hasta) de `tipo` que contiene a `dia` (la semana empieza el lunes)."""
+    if tipo == "Diario":
+        return dia, dia + timedelta(days=1)
+    if tipo == "Semanal":
+        lunes = dia - timedelta(days=dia.weekday())
+        return lunes, lunes + timedelta(days=7)
+    if tipo == "Mensual":
+        inicio = dia.replace(day=1)
+        return inicio, (inicio + timedelta(days=32)).replace(day=1)
+    if tipo == "Anual":
+        return dia.replace(month=1, day=1), date(dia.year + 1, 1, 1)
+    raise ValueError(f"Tipo de reporte desconocido: {tipo}. Use {', '.join(TIPOS)}.")
+
+
+def rango_anterior(tipo: str, dia: date) -> Tuple[date, date]:
+    """El período del mismo tipo inmediatamente anterior (para las comparativas)."""
+    desde, _ = rango_periodo(tipo, dia)
+    return rango_periodo(tipo, desde - timedelta(days=1))
+
+
+# === EJECUCIÓN EN PARALELO ===
+def _ejecutar(funcion: Callable[[Any], Dict[str, Any]]) -> Dict[str, Any]:
+    conn = pool.obtener()
+    try:
+        return funcion(conn)
+    finally:
+        pool.devolver(conn)
+
+
+async def _seccion(nombre: str, funcion: Callable[[Any], Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+    inicio = time.perf_counter()
+    try:
+        resultado = {"datos": await run_in_threadpool(_ejecutar, funcion)}
+    except HTTPException as e:
+        resultado = {"error": e.detail}
+    except PoolAgotadoError as e:
+        resultado = {"error": f"Base de datos saturada: {e}"}
+    except Exception as e:
+        log.error(f"ERROR en la sección '{nombre}' del tablero de reportes → {e}", exc_info=True)
+        resultado = {"error": str(e)}
+    resultado["duracion_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    return nombre, resultado
+
+
+async def secciones_en_paralelo(
+    secciones: Dict[str, Callable[[Any], Dict[str, Any]]]
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Lanza todas las secciones a la vez y las entrega en el orden en que terminan, como
+    (nombre, {"datos": ...} | {"error": ...}). Una sección que falla no corta a las demás.
+    """
+    for pendiente in asyncio.as_completed([_seccion(nombre, funcion) for nombre, funcion in secciones.items()]):
+        yield await pendiente
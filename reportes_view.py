@@ -3,12 +3,11 @@ import flet as ft
 # --- IMPORTAR PLOTLY Y IO ---
 import plotly.graph_objects as go
 import plotly.express as px
-import io
 import base64
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
 import os
+import threading
+from graficos_render import render_graficos
+import reporte_pdf
 # --- FIN IMPORTAR ---
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
@@ -146,95 +145,26 @@ def crear_vista_reportes(backend_service, on_update_ui, page):
     fecha_text = ft.Text("Fecha: Hoy", size=16)
 
     # --- DATOS PARA PDF (Variable de estado) ---
-    # Almacenaremos los bytes de las imágenes y los textos para usarlos en el PDF
+    # El último tablero cargado completo: el PDF se arma con esos datos (gráficos vectoriales,
+    # reporte_pdf.py) más el detalle de cocina, que se pide al exportar
     estado_reporte = {
         "tipo": "",
         "fecha": "",
-        "textos": [],
-        "img_resumen": None,
-        "img_productos": None,
-        "img_horas": None,
-        "img_analisis_mas": None,
-        "img_analisis_menos": None,
-        "img_eficiencia": None
+        "dia": None,
+        "tablero": None
     }
 
     def guardar_pdf(e: ft.FilePickerResultEvent):
         if e.path:
             try:
-                c = canvas.Canvas(e.path, pagesize=letter)
-                width, height = letter
-                
-                # Encabezado
-                c.setFont("Helvetica-Bold", 18)
-                c.drawString(50, height - 50, f"Reporte {estado_reporte['tipo']}")
-                c.setFont("Helvetica", 12)
-                c.drawString(50, height - 70, f"Fecha: {estado_reporte['fecha']}")
-                
-                # Textos Resumen
-                y = height - 100
-                c.setFont("Helvetica", 10)
-                for linea in estado_reporte["textos"]:
-                    # Ignorar algunas líneas decorativas o repetitivas si se desea
-                    if isinstance(linea, str) and "---" not in linea:
-                         c.drawString(50, y, linea)
-                         y -= 15
-                    if y < 50: # Nueva página si se acaba el espacio
-                        c.showPage()
-                        y = height - 50
-
-                # Función auxiliar para dibujar imagen
-                def dibujar_imagen(img_bytes, x, y, w, h):
-                    if img_bytes:
-                        try:
-                            # Plotly to_image devuelve bytes, ReportLab ImageReader los puede leer
-                            image = ImageReader(io.BytesIO(img_bytes))
-                            c.drawImage(image, x, y, width=w, height=h)
-                            return True
-                        except Exception as ex:
-                            print(f"Error dibujando imagen: {ex}")
-                    return False
-
-                # Gráficos
-                # Resumen
-                y -= 20
-                if estado_reporte['img_resumen']:
-                    c.drawString(50, y, "Resumen General")
-                    y -= 210
-                    dibujar_imagen(estado_reporte['img_resumen'], 50, y, 500, 200)
-                    y -= 30
-                
-                if y < 250: c.showPage(); y = height - 50
-
-                # Productos
-                if estado_reporte['img_productos']:
-                    c.drawString(50, y, "Productos Más Vendidos")
-                    y -= 210
-                    dibujar_imagen(estado_reporte['img_productos'], 50, y, 500, 200)
-                    y -= 30
-
-                if y < 250: c.showPage(); y = height - 50
-                
-                # Ventas Hora
-                if estado_reporte['img_horas']:
-                     c.drawString(50, y, "Ventas por Hora")
-                     y -= 210
-                     dibujar_imagen(estado_reporte['img_horas'], 50, y, 500, 200)
-                     y -= 30
-
-                if y < 250: c.showPage(); y = height - 50
-
-                # Eficiencia
-                if estado_reporte['img_eficiencia']:
-                     c.drawString(50, y, "Eficiencia de Cocina")
-                     y -= 210
-                     dibujar_imagen(estado_reporte['img_eficiencia'], 50, y, 500, 200)
-                     y -= 30
-
-                c.save()
-                
+                if estado_reporte["tablero"] is None:
+                    raise Exception("Primero cargue un reporte")
+                # Los pedidos del detalle se escriben a medida que llegan del backend
+                detalle = backend_service.iterar_detalle_cocina(estado_reporte["tipo"], estado_reporte["dia"])
+                resultado = reporte_pdf.exportar_reporte(e.path, estado_reporte["tablero"], detalle)
+
                 # Mostrar confirmación
-                page.snack_bar = ft.SnackBar(ft.Text(f"Reporte guardado en: {e.path}"))
+                page.snack_bar = ft.SnackBar(ft.Text(f"Reporte guardado en: {e.path} ({resultado['paginas']} páginas)"))
                 page.snack_bar.open = True
                 page.update()
 
@@ -323,333 +253,355 @@ def crear_vista_reportes(backend_service, on_update_ui, page):
     )
     # --- FIN NUEVO ---
 
-    def actualizar_reporte(e):
-        try:
-            # Obtener tipo de reporte y fecha
-            tipo = tipo_reporte_dropdown.value
-            # Corrección para extraer la fecha
-            fecha_text_content = fecha_text.value.strip()
-            if ": " in fecha_text_content:
-                fecha_str = fecha_text_content.split(": ", 1)[1].strip()
-            else:
-                fecha_str = fecha_text_content
+    # --- CARGA DEL TABLERO ---
+    # Una sola petición a /reportes/dashboard, hecha en un hilo para no trabar la interfaz.
+    # Cada sección se dibuja apenas llega; `carga["id"]` descarta lo que llegue de una carga
+    # anterior si el usuario vuelve a pedir el reporte antes de que termine.
+    carga = {"id": 0, "periodo_cerrado": False}
+    texto_estado_carga = ft.Text("", size=14, italic=True)
+    contenedor_dashboard = ft.Container()
+    columna_general = ft.Column(spacing=5)
+    columna_horas = ft.Column(spacing=5)
+
+    def leer_fecha():
+        # Corrección para extraer la fecha
+        fecha_text_content = fecha_text.value.strip()
+        if ": " in fecha_text_content:
+            fecha_str = fecha_text_content.split(": ", 1)[1].strip()
+        else:
+            fecha_str = fecha_text_content
 
-            # Convertir fecha a objeto datetime
-            if fecha_str.lower() == "hoy" or fecha_str == "":
-                fecha = datetime.now()
-            else:
-                fecha = datetime.strptime(fecha_str, "%Y-%m-%d")
+        # Convertir fecha a objeto datetime
+        if fecha_str.lower() == "hoy" or fecha_str == "":
+            return datetime.now(), fecha_str
+        return datetime.strptime(fecha_str, "%Y-%m-%d"), fecha_str
 
-            # ================================================
-            # 🔄 LLAMADAS AL BACKEND CON MANEJO DE ERRORES
-            # ================================================
-            
-            # Obtener datos del backend para el reporte general
-            try:
-                datos = backend_service.obtener_reporte(tipo, fecha)
-            except Exception as reporte_ex:
-                print(f"Error obteniendo reporte: {reporte_ex}")
-                datos = {
-                    "ventas_totales": 0,
-                    "pedidos_totales": 0,
-                    "productos_vendidos": 0,
-                    "productos_mas_vendidos": []
-                }
-
-            # Obtener datos comparativos
-            try:
-                datos_comparativos = backend_service.obtener_reporte_comparativo(tipo, fecha)
-            except Exception as e:
-                print(f"Error obteniendo datos comparativos: {e}")
-                datos_comparativos = {
-                    "actual": datos,
-                    "anterior": {
-                        "ventas_totales": datos.get("ventas_totales", 0) * 0.85,
-                        "pedidos_totales": max(1, int(datos.get("pedidos_totales", 0) * 0.9)),
-                        "productos_vendidos": int(datos.get("productos_vendidos", 0) * 0.88)
-                    }
-                }
-
-            # --- OBTENER VENTAS POR HORA ---
-            try:
-                ventas_por_hora = backend_service.obtener_ventas_por_hora(fecha.strftime("%Y-%m-%d"))
-            except Exception as hora_ex:
-                print(f"Error obteniendo ventas por hora: {hora_ex}")
-                ventas_por_hora = {f"{h:02d}": 0 for h in range(24)}
+    def mostrar_grafico(fig, imagen, nombre):
+        """Pide la imagen al renderizador (graficos_render) sin esperarla y la coloca cuando llega."""
+        id_carga = carga["id"]
+        futuro = render_graficos.renderizar(fig, 600, 300, permanente=carga["periodo_cerrado"])
 
-            # --- OBTENER EFICIENCIA DE COCINA ---
+        def listo(f):
+            if id_carga != carga["id"]:
+                return
             try:
-                datos_eficiencia = backend_service.obtener_eficiencia_cocina(tipo, fecha)
-                promedio_cocina_min = datos_eficiencia.get("promedio_minutos", 0)
-                detalle_pedidos_cocina = datos_eficiencia.get("detalle_pedidos", [])
-            except Exception as ex:
-                print(f"Error al obtener datos de eficiencia de cocina: {ex}")
-                promedio_cocina_min = 0
-                detalle_pedidos_cocina = []
-
-            # --- OBTENER ANÁLISIS DE PRODUCTOS ---
-            try:
-                # Calcular fechas para análisis
-                if tipo == "Diario":
-                    start_date_analisis = fecha.strftime("%Y-%m-%d")
-                    end_date_analisis = (fecha + timedelta(days=1)).strftime("%Y-%m-%d")
-                elif tipo == "Semanal":
-                    start_of_week = fecha - timedelta(days=fecha.weekday())
-                    start_date_analisis = start_of_week.strftime("%Y-%m-%d")
-                    end_date_analisis = (start_of_week + timedelta(days=6)).strftime("%Y-%m-%d")
-                elif tipo == "Mensual":
-                    start_date_analisis = fecha.replace(day=1).strftime("%Y-%m-%d")
-                    if fecha.month == 12:
-                        end_date_analisis = fecha.replace(day=31).strftime("%Y-%m-%d")
-                    else:
-                        next_month = fecha.replace(day=1) + timedelta(days=32)
-                        end_date_analisis = (next_month.replace(day=1) - timedelta(days=1)).strftime("%Y-%m-%d")
-                elif tipo == "Anual":
-                    start_date_analisis = fecha.replace(month=1, day=1).strftime("%Y-%m-%d")
-                    end_date_analisis = fecha.replace(month=12, day=31).strftime("%Y-%m-%d")
-                else:
-                    start_date_analisis = fecha.strftime("%Y-%m-%d")
-                    end_date_analisis = (fecha + timedelta(days=1)).strftime("%Y-%m-%d")
-                
-                datos_analisis = backend_service.obtener_analisis_productos(
-                    start_date=start_date_analisis, 
-                    end_date=end_date_analisis
-                )
-            except Exception as analisis_ex:
-                print(f"Error obteniendo análisis: {analisis_ex}")
-                datos_analisis = {
-                    "productos_mas_vendidos": [],
-                    "productos_menos_vendidos": []
-                }
-
-            # ================================================
-            # 📊 GENERAR REPORTES Y GRÁFICOS
-            # ================================================
-            
-            # Crear dashboard ejecutivo
-            dashboard_ejecutivo = crear_dashboard_ejecutivo(datos_comparativos, tipo)
-            
-            # --- GUARDAR DATOS EN ESTADO PARA PDF ---
-            estado_reporte["tipo"] = tipo
-            estado_reporte["fecha"] = fecha_str
-            estado_reporte["textos"] = []
-
-            # Preparar controles de texto
-            controles_texto = []
-            controles_texto.append(ft.Text(f"Reporte {tipo} - {fecha_str}", size=20, weight=ft.FontWeight.BOLD))
+                imagen.src_base64 = base64.b64encode(f.result()).decode('utf-8')
+            except Exception as graf_ex:
+                print(f"Error generando gráfico '{nombre}': {graf_ex}")
+                imagen.src_base64 = ""
+            page.update()
+        futuro.add_done_callback(listo)
+
+    def preparar_contenedores(tipo, fecha_str):
+        """Arma el esqueleto del reporte; cada sección llena su parte cuando llega."""
+        estado_reporte["tablero"] = None
+        for img in (imagen_resumen, imagen_productos_vendidos, imagen_ventas_hora,
+                    imagen_analisis_mas, imagen_analisis_menos, imagen_eficiencia_cocina):
+            img.src_base64 = ""
+        contenedor_dashboard.content = ft.Text("Cargando comparativa...", italic=True)
+        columna_general.controls = [ft.Text(f"Reporte {tipo} - {fecha_str}", size=20, weight=ft.FontWeight.BOLD),
+                                    ft.Text("Cargando...", italic=True)]
+        columna_horas.controls = [ft.Text("Ventas por Hora:", size=18, weight=ft.FontWeight.BOLD),
+                                  ft.Text("Cargando...", italic=True)]
+        texto_eficiencia_cocina.value = "Cargando..."
+
+        contenedor_reporte.content = ft.Column([
+            contenedor_dashboard,
+            ft.Divider(),
+            columna_general,
+            ft.Divider(),
+            columna_horas,
+            ft.Text("Gráfico Resumen General", size=16, weight=ft.FontWeight.BOLD),
+            imagen_resumen,
+            ft.Text("Gráfico Productos Más Vendidos", size=16, weight=ft.FontWeight.BOLD),
+            imagen_productos_vendidos,
+            ft.Text("Gráfico Ventas por Hora", size=16, weight=ft.FontWeight.BOLD),
+            imagen_ventas_hora,
+            contenedor_eficiencia_cocina
+        ])
+        contenedor_analisis.content = ft.Column([
+            ft.Text(f"Análisis de Productos - {tipo}", size=20, weight=ft.FontWeight.BOLD),
+            ft.Text("Cargando...", italic=True)
+        ])
+
+    def dibujar_general(tipo, fecha_str, datos):
+        controles_texto = []
+        controles_texto.append(ft.Text(f"Reporte {tipo} - {fecha_str}", size=20, weight=ft.FontWeight.BOLD))
+        controles_texto.append(ft.Divider())
+        controles_texto.append(ft.Text(f"Ventas totales: ${datos.get('ventas_totales', 0):.2f}", size=16))
+        controles_texto.append(ft.Text(f"Pedidos totales: {datos.get('pedidos_totales', 0)}", size=16))
+        controles_texto.append(ft.Text(f"Productos vendidos: {datos.get('productos_vendidos', 0)}", size=16))
+
+        if datos.get('productos_mas_vendidos'):
             controles_texto.append(ft.Divider())
-            controles_texto.append(ft.Text(f"Ventas totales: ${datos.get('ventas_totales', 0):.2f}", size=16))
-            controles_texto.append(ft.Text(f"Pedidos totales: {datos.get('pedidos_totales', 0)}", size=16))
-            controles_texto.append(ft.Text(f"Productos vendidos: {datos.get('productos_vendidos', 0)}", size=16))
-            controles_texto.append(ft.Text(f"Tiempo promedio en cocina: {promedio_cocina_min:.2f} minutos", size=16, weight=ft.FontWeight.BOLD))
-
-            if datos.get('productos_mas_vendidos'):
-                controles_texto.append(ft.Divider())
-                controles_texto.append(ft.Text("Productos más vendidos (General):", size=18, weight=ft.FontWeight.BOLD))
-                for producto in datos['productos_mas_vendidos'][:10]:  # Limitar a 10
-                    controles_texto.append(ft.Text(f"- {producto['nombre']}: {producto['cantidad']} unidades"))
+            controles_texto.append(ft.Text("Productos más vendidos (General):", size=18, weight=ft.FontWeight.BOLD))
+            for producto in datos['productos_mas_vendidos'][:10]:  # Limitar a 10
+                controles_texto.append(ft.Text(f"- {producto['nombre']}: {producto['cantidad']} unidades"))
+        columna_general.controls = controles_texto
 
-            controles_texto.append(ft.Divider())
-            controles_texto.append(ft.Text("Ventas por Hora:", size=18, weight=ft.FontWeight.BOLD))
-            horas_con_venta = {h: v for h, v in ventas_por_hora.items() if v > 0}
-            if horas_con_venta:
-                for hora_str, total in sorted(horas_con_venta.items()):
-                    controles_texto.append(ft.Text(f"Hora {hora_str.zfill(2)}:00 - ${total:.2f}"))
+        # Gráfico de Resumen General
+        try:
+            if all(key in datos for key in ['ventas_totales', 'pedidos_totales', 'productos_vendidos']):
+                fig_resumen = go.Figure(data=[
+                    go.Bar(name='Ventas ($)', x=['Resumen'], y=[datos.get('ventas_totales', 0)], 
+                        text=[f"${datos.get('ventas_totales', 0):.2f}"], textposition='auto'),
+                    go.Bar(name='Pedidos', x=['Resumen'], y=[datos.get('pedidos_totales', 0)], 
+                        text=[datos.get('pedidos_totales', 0)], textposition='auto'),
+                    go.Bar(name='Productos', x=['Resumen'], y=[datos.get('productos_vendidos', 0)], 
+                        text=[datos.get('productos_vendidos', 0)], textposition='auto')
+                ])
+                fig_resumen.update_layout(title_text='Resumen General', height=300)
+                mostrar_grafico(fig_resumen, imagen_resumen, "resumen")
             else:
-                controles_texto.append(ft.Text("No hubo ventas en esta fecha.", size=14, italic=True))
-
-            # Llenar estado para PDF
-            for control in controles_texto:
-                if isinstance(control, ft.Text):
-                    estado_reporte["textos"].append(control.value)
-
-            # --- GENERAR GRÁFICOS ---
-            # Gráfico de Resumen General
-            try:
-                if all(key in datos for key in ['ventas_totales', 'pedidos_totales', 'productos_vendidos']):
-                    fig_resumen = go.Figure(data=[
-                        go.Bar(name='Ventas ($)', x=['Resumen'], y=[datos.get('ventas_totales', 0)], 
-                            text=[f"${datos.get('ventas_totales', 0):.2f}"], textposition='auto'),
-                        go.Bar(name='Pedidos', x=['Resumen'], y=[datos.get('pedidos_totales', 0)], 
-                            text=[datos.get('pedidos_totales', 0)], textposition='auto'),
-                        go.Bar(name='Productos', x=['Resumen'], y=[datos.get('productos_vendidos', 0)], 
-                            text=[datos.get('productos_vendidos', 0)], textposition='auto')
-                    ])
-                    fig_resumen.update_layout(title_text='Resumen General', height=300)
-                    img_bytes_resumen = fig_resumen.to_image(format="png", width=600, height=300, scale=1)
-                    estado_reporte["img_resumen"] = img_bytes_resumen
-                    imagen_resumen.src_base64 = base64.b64encode(img_bytes_resumen).decode('utf-8')
-                else:
-                    imagen_resumen.src_base64 = ""
-            except Exception as graf_ex:
-                print(f"Error generando gráfico resumen: {graf_ex}")
                 imagen_resumen.src_base64 = ""
+        except Exception as graf_ex:
+            print(f"Error generando gráfico resumen: {graf_ex}")
+            imagen_resumen.src_base64 = ""
 
-            # Gráfico de Productos Más Vendidos
-            try:
-                if datos.get('productos_mas_vendidos'):
-                    nombres_pv = [p['nombre'] for p in datos['productos_mas_vendidos'][:10]]
-                    cantidades_pv = [p['cantidad'] for p in datos['productos_mas_vendidos'][:10]]
-                    fig_pv = px.bar(x=nombres_pv, y=cantidades_pv, orientation='v', 
-                                title='Productos Más Vendidos (General)', 
-                                labels={'x': 'Producto', 'y': 'Cantidad'})
-                    fig_pv.update_layout(height=300)
-                    img_bytes_pv = fig_pv.to_image(format="png", width=600, height=300, scale=1)
-                    estado_reporte["img_productos"] = img_bytes_pv
-                    imagen_productos_vendidos.src_base64 = base64.b64encode(img_bytes_pv).decode('utf-8')
-                else:
-                    imagen_productos_vendidos.src_base64 = ""
-            except Exception as graf_ex:
-                print(f"Error generando gráfico productos: {graf_ex}")
+        # Gráfico de Productos Más Vendidos
+        try:
+            if datos.get('productos_mas_vendidos'):
+                nombres_pv = [p['nombre'] for p in datos['productos_mas_vendidos'][:10]]
+                cantidades_pv = [p['cantidad'] for p in datos['productos_mas_vendidos'][:10]]
+                fig_pv = px.bar(x=nombres_pv, y=cantidades_pv, orientation='v', 
+                            title='Productos Más Vendidos (General)', 
+                            labels={'x': 'Producto', 'y': 'Cantidad'})
+                fig_pv.update_layout(height=300)
+                mostrar_grafico(fig_pv, imagen_productos_vendidos, "productos")
+            else:
                 imagen_productos_vendidos.src_base64 = ""
+        except Exception as graf_ex:
+            print(f"Error generando gráfico productos: {graf_ex}")
+            imagen_productos_vendidos.src_base64 = ""
+
+    def dibujar_comparativa(tipo, datos, anterior):
+        if anterior is None:
+            # Sin el período anterior se estima, como hacía la comparativa local
+            anterior = {
+                "ventas_totales": datos.get("ventas_totales", 0) * 0.85,
+                "pedidos_totales": max(1, int(datos.get("pedidos_totales", 0) * 0.9)),
+                "productos_vendidos": int(datos.get("productos_vendidos", 0) * 0.88)
+            }
+        contenedor_dashboard.content = crear_dashboard_ejecutivo({"actual": datos, "anterior": anterior}, tipo)
+
+    def dibujar_ventas_hora(ventas_por_hora):
+        controles_horas = [ft.Text("Ventas por Hora:", size=18, weight=ft.FontWeight.BOLD)]
+        horas_con_venta = {h: v for h, v in ventas_por_hora.items() if v > 0}
+        if horas_con_venta:
+            for hora_str, total in sorted(horas_con_venta.items()):
+                controles_horas.append(ft.Text(f"Hora {hora_str.zfill(2)}:00 - ${total:.2f}"))
+        else:
+            controles_horas.append(ft.Text("No hubo ventas en esta fecha.", size=14, italic=True))
+        columna_horas.controls = controles_horas
 
-            # Gráfico de Ventas por Hora
-            try:
-                horas_con_venta_datos = {h: v for h, v in ventas_por_hora.items() if v > 0}
-                if horas_con_venta_datos:
-                    horas_plot = [f"{h}h" for h in sorted(horas_con_venta_datos.keys(), key=int)]
-                    ventas_plot = [horas_con_venta_datos[h] for h in sorted(horas_con_venta_datos.keys(), key=int)]
-                    fig_hora = go.Figure(data=go.Scatter(x=horas_plot, y=ventas_plot, mode='lines+markers', 
-                                                    name='Ventas por Hora'))
-                    fig_hora.update_layout(title='Ventas por Hora', xaxis_title='Hora del Día', 
-                                        yaxis_title='Ventas ($)', height=300)
-                    img_bytes_hora = fig_hora.to_image(format="png", width=600, height=300, scale=1)
-                    estado_reporte["img_horas"] = img_bytes_hora
-                    imagen_ventas_hora.src_base64 = base64.b64encode(img_bytes_hora).decode('utf-8')
-                else:
-                    imagen_ventas_hora.src_base64 = ""
-            except Exception as graf_ex:
-                print(f"Error generando gráfico horas: {graf_ex}")
+        # Gráfico de Ventas por Hora
+        try:
+            if horas_con_venta:
+                horas_plot = [f"{h}h" for h in sorted(horas_con_venta.keys(), key=int)]
+                ventas_plot = [horas_con_venta[h] for h in sorted(horas_con_venta.keys(), key=int)]
+                fig_hora = go.Figure(data=go.Scatter(x=horas_plot, y=ventas_plot, mode='lines+markers', 
+                                                name='Ventas por Hora'))
+                fig_hora.update_layout(title='Ventas por Hora', xaxis_title='Hora del Día', 
+                                    yaxis_title='Ventas ($)', height=300)
+                mostrar_grafico(fig_hora, imagen_ventas_hora, "horas")
+            else:
                 imagen_ventas_hora.src_base64 = ""
-
-            # Gráfico de Eficiencia de Cocina
-            try:
-                if detalle_pedidos_cocina:
-                    labels_pedidos = [f"Pedido {p['id']}" for p in detalle_pedidos_cocina[:15]]  # Limitar a 15
-                    tiempos_cocina = [p['tiempo'] for p in detalle_pedidos_cocina[:15]]
-                    fig_eficiencia = px.bar(x=labels_pedidos, y=tiempos_cocina, orientation='v', 
-                                        title=f'Tiempos de Cocina - {tipo} ({fecha_str})', 
-                                        labels={'x': 'Pedido', 'y': 'Tiempo (min)'})
-                    fig_eficiencia.add_hline(y=promedio_cocina_min, line_dash="dash", line_color="red", 
-                                        annotation_text=f"Promedio: {promedio_cocina_min:.2f} min")
-                    fig_eficiencia.update_layout(height=300)
-                    img_bytes_eficiencia = fig_eficiencia.to_image(format="png", width=600, height=300, scale=1)
-                    estado_reporte["img_eficiencia"] = img_bytes_eficiencia
-                    imagen_eficiencia_cocina.src_base64 = base64.b64encode(img_bytes_eficiencia).decode('utf-8')
-                    texto_eficiencia_cocina.value = f"Promedio: {promedio_cocina_min:.2f} minutos"
-                else:
-                    imagen_eficiencia_cocina.src_base64 = ""
-                    texto_eficiencia_cocina.value = "No hay pedidos completados en cocina para este periodo."
-            except Exception as graf_ex:
-                print(f"Error generando gráfico eficiencia: {graf_ex}")
+        except Exception as graf_ex:
+            print(f"Error generando gráfico horas: {graf_ex}")
+            imagen_ventas_hora.src_base64 = ""
+
+    def dibujar_eficiencia(tipo, fecha_str, datos_eficiencia):
+        promedio_cocina_min = datos_eficiencia.get("promedio_minutos", 0)
+        # El tablero trae los pedidos ya agrupados en tramos de minutos (no uno por pedido)
+        tramos_cocina = datos_eficiencia.get("tramos", [])
+        # Gráfico de Eficiencia de Cocina
+        try:
+            if datos_eficiencia.get("total_pedidos"):
+                fig_eficiencia = px.bar(x=[t['tramo'] for t in tramos_cocina], y=[t['pedidos'] for t in tramos_cocina],
+                                    orientation='v',
+                                    title=f'Tiempos de Cocina - {tipo} ({fecha_str})',
+                                    labels={'x': 'Tiempo en cocina (min)', 'y': 'Pedidos'})
+                fig_eficiencia.update_layout(height=300)
+                mostrar_grafico(fig_eficiencia, imagen_eficiencia_cocina, "eficiencia")
+                texto_eficiencia_cocina.value = f"Promedio: {promedio_cocina_min:.2f} minutos"
+            else:
                 imagen_eficiencia_cocina.src_base64 = ""
-                texto_eficiencia_cocina.value = "Error al generar gráfico de eficiencia."
+                texto_eficiencia_cocina.value = "No hay pedidos completados en cocina para este periodo."
+        except Exception as graf_ex:
+            print(f"Error generando gráfico eficiencia: {graf_ex}")
+            imagen_eficiencia_cocina.src_base64 = ""
+            texto_eficiencia_cocina.value = "Error al generar gráfico de eficiencia."
+
+    def dibujar_analisis(tipo, periodo, datos_analisis):
+        rango = ""
+        if periodo:
+            # El período llega como [desde, hasta): se muestra con el último día incluido
+            ultimo_dia = datetime.strptime(periodo["hasta"], "%Y-%m-%d") - timedelta(days=1)
+            rango = f" ({periodo['desde']} a {ultimo_dia.strftime('%Y-%m-%d')})"
+        controles_analisis_texto = []
+        controles_analisis_texto.append(ft.Text(f"Análisis de Productos - {tipo}{rango}", 
+                                            size=20, weight=ft.FontWeight.BOLD))
+        controles_analisis_texto.append(ft.Divider())
+
+        # Productos más vendidos
+        if datos_analisis.get('productos_mas_vendidos'):
+            controles_analisis_texto.append(ft.Text("Productos más vendidos:", size=18, weight=ft.FontWeight.BOLD))
+            for producto in datos_analisis['productos_mas_vendidos'][:10]:
+                controles_analisis_texto.append(ft.Text(f"- {producto['nombre']}: {producto['cantidad']} veces"))
+        else:
+            controles_analisis_texto.append(ft.Text("No se encontraron productos vendidos en este periodo.", 
+                                                size=14, italic=True))
+
+        controles_analisis_texto.append(ft.Divider())
 
-            # --- ANALISIS DE PRODUCTOS ---
-            controles_analisis_texto = []
-            controles_analisis_texto.append(ft.Text(f"Análisis de Productos - {tipo} ({start_date_analisis} a {end_date_analisis})", 
-                                                size=20, weight=ft.FontWeight.BOLD))
-            controles_analisis_texto.append(ft.Divider())
+        # Productos menos vendidos
+        if datos_analisis.get('productos_menos_vendidos'):
+            controles_analisis_texto.append(ft.Text("Productos menos vendidos:", size=18, weight=ft.FontWeight.BOLD))
+            for producto in datos_analisis['productos_menos_vendidos'][:10]:
+                controles_analisis_texto.append(ft.Text(f"- {producto['nombre']}: {producto['cantidad']} veces"))
+        else:
+            controles_analisis_texto.append(ft.Text("No se encontraron productos menos vendidos en este periodo.", 
+                                                size=14, italic=True))
 
-            # Productos más vendidos
+        # Gráficos de análisis
+        try:
+            # Más vendidos
             if datos_analisis.get('productos_mas_vendidos'):
-                controles_analisis_texto.append(ft.Text("Productos más vendidos:", size=18, weight=ft.FontWeight.BOLD))
-                for producto in datos_analisis['productos_mas_vendidos'][:10]:
-                    controles_analisis_texto.append(ft.Text(f"- {producto['nombre']}: {producto['cantidad']} veces"))
+                nombres_am = [p['nombre'] for p in datos_analisis['productos_mas_vendidos'][:10]]
+                cantidades_am = [p['cantidad'] for p in datos_analisis['productos_mas_vendidos'][:10]]
+                fig_am = px.bar(x=nombres_am, y=cantidades_am, orientation='v', 
+                            title='Análisis - Más Vendidos', 
+                            labels={'x': 'Producto', 'y': 'Cantidad'})
+                fig_am.update_layout(height=300)
+                mostrar_grafico(fig_am, imagen_analisis_mas, "analisis_mas")
             else:
-                controles_analisis_texto.append(ft.Text("No se encontraron productos vendidos en este periodo.", 
-                                                    size=14, italic=True))
-
-            controles_analisis_texto.append(ft.Divider())
+                imagen_analisis_mas.src_base64 = ""
 
-            # Productos menos vendidos
+            # Menos vendidos
             if datos_analisis.get('productos_menos_vendidos'):
-                controles_analisis_texto.append(ft.Text("Productos menos vendidos:", size=18, weight=ft.FontWeight.BOLD))
-                for producto in datos_analisis['productos_menos_vendidos'][:10]:
-                    controles_analisis_texto.append(ft.Text(f"- {producto['nombre']}: {producto['cantidad']} veces"))
+                nombres_anm = [p['nombre'] for p in datos_analisis['productos_menos_vendidos'][:10]]
+                cantidades_anm = [p['cantidad'] for p in datos_analisis['productos_menos_vendidos'][:10]]
+                fig_anm = px.bar(x=nombres_anm, y=cantidades_anm, orientation='v', 
+                            title='Análisis - Menos Vendidos', 
+                            labels={'x': 'Producto', 'y': 'Cantidad'})
+                fig_anm.update_layout(height=300)
+                mostrar_grafico(fig_anm, imagen_analisis_menos, "analisis_menos")
             else:
-                controles_analisis_texto.append(ft.Text("No se encontraron productos menos vendidos en este periodo.", 
-                                                    size=14, italic=True))
-
-            # Gráficos de análisis
-            try:
-                # Más vendidos
-                if datos_analisis.get('productos_mas_vendidos'):
-                    nombres_am = [p['nombre'] for p in datos_analisis['productos_mas_vendidos'][:10]]
-                    cantidades_am = [p['cantidad'] for p in datos_analisis['productos_mas_vendidos'][:10]]
-                    fig_am = px.bar(x=nombres_am, y=cantidades_am, orientation='v', 
-                                title='Análisis - Más Vendidos', 
-                                labels={'x': 'Producto', 'y': 'Cantidad'})
-                    fig_am.update_layout(height=300)
-                    img_bytes_am = fig_am.to_image(format="png", width=600, height=300, scale=1)
-                    imagen_analisis_mas.src_base64 = base64.b64encode(img_bytes_am).decode('utf-8')
-                else:
-                    imagen_analisis_mas.src_base64 = ""
-
-                # Menos vendidos
-                if datos_analisis.get('productos_menos_vendidos'):
-                    nombres_anm = [p['nombre'] for p in datos_analisis['productos_menos_vendidos'][:10]]
-                    cantidades_anm = [p['cantidad'] for p in datos_analisis['productos_menos_vendidos'][:10]]
-                    fig_anm = px.bar(x=nombres_anm, y=cantidades_anm, orientation='v', 
-                                title='Análisis - Menos Vendidos', 
-                                labels={'x': 'Producto', 'y': 'Cantidad'})
-                    fig_anm.update_layout(height=300)
-                    img_bytes_anm = fig_anm.to_image(format="png", width=600, height=300, scale=1)
-                    imagen_analisis_menos.src_base64 = base64.b64encode(img_bytes_anm).decode('utf-8')
-                else:
-                    imagen_analisis_menos.src_base64 = ""
-            except Exception as graf_ex:
-                print(f"Error generando gráficos análisis: {graf_ex}")
-                imagen_analisis_mas.src_base64 = ""
                 imagen_analisis_menos.src_base64 = ""
+        except Exception as graf_ex:
+            print(f"Error generando gráficos análisis: {graf_ex}")
+            imagen_analisis_mas.src_base64 = ""
+            imagen_analisis_menos.src_base64 = ""
+
+        contenedor_analisis.content = ft.Column(
+            controles_analisis_texto + [
+                ft.Text("Gráfico Análisis - Más Vendidos", size=16, weight=ft.FontWeight.BOLD),
+                imagen_analisis_mas,
+                ft.Text("Gráfico Análisis - Menos Vendidos", size=16, weight=ft.FontWeight.BOLD),
+                imagen_analisis_menos,
+            ]
+        )
 
-            # Reconstruir contenedores
-            contenedor_reporte.content = ft.Column([
-                dashboard_ejecutivo,
-                ft.Divider(),
-            ] + controles_texto + [
-                ft.Text("Gráfico Resumen General", size=16, weight=ft.FontWeight.BOLD),
-                imagen_resumen,
-                ft.Text("Gráfico Productos Más Vendidos", size=16, weight=ft.FontWeight.BOLD),
-                imagen_productos_vendidos,
-                ft.Text("Gráfico Ventas por Hora", size=16, weight=ft.FontWeight.BOLD),
-                imagen_ventas_hora,
-                contenedor_eficiencia_cocina
-            ])
-
-            contenedor_analisis.content = ft.Column(
-                controles_analisis_texto + [
-                    ft.Text("Gráfico Análisis - Más Vendidos", size=16, weight=ft.FontWeight.BOLD),
-                    imagen_analisis_mas,
-                    ft.Text("Gráfico Análisis - Menos Vendidos", size=16, weight=ft.FontWeight.BOLD),
-                    imagen_analisis_menos,
-                ]
-            )
-
-            page.update()
+    def mostrar_error(ex):
+        contenedor_reporte.content = ft.Column([
+            ft.Text(f"Error al cargar reporte: {str(ex)}", color=ft.Colors.RED)
+        ])
+        contenedor_analisis.content = ft.Column([
+            ft.Text(f"Error al cargar análisis: {str(ex)}", color=ft.Colors.RED)
+        ])
+        
+        # Limpiar todas las imágenes
+        imagenes = [
+            imagen_resumen, imagen_productos_vendidos, imagen_ventas_hora,
+            imagen_analisis_mas, imagen_analisis_menos, imagen_eficiencia_cocina
+        ]
+        for img in imagenes:
+            img.src_base64 = ""
+        
+        texto_eficiencia_cocina.value = "Error al cargar datos de eficiencia."
+
+    def cargar_tablero(id_carga, tipo, fecha, fecha_str):
+        """Corre en un hilo: pide el tablero y dibuja cada sección apenas llega."""
+        recibido = {}
+
+        def al_recibir(seccion, resultado):
+            if id_carga != carga["id"]:
+                return
+            if "error" in resultado:
+                print(f"Error en la sección '{seccion}' del reporte: {resultado['error']}")
+            datos = resultado.get("datos")
+            recibido[seccion] = datos
+            if seccion == "periodo" and datos:
+                # Un período que ya terminó no cambia: sus gráficos se guardan en disco
+                carga["periodo_cerrado"] = datos["hasta"] <= datetime.now().strftime("%Y-%m-%d")
+            try:
+                if seccion == "reporte":
+                    datos = datos or {"ventas_totales": 0, "pedidos_totales": 0, "productos_vendidos": 0, "productos_mas_vendidos": []}
+                    recibido["reporte"] = datos
+                    dibujar_general(tipo, fecha_str, datos)
+                elif seccion == "ventas_por_hora":
+                    dibujar_ventas_hora(datos or {f"{h:02d}": 0 for h in range(24)})
+                elif seccion == "eficiencia":
+                    dibujar_eficiencia(tipo, fecha_str, datos or {})
+                elif seccion == "analisis":
+                    dibujar_analisis(tipo, recibido.get("periodo"), datos or {})
+                # La comparativa necesita el período actual y el anterior
+                if seccion in ("reporte", "anterior") and "reporte" in recibido and "anterior" in recibido:
+                    dibujar_comparativa(tipo, recibido["reporte"], recibido["anterior"])
+                page.update()
+            except Exception as ex:
+                print(f"Error dibujando la sección '{seccion}' del reporte: {ex}")
 
+        try:
+            tablero = backend_service.obtener_dashboard(tipo, fecha, al_recibir)
         except Exception as ex:
             print(f"Error general en actualizar_reporte: {ex}")
             import traceback
             traceback.print_exc()
-            
-            contenedor_reporte.content = ft.Column([
-                ft.Text(f"Error al cargar reporte: {str(ex)}", color=ft.Colors.RED)
-            ])
-            contenedor_analisis.content = ft.Column([
-                ft.Text(f"Error al cargar análisis: {str(ex)}", color=ft.Colors.RED)
-            ])
-            
-            # Limpiar todas las imágenes
-            imagenes = [
-                imagen_resumen, imagen_productos_vendidos, imagen_ventas_hora,
-                imagen_analisis_mas, imagen_analisis_menos, imagen_eficiencia_cocina
-            ]
-            for img in imagenes:
-                img.src_base64 = ""
-            
-            texto_eficiencia_cocina.value = "Error al cargar datos de eficiencia."
+            if id_carga == carga["id"]:
+                mostrar_error(ex)
+                boton_actualizar.disabled = False
+                texto_estado_carga.value = ""
+                page.update()
+            return
+
+        if id_carga != carga["id"]:
+            return
+        # --- GUARDAR DATOS EN ESTADO PARA PDF ---
+        estado_reporte["tipo"] = tipo
+        estado_reporte["fecha"] = fecha_str
+        estado_reporte["dia"] = fecha
+        estado_reporte["tablero"] = tablero
+        boton_actualizar.disabled = False
+        errores = len(tablero.get("errores", {}))
+        texto_estado_carga.value = f"Reporte cargado ({tablero.get('duracion_ms', 0):.0f} ms en el servidor)" + (f" | {errores} secciones con error" if errores else "")
+        page.update()
+
+    def actualizar_reporte(e):
+        try:
+            # Obtener tipo de reporte y fecha
+            tipo = tipo_reporte_dropdown.value
+            fecha, fecha_str = leer_fecha()
+        except Exception as ex:
+            print(f"Error general en actualizar_reporte: {ex}")
+            mostrar_error(ex)
             page.update()
+            return
+
+        carga["id"] += 1
+        # El navegador de kaleido arranca mientras se espera al servidor
+        render_graficos.calentar()
+        preparar_contenedores(tipo, fecha_str)
+        boton_actualizar.disabled = True
+        texto_estado_carga.value = "Cargando reporte..."
+        page.update()
+        threading.Thread(target=cargar_tablero, args=(carga["id"], tipo, fecha, fecha_str), daemon=True).start()
+
+    boton_actualizar = ft.ElevatedButton(
+        "Actualizar reporte",
+        on_click=actualizar_reporte,
+        style=ft.ButtonStyle(bgcolor=ft.Colors.GREEN_700, color=ft.Colors.WHITE)
+    )
 
 
     # Vista principal: Envolver la Columna en un Scrollview
@@ -662,11 +614,7 @@ def crear_vista_reportes(backend_service, on_update_ui, page):
                 fecha_button,
                 fecha_text
             ]),
-            ft.ElevatedButton(
-                "Actualizar reporte",
-                on_click=actualizar_reporte,
-                style=ft.ButtonStyle(bgcolor=ft.Colors.GREEN_700, color=ft.Colors.WHITE)
-            ),
+            ft.Row([boton_actualizar, texto_estado_carga]),
             ft.ElevatedButton(
                 "Exportar a PDF",
                 icon=ft.Icons.PICTURE_AS_PDF,
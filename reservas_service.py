@@ -2,6 +2,8 @@
 import requests
 from typing import List, Dict, Any
 
+from http_sesion import sesion, TIMEOUT_SEGUNDOS
+
 class ReservasService:
     def __init__(self, base_url: str = "http://127.0.0.1:8000"):
         self.base_url = base_url.rstrip("/")
@@ -19,7 +21,7 @@ class ReservasService:
         params = {}
         if fecha:
             params["fecha"] = fecha
-        r = requests.get(f"{self.base_url}/reservas/", params=params)
+        r = sesion.get(f"{self.base_url}/reservas/", params=params, timeout=TIMEOUT_SEGUNDOS)
         r.raise_for_status()
         return r.json()
 
@@ -44,7 +46,7 @@ class ReservasService:
         if fecha_hora_fin:
             payload["fecha_hora_fin"] = fecha_hora_fin
 
-        r = requests.post(f"{self.base_url}/reservas/", json=payload)
+        r = sesion.post(f"{self.base_url}/reservas/", json=payload, timeout=TIMEOUT_SEGUNDOS)
         r.raise_for_status()
         return r.json()
 
@@ -58,7 +60,7 @@ class ReservasService:
         Returns:
             Dict[str, Any]: Mensaje de confirmación.
         """
-        r = requests.delete(f"{self.base_url}/reservas/{reserva_id}")
+        r = sesion.delete(f"{self.base_url}/reservas/{reserva_id}", timeout=TIMEOUT_SEGUNDOS)
         r.raise_for_status()
         return r.json()
 
@@ -86,22 +88,42 @@ class ReservasService:
         if fecha_hora_fin is not None:
             payload["fecha_hora_fin"] = fecha_hora_fin
 
-        r = requests.put(f"{self.base_url}/reservas/{reserva_id}", json=payload)
+        r = sesion.put(f"{self.base_url}/reservas/{reserva_id}", json=payload, timeout=TIMEOUT_SEGUNDOS)
         r.raise_for_status()
         return r.json()
 
     # === MÉTODO: obtener_mesas_disponibles ===
     # Obtiene la lista de mesas disponibles para una fecha y hora específica.
-    def obtener_mesas_disponibles(self, fecha_hora: str) -> List[Dict[str, Any]]:
+    def obtener_mesas_disponibles(self, fecha_hora: str, personas: int = 1) -> List[Dict[str, Any]]:
         """
         Obtiene mesas disponibles para una fecha y hora específica.
         Args:
             fecha_hora (str): Fecha y hora para verificar disponibilidad (formato: 'YYYY-MM-DD HH:MM:SS').
+            personas (int, optional): Tamaño del grupo; las mesas vienen de mejor a peor ajuste.
         Returns:
             List[Dict[str, Any]]: Lista de mesas disponibles.
         """
-        params = {"fecha_hora": fecha_hora}
-        r = requests.get(f"{self.base_url}/mesas/disponibles/", params=params)
+        params = {"fecha_hora_str": fecha_hora, "personas": personas}
+        r = sesion.get(f"{self.base_url}/mesas/disponibles/", params=params, timeout=TIMEOUT_SEGUNDOS)
+        r.raise_for_status()
+        return r.json()
+
+    # === MÉTODO: obtener_grilla_disponibilidad ===
+    # Obtiene la disponibilidad de todas las mesas para un día completo en una sola llamada.
+    def obtener_grilla_disponibilidad(self, fecha: str, paso_minutos: int = 30, hora_inicio: int = 0, hora_fin: int = 24) -> Dict[str, Any]:
+        """
+        Obtiene la matriz mesa × franja horaria de un día.
+        Args:
+            fecha (str): Fecha en formato 'YYYY-MM-DD'.
+            paso_minutos (int, optional): Largo de cada franja en minutos.
+            hora_inicio (int, optional): Primera hora del día incluida.
+            hora_fin (int, optional): Hora en la que termina la grilla (24 = fin del día).
+        Returns:
+            Dict[str, Any]: 'franjas' (inicio de cada franja) y 'mesas', cada una con
+            'numero', 'capacidad' y 'libre' (un booleano por franja).
+        """
+        params = {"fecha": fecha, "paso_minutos": paso_minutos, "hora_inicio": hora_inicio, "hora_fin": hora_fin}
+        r = sesion.get(f"{self.base_url}/reservas/grilla", params=params, timeout=TIMEOUT_SEGUNDOS)
         r.raise_for_status()
         return r.json()
 
@@ -3,6 +3,12 @@ import flet as ft
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
 
+# Horas que muestra la grilla de disponibilidad (hora_fin 24 = hasta medianoche)
+HORARIO_GRILLA = (12, 24)
+ANCHO_CELDA = 18
+ANCHO_ETIQUETA = 110
+ESPACIO_CELDAS = 2
+
 def crear_vista_reservas(reservas_service, clientes_service, mesas_service, on_update_ui, page):
     # DatePicker para seleccionar la fecha de las reservas
     fecha_reservas_picker = ft.DatePicker(
@@ -18,16 +24,26 @@ def crear_vista_reservas(reservas_service, clientes_service, mesas_service, on_u
     # Dropdown para seleccionar cliente (solo clientes existentes) - CORREGIDO
     cliente_dropdown = ft.Dropdown(label="Cliente", width=300)
 
-    # Dropdown para seleccionar la mesa (1 a 6)
+    # Dropdown para seleccionar la mesa (se llena con las mesas de la grilla)
     mesa_dropdown = ft.Dropdown(
         label="Mesa",
-        options=[ft.dropdown.Option(str(i)) for i in range(1, 7)], # Opciones 1 a 6
+        options=[],
         width=200
     )
 
     hora_inicio = ft.TextField(label="Hora Inicio (HH:MM)", width=150)
     duracion_horas = ft.TextField(label="Duración (Horas)", width=150, value="1")
 
+    # Grilla mesa × franja del día: una sola llamada al backend por día
+    paso_dropdown = ft.Dropdown(
+        label="Franja (min)",
+        options=[ft.dropdown.Option(p) for p in ("15", "30", "60")],
+        value="30",
+        width=140,
+        on_change=lambda e: actualizar_grilla()
+    )
+    grilla_disponibilidad = ft.Column(spacing=ESPACIO_CELDAS)
+
     # Lista de reservas
     lista_reservas = ft.ListView(
         expand=1,
@@ -49,13 +65,69 @@ def crear_vista_reservas(reservas_service, clientes_service, mesas_service, on_u
             cliente_dropdown.options = [ft.dropdown.Option(text="Error al cargar clientes", key="-1")]
 
 
+    def fecha_seleccionada() -> str:
+        fecha_str = fecha_reservas_text.value.split(": ")[1]
+        return datetime.now().strftime("%Y-%m-%d") if fecha_str == "Hoy" else fecha_str
+
+    def elegir_celda(mesa_numero: int, hora: str):
+        """Clic en una franja libre: precarga mesa y hora en el formulario."""
+        mesa_dropdown.value = str(mesa_numero)
+        hora_inicio.value = hora
+        page.update()
+
+    def cargar_mesas(mesas: List[Dict[str, Any]]):
+        mesa_dropdown.options = [
+            ft.dropdown.Option(text=f"Mesa {m['numero']} ({m['capacidad']} pers.)", key=str(m['numero']))
+            for m in mesas
+        ]
+
+    def actualizar_grilla():
+        """Pide la disponibilidad del día completo y la dibuja (verde libre, rojo reservada u ocupada)."""
+        try:
+            grilla = reservas_service.obtener_grilla_disponibilidad(
+                fecha_seleccionada(), paso_minutos=int(paso_dropdown.value),
+                hora_inicio=HORARIO_GRILLA[0], hora_fin=HORARIO_GRILLA[1]
+            )
+        except Exception as e:
+            print(f"Error al cargar la grilla de disponibilidad: {e}")
+            # Sin grilla el formulario sigue sirviendo: las mesas salen de /mesas
+            try:
+                cargar_mesas([m for m in mesas_service.obtener_mesas() if not m.get("es_virtual")])
+                page.update()
+            except Exception as ex:
+                print(f"Error al cargar mesas: {ex}")
+            return
+
+        horas = [franja.split(" ")[1][:5] for franja in grilla["franjas"]]
+        # Encabezado: un rótulo por hora que ocupa el ancho de sus franjas
+        franjas_por_hora = {}
+        for hora in horas:
+            franjas_por_hora[hora[:2]] = franjas_por_hora.get(hora[:2], 0) + 1
+        encabezado = [ft.Container(width=ANCHO_ETIQUETA)] + [
+            ft.Container(ft.Text(f"{hh}h", size=10), width=n * ANCHO_CELDA + (n - 1) * ESPACIO_CELDAS)
+            for hh, n in franjas_por_hora.items()
+        ]
+        filas = [ft.Row(encabezado, spacing=ESPACIO_CELDAS)]
+        for mesa in grilla["mesas"]:
+            celdas = [ft.Container(ft.Text(f"Mesa {mesa['numero']} ({mesa['capacidad']})", size=12), width=ANCHO_ETIQUETA)]
+            for hora, libre in zip(horas, mesa["libre"]):
+                celdas.append(ft.Container(
+                    width=ANCHO_CELDA,
+                    height=20,
+                    border_radius=3,
+                    bgcolor=ft.Colors.GREEN_700 if libre else ft.Colors.RED_700,
+                    tooltip=f"Mesa {mesa['numero']} · {hora} · {'libre' if libre else 'reservada'}",
+                    on_click=(lambda e, n=mesa['numero'], h=hora: elegir_celda(n, h)) if libre else None
+                ))
+            filas.append(ft.Row(celdas, spacing=ESPACIO_CELDAS))
+        grilla_disponibilidad.controls = filas
+        # Las mesas del dropdown salen de la misma respuesta
+        cargar_mesas(grilla["mesas"])
+        page.update()
+
     def actualizar_reservas_fecha(e):
         try:
-            fecha_str = fecha_reservas_text.value.split(": ")[1]
-            if fecha_str == "Hoy":
-                fecha = datetime.now().strftime("%Y-%m-%d")
-            else:
-                fecha = fecha_str
+            fecha = fecha_seleccionada()
             # Asumiendo que el servicio maneja la fecha
             reservas = reservas_service.obtener_reservas(fecha=fecha)
             lista_reservas.controls.clear()
@@ -81,6 +153,7 @@ def crear_vista_reservas(reservas_service, clientes_service, mesas_service, on_u
             page.update()
         except Exception as e:
             print(f"Error al cargar reservas: {e}")
+        actualizar_grilla()
 
     def crear_reserva_click(e):
         # CORREGIDO: Obtener la KEY del cliente seleccionado, no el texto
@@ -188,7 +261,11 @@ def crear_vista_reservas(reservas_service, clientes_service, mesas_service, on_u
 
 
     # Configurar DatePicker
-    fecha_reservas_picker.on_change = lambda e: setattr(fecha_reservas_text, 'value', f"Fecha: {e.control.value.strftime('%Y-%m-%d')}") or page.update()
+    def cambiar_fecha(e):
+        fecha_reservas_text.value = f"Fecha: {e.control.value.strftime('%Y-%m-%d')}"
+        actualizar_reservas_fecha(None)
+
+    fecha_reservas_picker.on_change = cambiar_fecha
 
     # Cargar clientes al inicializar la vista
     cargar_clientes()
@@ -202,10 +279,16 @@ def crear_vista_reservas(reservas_service, clientes_service, mesas_service, on_u
             ft.Divider(),
             ft.Row([fecha_reservas_button, fecha_reservas_text]),
             ft.Divider(),
+            ft.Row([ft.Text("Disponibilidad del Día", size=18, weight=ft.FontWeight.BOLD), paso_dropdown]),
+            ft.Container(
+                ft.Column([ft.Row([grilla_disponibilidad], scroll=ft.ScrollMode.AUTO)], scroll=ft.ScrollMode.AUTO),
+                height=260
+            ),
+            ft.Divider(),
             ft.Text("Crear Nueva Reserva", size=18, weight=ft.FontWeight.BOLD),
             # --- CAMPOS MODIFICADOS ---
             cliente_dropdown,  # Dropdown para cliente existente
-            mesa_dropdown,     # Dropdown para seleccionar mesa (1-6)
+            mesa_dropdown,     # Dropdown con las mesas de la grilla
             # --- FIN CAMPOS MODIFICADOS ---
             ft.Row([hora_inicio, duracion_horas]),
             ft.ElevatedButton(
@@ -222,4 +305,5 @@ def crear_vista_reservas(reservas_service, clientes_service, mesas_service, on_u
     )
 
     vista.cargar_clientes = cargar_clientes
+    vista.actualizar_dia = lambda: actualizar_reservas_fecha(None)
     return vista
\ No newline at end of file
@@ -0,0 +1,522 @@
+# === RESPALDO_STREAMING.PY ===
+# Respaldo lógico por streaming: cada tabla sale con COPY ... TO STDOUT y pasa directo por
+# gzip a trozos de tamaño acotado, cada uno con su sha256 en `manifiesto.json`. Nada se
+# escribe sin comprimir ni se relee para calcular tamaños o checksums.
+#
+# Modos:
+#   completo     → todas las tablas con datos propios.
+#   diferencial  → sólo los pedidos/reservas con `updated_at` posterior al respaldo base (y
+#                  las líneas de esos pedidos), la lista de claves vigentes para detectar
+#                  los borrados y las tablas chicas (menú, clientes, mesas...) enteras.
+#
+# Restaurar un diferencial aplica toda la cadena: el completo del que parte y los
+# diferenciales intermedios, en orden. Las tablas de resumen de ventas no se exportan:
+# se reconstruyen desde `pedidos` al terminar.
+#
+#   python respaldo_streaming.py exportar DESTINO [--diferencial BASE]
+#   python respaldo_streaming.py verificar RUTA
+#   python respaldo_streaming.py restaurar RUTA [--reemplazar]
+
+import os
+import sys
+import json
+import gzip
+import hashlib
+import argparse
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import psycopg2
+
+import resumen_ventas
+
+log = logging.getLogger("RestaurantIA")
+
+FORMATO_MANIFIESTO = 1
+ARCHIVO_MANIFIESTO = "manifiesto.json"
+# Los trozos se cortan al superar este tamaño SIN comprimir (siempre en un límite de fila)
+TAMANO_TROZO_BYTES = int(os.environ.get("RESPALDO_TROZO_MB", "128")) * 1024 * 1024
+NIVEL_COMPRESION = int(os.environ.get("RESPALDO_COMPRESION", "6"))
+
+# Orden de restauración (padres antes que hijos) y qué exporta un diferencial de cada tabla
+TABLAS = [
+    ("clientes", "completo"),
+    ("mesas", "completo"),
+    ("menu", "completo"),
+    ("inventario", "completo"),
+    ("recetas", "completo"),
+    ("ingredientes_recetas", "completo"),
+    ("configuraciones", "completo"),
+    ("contador_pedidos_app", "completo"),
+    ("pedidos", "cambios"),
+    ("pedido_items", "por_pedido"),
+    ("reservas", "cambios"),
+]
+# Tablas que no se respaldan: derivadas (se reconstruyen), de control o temporales
+TABLAS_EXCLUIDAS = {
+    "resumen_ventas_hora", "resumen_ventas_producto",  # resumen_ventas.reconstruir
+    "pedidos_eliminados",  # feed de borrados para los clientes, se purga a diario
+    "schema_migraciones",  # la crea migraciones.aplicar en el destino
+    "respaldos",  # historial local de trabajos de respaldo
+    "menu_version",  # contador de la caché del menú: se avanza al restaurar
+}
+# Un diferencial de `pedido_items` lleva las líneas de los pedidos que cambiaron
+PADRE_POR_PEDIDO = ("pedidos", "pedido_id")
+
+Avance = Callable[[float, str], None]
+
+
+class ErrorRespaldo(Exception):
+    pass
+
+
+# === ESCRITURA: COPY → gzip → trozos con sha256 ===
+class _ArchivoConHash:
+    """Archivo binario que va calculando el sha256 y el tamaño de lo que se escribe o lee."""
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self.hash = hashlib.sha256()
+        self.bytes = 0
+
+    def write(self, datos):
+        self.hash.update(datos)
+        self.bytes += len(datos)
+        return self.archivo.write(datos)
+
+    def read(self, tamano=-1):
+        datos = self.archivo.read(tamano)
+        self.hash.update(datos)
+        self.bytes += len(datos)
+        return datos
+
+    def flush(self):
+        self.archivo.flush()
+
+
+class EscritorTrozos:
+    """
+    Destino de `copy_expert(COPY ... TO STDOUT)`. psycopg2 escribe fila por fila, así que
+    cambiar de trozo entre dos escrituras nunca corta una fila.
+    """
+
+    def __init__(self, directorio: Path, prefijo: str, al_cerrar_trozo: Optional[Callable[[int], None]] = None):
+        self.directorio = directorio
+        self.prefijo = prefijo
+        self.al_cerrar_trozo = al_cerrar_trozo
+        self.trozos: List[Dict[str, Any]] = []
+        self._archivo = None
+        self._hash = None
+        self._gzip = None
+        self._sin_comprimir = 0
+        self._filas = 0
+
+    def _abrir(self) -> None:
+        nombre = f"{self.prefijo}.{len(self.trozos) + 1:04d}.copy.gz"
+        self._archivo = open(self.directorio / nombre, "wb")
+        self._hash = _ArchivoConHash(self._archivo)
+        # mtime=0: el mismo contenido produce el mismo archivo (y el mismo checksum)
+        self._gzip = gzip.GzipFile(filename="", mode="wb", fileobj=self._hash, compresslevel=NIVEL_COMPRESION, mtime=0)
+        self.trozos.append({"archivo": nombre})
+        self._sin_comprimir = 0
+        self._filas = 0
+
+    def _cerrar_trozo(self) -> None:
+        self._gzip.close()
+        self._archivo.close()
+        self.trozos[-1].update({
+            "filas": self._filas,
+            "bytes": self._hash.bytes,
+            "bytes_sin_comprimir": self._sin_comprimir,
+            "sha256": self._hash.hash.hexdigest(),
+        })
+        if self.al_cerrar_trozo:
+            self.al_cerrar_trozo(self._sin_comprimir)
+        self._gzip = None
+
+    def write(self, datos) -> int:
+        if isinstance(datos, str):
+            datos = datos.encode("utf-8")
+        if self._gzip is None:
+            self._abrir()
+        elif self._sin_comprimir >= TAMANO_TROZO_BYTES:
+            self._cerrar_trozo()
+            self._abrir()
+        self._gzip.write(datos)
+        self._sin_comprimir += len(datos)
+        self._filas += datos.count(b"\n")
+        return len(datos)
+
+    def cerrar(self) -> List[Dict[str, Any]]:
+        # Una tabla vacía igual deja un trozo (vacío) para que el manifiesto sea uniforme
+        if self._gzip is None:
+            self._abrir()
+        self._cerrar_trozo()
+        return self.trozos
+
+
+# === ESQUEMA ===
+def _columnas(cursor, tabla: str) -> List[str]:
+    # Las columnas generadas (reservas.periodo) las recalcula la base al restaurar
+    cursor.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = %s AND is_generated = 'NEVER'
+        ORDER BY ordinal_position
+    """, (tabla,))
+    return [f['column_name'] for f in cursor.fetchall()]
+
+
+def _clave_primaria(cursor, tabla: str) -> List[str]:
+    cursor.execute("""
+        SELECT a.attname FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+        WHERE i.indrelid = %s::regclass AND i.indisprimary
+        ORDER BY array_position(i.indkey::int2[], a.attnum)
+    """, (f"public.{tabla}",))
+    return [f['attname'] for f in cursor.fetchall()]
+
+
+def _version_esquema(cursor) -> int:
+    cursor.execute("SELECT COALESCE(MAX(version), -1) AS version FROM schema_migraciones")
+    return cursor.fetchone()['version']
+
+
+def _comprobar_tablas(cursor) -> None:
+    """Una tabla nueva sin clasificar haría respaldos incompletos sin que nadie se entere."""
+    cursor.execute("SELECT tablename FROM pg_tables WHERE schemaname = 'public'")
+    existentes = {f['tablename'] for f in cursor.fetchall()}
+    conocidas = {t for t, _ in TABLAS} | TABLAS_EXCLUIDAS
+    sin_clasificar = existentes - conocidas
+    if sin_clasificar:
+        raise ErrorRespaldo(
+            f"Tablas sin clasificar en respaldo_streaming.TABLAS / TABLAS_EXCLUIDAS: {', '.join(sorted(sin_clasificar))}"
+        )
+
+
+def _cita(columna: str) -> str:
+    return f'"{columna}"'
+
+
+def _lista_columnas(columnas: List[str]) -> str:
+    return ", ".join(_cita(c) for c in columnas)
+
+
+# === MANIFIESTOS Y CADENA ===
+def leer_manifiesto(ruta: Path) -> Dict[str, Any]:
+    archivo = Path(ruta) / ARCHIVO_MANIFIESTO
+    if not archivo.exists():
+        raise ErrorRespaldo(f"{ruta} no es un respaldo por streaming (falta {ARCHIVO_MANIFIESTO})")
+    manifiesto = json.loads(archivo.read_text(encoding="utf-8"))
+    if manifiesto.get("formato") != FORMATO_MANIFIESTO:
+        raise ErrorRespaldo(f"Formato de manifiesto no soportado: {manifiesto.get('formato')}")
+    return manifiesto
+
+
+def cadena(ruta: Path) -> List[Path]:
+    """Respaldos a aplicar para llegar a `ruta`: el completo del que parte y los diferenciales en orden."""
+    rutas = [Path(ruta)]
+    manifiesto = leer_manifiesto(ruta)
+    while manifiesto["tipo"] == "diferencial":
+        base = rutas[0].parent / manifiesto["base"]
+        if not base.exists():
+            raise ErrorRespaldo(f"Falta el respaldo base {base} del diferencial {rutas[0].name}")
+        rutas.insert(0, base)
+        manifiesto = leer_manifiesto(base)
+    return rutas
+
+
+# === EXPORTAR ===
+def exportar(conn, destino: Path, base: Optional[Path] = None, avance: Optional[Avance] = None) -> Dict[str, Any]:
+    """
+    Exporta a `destino` (un directorio nuevo) desde una foto consistente de la base.
+    Con `base` el respaldo es diferencial respecto de ese respaldo (completo o diferencial).
+    """
+    destino = Path(destino)
+    destino.mkdir(parents=True)
+    manifiesto_base = leer_manifiesto(base) if base is not None else None
+    desde = datetime.fromisoformat(manifiesto_base["marca"]) if manifiesto_base else None
+    tipo = "diferencial" if manifiesto_base else "completo"
+    avance = avance or (lambda fraccion, mensaje: None)
+
+    conn.rollback()
+    try:
+        with conn.cursor() as cursor:
+            # Todas las tablas salen de la misma foto, aunque sigan entrando pedidos
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+            _comprobar_tablas(cursor)
+            # `updated_at` toma la hora de INICIO de la transacción que modifica la fila: una
+            # transacción abierta ahora puede confirmar después filas con hora anterior a esta
+            # foto. El próximo diferencial arranca desde la más vieja de ellas.
+            cursor.execute("""
+                SELECT LOCALTIMESTAMP AS instantanea,
+                       LEAST(LOCALTIMESTAMP, (
+                           SELECT MIN(xact_start)::timestamp FROM pg_stat_activity
+                           WHERE backend_xid IS NOT NULL AND pid <> pg_backend_pid()
+                       )) AS marca
+            """)
+            fila = cursor.fetchone()
+            version = _version_esquema(cursor)
+            if manifiesto_base and manifiesto_base["version_esquema"] != version:
+                raise ErrorRespaldo(
+                    f"El esquema cambió desde el respaldo base (v{manifiesto_base['version_esquema']} → v{version}): "
+                    f"hace falta un respaldo completo"
+                )
+
+            cursor.execute(
+                "SELECT relname, pg_total_relation_size(oid) AS bytes FROM pg_class WHERE relname = ANY(%s) AND relkind = 'r'",
+                ([t for t, _ in TABLAS],)
+            )
+            estimado = {f['relname']: int(f['bytes']) for f in cursor.fetchall()}
+            total_estimado = max(sum(estimado.values()), 1)
+            hecho = 0
+
+            manifiesto = {
+                "formato": FORMATO_MANIFIESTO,
+                "tipo": tipo,
+                "base": Path(base).name if base is not None else None,
+                "desde": desde.isoformat() if desde else None,
+                "instantanea": fila['instantanea'].isoformat(),
+                "marca": fila['marca'].isoformat(),
+                "version_esquema": version,
+                "tablas": [],
+            }
+
+            for orden, (tabla, modo_diferencial) in enumerate(TABLAS, start=1):
+                columnas = _columnas(cursor, tabla)
+                modo = modo_diferencial if tipo == "diferencial" else "completo"
+                where, params = "", []
+                if modo == "cambios":
+                    where, params = "WHERE updated_at >= %s", [desde]
+                elif modo == "por_pedido":
+                    padre, columna = PADRE_POR_PEDIDO
+                    where, params = f'WHERE "{columna}" IN (SELECT id FROM {padre} WHERE updated_at >= %s)', [desde]
+                avance(min(0.99, hecho / total_estimado), f"Exportando {tabla}")
+
+                def al_cerrar_trozo(bytes_sin_comprimir, tabla=tabla):
+                    avance(min(0.99, (hecho + bytes_sin_comprimir) / total_estimado), f"Exportando {tabla}")
+
+                escritor = EscritorTrozos(destino, f"{orden:02d}_{tabla}", al_cerrar_trozo)
+                consulta = cursor.mogrify(f"SELECT {_lista_columnas(columnas)} FROM {tabla} {where}", params).decode()
+                cursor.copy_expert(f"COPY ({consulta}) TO STDOUT", escritor)
+                entrada = {
+                    "tabla": tabla,
+                    "modo": modo,
+                    "columnas": columnas,
+                    "clave": _clave_primaria(cursor, tabla),
+                    "trozos": escritor.cerrar(),
+                }
+                if modo == "cambios":
+                    # Las claves vigentes: lo que falte en ellas se borró desde el respaldo base
+                    claves = EscritorTrozos(destino, f"{orden:02d}_{tabla}.claves")
+                    cursor.copy_expert(f"COPY (SELECT id FROM {tabla}) TO STDOUT", claves)
+                    entrada["claves"] = claves.cerrar()
+                manifiesto["tablas"].append(entrada)
+                hecho += estimado.get(tabla, 0)
+                filas = sum(t['filas'] for t in entrada['trozos'])
+                log.debug(f"Respaldo streaming → {tabla} ({modo}): {filas} filas en {len(entrada['trozos'])} trozo(s)")
+    finally:
+        conn.rollback()
+
+    (destino / ARCHIVO_MANIFIESTO).write_text(json.dumps(manifiesto, indent=2, ensure_ascii=False), encoding="utf-8")
+    filas = sum(t['filas'] for tabla in manifiesto["tablas"] for t in tabla["trozos"])
+    log.info(f"Respaldo {tipo} exportado → {destino} | {filas} filas | instantánea {manifiesto['instantanea']}")
+    return manifiesto
+
+
+# === VERIFICAR ===
+def _abrir_trozo(ruta: Path, trozo: Dict[str, Any]):
+    archivo = open(ruta / trozo["archivo"], "rb")
+    con_hash = _ArchivoConHash(archivo)
+    return archivo, con_hash, gzip.GzipFile(fileobj=con_hash, mode="rb")
+
+
+def _comprobar_hash(ruta: Path, trozo: Dict[str, Any], con_hash: _ArchivoConHash) -> None:
+    # Lo que gzip no llegó a leer también cuenta para el checksum
+    while con_hash.read(1024 * 1024):
+        pass
+    if con_hash.hash.hexdigest() != trozo["sha256"]:
+        raise ErrorRespaldo(f"Checksum incorrecto en {ruta.name}/{trozo['archivo']}: el respaldo está dañado")
+
+
+def verificar(ruta: Path) -> int:
+    """Comprueba los checksums de toda la cadena sin tocar la base. Devuelve cuántos trozos revisó."""
+    revisados = 0
+    for paso in cadena(ruta):
+        manifiesto = leer_manifiesto(paso)
+        for tabla in manifiesto["tablas"]:
+            for trozo in tabla["trozos"] + tabla.get("claves", []):
+                if not (paso / trozo["archivo"]).exists():
+                    raise ErrorRespaldo(f"Falta el trozo {paso.name}/{trozo['archivo']}")
+                archivo, con_hash, _ = _abrir_trozo(paso, trozo)
+                with archivo:
+                    _comprobar_hash(paso, trozo, con_hash)
+                revisados += 1
+    return revisados
+
+
+# === RESTAURAR ===
+def _copiar_desde(cursor, ruta: Path, trozos: List[Dict[str, Any]], destino_sql: str) -> None:
+    """COPY FROM de cada trozo descomprimiendo al vuelo; el checksum se valida al terminar cada uno."""
+    for trozo in trozos:
+        archivo, con_hash, descomprimido = _abrir_trozo(ruta, trozo)
+        with archivo:
+            try:
+                cursor.copy_expert(f"COPY {destino_sql} FROM STDIN", descomprimido)
+            except (psycopg2.Error, OSError, EOFError) as e:
+                # Un trozo dañado suele romper el COPY antes de llegar al final: si el checksum
+                # no coincide, ese es el error que importa
+                _comprobar_hash(ruta, trozo, con_hash)
+                raise ErrorRespaldo(f"Error al restaurar {ruta.name}/{trozo['archivo']}: {e}") from e
+            _comprobar_hash(ruta, trozo, con_hash)
+
+
+def _restaurar_completo(cursor, ruta: Path, manifiesto: Dict[str, Any]) -> None:
+    tablas = [t["tabla"] for t in manifiesto["tablas"]]
+    cursor.execute(f"TRUNCATE {', '.join(tablas)}, pedidos_eliminados, resumen_ventas_hora, resumen_ventas_producto")
+    for tabla in manifiesto["tablas"]:
+        _copiar_desde(cursor, ruta, tabla["trozos"], f"{tabla['tabla']} ({_lista_columnas(tabla['columnas'])})")
+
+
+def _aplicar_diferencial(cursor, ruta: Path, manifiesto: Dict[str, Any]) -> None:
+    """
+    Fusiona un diferencial: cada tabla se carga en una tabla temporal y se aplica con
+    INSERT ... ON CONFLICT, más los borrados (filas que ya no están en el origen).
+    """
+    temporales = []
+    for tabla in manifiesto["tablas"]:
+        nombre, modo, columnas, clave = tabla["tabla"], tabla["modo"], tabla["columnas"], tabla["clave"]
+        temporal = f"_restaurar_{nombre}"
+        cursor.execute(f"CREATE TEMP TABLE {temporal} (LIKE {nombre})")
+        temporales.append(temporal)
+        _copiar_desde(cursor, ruta, tabla["trozos"], f"{temporal} ({_lista_columnas(columnas)})")
+        coincide = " AND ".join(f't."{c}" = r."{c}"' for c in clave)
+
+        if modo == "completo":
+            cursor.execute(f"DELETE FROM {nombre} t WHERE NOT EXISTS (SELECT 1 FROM {temporal} r WHERE {coincide})")
+        elif modo == "cambios":
+            cursor.execute(f"CREATE TEMP TABLE _claves_{nombre} (id INTEGER PRIMARY KEY)")
+            temporales.append(f"_claves_{nombre}")
+            _copiar_desde(cursor, ruta, tabla["claves"], f"_claves_{nombre} (id)")
+            cursor.execute(f"DELETE FROM {nombre} t WHERE NOT EXISTS (SELECT 1 FROM _claves_{nombre} r WHERE r.id = t.id)")
+        elif modo == "por_pedido":
+            padre, columna = PADRE_POR_PEDIDO
+            cursor.execute(f'DELETE FROM {nombre} WHERE "{columna}" IN (SELECT id FROM _restaurar_{padre})')
+
+        resto = [c for c in columnas if c not in clave]
+        actualizar = (
+            "DO UPDATE SET " + ", ".join(f"{_cita(c)} = EXCLUDED.{_cita(c)}" for c in resto)
+            if resto else "DO NOTHING"
+        )
+        cursor.execute(f"""
+            INSERT INTO {nombre} ({_lista_columnas(columnas)})
+            SELECT {_lista_columnas(columnas)} FROM {temporal}
+            ON CONFLICT ({_lista_columnas(clave)}) {actualizar}
+        """)
+    # El siguiente diferencial de la cadena vuelve a crearlas
+    cursor.execute(f"DROP TABLE {', '.join(temporales)}")
+
+
+def restaurar(conn, ruta: Path, reemplazar: bool = False) -> Dict[str, Any]:
+    """
+    Restaura la cadena que termina en `ruta` sobre la base de `conn`, que debe tener el
+    esquema en la misma versión (migraciones.aplicar). Todo va en una transacción: si un
+    trozo falla su checksum no queda nada a medias.
+    """
+    pasos = cadena(Path(ruta))
+    manifiestos = [leer_manifiesto(p) for p in pasos]
+    with conn.cursor() as cursor:
+        version = _version_esquema(cursor)
+        if manifiestos[-1]["version_esquema"] != version:
+            raise ErrorRespaldo(
+                f"El respaldo es del esquema v{manifiestos[-1]['version_esquema']} y la base está en v{version}"
+            )
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM pedidos) AS hay")
+        if cursor.fetchone()['hay'] and not reemplazar:
+            raise ErrorRespaldo("La base de destino ya tiene pedidos: usa --reemplazar para sobrescribirla")
+
+        tablas = [t for t, _ in TABLAS]
+        # Sin triggers de usuario: `updated_at` conserva su valor original y el resumen de
+        # ventas se reconstruye una sola vez al final en vez de fila por fila
+        for tabla in tablas:
+            cursor.execute(f"ALTER TABLE {tabla} DISABLE TRIGGER USER")
+        for paso, manifiesto in zip(pasos, manifiestos):
+            log.info(f"Restaurando {manifiesto['tipo']} {paso.name} (instantánea {manifiesto['instantanea']})")
+            if manifiesto["tipo"] == "completo":
+                _restaurar_completo(cursor, paso, manifiesto)
+            else:
+                _aplicar_diferencial(cursor, paso, manifiesto)
+        for tabla in tablas:
+            cursor.execute(f"ALTER TABLE {tabla} ENABLE TRIGGER USER")
+
+        # Las secuencias siguen desde el mayor id restaurado
+        for tabla in tablas:
+            cursor.execute("""
+                SELECT attname AS columna, pg_get_serial_sequence(%s, attname) AS secuencia FROM pg_attribute
+                WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+                  AND pg_get_serial_sequence(%s, attname) IS NOT NULL
+            """, (tabla, tabla, tabla))
+            for fila in cursor.fetchall():
+                columna = _cita(fila['columna'])
+                cursor.execute(
+                    f"SELECT setval(%s, COALESCE(MAX({columna}), 1), MAX({columna}) IS NOT NULL) FROM {tabla}",
+                    (fila['secuencia'],)
+                )
+
+        # El menú se cargó con los triggers apagados: la versión se sube a mano para que el
+        # ETag de GET /menu/items nunca repita una versión con otro contenido (y el backend
+        # en marcha recibe `menu_actualizado`)
+        cursor.execute("UPDATE menu_version SET version = version + 1")
+    conn.commit()
+
+    resumen_ventas.reconstruir(conn)
+    log.info(f"Restauración completa → {len(pasos)} respaldo(s) aplicados hasta {manifiestos[-1]['instantanea']}")
+    return {"respaldos_aplicados": [p.name for p in pasos], "instantanea": manifiestos[-1]["instantanea"]}
+
+
+# === CLI ===
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Respaldo por streaming (COPY + gzip en trozos) de RestaurantIA")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_exp = sub.add_parser("exportar", help="Exporta un respaldo completo o diferencial a un directorio nuevo")
+    p_exp.add_argument("destino")
+    p_exp.add_argument("--diferencial", metavar="BASE", help="Respaldo sobre el que se calcula el diferencial")
+    p_ver = sub.add_parser("verificar", help="Comprueba los checksums de un respaldo y de su cadena")
+    p_ver.add_argument("ruta")
+    p_res = sub.add_parser("restaurar", help="Restaura un respaldo (y su cadena) en la base de DATABASE_URL")
+    p_res.add_argument("ruta")
+    p_res.add_argument("--reemplazar", action="store_true", help="Sobrescribe una base que ya tiene datos")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.comando == "verificar":
+            print(f"OK → {verificar(Path(args.ruta))} trozos con checksum correcto")
+            return 0
+
+        from db_pool import pool
+        import migraciones
+        conn = pool.obtener()
+        try:
+            if args.comando == "exportar":
+                manifiesto = exportar(conn, Path(args.destino), Path(args.diferencial) if args.diferencial else None)
+                for tabla in manifiesto["tablas"]:
+                    filas = sum(t['filas'] for t in tabla['trozos'])
+                    kb = sum(t['bytes'] for t in tabla['trozos']) / 1024
+                    print(f"{tabla['tabla']:<22} {tabla['modo']:<11} {filas:>10} filas {kb:>10.1f} KB")
+            else:
+                migraciones.aplicar(conn)
+                resultado = restaurar(conn, Path(args.ruta), args.reemplazar)
+                print(f"Restaurado → {' + '.join(resultado['respaldos_aplicados'])}")
+        finally:
+            pool.devolver(conn)
+            pool.cerrar()
+    except ErrorRespaldo as e:
+        print(f"ERROR: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+    sys.exit(main())
@@ -0,0 +1,406 @@
+# === RESPALDOS.PY ===
+# Respaldos de la base de datos como trabajos en segundo plano. POST /backup encola el
+# trabajo y responde al instante; pg_dump corre en un hilo aparte, en formato directorio
+# comprimido y con varios procesos en paralelo (-j), y el avance se consulta con
+# GET /backup/{id}. El estado se guarda en la tabla `respaldos`, así cualquier worker
+# de uvicorn puede responder. Al terminar se borran los respaldos viejos según la
+# política de retención.
+#
+# Modos:
+#   pg_dump      → pg_dump en formato directorio (restaurable con pg_restore).
+#   completo     → respaldo_streaming: COPY por tabla a trozos gzip con checksum.
+#   diferencial  → respaldo_streaming sólo con los cambios desde el último completo/diferencial.
+#
+# Los dos leen de una foto consistente de la base y sólo toman bloqueos ACCESS SHARE:
+# los pedidos siguen entrando mientras corren.
+
+import os
+import re
+import glob
+import shutil
+import socket
+import threading
+import subprocess
+import time
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import psycopg2
+import psycopg2.extensions
+
+import respaldo_streaming
+from db_pool import DATABASE_URL, pool
+
+log = logging.getLogger("RestaurantIA")
+
+DIRECTORIO_RESPALDOS = Path(os.environ.get(
+    "RESPALDO_DIR", os.path.join(os.path.expanduser("~"), "Desktop", "Backups_RestaurantPRO")
+))
+RESPALDO_JOBS = max(int(os.environ.get("RESPALDO_JOBS", "2")), 1)
+RESPALDO_COMPRESION = int(os.environ.get("RESPALDO_COMPRESION", "6"))
+# Retención: se conservan los últimos N respaldos completos y ninguno más viejo que X días (0 = sin límite)
+RESPALDO_CONSERVAR = max(int(os.environ.get("RESPALDO_CONSERVAR", "7")), 1)
+RESPALDO_DIAS = int(os.environ.get("RESPALDO_DIAS", "30"))
+
+PREFIJO_RESPALDO = "backup_restaurant_db_"
+MODOS = ("pg_dump", "completo", "diferencial")
+# Mientras el hilo del trabajo vive, un temporizador renueva actualizado_en cada LATIDO_SEGUNDOS
+# (pg_dump puede pasar minutos sin escribir nada con una tabla grande). Un trabajo sin latido
+# en VENCIDO_SEGUNDOS se da por muerto sólo si además su proceso ya no existe
+LATIDO_SEGUNDOS = 5
+VENCIDO_SEGUNDOS = 120
+# Proceso dueño de cada trabajo (columna respaldos.propietario)
+PROPIETARIO = f"{socket.gethostname()}:{os.getpid()}"
+
+PATRON_TABLA = re.compile(r'dumping contents of table "([^"]+)"')
+
+# Parámetros de DATABASE_URL → opciones de pg_dump (los que no son secretos) o variables de
+# entorno de libpq. La contraseña va sólo en PGPASSWORD: en la línea de comandos la vería
+# cualquiera con `ps` o el Administrador de tareas mientras dura el respaldo
+OPCIONES_PG = {"host": "--host", "port": "--port", "user": "--username", "dbname": "--dbname"}
+VARIABLES_PG = {
+    "password": "PGPASSWORD", "hostaddr": "PGHOSTADDR", "passfile": "PGPASSFILE",
+    "sslmode": "PGSSLMODE", "sslrootcert": "PGSSLROOTCERT", "sslcert": "PGSSLCERT", "sslkey": "PGSSLKEY",
+    "connect_timeout": "PGCONNECT_TIMEOUT", "application_name": "PGAPPNAME", "options": "PGOPTIONS",
+}
+
+
+def buscar_herramienta_pg(nombre: str) -> Optional[str]:
+    """Ruta de pg_dump / pg_restore: primero el PATH, luego la instalación estándar de Windows."""
+    path_in_path = shutil.which(nombre)
+    if path_in_path:
+        log.debug(f"{nombre} encontrado en PATH: {path_in_path}")
+        return path_in_path
+
+    possible_paths = glob.glob(f"C:/Program Files/PostgreSQL/*/bin/{nombre}.exe")
+    if possible_paths:
+        possible_paths.sort()
+        elegido = possible_paths[-1]
+        log.debug(f"{nombre} encontrado en instalación: {elegido}")
+        return elegido
+
+    log.error(f"{nombre} NO ENCONTRADO en el sistema")
+    return None
+
+
+def _proceso_vivo(pid: int) -> bool:
+    """El proceso `pid` de esta máquina sigue corriendo."""
+    if os.name == "nt":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        codigo = ctypes.c_ulong()
+        try:
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(codigo))
+        finally:
+            kernel32.CloseHandle(handle)
+        return codigo.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def conexion_pg_dump(dsn: str = DATABASE_URL) -> Tuple[List[str], Dict[str, str]]:
+    """Opciones de línea de comandos y entorno para que pg_dump se conecte a `dsn` sin exponer la contraseña."""
+    opciones: List[str] = []
+    entorno = os.environ.copy()
+    for clave, valor in psycopg2.extensions.parse_dsn(dsn).items():
+        if clave in OPCIONES_PG:
+            opciones.append(f"{OPCIONES_PG[clave]}={valor}")
+        elif clave in VARIABLES_PG:
+            entorno[VARIABLES_PG[clave]] = valor
+        else:
+            log.warning(f"Respaldo → parámetro de conexión '{clave}' no se pasa a pg_dump")
+    return opciones, entorno
+
+
+def _tamano_directorio(ruta: Path) -> int:
+    if ruta.is_file():
+        return ruta.stat().st_size
+    return sum(f.stat().st_size for f in ruta.rglob("*") if f.is_file())
+
+
+def _formatear(fila) -> Dict[str, Any]:
+    return {
+        "id": fila['id'],
+        "modo": fila['modo'],
+        "base_id": fila['base_id'],
+        "estado": fila['estado'],
+        "progreso": float(fila['progreso']),
+        "mensaje": fila['mensaje'],
+        "ruta": fila['ruta'],
+        "tamano_mb": round(fila['tamano_bytes'] / (1024 * 1024), 2) if fila['tamano_bytes'] is not None else None,
+        "creado_en": fila['creado_en'].strftime("%Y-%m-%d %H:%M:%S"),
+        "terminado_en": fila['terminado_en'].strftime("%Y-%m-%d %H:%M:%S") if fila['terminado_en'] else None,
+        "duracion_segundos": round((fila['terminado_en'] - fila['iniciado_en']).total_seconds(), 1)
+            if fila['terminado_en'] and fila['iniciado_en'] else None,
+    }
+
+
+class ServicioRespaldos:
+    def __init__(self, pool_db):
+        self.pool = pool_db
+        self._hilos: Dict[int, threading.Thread] = {}
+
+    # === CONSULTAS ===
+    def _actualizar(self, respaldo_id: int, **campos) -> None:
+        asignaciones = ", ".join(f"{k} = %s" for k in campos)
+        conn = self.pool.obtener()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE respaldos SET {asignaciones}, actualizado_en = CURRENT_TIMESTAMP WHERE id = %s",
+                    list(campos.values()) + [respaldo_id]
+                )
+            conn.commit()
+        finally:
+            self.pool.devolver(conn)
+
+    def obtener(self, conn, respaldo_id: int) -> Optional[Dict[str, Any]]:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT * FROM respaldos WHERE id = %s", (respaldo_id,))
+            fila = cursor.fetchone()
+        return _formatear(fila) if fila else None
+
+    def listar(self, conn, limite: int = 20) -> List[Dict[str, Any]]:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT * FROM respaldos ORDER BY creado_en DESC LIMIT %s", (limite,))
+            return [_formatear(f) for f in cursor.fetchall()]
+
+    # === TRABAJOS HUÉRFANOS ===
+    def _huerfano(self, fila) -> bool:
+        """Un trabajo sin latido está huérfano si el hilo o el proceso que lo ejecutaba ya no existe."""
+        propietario = fila['propietario']
+        if propietario == PROPIETARIO:
+            hilo = self._hilos.get(fila['id'])
+            return hilo is None or not hilo.is_alive()
+        servidor, _, pid = (propietario or "").rpartition(":")
+        if servidor == socket.gethostname() and pid.isdigit():
+            return not _proceso_vivo(int(pid))
+        # Otra máquina (o un trabajo de antes de la columna): sólo queda el latido vencido
+        return True
+
+    def _marcar_huerfanos(self, cursor) -> None:
+        cursor.execute("""
+            SELECT id, propietario FROM respaldos
+            WHERE estado IN ('pendiente', 'en_curso')
+              AND actualizado_en < CURRENT_TIMESTAMP - make_interval(secs => %s)
+        """, (VENCIDO_SEGUNDOS,))
+        huerfanos = [f['id'] for f in cursor.fetchall() if self._huerfano(f)]
+        if huerfanos:
+            cursor.execute("""
+                UPDATE respaldos
+                SET estado = 'fallido', mensaje = 'Interrumpido: el servidor se detuvo durante el respaldo',
+                    terminado_en = CURRENT_TIMESTAMP
+                WHERE id = ANY(%s)
+            """, (huerfanos,))
+            log.warning(f"Respaldos interrumpidos marcados como fallidos → {huerfanos}")
+
+    # === ENCOLAR ===
+    def encolar(self, conn, modo: str = "pg_dump") -> Dict[str, Any]:
+        """
+        Crea el trabajo y lanza el hilo que lo ejecuta. Si ya hay uno pendiente o en curso
+        se devuelve ese (pedir dos veces no lanza dos pg_dump). Un diferencial sin respaldo
+        anterior sobre el cual aplicarse se hace completo.
+        """
+        if modo not in MODOS:
+            raise ValueError(f"Modo de respaldo inválido: {modo} (válidos: {', '.join(MODOS)})")
+        with conn.cursor() as cursor:
+            self._marcar_huerfanos(cursor)
+            base_id, base = None, None
+            if modo == "diferencial":
+                cursor.execute("""
+                    SELECT id, ruta FROM respaldos
+                    WHERE estado = 'completado' AND eliminado_en IS NULL AND modo IN ('completo', 'diferencial')
+                    ORDER BY terminado_en DESC LIMIT 1
+                """)
+                ultimo = cursor.fetchone()
+                if ultimo is None:
+                    log.warning("Respaldo diferencial sin respaldo base → se hace completo")
+                    modo = "completo"
+                else:
+                    base_id, base = ultimo['id'], Path(ultimo['ruta'])
+            try:
+                cursor.execute(
+                    "INSERT INTO respaldos (modo, base_id, propietario) VALUES (%s, %s, %s) RETURNING *",
+                    (modo, base_id, PROPIETARIO)
+                )
+                fila = cursor.fetchone()
+                conn.commit()
+            except psycopg2.errors.UniqueViolation:
+                conn.rollback()
+                cursor.execute("SELECT * FROM respaldos WHERE estado IN ('pendiente', 'en_curso')")
+                fila = cursor.fetchone()
+                log.info(f"Respaldo ya en curso → se devuelve el trabajo #{fila['id']}")
+                return _formatear(fila)
+
+        hilo = threading.Thread(target=self._ejecutar, args=(fila['id'], modo, base), name=f"respaldo-{fila['id']}", daemon=True)
+        self._hilos[fila['id']] = hilo
+        hilo.start()
+        log.warning(f"RESPALDO #{fila['id']} ENCOLADO → {modo} en segundo plano")
+        return _formatear(fila)
+
+    # === EJECUCIÓN (HILO) ===
+    def _latir(self, respaldo_id: int, parar: threading.Event) -> None:
+        """Renueva el latido del trabajo mientras su hilo corre, escriba o no algo pg_dump."""
+        while not parar.wait(LATIDO_SEGUNDOS):
+            conn = None
+            try:
+                conn = self.pool.obtener()
+                with conn.cursor() as cursor:
+                    cursor.execute("UPDATE respaldos SET actualizado_en = CURRENT_TIMESTAMP WHERE id = %s", (respaldo_id,))
+                conn.commit()
+            except Exception as e:
+                log.warning(f"Respaldo #{respaldo_id} → no se pudo registrar el latido: {e}")
+            finally:
+                if conn is not None:
+                    self.pool.devolver(conn)
+
+    def _tamanos_tablas(self) -> Dict[str, int]:
+        conn = self.pool.obtener()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT n.nspname || '.' || c.relname AS tabla, pg_total_relation_size(c.oid) AS bytes
+                    FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+                    WHERE c.relkind IN ('r', 'p') AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+                """)
+                return {f['tabla']: int(f['bytes']) for f in cursor.fetchall()}
+        finally:
+            self.pool.devolver(conn)
+
+    def _volcar_pg_dump(self, respaldo_id: int, ruta_parcial: Path) -> None:
+        pg_dump = buscar_herramienta_pg("pg_dump")
+        if not pg_dump:
+            raise RuntimeError("No se encontró pg_dump. Instala PostgreSQL o agrégalo al PATH.")
+        tamanos = self._tamanos_tablas()
+        total = max(sum(tamanos.values()), 1)
+
+        opciones, entorno = conexion_pg_dump()
+        comando = [
+            pg_dump, *opciones, "--format", "directory", "--jobs", str(RESPALDO_JOBS),
+            "--compress", str(RESPALDO_COMPRESION), "--verbose", "--file", str(ruta_parcial)
+        ]
+        log.info(f"Respaldo #{respaldo_id} → pg_dump formato directorio, -j {RESPALDO_JOBS}, -Z {RESPALDO_COMPRESION}")
+        proceso = subprocess.Popen(comando, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+                                   errors="replace", env=entorno)
+
+        volcado, ultimo_avance, ultimas_lineas = 0, 0.0, []
+        for linea in proceso.stderr:
+            ultimas_lineas = (ultimas_lineas + [linea.strip()])[-5:]
+            coincidencia = PATRON_TABLA.search(linea)
+            if coincidencia:
+                volcado += tamanos.get(coincidencia.group(1), 0)
+            if time.monotonic() - ultimo_avance >= LATIDO_SEGUNDOS or coincidencia:
+                ultimo_avance = time.monotonic()
+                progreso = min(99.0, 100.0 * volcado / total)
+                tabla = coincidencia.group(1) if coincidencia else ""
+                self._actualizar(respaldo_id, progreso=round(progreso, 2),
+                                 mensaje=f"Volcando {tabla}" if tabla else "Volcando tablas...")
+        codigo = proceso.wait()
+        if codigo != 0:
+            raise RuntimeError(f"pg_dump terminó con código {codigo}: {' | '.join(ultimas_lineas)}")
+
+    def _volcar_streaming(self, respaldo_id: int, ruta_parcial: Path, base: Optional[Path]) -> None:
+        ultimo_avance = 0.0
+
+        def avance(fraccion: float, mensaje: str) -> None:
+            nonlocal ultimo_avance
+            if time.monotonic() - ultimo_avance >= LATIDO_SEGUNDOS:
+                ultimo_avance = time.monotonic()
+                self._actualizar(respaldo_id, progreso=round(100.0 * fraccion, 2), mensaje=mensaje)
+
+        conn = self.pool.obtener()
+        try:
+            respaldo_streaming.exportar(conn, ruta_parcial, base, avance)
+        finally:
+            self.pool.devolver(conn)
+
+    def _ejecutar(self, respaldo_id: int, modo: str, base: Optional[Path]) -> None:
+        ruta_parcial = None
+        parar_latido = threading.Event()
+        threading.Thread(target=self._latir, args=(respaldo_id, parar_latido),
+                         name=f"respaldo-{respaldo_id}-latido", daemon=True).start()
+        try:
+            DIRECTORIO_RESPALDOS.mkdir(parents=True, exist_ok=True)
+            nombre = f"{PREFIJO_RESPALDO}{datetime.now():%Y%m%d_%H%M%S}_{respaldo_id}"
+            ruta_final = DIRECTORIO_RESPALDOS / nombre
+            ruta_parcial = DIRECTORIO_RESPALDOS / f"{nombre}.parcial"
+            self._actualizar(respaldo_id, estado='en_curso', iniciado_en=datetime.now(), mensaje="Volcando tablas...")
+
+            if modo == "pg_dump":
+                self._volcar_pg_dump(respaldo_id, ruta_parcial)
+            else:
+                self._volcar_streaming(respaldo_id, ruta_parcial, base)
+
+            ruta_parcial.rename(ruta_final)
+            ruta_parcial = None
+            tamano = _tamano_directorio(ruta_final)
+            self._actualizar(respaldo_id, estado='completado', progreso=100, ruta=str(ruta_final),
+                             tamano_bytes=tamano, terminado_en=datetime.now(), mensaje="Respaldo creado exitosamente.")
+            log.info(f"RESPALDO #{respaldo_id} COMPLETADO → {ruta_final} | {tamano / 1024 / 1024:.2f} MB")
+            self.podar()
+        except Exception as e:
+            log.error(f"RESPALDO #{respaldo_id} FALLÓ → {e}", exc_info=True)
+            try:
+                self._actualizar(respaldo_id, estado='fallido', terminado_en=datetime.now(), mensaje=str(e)[:2000])
+            except Exception as e2:
+                log.error(f"No se pudo registrar la falla del respaldo #{respaldo_id} → {e2}")
+        finally:
+            parar_latido.set()
+            self._hilos.pop(respaldo_id, None)
+            if ruta_parcial is not None and ruta_parcial.exists():
+                shutil.rmtree(ruta_parcial, ignore_errors=True)
+
+    # === RETENCIÓN ===
+    def podar(self) -> int:
+        """
+        Borra los respaldos completos que exceden la política de retención. Devuelve cuántos borró.
+        La política cuenta respaldos completos (pg_dump o streaming); un diferencial vive
+        mientras viva el completo del que parte su cadena.
+        """
+        conn = self.pool.obtener()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT id, modo, base_id, ruta, terminado_en FROM respaldos
+                    WHERE estado = 'completado' AND eliminado_en IS NULL
+                    ORDER BY terminado_en DESC
+                """)
+                completados = cursor.fetchall()
+                por_id = {f['id']: f for f in completados}
+                completos = [f for f in completados if f['modo'] != 'diferencial']
+                limite_fecha = datetime.now() - timedelta(days=RESPALDO_DIAS) if RESPALDO_DIAS > 0 else None
+                conservados = {
+                    f['id'] for i, f in enumerate(completos)
+                    if i < RESPALDO_CONSERVAR and not (limite_fecha and i > 0 and f['terminado_en'] < limite_fecha)
+                }
+
+                def raiz(fila):
+                    while fila is not None and fila['modo'] == 'diferencial':
+                        fila = por_id.get(fila['base_id'])
+                    return fila['id'] if fila is not None else None
+
+                a_borrar = [f for f in completados if raiz(f) not in conservados]
+                for fila in a_borrar:
+                    ruta = Path(fila['ruta']) if fila['ruta'] else None
+                    # Sólo se borra lo que este servicio creó
+                    if ruta and ruta.name.startswith(PREFIJO_RESPALDO) and ruta.exists():
+                        shutil.rmtree(ruta, ignore_errors=True) if ruta.is_dir() else ruta.unlink()
+                    cursor.execute("UPDATE respaldos SET eliminado_en = CURRENT_TIMESTAMP WHERE id = %s", (fila['id'],))
+                    log.info(f"Retención → respaldo #{fila['id']} eliminado ({ruta})")
+            conn.commit()
+            return len(a_borrar)
+        finally:
+            self.pool.devolver(conn)
+
+
+servicio_respaldos = ServicioRespaldos(pool)
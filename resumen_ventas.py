@@ -0,0 +1,262 @@
+# === RESUMEN_VENTAS.PY ===
+# Resumen de ventas pre-agregado por hora y por producto (tablas resumen_ventas_hora y
+# resumen_ventas_producto). El trigger trigger_resumen_ventas lo mantiene al día con cada
+# pedido que entra o sale de 'Entregado'/'Pagado'; este módulo lo consulta para los
+# reportes y lo reconstruye desde `pedidos` para el historial existente.
+#
+#   python resumen_ventas.py --reconstruir [--desde YYYY-MM-DD] [--hasta YYYY-MM-DD]
+#   python resumen_ventas.py --verificar   [--desde YYYY-MM-DD] [--hasta YYYY-MM-DD]
+
+import sys
+import argparse
+import logging
+from datetime import datetime, date
+from typing import Dict, List, Optional, Any, Tuple
+
+log = logging.getLogger("RestaurantIA")
+
+# Estados que cuentan como venta cerrada (los mismos que usa el trigger)
+ESTADOS_VENTA = ('Entregado', 'Pagado')
+
+
+# === RANGOS ===
+def parsear_limite(valor: Optional[str]) -> Optional[datetime]:
+    """'YYYY-MM-DD' o 'YYYY-MM-DD HH:MM[:SS]' → datetime. Lanza ValueError si no es válido."""
+    if not valor:
+        return None
+    return datetime.fromisoformat(valor.strip().replace(" ", "T"))
+
+
+def alineado_a_hora(limite: Optional[datetime]) -> bool:
+    """El resumen tiene granularidad de una hora: sólo responde exacto en límites de hora completa."""
+    return limite is None or (limite.minute == 0 and limite.second == 0 and limite.microsecond == 0)
+
+
+def _condicion_rango(desde: Optional[datetime], hasta: Optional[datetime]) -> Tuple[str, list]:
+    condiciones, params = [], []
+    if desde:
+        condiciones.append("(fecha, hora) >= (%s, %s)")
+        params += [desde.date(), desde.hour]
+    if hasta:
+        condiciones.append("(fecha, hora) < (%s, %s)")
+        params += [hasta.date(), hasta.hour]
+    return (("WHERE " + " AND ".join(condiciones)) if condiciones else ""), params
+
+
+# === CONSULTAS PARA REPORTES ===
+def totales(cursor, desde: Optional[datetime], hasta: Optional[datetime]) -> Dict[str, Any]:
+    where, params = _condicion_rango(desde, hasta)
+    cursor.execute(f"""
+        SELECT COALESCE(SUM(pedidos), 0) AS pedidos,
+               COALESCE(SUM(unidades), 0) AS unidades,
+               COALESCE(SUM(ingresos), 0) AS ingresos
+        FROM resumen_ventas_hora
+        {where}
+    """, params)
+    fila = cursor.fetchone()
+    return {"pedidos": int(fila['pedidos']), "unidades": int(fila['unidades']), "ingresos": float(fila['ingresos'])}
+
+
+def productos(cursor, desde: Optional[datetime], hasta: Optional[datetime]) -> List[Dict[str, Any]]:
+    """Unidades vendidas por producto en el rango, de mayor a menor."""
+    where, params = _condicion_rango(desde, hasta)
+    cursor.execute(f"""
+        SELECT producto AS nombre, SUM(unidades) AS cantidad
+        FROM resumen_ventas_producto
+        {where}
+        GROUP BY producto
+        HAVING SUM(unidades) > 0
+        ORDER BY cantidad DESC, nombre
+    """, params)
+    return [{"nombre": f['nombre'], "cantidad": int(f['cantidad'])} for f in cursor.fetchall()]
+
+
+def ventas_por_hora(cursor, fecha: date) -> Dict[int, float]:
+    cursor.execute("""
+        SELECT hora, ingresos
+        FROM resumen_ventas_hora
+        WHERE fecha = %s AND unidades > 0
+        ORDER BY hora
+    """, (fecha,))
+    return {int(f['hora']): float(f['ingresos']) for f in cursor.fetchall()}
+
+
+# === AGREGACIÓN DIRECTA SOBRE PEDIDOS ===
+# Para lo que el resumen no cubre (estados abiertos como 'Listo', límites a media hora).
+# Se agrega en PostgreSQL: sólo viajan las filas ya agrupadas, nunca los documentos JSONB.
+def _condicion_estados(estados: tuple, desde: Optional[datetime], hasta: Optional[datetime]) -> Tuple[str, list]:
+    condiciones, params = ["p.estado IN %s"], [estados]
+    if desde:
+        condiciones.append("p.fecha_hora >= %s")
+        params.append(desde)
+    if hasta:
+        condiciones.append("p.fecha_hora < %s")
+        params.append(hasta)
+    return " AND ".join(condiciones), params
+
+
+def totales_desde_pedidos(cursor, estados: tuple, desde: Optional[datetime], hasta: Optional[datetime]) -> Dict[str, Any]:
+    where, params = _condicion_estados(estados, desde, hasta)
+    cursor.execute(f"""
+        SELECT COUNT(DISTINCT p.id) AS pedidos,
+               COUNT(i.item) AS unidades,
+               COALESCE(SUM((i.item ->> 'precio')::numeric), 0) AS ingresos
+        FROM pedidos p
+        LEFT JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(p.items) = 'array' THEN p.items ELSE '[]'::jsonb END
+        ) AS i(item) ON TRUE
+        WHERE {where}
+    """, params)
+    fila = cursor.fetchone()
+    return {"pedidos": int(fila['pedidos']), "unidades": int(fila['unidades']), "ingresos": float(fila['ingresos'])}
+
+
+def productos_desde_pedidos(cursor, estados: tuple, desde: Optional[datetime], hasta: Optional[datetime]) -> List[Dict[str, Any]]:
+    """Unidades por producto, de mayor a menor (mismo formato que productos())."""
+    where, params = _condicion_estados(estados, desde, hasta)
+    cursor.execute(f"""
+        SELECT i.item ->> 'nombre' AS nombre, COUNT(*) AS cantidad
+        FROM pedidos p
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(p.items) = 'array' THEN p.items ELSE '[]'::jsonb END
+        ) AS i(item)
+        WHERE {where} AND i.item ->> 'nombre' IS NOT NULL AND i.item ->> 'nombre' <> ''
+        GROUP BY 1
+        ORDER BY cantidad DESC, nombre
+    """, params)
+    return [{"nombre": f['nombre'], "cantidad": int(f['cantidad'])} for f in cursor.fetchall()]
+
+
+# === RECONSTRUCCIÓN (BACKFILL) ===
+def _condicion_pedidos(desde: Optional[date], hasta: Optional[date]) -> Tuple[str, list]:
+    condiciones, params = ["p.estado IN %s", "p.fecha_hora IS NOT NULL"], [ESTADOS_VENTA]
+    if desde:
+        condiciones.append("p.fecha_hora >= %s")
+        params.append(desde)
+    if hasta:
+        condiciones.append("p.fecha_hora < %s")
+        params.append(hasta)
+    return " AND ".join(condiciones), params
+
+
+def _condicion_resumen(desde: Optional[date], hasta: Optional[date]) -> Tuple[str, list]:
+    condiciones, params = ["TRUE"], []
+    if desde:
+        condiciones.append("fecha >= %s")
+        params.append(desde)
+    if hasta:
+        condiciones.append("fecha < %s")
+        params.append(hasta)
+    return " AND ".join(condiciones), params
+
+
+def reconstruir(conn, desde: Optional[date] = None, hasta: Optional[date] = None) -> Dict[str, int]:
+    """
+    Recalcula el resumen de [desde, hasta) desde `pedidos` en una sola transacción.
+    El bloqueo EXCLUSIVE hace que los pedidos que se cierran mientras tanto esperen
+    y sumen su parte sobre el resumen ya reconstruido.
+    """
+    where_p, params_p = _condicion_pedidos(desde, hasta)
+    where_r, params_r = _condicion_resumen(desde, hasta)
+    with conn.cursor() as cursor:
+        cursor.execute("LOCK TABLE resumen_ventas_hora, resumen_ventas_producto IN EXCLUSIVE MODE")
+        cursor.execute(f"DELETE FROM resumen_ventas_hora WHERE {where_r}", params_r)
+        cursor.execute(f"DELETE FROM resumen_ventas_producto WHERE {where_r}", params_r)
+
+        cursor.execute(f"""
+            INSERT INTO resumen_ventas_hora (fecha, hora, pedidos, unidades, ingresos)
+            SELECT p.fecha_hora::date, EXTRACT(HOUR FROM p.fecha_hora),
+                   COUNT(DISTINCT p.id), COUNT(i.item), COALESCE(SUM((i.item ->> 'precio')::numeric), 0)
+            FROM pedidos p
+            LEFT JOIN LATERAL jsonb_array_elements(
+                CASE WHEN jsonb_typeof(p.items) = 'array' THEN p.items ELSE '[]'::jsonb END
+            ) AS i(item) ON TRUE
+            WHERE {where_p}
+            GROUP BY 1, 2
+        """, params_p)
+        horas = cursor.rowcount
+
+        cursor.execute(f"""
+            INSERT INTO resumen_ventas_producto (fecha, hora, producto, unidades, ingresos, pedidos)
+            SELECT p.fecha_hora::date, EXTRACT(HOUR FROM p.fecha_hora), i.item ->> 'nombre',
+                   COUNT(*), COALESCE(SUM((i.item ->> 'precio')::numeric), 0), COUNT(DISTINCT p.id)
+            FROM pedidos p
+            CROSS JOIN LATERAL jsonb_array_elements(
+                CASE WHEN jsonb_typeof(p.items) = 'array' THEN p.items ELSE '[]'::jsonb END
+            ) AS i(item)
+            WHERE {where_p} AND i.item ->> 'nombre' IS NOT NULL AND i.item ->> 'nombre' <> ''
+            GROUP BY 1, 2, 3
+        """, params_p)
+        filas_productos = cursor.rowcount
+    conn.commit()
+    log.info(f"Resumen de ventas reconstruido → {desde or 'inicio'} a {hasta or 'hoy'} | {horas} horas | {filas_productos} filas producto-hora")
+    return {"horas": horas, "filas_productos": filas_productos}
+
+
+def verificar(conn, desde: Optional[date] = None, hasta: Optional[date] = None) -> List[Dict[str, Any]]:
+    """Compara el resumen con un recálculo desde `pedidos` (sin modificar nada). Devuelve las diferencias."""
+    where_p, params_p = _condicion_pedidos(desde, hasta)
+    where_r, params_r = _condicion_resumen(desde, hasta)
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            WITH esperado AS (
+                SELECT p.fecha_hora::date AS fecha, EXTRACT(HOUR FROM p.fecha_hora)::smallint AS hora,
+                       COUNT(DISTINCT p.id) AS pedidos, COUNT(i.item) AS unidades,
+                       COALESCE(SUM((i.item ->> 'precio')::numeric), 0)::numeric(12, 2) AS ingresos
+                FROM pedidos p
+                LEFT JOIN LATERAL jsonb_array_elements(
+                    CASE WHEN jsonb_typeof(p.items) = 'array' THEN p.items ELSE '[]'::jsonb END
+                ) AS i(item) ON TRUE
+                WHERE {where_p}
+                GROUP BY 1, 2
+            ), actual AS (
+                SELECT fecha, hora, pedidos, unidades, ingresos
+                FROM resumen_ventas_hora
+                WHERE {where_r} AND (pedidos <> 0 OR unidades <> 0 OR ingresos <> 0)
+            )
+            SELECT COALESCE(e.fecha, a.fecha) AS fecha, COALESCE(e.hora, a.hora) AS hora,
+                   e.pedidos AS pedidos_esperados, a.pedidos AS pedidos_resumen,
+                   e.ingresos AS ingresos_esperados, a.ingresos AS ingresos_resumen
+            FROM esperado e
+            FULL JOIN actual a ON a.fecha = e.fecha AND a.hora = e.hora
+            WHERE e.pedidos IS DISTINCT FROM a.pedidos
+               OR e.unidades IS DISTINCT FROM a.unidades
+               OR e.ingresos IS DISTINCT FROM a.ingresos
+            ORDER BY 1, 2
+        """, params_p + params_r)
+        diferencias = [dict(f) for f in cursor.fetchall()]
+    conn.rollback()
+    return diferencias
+
+
+# === LÍNEA DE COMANDOS ===
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Reconstruye o verifica el resumen de ventas pre-agregado.")
+    accion = parser.add_mutually_exclusive_group(required=True)
+    accion.add_argument("--reconstruir", action="store_true", help="Recalcula el resumen desde la tabla pedidos")
+    accion.add_argument("--verificar", action="store_true", help="Compara el resumen con los pedidos sin modificar nada")
+    parser.add_argument("--desde", type=date.fromisoformat, help="Primer día incluido (YYYY-MM-DD)")
+    parser.add_argument("--hasta", type=date.fromisoformat, help="Día final EXCLUIDO (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    from db_pool import pool
+    conn = pool.obtener()
+    try:
+        if args.reconstruir:
+            resultado = reconstruir(conn, args.desde, args.hasta)
+            print(f"Resumen reconstruido: {resultado['horas']} horas, {resultado['filas_productos']} filas producto-hora")
+            return 0
+        diferencias = verificar(conn, args.desde, args.hasta)
+        for d in diferencias[:50]:
+            print(f"  {d['fecha']} {d['hora']:02d}h → esperado {d['pedidos_esperados']} pedidos / ${d['ingresos_esperados']} | "
+                  f"resumen {d['pedidos_resumen']} pedidos / ${d['ingresos_resumen']}")
+        print("OK: el resumen coincide con los pedidos." if not diferencias else f"ERROR: {len(diferencias)} horas con diferencias.")
+        return 0 if not diferencias else 1
+    finally:
+        pool.devolver(conn)
+        pool.cerrar()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+    sys.exit(main())
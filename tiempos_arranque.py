@@ -0,0 +1,94 @@
+# === TIEMPOS_ARRANQUE.PY ===
+# Informe de lo que cuesta importar la app al arrancar: la salida de `python -X importtime`
+# ya sumada y ordenada. Importa el módulo en un proceso aparte (no abre la interfaz).
+#
+#   python app.py --tiempos-arranque
+#   python tiempos_arranque.py [modulo] [--top N]
+
+import re
+import sys
+import subprocess
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+# Lo que la terminal de la mesera no debería cargar hasta abrir Reportes
+PAQUETES_PESADOS = ("plotly", "pandas", "numpy", "reportlab", "kaleido", "narwhals")
+
+_LINEA = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+class Importacion(NamedTuple):
+    modulo: str
+    propio_ms: float
+    acumulado_ms: float
+    nivel: int  # 0 = el módulo medido, 1 = lo que importa directamente...
+
+
+def medir(modulo: str = "app") -> List[Importacion]:
+    """Importa `modulo` en un intérprete nuevo con -X importtime y devuelve cada importación."""
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True, text=True, cwd=Path(__file__).resolve().parent
+    )
+    importaciones = []
+    otras_lineas = []
+    for linea in proceso.stderr.splitlines():
+        encontrada = _LINEA.match(linea)
+        if encontrada:
+            propio, acumulado, sangria, nombre = encontrada.groups()
+            importaciones.append(Importacion(nombre, int(propio) / 1000, int(acumulado) / 1000, (len(sangria) - 1) // 2))
+        elif not linea.startswith("import time:"):
+            otras_lineas.append(linea)
+    if proceso.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {modulo}: " + "\n".join(otras_lineas[-5:]))
+    return importaciones
+
+
+def informe(importaciones: List[Importacion], top: int = 15) -> str:
+    """Total, paquetes de primer nivel más caros, importaciones directas más lentas y pesados cargados."""
+    # -X importtime escribe cada módulo después de sus dependencias: el medido es el último de
+    # nivel 0 y su árbol es lo que queda desde el nivel 0 anterior (lo de antes es el arranque
+    # del intérprete: site, .pth...)
+    niveles_cero = [n for n, i in enumerate(importaciones) if i.nivel == 0]
+    if not niveles_cero:
+        return "Sin datos de importación"
+    inicio = niveles_cero[-2] + 1 if len(niveles_cero) > 1 else 0
+    importaciones = importaciones[inicio:niveles_cero[-1] + 1]
+    raiz = importaciones[-1]
+    total = raiz.acumulado_ms
+
+    por_paquete: Dict[str, float] = {}
+    for i in importaciones:
+        paquete = i.modulo.split(".")[0]
+        por_paquete[paquete] = por_paquete.get(paquete, 0) + i.propio_ms
+
+    lineas = [f"Importar {raiz.modulo}: {total:.0f} ms en {len(importaciones)} módulos", ""]
+    lineas.append("Paquetes más caros (tiempo propio sumado):")
+    for paquete, ms in sorted(por_paquete.items(), key=lambda p: p[1], reverse=True)[:top]:
+        lineas.append(f"  {ms:9.1f} ms  {ms / total * 100:5.1f}%  {paquete}")
+
+    lineas += ["", "Importaciones directas más lentas (acumulado):"]
+    directas = sorted((i for i in importaciones if i.nivel == 1), key=lambda i: i.acumulado_ms, reverse=True)
+    for i in directas[:top]:
+        lineas.append(f"  {i.acumulado_ms:9.1f} ms  {i.modulo}")
+
+    cargados = [p for p in PAQUETES_PESADOS if p in por_paquete]
+    lineas.append("")
+    if cargados:
+        costo = sum(por_paquete[p] for p in cargados)
+        lineas.append(f"Paquetes pesados cargados al arrancar: {', '.join(cargados)} ({costo:.0f} ms)")
+    else:
+        lineas.append("Paquetes pesados cargados al arrancar: ninguno (se cargan al abrir Reportes)")
+    return "\n".join(lineas)
+
+
+def main(modulo: str = "app", top: int = 15) -> None:
+    print(informe(medir(modulo), top))
+
+
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if not a.startswith("--")]
+    cantidad = int(sys.argv[sys.argv.index("--top") + 1]) if "--top" in sys.argv else 15
+    if "--top" in sys.argv:
+        argumentos.remove(str(cantidad))
+    main(argumentos[0] if argumentos else "app", cantidad)
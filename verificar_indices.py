@@ -0,0 +1,150 @@
+# === VERIFICAR_INDICES.PY ===
+# Verificación de regresión de planes: ejecuta los endpoints de reportes y reservas contra
+# la base de datos real, captura cada SELECT que emiten y comprueba con EXPLAIN que las
+# tablas grandes se leen por índice, con la columna de fecha como condición del índice
+# (Index Cond) y no como filtro aplicado fila por fila.
+#
+# Con pocos datos PostgreSQL prefiere el Seq Scan aunque exista el índice, así que la
+# sesión usa enable_seqscan = off. Aun así, una condición como DATE(fecha_hora) = ...
+# termina en Seq Scan o en un recorrido del índice completo sin Index Cond sobre la fecha.
+#
+#   python verificar_indices.py
+
+import re
+import sys
+from datetime import date, timedelta
+
+import backend
+import mesas_estado
+from db_pool import pool
+
+# Tablas que crecen con el uso y nunca deben recorrerse completas en estos endpoints
+TABLAS_VIGILADAS = {"pedidos", "reservas", "pedido_items", "resumen_ventas_hora", "resumen_ventas_producto"}
+
+
+class CursorExplain:
+    """Envuelve un cursor: antes de cada SELECT guarda su plan con EXPLAIN."""
+
+    def __init__(self, cursor, planes: list):
+        self._cursor = cursor
+        self._planes = planes
+
+    def execute(self, sql, params=None):
+        if sql.lstrip().upper().startswith(("SELECT", "WITH")):
+            self._cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            self._planes.append((sql, self._cursor.fetchone()['QUERY PLAN'][0]['Plan']))
+        return self._cursor.execute(sql, params)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+
+class ConexionExplain:
+    def __init__(self, conn):
+        self._conn = conn
+        self.planes = []
+
+    def cursor(self, *args, **kwargs):
+        return CursorExplain(self._conn.cursor(*args, **kwargs), self.planes)
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+
+def recorrer_plan(nodo):
+    yield nodo
+    for hijo in nodo.get("Plans", []):
+        yield from recorrer_plan(hijo)
+
+
+def ejecutar_sql(conn, sql: str) -> None:
+    with conn.cursor() as cursor:
+        cursor.execute(sql)
+
+
+def verificar_endpoint(conn, nombre: str, llamada, columnas_rango: dict) -> bool:
+    """columnas_rango: {tabla: columna} que debe aparecer en el Index Cond de cada lectura de esa tabla."""
+    envoltura = ConexionExplain(conn)
+    llamada(envoltura)
+    conn.rollback()
+    correcto = True
+    for sql, plan in envoltura.planes:
+        consulta = " ".join(sql.split())[:110]
+        for nodo in recorrer_plan(plan):
+            tabla = nodo.get("Relation Name")
+            if tabla not in TABLAS_VIGILADAS:
+                continue
+            if nodo["Node Type"] == "Seq Scan":
+                correcto = False
+                print(f"   -> SEQ SCAN en '{tabla}' | {consulta}...")
+                continue
+            nodos_indice = [n for n in recorrer_plan(nodo) if "Index Name" in n]
+            indices = ", ".join(sorted({n["Index Name"] for n in nodos_indice})) or "-"
+            columna = columnas_rango.get(tabla)
+            condiciones = " ".join(n.get("Index Cond", "") for n in nodos_indice)
+            if columna and not re.search(rf"\b{columna}\b", condiciones):
+                correcto = False
+                print(f"   -> {nodo['Node Type']} en '{tabla}' ({indices}) SIN '{columna}' en Index Cond | {consulta}...")
+            else:
+                print(f"   -> {nodo['Node Type']} en '{tabla}' ({indices})")
+    print(f"{'OK   ' if correcto else 'FALLA'} {nombre} ({len(envoltura.planes)} consultas)")
+    return correcto
+
+
+def main() -> int:
+    print("--- VERIFICANDO USO DE ÍNDICES EN CONSULTAS DE REPORTES ---")
+    hoy = date.today()
+    conn = pool.obtener()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off")
+        conn.commit()
+
+        pedidos_por_fecha = {"pedidos": "fecha_hora"}
+        resumen_por_fecha = {"resumen_ventas_hora": "fecha", "resumen_ventas_producto": "fecha", "pedidos": "fecha_hora"}
+        reservas_por_fecha = {"reservas": "fecha_hora_inicio"}
+        casos = [
+            ("GET /reportes/rango", pedidos_por_fecha, lambda c: backend.obtener_reporte_rango(
+                fecha_inicio=(hoy - timedelta(days=30)).isoformat(), fecha_fin=hoy.isoformat(), conn=c)),
+            ("GET /reportes (rango a la hora)", resumen_por_fecha, lambda c: backend.obtener_reporte(
+                tipo="Diario", start_date=hoy.isoformat(), end_date=(hoy + timedelta(days=1)).isoformat(), conn=c)),
+            ("GET /reportes (rango a media hora)", pedidos_por_fecha, lambda c: backend.obtener_reporte(
+                tipo="Diario", start_date=f"{hoy} 10:30:00", end_date=f"{hoy} 18:30:00", conn=c)),
+            ("GET /analisis/productos", pedidos_por_fecha, lambda c: backend.obtener_analisis_productos(
+                start_date=f"{hoy} 10:30:00", end_date=f"{hoy} 18:30:00", conn=c)),
+            ("GET /reportes/ventas_por_hora", resumen_por_fecha, lambda c: backend.obtener_ventas_por_hora(
+                fecha=hoy.isoformat(), conn=c)),
+            ("GET /reservas/?fecha=", reservas_por_fecha, lambda c: backend.obtener_reservas(fecha=hoy.isoformat(), conn=c)),
+            # /mesas sale de memoria: se revisan las consultas que reconstruyen ese estado
+            ("GET /mesas (reconstrucción)", reservas_por_fecha, lambda c: [
+                ejecutar_sql(c, sql) for sql in (mesas_estado.SQL_PEDIDOS_OCUPAN, mesas_estado.SQL_RESERVAS_VIGENTES)
+            ]),
+            ("GET /reservas/disponibilidad", {"reservas": "periodo"}, lambda c: backend.obtener_disponibilidad_reservas(
+                personas=4, desde=f"{hoy} 19:00:00", hasta=f"{hoy} 23:00:00", duracion_minutos=90, paso_minutos=30, conn=c)),
+            ("GET /reservas/grilla", {"reservas": "periodo"}, lambda c: backend.obtener_grilla_reservas(
+                fecha=hoy.isoformat(), paso_minutos=30, hora_inicio=0, hora_fin=24, conn=c)),
+        ]
+        resultados = []
+        for nombre, columnas_rango, llamada in casos:
+            print(f"\n{nombre}")
+            resultados.append(verificar_endpoint(conn, nombre, llamada, columnas_rango))
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute("RESET enable_seqscan")
+        conn.commit()
+        pool.devolver(conn)
+        pool.cerrar()
+
+    fallas = resultados.count(False)
+    print(f"\n--- {len(resultados) - fallas}/{len(resultados)} endpoints usan índices ---")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
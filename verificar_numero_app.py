@@ -0,0 +1,50 @@
+import requests
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_URL = "http://127.0.0.1:8000"
+PEDIDOS_SIMULTANEOS = 50
+HILOS = 16
+
+# Ítem sin receta → no consume inventario
+ITEM_PRUEBA = {"nombre": "Verificacion numero_app", "precio": 0, "tipo": "Prueba"}
+
+
+def crear_pedido_digital(i):
+    resp = requests.post(
+        f"{BASE_URL}/pedidos",
+        json={"mesa_numero": 99, "items": [ITEM_PRUEBA], "estado": "Pendiente", "notas": f"verificacion {i}"},
+        timeout=30
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+def verificar_numero_app():
+    print("--- INICIANDO VERIFICACIÓN DE NÚMEROS DE PEDIDO DIGITAL ---")
+    print(f"1. Enviando {PEDIDOS_SIMULTANEOS} pedidos digitales en paralelo ({HILOS} hilos)")
+
+    with ThreadPoolExecutor(max_workers=HILOS) as executor:
+        pedidos = list(executor.map(crear_pedido_digital, range(PEDIDOS_SIMULTANEOS)))
+
+    numeros = [p["numero_app"] for p in pedidos]
+    repetidos = sorted({n for n in numeros if numeros.count(n) > 1})
+    print(f"   -> {len(pedidos)} pedidos creados | Números: {min(numeros)} → {max(numeros)}")
+
+    print("\n2. Limpiando pedidos de prueba")
+    for p in pedidos:
+        requests.delete(f"{BASE_URL}/pedidos/{p['id']}", timeout=30)
+
+    if repetidos:
+        print(f"   -> ERROR: números repetidos: {repetidos}")
+        return False
+    if sorted(numeros) != list(range(min(numeros), min(numeros) + len(numeros))):
+        print("   -> ERROR: la secuencia tiene huecos")
+        return False
+
+    print("   -> OK: todos los números son únicos y consecutivos.")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verificar_numero_app() else 1)
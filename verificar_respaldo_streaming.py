@@ -0,0 +1,264 @@
+# === VERIFICAR_RESPALDO_STREAMING.PY ===
+# Prueba de ida y vuelta de respaldo_streaming: genera un conjunto de datos en una base
+# de origen temporal, exporta un respaldo completo y dos diferenciales con cambios,
+# altas y bajas entre medio, restaura la cadena en una base de destino vacía y compara
+# tabla por tabla. También corrompe un trozo y comprueba que la restauración lo rechaza
+# sin dejar nada a medias.
+#
+# Crea y borra las bases `restaurant_respaldo_origen` y `restaurant_respaldo_destino`
+# en el servidor de DATABASE_URL (el usuario necesita permiso CREATEDB).
+#
+#   python verificar_respaldo_streaming.py [--pedidos 5000]
+
+import sys
+import random
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.extras import RealDictCursor
+
+import migraciones
+import resumen_ventas
+import respaldo_streaming
+from db_pool import DATABASE_URL
+
+BASE_ORIGEN = "restaurant_respaldo_origen"
+BASE_DESTINO = "restaurant_respaldo_destino"
+# Trozos chicos para que las tablas grandes se repartan en varios archivos
+TAMANO_TROZO_PRUEBA = 64 * 1024
+# Texto que el formato de COPY tiene que escapar
+NOTAS_RARAS = ["", "sin sal", "tab\taquí", "línea 1\nlínea 2", "barra \\ invertida", "ñandú ☕ 🍕", "\\N literal"]
+
+
+def _conectar(base: str):
+    return psycopg2.connect(psycopg2.extensions.make_dsn(DATABASE_URL, dbname=base), cursor_factory=RealDictCursor)
+
+
+def _recrear_bases(eliminar_solo: bool = False) -> None:
+    conn = psycopg2.connect(DATABASE_URL)
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        for base in (BASE_ORIGEN, BASE_DESTINO):
+            cursor.execute(f"DROP DATABASE IF EXISTS {base}")
+            if not eliminar_solo:
+                cursor.execute(f"CREATE DATABASE {base}")
+    conn.close()
+
+
+def _guardar_lineas(cursor, condicion: str, params=()) -> None:
+    """Mismo contenido que backend.guardar_lineas_pedido, en bloque para los pedidos generados."""
+    cursor.execute(f"DELETE FROM pedido_items WHERE pedido_id IN (SELECT p.id FROM pedidos p WHERE {condicion})", params)
+    cursor.execute(f"""
+        INSERT INTO pedido_items (pedido_id, posicion, menu_id, nombre, precio_unitario, cantidad)
+        SELECT p.id, i.posicion - 1, m.id, i.item ->> 'nombre', (i.item ->> 'precio')::numeric, 1
+        FROM pedidos p
+        CROSS JOIN LATERAL jsonb_array_elements(p.items) WITH ORDINALITY AS i(item, posicion)
+        LEFT JOIN menu m ON m.nombre = i.item ->> 'nombre'
+        WHERE {condicion}
+    """, params)
+
+
+def _pedidos_al_azar(rnd: random.Random, menu, clientes, cantidad: int, inicio: datetime):
+    estados = ["Pendiente", "En preparacion", "Listo", "Entregado", "Pagado", "Pagado", "Pagado"]
+    filas = []
+    for _ in range(cantidad):
+        items = [{"nombre": m['nombre'], "precio": float(m['precio'])} for m in rnd.choices(menu, k=rnd.randint(1, 6))]
+        filas.append((
+            rnd.randint(1, 20),
+            rnd.choice(clientes + [None]),
+            rnd.choice(estados),
+            inicio + timedelta(minutes=rnd.randint(0, 90 * 24 * 60)),
+            psycopg2.extras.Json(items),
+            rnd.choice(NOTAS_RARAS),
+        ))
+    return filas
+
+
+def generar_datos(conn, rnd: random.Random, pedidos: int) -> None:
+    with conn.cursor() as cursor:
+        cursor.execute("INSERT INTO mesas (numero, capacidad) SELECT n, 2 + n % 6 FROM generate_series(1, 20) n ON CONFLICT DO NOTHING")
+        cursor.execute("""
+            INSERT INTO clientes (nombre, domicilio, celular)
+            SELECT 'Cliente ' || n, 'Calle ' || n, '555-' || n FROM generate_series(1, 60) n
+        """)
+        cursor.execute("SELECT id FROM clientes")
+        clientes = [f['id'] for f in cursor.fetchall()]
+        cursor.execute("SELECT nombre, precio FROM menu")
+        menu = cursor.fetchall()
+        inicio = datetime.now().replace(microsecond=0) - timedelta(days=90)
+        psycopg2.extras.execute_values(cursor, """
+            INSERT INTO pedidos (mesa_numero, cliente_id, estado, fecha_hora, items, notas) VALUES %s
+        """, _pedidos_al_azar(rnd, menu, clientes, pedidos, inicio), page_size=1000)
+        _guardar_lineas(cursor, "TRUE")
+        psycopg2.extras.execute_values(cursor, """
+            INSERT INTO reservas (mesa_numero, cliente_id, fecha_hora_inicio, fecha_hora_fin) VALUES %s
+        """, [
+            (rnd.randint(1, 20), rnd.choice(clientes), inicio + timedelta(hours=h), inicio + timedelta(hours=h + 2))
+            # Cada 3 horas: sin solapes aunque después se alarguen (reservas_sin_solape)
+            for h in rnd.sample(range(0, 90 * 24, 3), 400)
+        ])
+        cursor.execute("""
+            INSERT INTO contador_pedidos_app (fecha, ultimo_numero)
+            SELECT d::date, 10 + EXTRACT(DAY FROM d)::int FROM generate_series(CURRENT_DATE - 30, CURRENT_DATE, '1 day') d
+        """)
+    conn.commit()
+
+
+def modificar_datos(conn, rnd: random.Random, ronda: int) -> None:
+    """Cambios, altas y bajas como los que hace el sistema entre dos respaldos."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT id FROM pedidos ORDER BY id")
+        ids = [f['id'] for f in cursor.fetchall()]
+        cambiados = rnd.sample(ids, len(ids) // 20)
+        borrados = rnd.sample(sorted(set(ids) - set(cambiados)), len(ids) // 50)
+        cursor.execute("""
+            UPDATE pedidos SET estado = 'Pagado', notas = %s,
+                   items = items || jsonb_build_array(jsonb_build_object('nombre', 'Agua', 'precio', 10))
+            WHERE id = ANY(%s)
+        """, (f"ronda {ronda}\tcambiado", cambiados))
+        _guardar_lineas(cursor, "p.id = ANY(%s)", (cambiados,))
+        cursor.execute("DELETE FROM pedidos WHERE id = ANY(%s)", (borrados,))
+
+        cursor.execute("SELECT id FROM clientes ORDER BY id")
+        clientes = [f['id'] for f in cursor.fetchall()]
+        cursor.execute("SELECT nombre, precio FROM menu")
+        menu = cursor.fetchall()
+        psycopg2.extras.execute_values(cursor, """
+            INSERT INTO pedidos (mesa_numero, cliente_id, estado, fecha_hora, items, notas) VALUES %s
+        """, _pedidos_al_azar(rnd, menu, clientes, len(ids) // 20, datetime.now().replace(microsecond=0) - timedelta(days=2)))
+        _guardar_lineas(cursor, "p.id > %s", (max(ids),))
+
+        cursor.execute("SELECT id FROM reservas ORDER BY id")
+        reservas = [f['id'] for f in cursor.fetchall()]
+        cursor.execute("DELETE FROM reservas WHERE id = ANY(%s)", (rnd.sample(reservas, 15),))
+        cursor.execute("UPDATE reservas SET fecha_hora_fin = fecha_hora_fin + INTERVAL '30 minutes' WHERE id = ANY(%s)",
+                       (rnd.sample(reservas, 10),))
+        cursor.execute("""
+            INSERT INTO reservas (mesa_numero, cliente_id, fecha_hora_inicio, fecha_hora_fin)
+            SELECT 1 + n %% 20, %s, CURRENT_DATE + 7 * %s + n * INTERVAL '3 hours', CURRENT_DATE + 7 * %s + n * INTERVAL '3 hours' + INTERVAL '2 hours'
+            FROM generate_series(1, 20) n
+        """, (clientes[0], ronda, ronda))
+
+        # Tablas chicas: un cliente borrado (sus reservas caen en cascada), uno editado y un plato nuevo
+        cursor.execute("DELETE FROM clientes WHERE id = %s", (clientes[-1 - ronda],))
+        cursor.execute("UPDATE clientes SET domicilio = %s WHERE id = %s", (f"Mudado ronda {ronda}", clientes[1]))
+        cursor.execute("INSERT INTO menu (nombre, precio, tipo) VALUES (%s, 99.5, 'Especial')", (f"Plato de la ronda {ronda}",))
+        cursor.execute("""
+            INSERT INTO contador_pedidos_app (fecha, ultimo_numero) VALUES (CURRENT_DATE, 0)
+            ON CONFLICT (fecha) DO UPDATE SET ultimo_numero = contador_pedidos_app.ultimo_numero + 7
+        """)
+    conn.commit()
+
+
+def huella_tabla(conn, tabla: str) -> str:
+    with conn.cursor() as cursor:
+        clave = respaldo_streaming._clave_primaria(cursor, tabla)
+        orden = respaldo_streaming._lista_columnas(clave)
+        cursor.execute(f"SELECT COUNT(*) AS filas, md5(COALESCE(string_agg(t::text, '|' ORDER BY {orden}), '')) AS md5 FROM {tabla} t")
+        fila = cursor.fetchone()
+    conn.commit()
+    return f"{fila['filas']} filas / {fila['md5']}"
+
+
+def comparar(origen, destino, tablas) -> bool:
+    iguales = True
+    for tabla in tablas:
+        a, b = huella_tabla(origen, tabla), huella_tabla(destino, tabla)
+        estado = "OK   " if a == b else "FALLA"
+        iguales &= a == b
+        print(f"  [{estado}] {tabla:<24} {a}" + ("" if a == b else f"  ≠  {b}"))
+    return iguales
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Ida y vuelta de respaldo_streaming sobre bases temporales")
+    parser.add_argument("--pedidos", type=int, default=5000)
+    parser.add_argument("--semilla", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    rnd = random.Random(args.semilla)
+    respaldo_streaming.TAMANO_TROZO_BYTES = TAMANO_TROZO_PRUEBA
+    directorio = Path(tempfile.mkdtemp(prefix="respaldo_streaming_"))
+    _recrear_bases()
+    origen, destino = _conectar(BASE_ORIGEN), _conectar(BASE_DESTINO)
+    resultados = []
+    try:
+        migraciones.aplicar(origen)
+        generar_datos(origen, rnd, args.pedidos)
+
+        completo = directorio / "01_completo"
+        respaldo_streaming.exportar(origen, completo)
+        modificar_datos(origen, rnd, 1)
+        diferencial_1 = directorio / "02_diferencial"
+        respaldo_streaming.exportar(origen, diferencial_1, base=completo)
+        modificar_datos(origen, rnd, 2)
+        diferencial_2 = directorio / "03_diferencial"
+        respaldo_streaming.exportar(origen, diferencial_2, base=diferencial_1)
+
+        for ruta in (completo, diferencial_1, diferencial_2):
+            manifiesto = respaldo_streaming.leer_manifiesto(ruta)
+            trozos = [t for tabla in manifiesto["tablas"] for t in tabla["trozos"] + tabla.get("claves", [])]
+            pedidos = next(t for t in manifiesto["tablas"] if t["tabla"] == "pedidos")
+            print(f"{ruta.name:<16} {manifiesto['tipo']:<12} {len(trozos):>4} trozos "
+                  f"{sum(t['bytes'] for t in trozos) / 1024:>8.1f} KB | pedidos exportados: {sum(t['filas'] for t in pedidos['trozos'])}")
+
+        print("\nRestauración de la cadena completo + 2 diferenciales")
+        migraciones.aplicar(destino)
+        respaldo_streaming.restaurar(destino, diferencial_2)
+        resultados.append(comparar(origen, destino, [t for t, _ in respaldo_streaming.TABLAS]))
+        # El resumen no se compara fila a fila: el trigger del origen deja en cero las horas
+        # que se quedaron sin ventas y la reconstrucción directamente no las crea
+        coherente = not resumen_ventas.verificar(origen) and not resumen_ventas.verificar(destino)
+        print(f"  [{'OK   ' if coherente else 'FALLA'}] resumen de ventas coherente con pedidos en origen y destino")
+        resultados.append(coherente)
+
+        with destino.cursor() as cursor:
+            cursor.execute("INSERT INTO pedidos (mesa_numero, items) VALUES (1, '[]') RETURNING id")
+            nuevo_id = cursor.fetchone()['id']
+            cursor.execute("SELECT MAX(id) AS maximo FROM pedidos WHERE id <> %s", (nuevo_id,))
+            secuencia_ok = nuevo_id > cursor.fetchone()['maximo']
+        destino.rollback()
+        print(f"  [{'OK   ' if secuencia_ok else 'FALLA'}] las secuencias continúan después del mayor id restaurado")
+        resultados.append(secuencia_ok)
+
+        print("\nRespaldo dañado")
+        manifiesto = respaldo_streaming.leer_manifiesto(diferencial_1)
+        trozo = diferencial_1 / next(t for t in manifiesto["tablas"] if t["tabla"] == "pedidos")["trozos"][0]["archivo"]
+        datos = bytearray(trozo.read_bytes())
+        datos[len(datos) // 2] ^= 0xFF
+        trozo.write_bytes(bytes(datos))
+        antes = huella_tabla(destino, "pedidos")
+        for nombre, prueba in (
+            ("verificar", lambda: respaldo_streaming.verificar(diferencial_2)),
+            ("restaurar", lambda: respaldo_streaming.restaurar(destino, diferencial_2, reemplazar=True)),
+        ):
+            try:
+                prueba()
+                rechazado = False
+            except respaldo_streaming.ErrorRespaldo as e:
+                destino.rollback()
+                rechazado = True
+                print(f"  {nombre}: {type(e).__name__}: {str(e).splitlines()[0]}")
+            print(f"  [{'OK   ' if rechazado else 'FALLA'}] {nombre} rechaza el trozo dañado")
+            resultados.append(rechazado)
+        intacta = huella_tabla(destino, "pedidos") == antes
+        print(f"  [{'OK   ' if intacta else 'FALLA'}] la base de destino quedó como estaba")
+        resultados.append(intacta)
+    finally:
+        origen.close()
+        destino.close()
+        _recrear_bases(eliminar_solo=True)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    fallas = resultados.count(False)
+    print(f"\n--- {len(resultados) - fallas}/{len(resultados)} comprobaciones correctas ---")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())